@@ -7,3 +7,4 @@ from .class_groups import class_groups_ns
 from .user_class_groups import user_class_groups_ns
 from .events import events_ns
 from .notifications import notifications_ns
+from .monitoring import monitoring_ns
@@ -1,4 +1,5 @@
 # type: ignore
+from flask import Response, request, stream_with_context
 from flask_restx import Resource
 from flask_login import current_user
 from .models import class_group_model, message_model, message_post_model
@@ -12,16 +13,56 @@ from betterave_backend.app.operations.class_group_operations import (
 )
 from betterave_backend.app.operations.message_operations import (
     get_messages_by_group_id,
+    get_last_message_id,
+    iter_new_messages,
     add_message_to_group,
     delete_message,
 )
-from betterave_backend.app.decorators import require_authentication
+from betterave_backend.app.broker import server_sent_event
+from betterave_backend.app.decorators import require_authentication, with_etag
+from betterave_backend.app.api.parsers import message_page_parser, message_stream_parser
+
+# Delay before an EventSource reconnects after its stream was closed, in milliseconds
+STREAM_RETRY_MS = 3000
+
+
+def message_stream_response(group_id: int) -> Response:
+    """
+    Return the Server-Sent Events stream of the new messages of a class group, each with its ID as event ID.
+
+    The stream starts after the message given by the Last-Event-ID header or the last_event_id argument,
+    so a reconnecting client first receives the messages it missed, or after the newest message.
+    """
+    args = message_stream_parser.parse_args()
+    last_id = request.headers.get("Last-Event-ID") or args.get("last_event_id")
+    if last_id is None:
+        last_id = get_last_message_id(group_id)
+    try:
+        last_id = int(last_id)
+    except ValueError:
+        api.abort(400, "Last-Event-ID must be a message ID")
+
+    def events():
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        for messages in iter_new_messages(group_id, last_id):
+            if not messages:
+                # A comment, ignored by the clients, keeping idle connections open
+                yield ": keepalive\n\n"
+            for message in messages:
+                yield server_sent_event(api.marshal(message, message_model), message["message_id"], "message")
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @api.route("/")
 class ClassGroupList(Resource):
     @api.doc(security="apikey")
     @require_authentication()
+    @with_etag("class_group")
     @api.marshal_list_with(class_group_model)
     def get(self):
         """List all class groups."""
@@ -73,10 +114,17 @@ class ClassGroupResource(Resource):
 class GroupMessages(Resource):
     @api.doc(security="apikey")
     @require_authentication()
+    @with_etag("message", "user")
+    @api.expect(message_page_parser)
     @api.marshal_list_with(message_model)
     def get(self, group_id: int):
-        """Get all messages for a specific class group."""
-        return [message.as_dict() for message in get_messages_by_group_id(group_id)]
+        """Get a page of the messages of a specific class group, newest first."""
+        args = message_page_parser.parse_args()
+        try:
+            messages = get_messages_by_group_id(group_id, args.get("before"), args.get("after"), args.get("limit"))
+        except ValueError as e:
+            api.abort(400, str(e))
+        return [message.as_dict() for message in messages]
 
     @api.doc(security="apikey")
     @require_authentication()
@@ -90,6 +138,19 @@ class GroupMessages(Resource):
         api.abort(400, "Could not add message to the class")
 
 
+@api.route("/<int:group_id>/messages/stream")
+class GroupMessageStream(Resource):
+    @api.doc(security="apikey")
+    @require_authentication()
+    @api.expect(message_stream_parser)
+    @api.produces(["text/event-stream"])
+    def get(self, group_id: int):
+        """Stream the new messages of a specific class group as Server-Sent Events, resuming from Last-Event-ID."""
+        if not get_class_group_by_id(group_id):
+            api.abort(404, "Class group not found")
+        return message_stream_response(group_id)
+
+
 @api.route("/messages/<int:message_id>")
 @api.response(404, "Message not found")
 class MessageResource(Resource):
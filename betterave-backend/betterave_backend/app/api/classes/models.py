@@ -58,3 +58,89 @@ grades_post_model = api.model(
         "grade": fields.String(required=True, description="The value of the grade"),
     },
 )
+
+grade_summary_fields = {
+    "count": fields.Integer(description="The number of grades"),
+    "mean": fields.Float(description="The mean of the grades, null without grades"),
+    "std": fields.Float(description="The standard deviation of the grades, null without grades"),
+    "min": fields.Float(description="The lowest grade, null without grades"),
+    "max": fields.Float(description="The highest grade, null without grades"),
+}
+
+grade_quantile_model = api.model(
+    "GradeQuantile",
+    {
+        "quantile": fields.Float(description="The quantile, between 0 and 1"),
+        "value": fields.Float(description="The grade below which this share of the grades falls"),
+    },
+)
+
+grade_bucket_model = api.model(
+    "GradeBucket",
+    {
+        "start": fields.Integer(description="The lowest grade of the bucket"),
+        "end": fields.Integer(description="The highest grade of the bucket, excluded except for the last one"),
+        "count": fields.Integer(description="The number of grades in the bucket"),
+    },
+)
+
+grade_level_stats_model = api.model(
+    "GradeLevelStats",
+    {"level": fields.String(description="The level of the students"), **grade_summary_fields},
+)
+
+grade_stats_model = api.model(
+    "GradeStats",
+    {
+        "class_id": fields.Integer(description="The ID of the class, null for the whole school"),
+        **grade_summary_fields,
+        "median": fields.Float(description="The median grade, null without grades"),
+        "quantiles": fields.List(fields.Nested(grade_quantile_model)),
+        "histogram": fields.List(fields.Nested(grade_bucket_model)),
+        "levels": fields.List(fields.Nested(grade_level_stats_model), description="The statistics of each level"),
+    },
+)
+
+grade_import_row_model = api.model(
+    "GradeImportRow",
+    {
+        "student_id": fields.Integer(description="The ID of the student, or give their email"),
+        "email": fields.String(description="The email of the student, if their ID is not given"),
+        "grade": fields.Float(required=True, description="The grade, between 0 and 20"),
+    },
+)
+
+grade_import_model = api.model(
+    "GradeImport",
+    {"grades": fields.List(fields.Nested(grade_import_row_model), required=True, description="The grades to set")},
+)
+
+grade_import_error_model = api.model(
+    "GradeImportError",
+    {
+        "row": fields.Integer(description="The number of the invalid row, from 1, null for an error of the batch"),
+        "student": fields.String(description="The student_id or email of the row, as given"),
+        "error": fields.String(description="Why the row is invalid"),
+    },
+)
+
+grade_import_report_model = api.model(
+    "GradeImportReport",
+    {
+        "imported": fields.Integer(description="The number of grades set, 0 if any row is invalid"),
+        "errors": fields.List(fields.Nested(grade_import_error_model)),
+    },
+)
+
+grade_matrix_model = api.model(
+    "GradeMatrix",
+    {
+        "student_ids": fields.List(fields.Integer, description="The IDs of the students, the lines of the matrix"),
+        "class_ids": fields.List(fields.Integer, description="The IDs of the classes, the columns of the matrix"),
+        "grades": fields.List(
+            fields.Float,
+            description="The grades flattened by student, grades[i * len(class_ids) + j] being the grade of "
+            "student i in class j, or null",
+        ),
+    },
+)
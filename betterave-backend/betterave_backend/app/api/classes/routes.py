@@ -1,7 +1,17 @@
 # type: ignore
+from flask import request
 from flask_restx import Resource
 from flask_login import current_user
-from .models import class_model, homework_model, homework_post_model
+from sqlalchemy import select
+from .models import (
+    class_model,
+    grade_import_model,
+    grade_import_report_model,
+    grade_matrix_model,
+    grade_stats_model,
+    homework_model,
+    homework_post_model,
+)
 from .namespace import api
 from betterave_backend.app.operations.class_operations import (
     add_class,
@@ -11,6 +21,7 @@ from betterave_backend.app.operations.class_operations import (
     delete_class,
     get_classes_from_level,
     get_classes_from_teacher,
+    teacher_class_ids,
 )
 from betterave_backend.app.operations.message_operations import (
     get_class_messages,
@@ -20,19 +31,40 @@ from betterave_backend.app.api.class_groups.models import (
     message_model,
     message_post_model,
 )
+from betterave_backend.app.api.class_groups.routes import message_stream_response
 from betterave_backend.app.operations.homework_operations import (
     get_class_homework,
     add_homework_to_class,
     get_user_homework,
 )
-from betterave_backend.app.models import UserLevel, User
-from betterave_backend.app.decorators import require_authentication, resolve_user
+from betterave_backend.app.operations.grade_operations import (
+    get_grade_matrix,
+    get_grade_stats,
+    import_class_grades,
+    read_grade_csv,
+)
+from betterave_backend.app.operations.data_version_operations import GLOBAL_OWNER_ID, GRADES_SCOPE
+from betterave_backend.app.models import Class, UserLevel, User
+from betterave_backend.app.decorators import (
+    cached_response,
+    current_user_required,
+    require_authentication,
+    resolve_user,
+    with_etag,
+)
+from betterave_backend.app.api.parsers import (
+    homework_feed_parser,
+    message_page_parser,
+    message_stream_parser,
+    window_parser,
+)
 
 
 @api.route("/")
 class ClassList(Resource):
     @api.doc(security="apikey")
     @require_authentication()
+    @with_etag("class")
     @api.marshal_list_with(class_model)
     def get(self):
         """List all classes."""
@@ -83,6 +115,7 @@ class ClassResource(Resource):
 class ClassLevelResource(Resource):
     @api.doc(security="apikey")
     @require_authentication()
+    @with_etag("class")
     @api.marshal_list_with(class_model)
     def get(self, level_or_me: UserLevel):
         """Fetch all classes for a given level."""
@@ -105,6 +138,7 @@ class ClassTeacherResource(Resource):
     @api.doc(security="apikey")
     @require_authentication()
     @resolve_user
+    @with_etag("class")
     @api.marshal_list_with(class_model)
     def get(self, user: User):
         """Fetch all classes for a given teacher_id."""
@@ -113,17 +147,42 @@ class ClassTeacherResource(Resource):
         return get_classes_from_teacher(user.user_id)
 
 
+@api.route("/teacherclasses/<user_id_or_me>/grades")
+class ClassTeacherGrades(Resource):
+    @api.doc(security="apikey")
+    @require_authentication("admin", "teacher")
+    @resolve_user
+    @current_user_required
+    @with_etag("class", "lesson", "user_class_group", "grade")
+    @api.marshal_with(grade_matrix_model)
+    def get(self, user: User):
+        """
+        Get the grades of the students of the classes of a teacher (of every class for an admin), as a matrix.
+
+        The matrix is in columnar layout: the student IDs, the class IDs, and the grades flattened by student.
+        """
+        class_ids = select(Class.class_id) if user.is_admin else teacher_class_ids(user.user_id)
+        return get_grade_matrix(class_ids)
+
+
 @api.route("/<int:class_id>/messages")
 class ClassMessages(Resource):
     @api.doc(security="apikey")
     @require_authentication()
+    @with_etag("message", "user")
+    @api.expect(message_page_parser)
     @api.marshal_list_with(message_model)
     def get(self, class_id: int):
-        """Get all messages for the main group of a specific class."""
+        """Get a page of the messages of the main group of a specific class, newest first."""
+        args = message_page_parser.parse_args()
         class_ = get_class_by_id(class_id)
         if not class_:
             api.abort(400, f"Class with id {class_id} not found")
-        return [message.as_dict() for message in get_class_messages(class_)]
+        try:
+            messages = get_class_messages(class_, args.get("before"), args.get("after"), args.get("limit"))
+        except ValueError as e:
+            api.abort(400, str(e))
+        return [message.as_dict() for message in messages]
 
     @api.doc(security="apikey")
     @require_authentication()
@@ -137,14 +196,31 @@ class ClassMessages(Resource):
         api.abort(400, "Could not add message to the class")
 
 
+@api.route("/<int:class_id>/messages/stream")
+class ClassMessageStream(Resource):
+    @api.doc(security="apikey")
+    @require_authentication()
+    @api.expect(message_stream_parser)
+    @api.produces(["text/event-stream"])
+    def get(self, class_id: int):
+        """Stream the new messages of the main group of a specific class as Server-Sent Events."""
+        class_ = get_class_by_id(class_id)
+        if not class_ or not class_.main_group():
+            api.abort(404, f"Class with id {class_id} not found")
+        return message_stream_response(class_.main_group().group_id)
+
+
 @api.route("/<int:class_id>/homework")
 class GroupHomework(Resource):
     @api.doc(security="apikey")
     @require_authentication()
+    @with_etag("homework")
+    @api.expect(window_parser)
     @api.marshal_list_with(homework_model)
     def get(self, class_id: int):
-        """Get all homework for a specific class group."""
-        return [hmw.as_dict() for hmw in get_class_homework(class_id)]
+        """Get all homework for a specific class group, optionally due in the [start, end) window."""
+        args = window_parser.parse_args()
+        return [hmw.as_dict() for hmw in get_class_homework(class_id, args.get("start"), args.get("end"))]
 
     @api.doc(security="apikey")
     @require_authentication("admin", "teacher")
@@ -166,7 +242,65 @@ class GroupHomework(Resource):
 class Homework(Resource):
     @api.doc(security="apikey")
     @require_authentication()
+    @with_etag("homework", "user_class_group")
+    @api.expect(homework_feed_parser)
     @api.marshal_list_with(homework_model)
     def get(self):
-        """Get all homework for a specific class group."""
-        return [hmw.as_dict() for hmw in get_user_homework(current_user)]
+        """Get the homework of the current user by due date, optionally due in the [start, end) window."""
+        args = homework_feed_parser.parse_args()
+        homework = get_user_homework(current_user, args.get("start"), args.get("end"), args.get("limit"))
+        return [hmw.as_dict() for hmw in homework]
+
+
+@api.route("/<int:class_id>/grades")
+@api.response(404, "Class not found")
+class ClassGrades(Resource):
+    @api.doc(security="apikey")
+    @require_authentication("admin", "teacher")
+    @api.expect(grade_import_model)
+    @api.response(200, "Every grade was set", grade_import_report_model)
+    @api.response(400, "No grade was set, some rows are invalid", grade_import_report_model)
+    def post(self, class_id: int):
+        """
+        Set the grades of many students of a class at once, all or none of them.
+
+        The body is either JSON, {"grades": [{"student_id" or "email", "grade"}, ...]}, or a CSV file sent as
+        text/csv, with a header naming the student_id or email and grade columns. The report lists the errors of
+        the invalid rows.
+        """
+        if get_class_by_id(class_id) is None:
+            api.abort(404, "Class not found")
+        if request.mimetype == "text/csv":
+            rows = read_grade_csv(request.get_data(as_text=True))
+        else:
+            payload = api.payload
+            rows = payload.get("grades") if isinstance(payload, dict) else payload
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                api.abort(400, "Expected a list of grades")
+        imported, errors = import_class_grades(class_id, rows)
+        return api.marshal({"imported": imported, "errors": errors}, grade_import_report_model), 400 if errors else 200
+
+
+@api.route("/<int:class_id>/grades/stats")
+@api.response(404, "Class not found")
+class ClassGradeStats(Resource):
+    @api.doc(security="apikey")
+    @require_authentication("admin", "teacher")
+    @cached_response(GRADES_SCOPE, owner=lambda class_id: class_id)
+    @api.marshal_with(grade_stats_model)
+    def get(self, class_id: int):
+        """Get the statistics of the grades of a class, overall and by level of the students."""
+        if get_class_by_id(class_id) is None:
+            api.abort(404, "Class not found")
+        return get_grade_stats(class_id)
+
+
+@api.route("/grades/stats")
+class GradeStats(Resource):
+    @api.doc(security="apikey")
+    @require_authentication("admin", "teacher")
+    @cached_response(GRADES_SCOPE, owner=lambda: GLOBAL_OWNER_ID)
+    @api.marshal_with(grade_stats_model)
+    def get(self):
+        """Get the statistics of the grades of the whole school, overall and by level of the students."""
+        return get_grade_stats()
@@ -20,8 +20,8 @@ fullcalendar_event_model = api.model(
     "Event",
     {
         "id": fields.String(
-            attribute=lambda x: f"event_{x.event_id}",
-            description="A unique identifier for the event prefixed with 'event_'",
+            attribute="calendar_id",
+            description="A unique identifier, 'event_<event_id>' or 'event_series_<series_id>_<YYYYMMDD>'",
         ),
         "resourceId": fields.Integer(
             attribute=lambda x: x.asso_id,
@@ -48,7 +48,15 @@ fullcalendar_event_model = api.model(
         "room": fields.String(attribute="location", description="The location where the event takes place"),
         "event_id": fields.Integer(
             attribute="event_id",
-            description="The internal unique identifier of the event",
+            description="The internal unique identifier of the event, null for occurrences of a series",
+        ),
+        "series_id": fields.Integer(
+            attribute=lambda x: getattr(x, "series_id", None),
+            description="The identifier of the event series, null for one-off events",
+        ),
+        "occurrence_date": fields.Date(
+            attribute=lambda x: getattr(x, "occurrence_date", None),
+            description="The date of the occurrence in the series recurrence, before any move",
         ),
         "lesson_id": fields.Integer(
             default=None,
@@ -96,3 +104,60 @@ event_attendees_post_model = api.model(
         ),
     },
 )
+
+event_series_model = api.model(
+    "EventSeries",
+    {
+        "series_id": fields.Integer(description="The internal unique identifier of the event series"),
+        "asso_id": fields.Integer(description="The unique identifier of the association organizing the events"),
+        "name": fields.String(description="The name of the events"),
+        "start_date": fields.Date(description="The first possible date of the series"),
+        "until_date": fields.Date(description="The last possible date of the series, included"),
+        "interval": fields.Integer(description="The number of weeks between two occurrences"),
+        "weekdays": fields.String(description="The days of the week of the occurrences, e.g. 'MO,WE'"),
+        "rrule": fields.String(description="The recurrence rule of the series in iCalendar format"),
+        "start_time": fields.String(
+            attribute=lambda x: x.start_time.strftime("%H:%M"), description="The start time of each occurrence"
+        ),
+        "end_time": fields.String(
+            attribute=lambda x: x.end_time.strftime("%H:%M"), description="The end time of each occurrence"
+        ),
+        "description": fields.String(description="A description of the events"),
+        "location": fields.String(description="The location where the events take place"),
+        "participants": fields.String(attribute="participant_type", description="The participants of the events"),
+    },
+)
+
+event_series_post_model = api.model(
+    "EventSeriesPost",
+    {
+        "asso_id": fields.Integer(
+            required=True,
+            description="The unique identifier of the association organizing the events",
+        ),
+        "name": fields.String(required=True, description="The name of the events"),
+        "start_date": fields.String(required=True, description="The first possible date in YYYY-MM-DD format"),
+        "until_date": fields.String(required=True, description="The last possible date in YYYY-MM-DD format"),
+        "start_time": fields.String(required=True, description="The start time of each occurrence in HH:MM format"),
+        "end_time": fields.String(required=True, description="The end time of each occurrence in HH:MM format"),
+        "weekdays": fields.String(description="The days of the week, e.g. 'MO,WE', defaults to the start date's"),
+        "interval": fields.Integer(description="The number of weeks between two occurrences, defaults to 1"),
+        "description": fields.String(description="A description of the events"),
+        "location": fields.String(description="The location where the events will take place"),
+        "participants": fields.String(
+            required=True,
+            description="Users that will participate to the events. ['Subscribers', 'All users'] or a UserLevel.",
+        ),
+    },
+)
+
+event_occurrence_put_model = api.model(
+    "EventOccurrencePut",
+    {
+        "date": fields.String(description="The new date of the occurrence in YYYY-MM-DD format"),
+        "start_time": fields.String(description="The new start time of the occurrence in HH:MM format"),
+        "end_time": fields.String(description="The new end time of the occurrence in HH:MM format"),
+        "description": fields.String(description="The description of this occurrence"),
+        "location": fields.String(description="The location of this occurrence"),
+    },
+)
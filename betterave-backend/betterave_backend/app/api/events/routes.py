@@ -5,6 +5,9 @@ from .models import (
     fullcalendar_event_model,
     event_post_model,
     event_attendees_post_model,
+    event_series_model,
+    event_series_post_model,
+    event_occurrence_put_model,
 )
 from betterave_backend.app.operations.event_operations import (
     add_event,
@@ -14,7 +17,18 @@ from betterave_backend.app.operations.event_operations import (
     delete_event,
     get_event_by_id,
 )
-from betterave_backend.app.decorators import require_authentication
+from betterave_backend.app.operations.event_series_operations import (
+    add_event_series,
+    update_event_series,
+    delete_event_series,
+    get_event_series_by_id,
+    get_all_event_series,
+    override_event_occurrence,
+    cancel_event_occurrence,
+)
+from betterave_backend.app.decorators import require_authentication, with_etag
+from betterave_backend.app.operations.data_version_operations import EVENTS_SCOPE
+from betterave_backend.app.api.parsers import window_parser
 from flask_login import current_user
 
 
@@ -22,10 +36,13 @@ from flask_login import current_user
 class EventList(Resource):
     @api.doc(security="apikey")
     @require_authentication()
+    @with_etag(scope=EVENTS_SCOPE)
+    @api.expect(window_parser)
     @api.marshal_list_with(fullcalendar_event_model)
     def get(self):
-        """Get a list of all events."""
-        return get_all_events()
+        """Get a list of all events, optionally in the [start, end) window."""
+        args = window_parser.parse_args()
+        return get_all_events(args.get("start"), args.get("end"))
 
     @api.doc(security="apikey")
     @require_authentication()
@@ -68,3 +85,97 @@ class EventAttendees(Resource):
         if add_attendees_to_event(event_id, user_ids, user_level, asso_id):
             return {"message": "Attendees added successfully"}, 200
         api.abort(400, "Could not add attendees to the event")
+
+
+@api.route("/series")
+class EventSeriesList(Resource):
+    @api.doc(security="apikey")
+    @require_authentication()
+    @with_etag("event_series")
+    @api.marshal_list_with(event_series_model)
+    def get(self):
+        """List all event series."""
+        return get_all_event_series()
+
+    @api.doc(security="apikey")
+    @require_authentication()
+    @api.expect(event_series_post_model)
+    def post(self):
+        """Create a new weekly event series."""
+        series_data = api.payload
+        if not can_create_event(current_user, series_data["asso_id"]):
+            api.abort(403, "Permission denied")
+        series_id = add_event_series(**series_data)
+        if series_id == -1:
+            api.abort(400, "Could not create the event series")
+        return series_id, 201
+
+
+def get_editable_series(series_id: int):
+    """Return an event series the current user may modify, aborting with 404 or 403 otherwise."""
+    series = get_event_series_by_id(series_id)
+    if not series:
+        api.abort(404, "Event series not found")
+    if not can_create_event(current_user, series.asso_id):
+        api.abort(403, "Permission denied")
+    return series
+
+
+@api.route("/series/<int:series_id>")
+@api.response(404, "Event series not found")
+class EventSeriesResource(Resource):
+    @api.doc(security="apikey")
+    @require_authentication()
+    @api.marshal_with(event_series_model)
+    def get(self, series_id: int):
+        """Fetch an event series given its identifier."""
+        series = get_event_series_by_id(series_id)
+        if series:
+            return series
+        api.abort(404, "Event series not found")
+
+    @api.doc(security="apikey")
+    @require_authentication("admin", "asso")
+    @api.expect(event_series_post_model)
+    @api.response(204, "Event series successfully updated")
+    def put(self, series_id: int):
+        """Update an event series given its identifier."""
+        get_editable_series(series_id)
+        if update_event_series(series_id, api.payload):
+            return None, 204
+        api.abort(400, "Could not update the event series")
+
+    @api.doc(security="apikey")
+    @require_authentication("admin", "asso")
+    @api.response(204, "Event series successfully deleted")
+    def delete(self, series_id: int):
+        """Delete an event series and all its occurrences given its identifier."""
+        get_editable_series(series_id)
+        if delete_event_series(series_id):
+            return None, 204
+        api.abort(400, "Could not delete the event series")
+
+
+@api.route("/series/<int:series_id>/occurrences/<string:occurrence_date>")
+@api.response(404, "Occurrence not found")
+class EventOccurrenceResource(Resource):
+    @api.doc(security="apikey")
+    @require_authentication("admin", "asso")
+    @api.expect(event_occurrence_put_model)
+    @api.response(204, "Occurrence successfully modified")
+    def put(self, series_id: int, occurrence_date: str):
+        """Move or modify one occurrence of an event series, given the date (YYYY-MM-DD) it was planned on."""
+        get_editable_series(series_id)
+        if override_event_occurrence(series_id, occurrence_date, api.payload):
+            return None, 204
+        api.abort(404, "Occurrence not found or could not be modified")
+
+    @api.doc(security="apikey")
+    @require_authentication("admin", "asso")
+    @api.response(204, "Occurrence successfully cancelled")
+    def delete(self, series_id: int, occurrence_date: str):
+        """Cancel one occurrence of an event series, given the date (YYYY-MM-DD) it was planned on."""
+        get_editable_series(series_id)
+        if cancel_event_occurrence(series_id, occurrence_date):
+            return None, 204
+        api.abort(404, "Occurrence not found or could not be cancelled")
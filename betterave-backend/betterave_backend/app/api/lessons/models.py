@@ -1,52 +1,60 @@
-from datetime import datetime
 from flask_restx import fields
 from .namespace import api
 
 
+# Serializes the denormalized CalendarLesson rows (see models/calendar_lesson.py)
 fullcalendar_lesson_model = api.model(
     "Lesson",
     {
         "id": fields.String(
-            attribute=lambda x: f"lesson_{x.lesson_id}",
-            description="A unique identifier for the lesson prefixed with 'lesson_'",
+            attribute="calendar_id",
+            description="A unique identifier, 'lesson_<lesson_id>' or 'series_<series_id>_<YYYYMMDD>' for occurrences",
         ),
         "group_id": fields.Integer(
-            attribute=lambda x: x.class_group.class_id,
+            attribute="class_id",
             description="The identifier of the class group, used for associating events with resources",
         ),
         "start": fields.DateTime(
             dt_format="iso8601",
-            attribute=lambda x: datetime.combine(x.date, x.start_time).isoformat(),
+            attribute="start_ts",
             description="The start time of the lesson in ISO8601 format",
         ),
         "end": fields.DateTime(
             dt_format="iso8601",
-            attribute=lambda x: datetime.combine(x.date, x.end_time).isoformat(),
+            attribute="end_ts",
             description="The end time of the lesson in ISO8601 format",
         ),
         "title": fields.String(
-            attribute=lambda x: x.class_group.class_ref.name,
+            attribute="title",
             description="The name of the class associated with the lesson",
         ),
         "type": fields.String(
-            attribute=lambda x: x.class_group.name,
+            attribute="group_name",
             description="The name of the class group",
         ),
         "backgroundColor": fields.String(
-            attribute=lambda x: x.class_group.class_ref.background_color,
+            attribute="background_color",
             description="The background color associated with the class for calendar display",
         ),
         "room": fields.String(attribute="room", description="The room in which the lesson takes place"),
         "teacher": fields.String(
-            attribute=lambda x: f"{x.teacher.name} {x.teacher.surname}",
+            attribute="teacher_name",
             description="The full name of the teacher conducting the lesson",
         ),
         "lesson_id": fields.Integer(
             attribute="lesson_id",
-            description="The internal unique identifier of the lesson",
+            description="The internal unique identifier of the lesson, null for occurrences of a series",
+        ),
+        "series_id": fields.Integer(
+            attribute="series_id",
+            description="The identifier of the lesson series, null for one-off lessons",
+        ),
+        "occurrence_date": fields.Date(
+            attribute="occurrence_date",
+            description="The date of the occurrence in the series recurrence, before any move",
         ),
         "class_id": fields.Integer(
-            attribute=lambda x: x.class_group.class_id,
+            attribute="class_id",
             description="The internal unique identifier of the class",
         ),
         "homework": fields.String(
@@ -77,3 +85,61 @@ lesson_post_model = api.model(
         "homework": fields.String(description="Any homework assigned for this lesson"),
     },
 )
+
+lesson_series_model = api.model(
+    "LessonSeries",
+    {
+        "series_id": fields.Integer(description="The internal unique identifier of the lesson series"),
+        "group_id": fields.Integer(description="The identifier of the class group associated with the series"),
+        "start_date": fields.Date(description="The first possible date of the series"),
+        "until_date": fields.Date(description="The last possible date of the series, included"),
+        "interval": fields.Integer(description="The number of weeks between two occurrences"),
+        "weekdays": fields.String(description="The days of the week of the occurrences, e.g. 'MO,WE'"),
+        "rrule": fields.String(description="The recurrence rule of the series in iCalendar format"),
+        "start_time": fields.String(
+            attribute=lambda x: x.start_time.strftime("%H:%M"), description="The start time of each occurrence"
+        ),
+        "end_time": fields.String(
+            attribute=lambda x: x.end_time.strftime("%H:%M"), description="The end time of each occurrence"
+        ),
+        "room": fields.String(description="The room in which the lessons take place"),
+        "teacher_id": fields.Integer(description="The identifier of the teacher conducting the lessons"),
+        "homework": fields.String(description="Any homework assigned for the lessons"),
+    },
+)
+
+lesson_series_post_model = api.model(
+    "LessonSeriesPost",
+    {
+        "group_id": fields.Integer(
+            required=True,
+            description="The identifier of the class group associated with the series",
+        ),
+        "start_date": fields.Date(required=True, description="The first possible date of the series"),
+        "until_date": fields.Date(required=True, description="The last possible date of the series, included"),
+        "start_time": fields.String(
+            required=True,
+            description="The start time of each occurrence (expected format HH:MM)",
+        ),
+        "end_time": fields.String(
+            required=True,
+            description="The end time of each occurrence (expected format HH:MM)",
+        ),
+        "weekdays": fields.String(description="The days of the week, e.g. 'MO,WE', defaults to the start date's"),
+        "interval": fields.Integer(description="The number of weeks between two occurrences, defaults to 1"),
+        "room": fields.String(description="The room in which the lessons are scheduled to take place"),
+        "teacher_id": fields.Integer(description="The identifier of the teacher conducting the lessons"),
+        "homework": fields.String(description="Any homework assigned for the lessons"),
+    },
+)
+
+occurrence_put_model = api.model(
+    "LessonOccurrencePut",
+    {
+        "date": fields.Date(description="The new date of the occurrence"),
+        "start_time": fields.String(description="The new start time of the occurrence (expected format HH:MM)"),
+        "end_time": fields.String(description="The new end time of the occurrence (expected format HH:MM)"),
+        "room": fields.String(description="The new room of the occurrence"),
+        "homework": fields.String(description="The homework assigned for this occurrence"),
+    },
+)
@@ -1,25 +1,47 @@
 # type: ignore
 from flask_restx import Resource
-from .models import fullcalendar_lesson_model, lesson_post_model
+from .models import (
+    fullcalendar_lesson_model,
+    lesson_post_model,
+    lesson_series_model,
+    lesson_series_post_model,
+    occurrence_put_model,
+)
 from .namespace import api
 from betterave_backend.app.operations.lesson_operations import (
-    get_all_lessons,
     add_lesson,
-    get_lesson_by_id,
     update_lesson,
     delete_lesson,
 )
-from betterave_backend.app.decorators import require_authentication
+from betterave_backend.app.operations.lesson_calendar_operations import (
+    get_all_calendar_lessons,
+    get_calendar_lesson,
+)
+from betterave_backend.app.operations.lesson_series_operations import (
+    add_lesson_series,
+    update_lesson_series,
+    delete_lesson_series,
+    get_lesson_series_by_id,
+    get_all_lesson_series,
+    override_occurrence,
+    cancel_occurrence,
+)
+from betterave_backend.app.decorators import require_authentication, with_etag
+from betterave_backend.app.operations.data_version_operations import LESSONS_SCOPE
+from betterave_backend.app.api.parsers import window_parser
 
 
 @api.route("/")
 class LessonList(Resource):
     @api.doc(security="apikey")
     @require_authentication()
+    @with_etag(scope=LESSONS_SCOPE)
+    @api.expect(window_parser)
     @api.marshal_list_with(fullcalendar_lesson_model)
     def get(self):
-        """List all lessons."""
-        return get_all_lessons()
+        """List all lessons, optionally in the [start, end) window."""
+        args = window_parser.parse_args()
+        return get_all_calendar_lessons(args.get("start"), args.get("end"))
 
     @api.doc(security="apikey")
     @require_authentication("admin", "teacher")
@@ -38,7 +60,7 @@ class LessonResource(Resource):
     @api.marshal_with(fullcalendar_lesson_model)
     def get(self, lesson_id: int):
         """Fetch a lesson given its identifier."""
-        lesson = get_lesson_by_id(lesson_id)
+        lesson = get_calendar_lesson(lesson_id)
         if lesson:
             return lesson
         api.abort(404, "Lesson not found")
@@ -61,3 +83,84 @@ class LessonResource(Resource):
         if delete_lesson(lesson_id):
             return None, 204
         api.abort(404, "Lesson not found or could not be deleted")
+
+
+@api.route("/series")
+class LessonSeriesList(Resource):
+    @api.doc(security="apikey")
+    @require_authentication()
+    @with_etag("lesson_series")
+    @api.marshal_list_with(lesson_series_model)
+    def get(self):
+        """List all lesson series."""
+        return get_all_lesson_series()
+
+    @api.doc(security="apikey")
+    @require_authentication("admin", "teacher")
+    @api.expect(lesson_series_post_model)
+    def post(self):
+        """Create a new weekly lesson series."""
+        series_id = add_lesson_series(**api.payload)
+        if series_id == -1:
+            api.abort(400, "Could not create lesson series.")
+        return series_id, 201
+
+
+@api.route("/series/<int:series_id>")
+@api.response(404, "Lesson series not found")
+class LessonSeriesResource(Resource):
+    @api.doc(security="apikey")
+    @require_authentication()
+    @api.marshal_with(lesson_series_model)
+    def get(self, series_id: int):
+        """Fetch a lesson series given its identifier."""
+        series = get_lesson_series_by_id(series_id)
+        if series:
+            return series
+        api.abort(404, "Lesson series not found")
+
+    @api.doc(security="apikey")
+    @require_authentication("admin", "teacher")
+    @api.expect(lesson_series_post_model)
+    @api.response(204, "Lesson series successfully updated")
+    def put(self, series_id: int):
+        """Update a lesson series given its identifier."""
+        if not get_lesson_series_by_id(series_id):
+            api.abort(404, "Lesson series not found")
+        if update_lesson_series(series_id, api.payload):
+            return None, 204
+        api.abort(400, "Could not update lesson series.")
+
+    @api.doc(security="apikey")
+    @require_authentication("admin", "teacher")
+    @api.response(204, "Lesson series successfully deleted")
+    def delete(self, series_id: int):
+        """Delete a lesson series and all its occurrences given its identifier."""
+        if not get_lesson_series_by_id(series_id):
+            api.abort(404, "Lesson series not found")
+        if delete_lesson_series(series_id):
+            return None, 204
+        api.abort(400, "Could not delete lesson series.")
+
+
+@api.route("/series/<int:series_id>/occurrences/<string:occurrence_date>")
+@api.response(404, "Occurrence not found")
+class LessonOccurrenceResource(Resource):
+    @api.doc(security="apikey")
+    @require_authentication("admin", "teacher")
+    @api.expect(occurrence_put_model)
+    @api.response(204, "Occurrence successfully modified")
+    def put(self, series_id: int, occurrence_date: str):
+        """Move or modify one occurrence of a lesson series, given the date (YYYY-MM-DD) it was planned on."""
+        if get_lesson_series_by_id(series_id) and override_occurrence(series_id, occurrence_date, api.payload):
+            return None, 204
+        api.abort(404, "Occurrence not found or could not be modified")
+
+    @api.doc(security="apikey")
+    @require_authentication("admin", "teacher")
+    @api.response(204, "Occurrence successfully cancelled")
+    def delete(self, series_id: int, occurrence_date: str):
+        """Cancel one occurrence of a lesson series, given the date (YYYY-MM-DD) it was planned on."""
+        if get_lesson_series_by_id(series_id) and cancel_occurrence(series_id, occurrence_date):
+            return None, 204
+        api.abort(404, "Occurrence not found or could not be cancelled")
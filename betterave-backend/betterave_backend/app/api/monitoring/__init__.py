@@ -0,0 +1 @@
+from .namespace import api as monitoring_ns
@@ -0,0 +1,35 @@
+from flask_restx import fields
+from .namespace import api
+
+cache_stats_model = api.model(
+    "CacheStats",
+    {
+        "backend": fields.String(description="The cache backend in use (memory, sqlite or none)"),
+        "hits": fields.Integer(description="The number of cache hits served by this worker"),
+        "misses": fields.Integer(description="The number of cache misses of this worker"),
+        "hit_ratio": fields.Float(description="The share of lookups of this worker served from the cache"),
+        "entries": fields.Integer(description="The number of entries currently stored in the backend"),
+    },
+)
+
+job_stats_model = api.model(
+    "JobStats",
+    {
+        "pending": fields.Integer(description="The number of jobs waiting for a worker, including the retries"),
+        "running": fields.Integer(description="The number of jobs claimed by a worker"),
+        "done": fields.Integer(description="The number of jobs which succeeded"),
+        "failed": fields.Integer(description="The number of jobs which failed on their last attempt"),
+    },
+)
+
+password_hashing_stats_model = api.model(
+    "PasswordHashingStats",
+    {
+        "workers": fields.Integer(description="The number of bcrypt processes of this worker, 0 to hash inline"),
+        "max_concurrent": fields.Integer(description="The number of hashes admitted at once, running or queued"),
+        "in_flight": fields.Integer(description="The number of hashes admitted and not finished yet"),
+        "waiting": fields.Integer(description="The number of requests waiting for a hashing slot (queue depth)"),
+        "completed": fields.Integer(description="The number of hashes finished by this worker"),
+        "rejected": fields.Integer(description="The number of requests answered 503 after waiting for a slot"),
+    },
+)
@@ -0,0 +1,5 @@
+from flask_restx import Namespace
+
+api = Namespace("monitoring", description="Operations related to monitoring the API")
+
+from . import routes
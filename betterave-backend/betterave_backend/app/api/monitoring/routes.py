@@ -0,0 +1,37 @@
+# type: ignore
+from flask_restx import Resource
+from betterave_backend.extensions import cache, password_hasher
+from betterave_backend.app.decorators import require_authentication
+from betterave_backend.app.operations.job_operations import count_jobs_by_status
+from .namespace import api
+from .models import cache_stats_model, job_stats_model, password_hashing_stats_model
+
+
+@api.route("/cache")
+class CacheStats(Resource):
+    @api.doc(security="apikey")
+    @require_authentication("admin")
+    @api.marshal_with(cache_stats_model)
+    def get(self):
+        """Get the hit/miss counters of the response cache for the worker serving the request."""
+        return cache.stats()
+
+
+@api.route("/jobs")
+class JobStats(Resource):
+    @api.doc(security="apikey")
+    @require_authentication("admin")
+    @api.marshal_with(job_stats_model)
+    def get(self):
+        """Get the number of background jobs of each status."""
+        return count_jobs_by_status()
+
+
+@api.route("/password-hashing")
+class PasswordHashingStats(Resource):
+    @api.doc(security="apikey")
+    @require_authentication("admin")
+    @api.marshal_with(password_hashing_stats_model)
+    def get(self):
+        """Get the queue depth and counters of the password hashing of the worker serving the request."""
+        return password_hasher.stats()
@@ -37,6 +37,20 @@ fullcalendar_notif_model = api.model(
             attribute="notification_id",
             description="The internal unique identifier of the notif",
         ),
+        "read": fields.Boolean(
+            attribute=lambda x: getattr(x, "read", None),
+            description="Whether the user has read the notif, null when listing all notifs",
+        ),
+    },
+)
+
+notification_read_post_model = api.model(
+    "NotificationReadPost",
+    {
+        "last_read_id": fields.Integer(
+            description="The ID of the last notification read, all of them if not given",
+            required=False,
+        ),
     },
 )
 
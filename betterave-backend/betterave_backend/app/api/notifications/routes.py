@@ -13,7 +13,9 @@ from betterave_backend.app.operations.notification_operations import (
     get_notification_by_id,
     can_create_notification,
 )
-from betterave_backend.app.decorators import require_authentication
+from betterave_backend.app.decorators import require_authentication, with_etag
+from betterave_backend.app.operations.data_version_operations import NOTIFICATIONS_SCOPE
+from betterave_backend.app.api.parsers import window_parser
 from flask_login import current_user
 
 
@@ -21,10 +23,13 @@ from flask_login import current_user
 class NotificationList(Resource):
     @api.doc(security="apikey")
     @require_authentication()
+    @with_etag(scope=NOTIFICATIONS_SCOPE)
+    @api.expect(window_parser)
     @api.marshal_list_with(fullcalendar_notif_model)
     def get(self):
-        """Get a list of all notifications."""
-        return get_all_notifications()
+        """Get a list of all notifications, optionally sent in the [start, end) window."""
+        args = window_parser.parse_args()
+        return get_all_notifications(args.get("start"), args.get("end"))
 
     @api.doc(security="apikey")
     @require_authentication()
@@ -0,0 +1,113 @@
+"""Request parsers shared by several namespaces."""
+
+from datetime import date
+from flask_restx import reqparse
+
+
+def iso_date(value: str) -> date:
+    """
+    Parse a date from an ISO 8601 date or datetime string.
+
+    FullCalendar sends the boundaries of the visible range as datetimes with an offset
+    (e.g. 2024-03-25T00:00:00+01:00), of which only the local date is relevant.
+    """
+    return date.fromisoformat(value[:10])
+
+
+iso_date.__schema__ = {"type": "string", "format": "date"}  # type: ignore
+
+# Default and largest number of items of a page
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def page_size(value: str) -> int:
+    """Parse a page size, between 1 and MAX_PAGE_SIZE."""
+    size = int(value)
+    if not 1 <= size <= MAX_PAGE_SIZE:
+        raise ValueError(f"The page size must be between 1 and {MAX_PAGE_SIZE}")
+    return size
+
+
+page_size.__schema__ = {"type": "integer", "minimum": 1, "maximum": MAX_PAGE_SIZE}  # type: ignore
+
+# Parser for the visible date window of calendar endpoints. The end date is exclusive.
+window_parser = reqparse.RequestParser()
+window_parser.add_argument(
+    "start",
+    type=iso_date,
+    required=False,
+    help="Only return items on or after this date (ISO 8601)",
+)
+window_parser.add_argument(
+    "end",
+    type=iso_date,
+    required=False,
+    help="Only return items strictly before this date (ISO 8601)",
+)
+
+# Parser for the homework feed of a user: the window of the due dates and the number of homework
+homework_feed_parser = window_parser.copy()
+homework_feed_parser.add_argument(
+    "limit",
+    type=page_size,
+    required=False,
+    help=f"Only return the first homework due, at most {MAX_PAGE_SIZE}",
+)
+
+# Parser for the keyset pagination of a chat history, newest first
+message_page_parser = reqparse.RequestParser()
+message_page_parser.add_argument(
+    "before",
+    type=int,
+    required=False,
+    help="Only return the messages posted before the message with this ID, to load older messages",
+)
+message_page_parser.add_argument(
+    "after",
+    type=int,
+    required=False,
+    help="Only return the messages posted after the message with this ID, to load new messages",
+)
+message_page_parser.add_argument(
+    "limit",
+    type=page_size,
+    default=DEFAULT_PAGE_SIZE,
+    help=f"The number of messages of the page, at most {MAX_PAGE_SIZE}",
+)
+
+# Parser for the chat streams, for clients which cannot send the Last-Event-ID header on their first connection
+message_stream_parser = reqparse.RequestParser()
+message_stream_parser.add_argument(
+    "last_event_id",
+    type=int,
+    required=False,
+    help="Stream the messages posted after the message with this ID. Defaults to the newest message",
+)
+
+
+def page_offset(value: str) -> int:
+    """Parse the number of items to skip before a page, at least 0."""
+    offset = int(value)
+    if offset < 0:
+        raise ValueError("The offset must not be negative")
+    return offset
+
+
+page_offset.__schema__ = {"type": "integer", "minimum": 0}  # type: ignore
+
+# Parser for the pages of a full-text search, most relevant results first
+search_parser = reqparse.RequestParser()
+search_parser.add_argument("q", type=str, required=True, help="The words to search for")
+search_parser.add_argument(
+    "limit",
+    type=page_size,
+    default=DEFAULT_PAGE_SIZE,
+    help=f"The number of results of the page, at most {MAX_PAGE_SIZE}",
+)
+search_parser.add_argument(
+    "offset",
+    type=page_offset,
+    default=0,
+    help="The number of results to skip, to load the next pages",
+)
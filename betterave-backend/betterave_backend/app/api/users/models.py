@@ -75,6 +75,16 @@ asso_model = api.model(
 )
 
 
+asso_subscription_model = api.inherit(
+    "AssoSubscription",
+    asso_model,
+    {
+        "subscribed": fields.Boolean(description="Whether the user is subscribed to the association"),
+        "subscriber_count": fields.Integer(description="The number of subscribers of the association"),
+    },
+)
+
+
 grades_model = api.model(
     "Grade",
     {
@@ -92,3 +102,84 @@ grades_post_model = api.model(
         "grade": fields.String(required=True, description="The value of the grade"),
     },
 )
+
+transcript_fields = {
+    "average": fields.Float(description="The average of the grades weighted by the ECTS credits of the classes"),
+    "credits_attempted": fields.Integer(description="The ECTS credits of the graded classes"),
+    "credits_earned": fields.Integer(description="The ECTS credits of the classes graded at least 10"),
+}
+
+transcript_level_model = api.model(
+    "TranscriptLevel",
+    {"level": fields.String(description="The level of the classes (1A, 2A, 3A)"), **transcript_fields},
+)
+
+transcript_class_model = api.model(
+    "TranscriptClass",
+    {
+        "class_id": fields.Integer(description="The ID of the class"),
+        "name": fields.String(description="The name of the class"),
+        "level": fields.String(description="The level of the class"),
+        "ects_credits": fields.Integer(description="The ECTS credits of the class"),
+        "grade": fields.Float(description="The grade of the student in the class"),
+        "passed": fields.Boolean(description="Whether the grade earns the credits of the class"),
+    },
+)
+
+transcript_model = api.model(
+    "Transcript",
+    {
+        "student_id": fields.Integer(description="The ID of the student"),
+        **transcript_fields,
+        "levels": fields.List(fields.Nested(transcript_level_model), description="The averages of each level"),
+        "classes": fields.List(fields.Nested(transcript_class_model), description="The grade of each class"),
+    },
+)
+
+attendance_put_model = api.model(
+    "AttendancePut",
+    {
+        "attending": fields.Boolean(
+            required=True,
+            description="True to attend whatever the audience of the event, False to opt out of it",
+        ),
+    },
+)
+
+job_model = api.model(
+    "Job",
+    {
+        "job_id": fields.Integer(readonly=True, description="The unique identifier of a job"),
+        "kind": fields.String(description="The kind of work done by the job"),
+        "status": fields.String(attribute="status.value", description="pending, running, done or failed"),
+        "attempts": fields.Integer(description="The number of times the job was started"),
+        "max_attempts": fields.Integer(description="The number of attempts before the job is marked as failed"),
+        "created_at": fields.DateTime(description="When the job was enqueued"),
+        "run_after": fields.DateTime(description="When the job can run, later than created_at for a retry"),
+        "finished_at": fields.DateTime(description="When the job succeeded or failed for the last time"),
+        "error": fields.String(description="The error of the last failed attempt"),
+    },
+)
+
+search_result_model = api.model(
+    "SearchResult",
+    {
+        "kind": fields.String(description="message or homework"),
+        "item_id": fields.Integer(description="The ID of the message or homework"),
+        "group_id": fields.Integer(description="The ID of the class group of the message or homework"),
+        "class_id": fields.Integer(description="The ID of the class of the group"),
+        "class_name": fields.String(description="The name of the class of the group"),
+        "content": fields.String(description="The content of the message or homework"),
+        "date": fields.DateTime(description="When the message was sent, or when the homework is due"),
+        "author": fields.String(description="The name of the sender of a message, null for homework"),
+        "score": fields.Float(description="The relevance of the result, higher is more relevant"),
+    },
+)
+
+calendar_token_model = api.model(
+    "CalendarToken",
+    {
+        "token": fields.String(description="The token of the calendar feed URL, only returned once"),
+        "feed_url": fields.String(description="The URL of the iCalendar feed of the user, to give to a calendar app"),
+    },
+)
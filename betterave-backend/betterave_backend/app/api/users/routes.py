@@ -1,13 +1,23 @@
 # type: ignore
+from datetime import datetime, timedelta
+from flask import Response, stream_with_context
 from flask_restx import Resource, reqparse
+from betterave_backend.app.ics import generate_calendar
+from betterave_backend.extensions import api as root_api
 from betterave_backend.app.models import User
 from .models import (
     user_model,
     user_post_model,
     user_classgroups_model,
     asso_model,
+    asso_subscription_model,
     class_group_model,
     grades_model,
+    attendance_put_model,
+    job_model,
+    search_result_model,
+    transcript_model,
+    calendar_token_model,
 )
 from .namespace import api
 from betterave_backend.app.operations.user_operations import (
@@ -16,22 +26,24 @@ from betterave_backend.app.operations.user_operations import (
     get_user_by_id,
     update_user,
     delete_user,
+    create_calendar_token,
+    revoke_calendar_token,
 )
 from betterave_backend.app.operations.grade_operations import (
     get_grades_by_student_and_class_id,
+    get_student_transcript,
     update_student_grade,
 )
 from betterave_backend.app.operations.student_operations import get_students_from_class
-from betterave_backend.app.operations.lesson_operations import (
-    get_student_lessons,
-    get_teacher_lessons,
-    get_all_lessons,
-    get_student_future_lessons,
-    get_teacher_future_lessons,
-    get_all_future_lessons,
+from betterave_backend.app.operations.lesson_calendar_operations import (
+    get_student_calendar_lessons,
+    get_teacher_calendar_lessons,
+    get_all_calendar_lessons,
+    iter_user_calendar_lessons,
 )
 from betterave_backend.app.operations.asso_operations import (
     get_all_assos,
+    get_assos_with_subscription,
     unsubscribe_from_asso,
     subscribe_to_asso,
 )
@@ -42,11 +54,19 @@ from betterave_backend.app.operations.event_operations import (
     get_association_future_events,
     get_all_future_events,
     get_user_future_events,
+    iter_user_events,
+    get_event_by_id,
+    set_event_attendance,
+    set_event_series_attendance,
 )
+from betterave_backend.app.operations.event_series_operations import get_event_series_by_id
+from betterave_backend.app.operations.job_operations import get_job_by_id
+from betterave_backend.app.operations.search_operations import search_class_content
 
 from betterave_backend.app.operations.notification_operations import (
     get_all_notifications,
     get_user_notifications,
+    mark_notifications_read,
 )
 
 from betterave_backend.app.operations.user_class_group_operations import (
@@ -56,11 +76,21 @@ from betterave_backend.app.operations.user_class_group_operations import (
 )
 from betterave_backend.app.api.lessons.models import fullcalendar_lesson_model
 from betterave_backend.app.api.events.models import fullcalendar_event_model
-from betterave_backend.app.api.notifications.models import fullcalendar_notif_model
+from betterave_backend.app.api.notifications.models import fullcalendar_notif_model, notification_read_post_model
+from betterave_backend.app.api.parsers import search_parser, window_parser
 from betterave_backend.app.decorators import (
+    calendar_token_required,
     require_authentication,
     current_user_required,
     resolve_user,
+    cached_response,
+    with_etag,
+)
+from betterave_backend.app.operations.data_version_operations import (
+    LESSONS_SCOPE,
+    EVENTS_SCOPE,
+    NOTIFICATIONS_SCOPE,
+    TRANSCRIPT_SCOPE,
 )
 
 # Parser for URL parameters.
@@ -78,6 +108,7 @@ parser.add_argument(
 class UserList(Resource):
     @api.doc(security="apikey")
     @require_authentication()
+    @with_etag("user")
     @api.marshal_list_with(user_model)
     def get(self):
         """List all users."""
@@ -101,6 +132,7 @@ class UserList(Resource):
 class ClassListStudents(Resource):
     @api.doc(security="apikey")
     @require_authentication()
+    @with_etag("user", "user_class_group")
     @api.marshal_list_with(user_model)
     def get(self, class_id: int):
         """List all students from a given class_id."""
@@ -126,6 +158,7 @@ class GradesByStudentAndClass(Resource):
     @api.doc(security="apikey")
     @require_authentication()
     @resolve_user
+    @with_etag("grade")
     @api.marshal_list_with(grades_model)
     def get(self, class_id: int, user: User):
         """Get grades for a specific student in a specific class."""
@@ -146,6 +179,20 @@ class GradesByStudentAndClass(Resource):
         return {"message": "Grade updated successfully"}, 200
 
 
+@api.route("/<string:user_id_or_me>/transcript")
+class UserTranscript(Resource):
+    @api.doc(security="apikey")
+    @require_authentication()
+    @resolve_user
+    @current_user_required
+    @with_etag(scope=TRANSCRIPT_SCOPE, per_user=True)
+    @cached_response(TRANSCRIPT_SCOPE)
+    @api.marshal_with(transcript_model)
+    def get(self, user: User):
+        """Get the transcript of a student: the grade of each class, and the ECTS-weighted averages and credits."""
+        return get_student_transcript(user.user_id)
+
+
 @api.route("/<string:user_id_or_me>")
 @api.response(404, "User not found")
 class UserResource(Resource):
@@ -220,15 +267,21 @@ class UserLessons(Resource):
     @require_authentication()
     @resolve_user
     @current_user_required
+    @with_etag(scope=LESSONS_SCOPE, per_user=True)
+    @cached_response(LESSONS_SCOPE)
+    @api.expect(window_parser)
     @api.marshal_list_with(fullcalendar_lesson_model)
     def get(self, user: User):
-        """Get a list of lessons for a specific student or teacher."""
+        """Get a list of lessons for a specific student or teacher, optionally in the [start, end) window."""
+        args = window_parser.parse_args()
+        start, end = args.get("start"), args.get("end")
+
         if user.is_student:
-            lessons = get_student_lessons(user)
+            lessons = get_student_calendar_lessons(user, start, end)
         elif user.is_teacher:
-            lessons = get_teacher_lessons(user)
+            lessons = get_teacher_calendar_lessons(user, start, end)
         elif user.is_admin:
-            lessons = get_all_lessons()
+            lessons = get_all_calendar_lessons(start, end)
         else:
             lessons = []
 
@@ -241,6 +294,8 @@ class UserFutureLessons(Resource):
     @require_authentication()
     @resolve_user
     @current_user_required
+    @with_etag(scope=LESSONS_SCOPE, per_user=True, per_day=True)
+    @cached_response(LESSONS_SCOPE, per_day=True)
     @api.expect(parser)
     @api.marshal_list_with(fullcalendar_lesson_model)
     def get(self, user: User):
@@ -248,12 +303,13 @@ class UserFutureLessons(Resource):
         args = parser.parse_args()
         limit = args.get("limit")  # taking back the limit argument presents in the URL
 
+        today = datetime.now().date()
         if user.is_student:
-            future_lessons = get_student_future_lessons(user, limit)
+            future_lessons = get_student_calendar_lessons(user, start=today, limit=limit)
         elif user.is_teacher:
-            future_lessons = get_teacher_future_lessons(user, limit)
+            future_lessons = get_teacher_calendar_lessons(user, start=today, limit=limit)
         elif user.is_admin:
-            future_lessons = get_all_future_lessons()
+            future_lessons = get_all_calendar_lessons(start=today)
         else:
             future_lessons = []
 
@@ -264,6 +320,7 @@ class UserFutureLessons(Resource):
 class AssociationList(Resource):
     @api.doc(security="apikey")
     @require_authentication()
+    @with_etag("user")
     @api.marshal_list_with(asso_model)
     def get(self):
         """Get a list of all associations."""
@@ -277,14 +334,11 @@ class UserAssociationList(Resource):
     @require_authentication()
     @resolve_user
     @current_user_required
+    @with_etag("user")
+    @api.marshal_list_with(asso_subscription_model)
     def get(self, user: User):
-        """Get a list of all associations with subscription status for a specific user."""
-        associations = get_all_assos()
-
-        marshalled = api.marshal(associations, asso_model)
-        for marshalled_asso, asso in zip(marshalled, associations):
-            marshalled_asso["subscribed"] = user in asso.subscribers
-        return marshalled
+        """Get a list of all associations with subscription status and subscriber count for a specific user."""
+        return get_assos_with_subscription(user)
 
 
 @api.route("/<string:user_id_or_me>/subscribe/<int:asso_id>")
@@ -379,15 +433,20 @@ class UserEvents(Resource):
     @require_authentication()
     @resolve_user
     @current_user_required
+    @with_etag(scope=EVENTS_SCOPE, per_user=True)
+    @api.expect(window_parser)
     @api.marshal_list_with(fullcalendar_event_model)
     def get(self, user: User):
-        """Get a list of events for a specific user."""
+        """Get a list of events for a specific user, optionally in the [start, end) window."""
+        args = window_parser.parse_args()
+        start, end = args.get("start"), args.get("end")
+
         if user.is_asso:
-            events = get_association_events(user)
+            events = get_association_events(user, start=start, end=end)
         elif user.is_admin:
-            events = get_all_events()
+            events = get_all_events(start, end)
         else:
-            events = get_user_events(user)
+            events = get_user_events(user, start=start, end=end)
 
         return events
 
@@ -398,6 +457,7 @@ class UserFutureEvents(Resource):
     @require_authentication()
     @resolve_user
     @current_user_required
+    @with_etag(scope=EVENTS_SCOPE, per_user=True, per_day=True)
     @api.expect(parser)
     @api.marshal_list_with(fullcalendar_event_model)
     def get(self, user: User):
@@ -415,18 +475,192 @@ class UserFutureEvents(Resource):
         return future_events
 
 
+@api.route("/<string:user_id_or_me>/events/<int:event_id>/attendance")
+@api.response(404, "Event not found")
+class UserEventAttendance(Resource):
+    @api.doc(security="apikey")
+    @require_authentication()
+    @resolve_user
+    @current_user_required
+    @api.expect(attendance_put_model)
+    @api.response(204, "Attendance successfully set")
+    def put(self, user: User, event_id: int):
+        """Opt a user in or out of an event, whatever its audience."""
+        if not get_event_by_id(event_id):
+            api.abort(404, "Event not found")
+        if set_event_attendance(event_id, user.user_id, api.payload["attending"]):
+            return None, 204
+        api.abort(400, "Could not set the attendance to the event")
+
+    @api.doc(security="apikey")
+    @require_authentication()
+    @resolve_user
+    @current_user_required
+    @api.response(204, "Attendance successfully reset")
+    def delete(self, user: User, event_id: int):
+        """Make a user attend an event again only if they are in its audience."""
+        if not get_event_by_id(event_id):
+            api.abort(404, "Event not found")
+        if set_event_attendance(event_id, user.user_id, None):
+            return None, 204
+        api.abort(400, "Could not reset the attendance to the event")
+
+
+@api.route("/<string:user_id_or_me>/events/series/<int:series_id>/attendance")
+@api.response(404, "Event series not found")
+class UserEventSeriesAttendance(Resource):
+    @api.doc(security="apikey")
+    @require_authentication()
+    @resolve_user
+    @current_user_required
+    @api.expect(attendance_put_model)
+    @api.response(204, "Attendance successfully set")
+    def put(self, user: User, series_id: int):
+        """Opt a user in or out of every occurrence of an event series, whatever its audience."""
+        if not get_event_series_by_id(series_id):
+            api.abort(404, "Event series not found")
+        if set_event_series_attendance(series_id, user.user_id, api.payload["attending"]):
+            return None, 204
+        api.abort(400, "Could not set the attendance to the event series")
+
+    @api.doc(security="apikey")
+    @require_authentication()
+    @resolve_user
+    @current_user_required
+    @api.response(204, "Attendance successfully reset")
+    def delete(self, user: User, series_id: int):
+        """Make a user attend an event series again only if they are in its audience."""
+        if not get_event_series_by_id(series_id):
+            api.abort(404, "Event series not found")
+        if set_event_series_attendance(series_id, user.user_id, None):
+            return None, 204
+        api.abort(400, "Could not reset the attendance to the event series")
+
+
 @api.route("/<string:user_id_or_me>/notifications")
 class UserNotifications(Resource):
     @api.doc(security="apikey")
     @require_authentication()
     @resolve_user
     @current_user_required
+    @with_etag(scope=NOTIFICATIONS_SCOPE, per_user=True)
+    @api.expect(window_parser)
     @api.marshal_list_with(fullcalendar_notif_model)
     def get(self, user):
-        """Get a list of notifications for a specific user."""
+        """Get a list of notifications for a specific user, optionally sent in the [start, end) window."""
+        args = window_parser.parse_args()
+        start, end = args.get("start"), args.get("end")
+
         if user.is_admin:
-            notifications = get_all_notifications()
+            notifications = get_all_notifications(start, end)
         else:
-            notifications = get_user_notifications(user)
+            notifications = get_user_notifications(user, start=start, end=end)
 
         return notifications
+
+
+@api.route("/<string:user_id_or_me>/notifications/read")
+class UserNotificationsRead(Resource):
+    @api.doc(security="apikey")
+    @require_authentication()
+    @resolve_user
+    @current_user_required
+    @api.expect(notification_read_post_model)
+    @api.response(204, "Notifications marked as read")
+    def post(self, user: User):
+        """Mark the notifications of a user as read, up to the given one or all of them."""
+        last_read_id = (api.payload or {}).get("last_read_id")
+        if mark_notifications_read(user, last_read_id):
+            return None, 204
+        api.abort(400, "Could not mark the notifications as read")
+
+
+@api.route("/<string:user_id_or_me>/jobs/<int:job_id>")
+class UserJob(Resource):
+    @api.doc(security="apikey")
+    @require_authentication()
+    @resolve_user
+    @current_user_required
+    @api.marshal_with(job_model)
+    def get(self, user: User, job_id: int):
+        """Get the status of a background job enqueued for a user."""
+        job = get_job_by_id(job_id)
+        if job is None or job.user_id != user.user_id:
+            api.abort(404, "Job not found")
+        return job
+
+
+@api.route("/<string:user_id_or_me>/search")
+class UserSearch(Resource):
+    @api.doc(security="apikey")
+    @require_authentication()
+    @resolve_user
+    @current_user_required
+    @api.expect(search_parser)
+    @api.marshal_list_with(search_result_model)
+    def get(self, user: User):
+        """
+        Search the messages and homework of the class groups of a user, most relevant first.
+
+        Results are paginated with limit and offset.
+        """
+        args = search_parser.parse_args()
+        return search_class_content(user, args["q"], args["limit"], args["offset"])
+
+
+# Without an explicit start date, the iCalendar feed starts this long before today
+ICS_DEFAULT_HISTORY = timedelta(days=90)
+
+
+@api.route("/<string:user_id_or_me>/calendar-token")
+class UserCalendarToken(Resource):
+    @api.doc(security="apikey")
+    @require_authentication()
+    @resolve_user
+    @current_user_required
+    @api.marshal_with(calendar_token_model, code=201)
+    def post(self, user: User):
+        """
+        Create the calendar feed URL of a user, to subscribe to from a calendar app, revoking the previous one.
+
+        The token of the URL is only returned by this call.
+        """
+        token = create_calendar_token(user)
+        feed_url = root_api.url_for(UserCalendarFeed, user_id_or_me=user.user_id, token=token, _external=True)
+        return {"token": token, "feed_url": feed_url}, 201
+
+    @api.doc(security="apikey")
+    @require_authentication()
+    @resolve_user
+    @current_user_required
+    def delete(self, user: User):
+        """Revoke the calendar feed URL of a user."""
+        revoke_calendar_token(user)
+        return {"message": "Calendar feed URL revoked"}, 200
+
+
+@api.route("/<string:user_id_or_me>/calendar.ics")
+@api.doc(params={"token": "The token of the calendar feed URL, from POST /users/<id>/calendar-token"})
+class UserCalendarFeed(Resource):
+    @calendar_token_required
+    @with_etag(scope=(LESSONS_SCOPE, EVENTS_SCOPE), per_user=True, per_day=True)
+    @api.expect(window_parser)
+    @api.produces(["text/calendar"])
+    def get(self, user: User):
+        """
+        Get the lessons and events of a user as an iCalendar feed, in the [start, end) window.
+
+        The start date defaults to 90 days ago. The document is streamed, one event at a time.
+        """
+        args = window_parser.parse_args()
+        start = args.get("start") or datetime.now().date() - ICS_DEFAULT_HISTORY
+        end = args.get("end")
+
+        lessons = iter_user_calendar_lessons(user, start, end)
+        events = iter_user_events(user, start, end)
+        document = generate_calendar(f"Betterave - {user.name} {user.surname}", lessons, events)
+        return Response(
+            stream_with_context(document),
+            mimetype="text/calendar",
+            headers={"Content-Disposition": 'inline; filename="calendar.ics"'},
+        )
@@ -0,0 +1,116 @@
+"""
+Publish/subscribe of the new messages of the class groups, for the Server-Sent Events chat streams.
+
+The message table is the log of the streams: an event is a message, its ID is the message ID, so a client
+resuming with Last-Event-ID gets the messages posted after it from the table. The broker only tells the
+streams waiting on a group when to query the table again. add_message_to_group publishes the ID of each new
+message once it is committed.
+
+Two backends are available, selected by the CHAT_BROKER setting:
+- "memory": the streams of a process are woken by the messages posted through the same process only.
+- "database": the streams are also woken every CHAT_POLL_INTERVAL seconds to query the message table, so that
+  the messages posted through the other gunicorn workers or hosts are delivered as well.
+"""
+
+import json
+import threading
+import time
+from typing import Any, Optional
+from flask import Flask
+
+
+def server_sent_event(data: Any, event_id: Optional[int] = None, event: Optional[str] = None) -> str:
+    """Format a Server-Sent Event with JSON data."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class MemoryChatBroker:
+    """In-process broker waking the streams of a group when a message is published to it."""
+
+    name = "memory"
+
+    def __init__(self) -> None:
+        """Create a broker without any published message."""
+        self._condition = threading.Condition()
+        # The ID of the last message published to each group
+        self._last_ids: dict[int, int] = {}
+
+    def publish(self, group_id: int, message_id: int) -> None:
+        """Wake the streams of a group waiting for a message newer than message_id."""
+        with self._condition:
+            self._last_ids[group_id] = max(message_id, self._last_ids.get(group_id, 0))
+            self._condition.notify_all()
+
+    def wait(self, group_id: int, last_id: int, timeout: float) -> bool:
+        """
+        Wait until a message newer than last_id is published to a group, at most timeout seconds.
+
+        Returns:
+            bool: True if such a message was published, False if the wait timed out.
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._last_ids.get(group_id, 0) > last_id, timeout)
+
+
+class DatabaseChatBroker(MemoryChatBroker):
+    """Broker also waking the streams periodically, to query the messages posted through other processes."""
+
+    name = "database"
+
+    def __init__(self, poll_interval: float) -> None:
+        """Create a broker polling the message table every poll_interval seconds."""
+        super().__init__()
+        self.poll_interval = poll_interval
+
+    def wait(self, group_id: int, last_id: int, timeout: float) -> bool:
+        """Wait for a message published in this process, or until it is time to query the message table."""
+        # The table may hold messages from other processes: the caller queries it whatever the outcome
+        super().wait(group_id, last_id, min(timeout, self.poll_interval))
+        return True
+
+
+class ChatBroker:
+    """Flask extension holding the broker backend of the chat streams."""
+
+    def __init__(self) -> None:
+        """Create the extension, unusable until init_app is called."""
+        self.backend: Any = None
+        self.keepalive = 15.0
+        self.max_duration = 300.0
+
+    def init_app(self, app: Flask) -> None:
+        """Create the backend selected by the app configuration."""
+        app.config.setdefault("CHAT_BROKER", "database")
+        app.config.setdefault("CHAT_POLL_INTERVAL", 2.0)
+        # A comment is sent to idle streams every CHAT_KEEPALIVE seconds so that proxies keep them open
+        app.config.setdefault("CHAT_KEEPALIVE", 15.0)
+        # Streams are closed after CHAT_MAX_DURATION seconds, the clients reconnect with their Last-Event-ID
+        app.config.setdefault("CHAT_MAX_DURATION", 300.0)
+
+        backend = app.config["CHAT_BROKER"]
+        if backend == "memory":
+            self.backend = MemoryChatBroker()
+        elif backend == "database":
+            self.backend = DatabaseChatBroker(float(app.config["CHAT_POLL_INTERVAL"]))
+        else:
+            raise ValueError(f"Unknown chat broker: {backend}")
+        self.keepalive = float(app.config["CHAT_KEEPALIVE"])
+        self.max_duration = float(app.config["CHAT_MAX_DURATION"])
+
+    def publish(self, group_id: int, message_id: int) -> None:
+        """Notify the streams of a group of a new message."""
+        if self.backend is not None:
+            self.backend.publish(group_id, message_id)
+
+    def wait(self, group_id: int, last_id: int, deadline: Optional[float] = None) -> bool:
+        """Wait for a message newer than last_id in a group, at most the keepalive interval or until the deadline."""
+        timeout = self.keepalive
+        if deadline is not None:
+            timeout = max(0.0, min(timeout, deadline - time.monotonic()))
+        return self.backend.wait(group_id, last_id, timeout)
@@ -0,0 +1,195 @@
+"""
+Response cache for the read-heavy API endpoints.
+
+The cache stores serialized responses under keys built by the cached_response decorator (see
+decorators.py) from the endpoint, the user, the query arguments and the user's data version. Entries
+are therefore never invalidated explicitly: a change bumps the data version in the database and the
+next request simply misses. The TTL only bounds the memory used by entries nobody asks for anymore.
+
+Two backends are available, selected by the CACHE_BACKEND setting:
+- "memory": an in-process LRU, private to each worker.
+- "sqlite": a SQLite file (CACHE_PATH) shared by all the gunicorn workers of a host.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from flask import Flask
+
+
+class MemoryCacheBackend:
+    """Thread-safe in-process LRU cache with a TTL."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int, ttl: float):
+        """Create an empty cache of at most max_entries entries, each living ttl seconds."""
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the value stored under the key, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        """Store the value under the key, evicting the least recently used entries if needed."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        """Return the number of entries, including the expired ones not evicted yet."""
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """Cache stored in a SQLite file, shared by every process opening the same path."""
+
+    name = "sqlite"
+    # Expired and excess entries are pruned every PRUNE_INTERVAL writes
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, path: str, max_entries: int, ttl: float):
+        """Open (or create) the cache file at path, holding at most max_entries entries living ttl seconds."""
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS cache_entry "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._connection().execute("CREATE INDEX IF NOT EXISTS ix_cache_entry_expires_at ON cache_entry (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the connection of the current thread, opening it on first use."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the value stored under the key, or None if it is missing or expired."""
+        row = (
+            self._connection()
+            .execute("SELECT value FROM cache_entry WHERE key = ? AND expires_at > ?", (key, time.time()))
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def set(self, key: str, value: str) -> None:
+        """Store the value under the key, pruning the table from time to time."""
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache_entry (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + self.ttl),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_INTERVAL == 0:
+            self.prune()
+
+    def prune(self) -> None:
+        """Delete the expired entries, then the entries closest to expiry above max_entries."""
+        connection = self._connection()
+        connection.execute("DELETE FROM cache_entry WHERE expires_at <= ?", (time.time(),))
+        connection.execute(
+            "DELETE FROM cache_entry WHERE key IN "
+            "(SELECT key FROM cache_entry ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._connection().execute("DELETE FROM cache_entry")
+
+    def __len__(self) -> int:
+        """Return the number of entries, including the expired ones not pruned yet."""
+        return self._connection().execute("SELECT COUNT(*) FROM cache_entry").fetchone()[0]
+
+
+class ResponseCache:
+    """Flask extension holding the cache backend and the hit/miss counters of the current process."""
+
+    def __init__(self) -> None:
+        """Create the extension, disabled until init_app is called."""
+        self.backend: Any = None
+        self.enabled = False
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask) -> None:
+        """Create the backend selected by the app configuration."""
+        app.config.setdefault("CACHE_BACKEND", "memory")
+        app.config.setdefault("CACHE_PATH", "/database/cache.db")
+        app.config.setdefault("CACHE_TTL", 300)
+        app.config.setdefault("CACHE_MAX_ENTRIES", 2048)
+
+        backend = app.config["CACHE_BACKEND"]
+        if backend == "sqlite":
+            self.backend = SQLiteCacheBackend(
+                app.config["CACHE_PATH"], app.config["CACHE_MAX_ENTRIES"], app.config["CACHE_TTL"]
+            )
+        elif backend == "memory":
+            self.backend = MemoryCacheBackend(app.config["CACHE_MAX_ENTRIES"], app.config["CACHE_TTL"])
+        elif backend == "none":
+            self.backend = None
+        else:
+            raise ValueError(f"Unknown cache backend: {backend}")
+        self.enabled = self.backend is not None
+        self.hits = self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the deserialized value stored under the key, or None, and count the hit or miss."""
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Any) -> None:
+        """Serialize and store a value under the key."""
+        self.backend.set(key, json.dumps(value))
+
+    def clear(self) -> None:
+        """Remove every entry of the backend."""
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Return the counters of the current process and the number of entries of the backend."""
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend.name if self.enabled else "none",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.backend) if self.enabled else 0,
+        }
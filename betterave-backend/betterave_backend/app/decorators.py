@@ -33,16 +33,39 @@ current_user_required:
 resolve_user:
     Decorator that resolves the user from the user_id_or_me parameter in the route. If the user_id_or_me parameter
     is "me", the current user is used. Otherwise, the user is resolved from the user_id_or_me parameter.
+
+cached_response:
+    Decorator factory caching the marshalled response of a per-user route in the response cache. The key contains
+    the user's data version for the given scope, so a committed change is visible on the next request. Responses
+    shared by every user are keyed on the data version of another owner instead, e.g. a class.
+
+calendar_token_required:
+    Decorator authenticating a calendar feed route by the token of its URL, instead of a session or the API key,
+    as calendar apps subscribe with a plain URL. It resolves the user like resolve_user.
+
+with_etag:
+    Decorator factory adding a strong ETag to the response of a list route and answering 304 Not Modified when the
+    request's If-None-Match matches. The ETag is computed from data versions, without running the route.
 """
 
 import os
-from typing import Any, Callable, List, Type, Union
+import hashlib
+import hmac
+from datetime import date
+from typing import Any, Callable, List, Optional, Type, Union
 from functools import wraps
-from betterave_backend.extensions import db
+from urllib.parse import urlencode
+from betterave_backend.extensions import db, cache
 from flask_login import current_user
-from flask import jsonify, request
+from flask import Response, jsonify, request
 from flask_restx import abort
 from betterave_backend.app.models import User
+from betterave_backend.app.operations.data_version_operations import (
+    AUDIENCE_SCOPES,
+    GLOBAL_OWNER_ID,
+    get_data_version,
+    table_scope,
+)
 
 
 def is_valid_apikey(key: str) -> bool:
@@ -135,6 +158,30 @@ def require_authentication(*user_types_required: List[str]):
     return decorator
 
 
+def calendar_token_required(f: Callable) -> Callable:
+    """
+    Authenticate a route by the calendar feed token of the user given by user_id_or_me, in the "token" argument.
+
+    The token is compared with the hash stored for the user, so a revoked or rotated token is refused. Replaces
+    require_authentication, resolve_user and current_user_required, and answers 404 for a wrong token or user,
+    so that the URL does not reveal which users exist.
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        user_id = kwargs.pop("user_id_or_me", "")
+        token = request.args.get("token", "")
+        user = db.session.get(User, int(user_id)) if user_id.isdigit() else None
+        if not token or user is None or not user.calendar_token_hash:
+            abort(404, "Calendar feed not found")
+        if not hmac.compare_digest(user.calendar_token_hash, User.hash_calendar_token(token)):
+            abort(404, "Calendar feed not found")
+        kwargs["user"] = user
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+
 def current_user_required(f: Callable) -> Callable:
     """
     Ensure that the current user is either the user specified by the user_id in the route or an admin.
@@ -194,3 +241,115 @@ def resolve_user(f: Callable) -> Callable:
         return f(*args, **kwargs)
 
     return decorated_function
+
+
+def cached_response(scope: str, per_day: bool = False, owner: Optional[Callable[..., int]] = None) -> Callable:
+    """
+    Cache the marshalled response of a route taking a resolved `user`, in the response cache.
+
+    The key is made of the endpoint, the user, the query arguments and the user's data version for `scope`
+    (the global one for admins, who see everyone's data). The version is read before the data, so a change
+    committed meanwhile is at worst served once under the previous version. Audience scopes also key on the
+    global version. Routes depending on the current date (e.g. future lessons) must set `per_day`.
+    Must be placed below resolve_user and current_user_required, and above the marshalling decorators.
+
+    Routes whose response is the same for every user set `owner`, a function of the keyword arguments of the
+    route returning the owner of the data version (e.g. a class ID): the key then has no user, and the route
+    needs no resolved user.
+    """
+
+    def decorator(f: Callable) -> Callable:
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not cache.enabled:
+                return f(*args, **kwargs)
+
+            if owner is not None:
+                owner_id, user_part = owner(**kwargs), ""
+            else:
+                user = kwargs["user"]
+                owner_id, user_part = GLOBAL_OWNER_ID if user.is_admin else user.user_id, str(user.user_id)
+            key = ":".join(
+                [
+                    request.endpoint,
+                    user_part,
+                    f"{scope}={request_data_version(owner_id, scope)}",
+                    str(request_data_version(GLOBAL_OWNER_ID, scope)) if scope in AUDIENCE_SCOPES else "",
+                    date.today().isoformat() if per_day else "",
+                    urlencode(sorted(request.args.items(multi=True))),
+                ]
+            )
+            response = cache.get(key)
+            if response is None:
+                response = f(*args, **kwargs)
+                # Only plain marshalled payloads are cached, not errors returned with a status code
+                if isinstance(response, (list, dict)):
+                    cache.set(key, response)
+            return response
+
+        return decorated_function
+
+    return decorator
+
+
+def request_data_version(owner_id: int, scope: str) -> int:
+    """Return a data version, read at most once per request (memoized in the WSGI environ of the request)."""
+    versions = request.environ.setdefault("betterave.data_versions", {})
+    if (owner_id, scope) not in versions:
+        versions[(owner_id, scope)] = get_data_version(owner_id, scope)
+    return versions[(owner_id, scope)]
+
+
+def with_etag(
+    *tables: str,
+    scope: Union[str, tuple[str, ...], None] = None,
+    per_user: bool = False,
+    per_day: bool = False,
+) -> Callable:
+    """
+    Add a strong ETag to the response of a route, and answer 304 when the client already has it.
+
+    The ETag hashes the endpoint, the URL with its query arguments, the requesting user, the global versions of
+    the given tables and the version of each `scope`: the resolved `user`'s version if `per_user` (the global one
+    for admins), the global version otherwise. Per-user audience scopes also depend on the global version.
+    Routes depending on the current date must set `per_day`.
+    Must be placed below resolve_user and current_user_required, and above the caching and marshalling decorators.
+    """
+    scopes = (scope,) if isinstance(scope, str) else scope or ()
+
+    def decorator(f: Callable) -> Callable:
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            user = kwargs.get("user") or (current_user if current_user.is_authenticated else None)
+            parts = [
+                request.endpoint,
+                request.full_path,
+                str(user.user_id) if user else "",
+                date.today().isoformat() if per_day else "",
+            ]
+            parts.extend(f"{table}={request_data_version(GLOBAL_OWNER_ID, table_scope(table))}" for table in tables)
+            owner_id = user.user_id if per_user and user and not user.is_admin else GLOBAL_OWNER_ID
+            parts.extend(f"{scope}={request_data_version(owner_id, scope)}" for scope in scopes)
+            if owner_id != GLOBAL_OWNER_ID:
+                shared = [scope for scope in scopes if scope in AUDIENCE_SCOPES]
+                parts.extend(f"{scope}*={request_data_version(GLOBAL_OWNER_ID, scope)}" for scope in shared)
+            etag = hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                return Response(status=304, headers={"ETag": f'"{etag}"'})
+
+            response = f(*args, **kwargs)
+            if isinstance(response, Response):
+                if response.status_code == 200:
+                    response.set_etag(etag)
+                return response
+            if isinstance(response, tuple):
+                data, code, *headers = response
+                if code != 200:
+                    return response
+                return data, code, {**(headers[0] if headers else {}), "ETag": f'"{etag}"'}
+            return response, 200, {"ETag": f'"{etag}"'}
+
+        return decorated_function
+
+    return decorator
@@ -0,0 +1,130 @@
+"""
+Password hashing and checking with bcrypt, off the request threads.
+
+bcrypt is deliberately slow and CPU-bound: a login costs a few hundred milliseconds of CPU. When hundreds of
+students log in at the start of term, hashing in the request threads takes the CPU from every other request
+of the worker. The PasswordHasher runs bcrypt in a pool of HASH_WORKERS processes instead, and admits at most
+HASH_MAX_CONCURRENT hashes at once (running or queued in the pool). The other callers wait for a slot up to
+HASH_QUEUE_TIMEOUT seconds, then get a PasswordHasherBusy error, answered with 503 and Retry-After by the API,
+so that a burst of logins is shed instead of piling up.
+
+The pool is created on first use in each process, so that the gunicorn workers each have their own. With
+HASH_WORKERS set to 0, as in tests, bcrypt runs inline in the calling thread, still behind the admission limit.
+The spawned processes import the main module of the program again, so the entry points only build the app
+under `if __name__ == "__main__"` (or import it from betterave_backend.wsgi there).
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+from flask import Flask
+from flask_bcrypt import Bcrypt
+
+# Used by the pool processes, which have no app: the rounds are given with each task
+_bcrypt = Bcrypt()
+
+
+def _generate_password_hash(password: str, rounds: int) -> str:
+    """Hash a password with bcrypt."""
+    return _bcrypt.generate_password_hash(password, rounds).decode("utf-8")
+
+
+def _check_password_hash(hashed_password: str, password: str) -> bool:
+    """Check a password against a bcrypt hash."""
+    return _bcrypt.check_password_hash(hashed_password, password)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when no hashing slot was free within HASH_QUEUE_TIMEOUT seconds."""
+
+
+class PasswordHasher:
+    """Flask extension running bcrypt in a process pool, behind an admission limit."""
+
+    def __init__(self) -> None:
+        """Create the extension, hashing inline until init_app is called."""
+        self.workers = 0
+        self.max_concurrent = 1
+        self.queue_timeout = 0.0
+        self.rounds = 12
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def init_app(self, app: Flask) -> None:
+        """Read the pool size and admission limit from the app configuration."""
+        app.config.setdefault("HASH_WORKERS", 0 if app.config.get("TESTING") else max(1, (os.cpu_count() or 2) // 2))
+        app.config.setdefault("HASH_MAX_CONCURRENT", 2 * max(1, app.config["HASH_WORKERS"]))
+        app.config.setdefault("HASH_QUEUE_TIMEOUT", 5.0)
+        app.config.setdefault("BCRYPT_LOG_ROUNDS", 12)
+
+        self.shutdown()
+        self.workers = app.config["HASH_WORKERS"]
+        self.max_concurrent = app.config["HASH_MAX_CONCURRENT"]
+        self.queue_timeout = app.config["HASH_QUEUE_TIMEOUT"]
+        self.rounds = app.config["BCRYPT_LOG_ROUNDS"]
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self.waiting = self.in_flight = self.completed = self.rejected = 0
+
+    def generate_password_hash(self, password: str) -> str:
+        """Hash a password."""
+        return self._run(_generate_password_hash, password, self.rounds)
+
+    def check_password_hash(self, hashed_password: str, password: str) -> bool:
+        """Check a password against its hash."""
+        return self._run(_check_password_hash, hashed_password, password)
+
+    def _run(self, function: Callable, *args: Any) -> Any:
+        """Wait for a slot, up to queue_timeout seconds, then run the function in the pool or inline."""
+        with self._lock:
+            self.waiting += 1
+        admitted = self._slots.acquire(timeout=self.queue_timeout)
+        with self._lock:
+            self.waiting -= 1
+            if not admitted:
+                self.rejected += 1
+                raise PasswordHasherBusy("Too many logins at once, please retry in a few seconds.")
+            self.in_flight += 1
+        try:
+            if not self.workers:
+                return function(*args)
+            return self._pool().submit(function, *args).result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """Return the pool of the current process, creating it on first use."""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # Spawned rather than forked, as the request threads may hold locks at the time of the fork
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+                self._pid = os.getpid()
+            return self._executor
+
+    def shutdown(self) -> None:
+        """Stop the pool of the current process, if any."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the pool size, the admission limit and the counters of the current process."""
+        return {
+            "workers": self.workers,
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,144 @@
+"""
+Serialization of lessons and events to iCalendar (RFC 5545).
+
+The functions below are generators: the document is produced one VEVENT at a time, so that a feed
+covering several years is never held in memory. Times are written as floating local times, as they
+are stored in the database.
+"""
+
+from datetime import datetime, time
+from typing import Iterable, Iterator, Optional, Union
+from betterave_backend.app.models import CalendarLesson, Event, EventOccurrence, LessonOccurrence
+
+PRODID = "-//Betterave//Betterave API//FR"
+# Lines longer than 75 octets must be folded
+MAX_LINE_OCTETS = 75
+
+
+def escape_text(value: Optional[str]) -> str:
+    """Escape a TEXT property value."""
+    if not value:
+        return ""
+    return (
+        value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def fold_line(line: str) -> str:
+    """Fold a content line into chunks of at most 75 octets, terminated by CRLF."""
+    encoded = line.encode()
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line + "\r\n"
+    chunks = []
+    start = 0
+    limit = MAX_LINE_OCTETS
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Never cut a multi-byte UTF-8 character
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        chunks.append(encoded[start:end].decode())
+        start = end
+        # Continuation lines start with a space, which counts in the 75 octets
+        limit = MAX_LINE_OCTETS - 1
+    return "\r\n ".join(chunks) + "\r\n"
+
+
+def format_datetime(value: datetime) -> str:
+    """Format a DATE-TIME value as a floating local time."""
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def vevent(
+    uid: str,
+    start: datetime,
+    end: datetime,
+    summary: str,
+    location: Optional[str] = None,
+    description: Optional[str] = None,
+    stamp: Optional[datetime] = None,
+) -> str:
+    """Return a VEVENT component."""
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{(stamp or datetime.utcnow()).strftime('%Y%m%dT%H%M%SZ')}",
+        f"DTSTART:{format_datetime(start)}",
+        f"DTEND:{format_datetime(end)}",
+        f"SUMMARY:{escape_text(summary)}",
+    ]
+    if location:
+        lines.append(f"LOCATION:{escape_text(location)}")
+    if description:
+        lines.append(f"DESCRIPTION:{escape_text(description)}")
+    lines.append("END:VEVENT")
+    return "".join(fold_line(line) for line in lines)
+
+
+def lesson_vevent(lesson: Union[CalendarLesson, LessonOccurrence], stamp: datetime) -> str:
+    """Return the VEVENT of a one-off lesson or of an occurrence of a lesson series."""
+    description = "\n".join(
+        part for part in [lesson.teacher_name, f"Homework: {lesson.homework}" if lesson.homework else None] if part
+    )
+    return vevent(
+        uid=(
+            f"lesson-{lesson.lesson_id}@betterave"
+            if lesson.lesson_id is not None
+            else f"lesson-series-{lesson.series_id}-{lesson.occurrence_date.strftime('%Y%m%d')}@betterave"
+        ),
+        start=lesson.start_ts,
+        end=lesson.end_ts,
+        summary=f"{lesson.title} - {lesson.group_name}",
+        location=lesson.room,
+        description=description,
+        stamp=stamp,
+    )
+
+
+def event_vevent(event: Union[Event, EventOccurrence], stamp: datetime) -> str:
+    """Return the VEVENT of an association event or of an occurrence of an event series."""
+    return vevent(
+        uid=(
+            f"event-{event.event_id}@betterave"
+            if event.event_id is not None
+            else f"event-series-{event.series_id}-{event.occurrence_date.strftime('%Y%m%d')}@betterave"
+        ),
+        start=datetime.combine(event.date, event.start_time or time()),
+        end=datetime.combine(event.date, event.end_time or time()),
+        summary=f"{event.association.name} - {event.name}" if event.association else event.name,
+        location=event.location,
+        description=event.description,
+        stamp=stamp,
+    )
+
+
+def generate_calendar(
+    name: str,
+    lessons: Iterable[Union[CalendarLesson, LessonOccurrence]],
+    events: Iterable[Union[Event, EventOccurrence]],
+    refresh_hours: int = 6,
+) -> Iterator[str]:
+    """
+    Yield an iCalendar document made of the given lessons and events, one component at a time.
+
+    `lessons` and `events` are consumed lazily, so they should be streamed queries (see yield_per).
+    """
+    stamp = datetime.utcnow()
+    yield "".join(
+        fold_line(line)
+        for line in [
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            f"PRODID:{PRODID}",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            f"X-WR-CALNAME:{escape_text(name)}",
+            f"REFRESH-INTERVAL;VALUE=DURATION:PT{refresh_hours}H",
+            f"X-PUBLISHED-TTL:PT{refresh_hours}H",
+        ]
+    )
+    for lesson in lessons:
+        yield lesson_vevent(lesson, stamp)
+    for event in events:
+        yield event_vevent(event, stamp)
+    yield fold_line("END:VCALENDAR")
@@ -5,9 +5,21 @@ from .class_group import ClassGroup
 from .event import Event
 from .lesson import Lesson
 from .message import Message
-from .relationship_tables import group_enrollment, event_attendance
-from .enums import UserLevel, UserType
+from .relationship_tables import (
+    group_enrollment,
+    event_attendance,
+    event_series_attendance,
+    notification_reception,
+)
+from .enums import UserLevel, UserType, AudienceKind, JobStatus
 from .homework import Homework  # type: ignore
 from .grade import Grade
 
-from .notification import Notification
+from .notification import Notification, NotificationReadCursor
+from .calendar_lesson import CalendarLesson
+from .lesson_series import LessonSeries, LessonSeriesOverride, LessonOccurrence
+from .event_series import EventSeries, EventSeriesOverride, EventOccurrence
+from .audience import EventAudience, NotificationAudience
+from .data_version import DataVersion
+from .job import Job
+from .search_index import SEARCH_TABLES
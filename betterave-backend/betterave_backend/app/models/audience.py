@@ -0,0 +1,56 @@
+"""
+Flask SQLAlchemy models for rule-based audiences.
+
+Instead of one row per user, the audience of an event, an event series or a notification is stored as a
+few rules: every user, the users of a level, or the subscribers of an association. Rules are evaluated at
+read time with indexed subqueries (see operations/audience_operations.py). Individual users can still be
+included or excluded through the attendance and reception tables, whose rows override the rules.
+"""
+
+from sqlalchemy.orm import declared_attr
+from betterave_backend.extensions import db
+from betterave_backend.app.models.enums import AudienceKind, UserLevel
+
+
+class AudienceRuleMixin:
+    """Columns of an audience rule: its kind, and the level or association it applies to."""
+
+    audience_id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.Enum(AudienceKind), nullable=False)
+    # Only for LEVEL rules
+    level = db.Column(db.Enum(UserLevel), nullable=True)
+
+    @declared_attr
+    def asso_id(cls):  # type: ignore
+        """Only for SUBSCRIBERS rules: the association whose subscribers are in the audience."""
+        return db.Column(db.Integer, db.ForeignKey("user.user_id"), nullable=True)
+
+
+class EventAudience(AudienceRuleMixin, db.Model):
+    """SQLAlchemy object representing an audience rule of an event or of an event series."""
+
+    __tablename__ = "event_audience"
+    __table_args__ = (
+        db.CheckConstraint("(event_id IS NULL) <> (series_id IS NULL)", name="ck_event_audience_owner"),
+        db.Index("ix_event_audience_kind_level", "kind", "level"),
+        db.Index("ix_event_audience_asso_id", "asso_id"),
+        db.Index("ix_event_audience_event_id", "event_id"),
+        db.Index("ix_event_audience_series_id", "series_id"),
+    )
+
+    # Exactly one of them is set
+    event_id = db.Column(db.Integer, db.ForeignKey("event.event_id"), nullable=True)
+    series_id = db.Column(db.Integer, db.ForeignKey("event_series.series_id"), nullable=True)
+
+
+class NotificationAudience(AudienceRuleMixin, db.Model):
+    """SQLAlchemy object representing an audience rule of a notification."""
+
+    __tablename__ = "notification_audience"
+    __table_args__ = (
+        db.Index("ix_notification_audience_kind_level", "kind", "level"),
+        db.Index("ix_notification_audience_asso_id", "asso_id"),
+        db.Index("ix_notification_audience_notification_id", "notification_id"),
+    )
+
+    notification_id = db.Column(db.Integer, db.ForeignKey("notification.notification_id"), nullable=False)
@@ -0,0 +1,51 @@
+"""
+Flask SQLAlchemy model for the denormalized calendar view of a lesson.
+
+Rendering a lesson in the calendar needs its class (title, colour), its class group and its teacher.
+Instead of joining lesson, class_group, class and user on every calendar read, this table keeps one
+ready-to-render row per lesson. It is maintained by the operations modifying any of these tables
+(see lesson_calendar_operations.py) and must never be written to directly.
+"""
+
+from datetime import date
+from betterave_backend.extensions import db
+
+
+class CalendarLesson(db.Model):
+    """SQLAlchemy object representing a lesson as displayed in the calendar."""
+
+    __tablename__ = "calendar_lesson"
+    __table_args__ = (
+        db.Index("ix_calendar_lesson_group_id_start_ts", "group_id", "start_ts"),
+        db.Index("ix_calendar_lesson_teacher_id_start_ts", "teacher_id", "start_ts"),
+        db.Index("ix_calendar_lesson_class_id", "class_id"),
+        db.Index("ix_calendar_lesson_start_ts", "start_ts"),
+    )
+
+    lesson_id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, nullable=False)
+    class_id = db.Column(db.Integer, nullable=False)
+    teacher_id = db.Column(db.Integer, nullable=True)
+
+    start_ts = db.Column(db.DateTime, nullable=False)
+    end_ts = db.Column(db.DateTime, nullable=False)
+    title = db.Column(db.String, nullable=False)
+    background_color = db.Column(db.String, nullable=True)
+    group_name = db.Column(db.String, nullable=False)
+    teacher_name = db.Column(db.String, nullable=True)
+    room = db.Column(db.String, nullable=True)
+    homework = db.Column(db.String, nullable=True)
+
+    # One-off lessons are not part of a series
+    series_id = None
+    occurrence_date = None
+
+    @property
+    def calendar_id(self) -> str:
+        """Get the identifier of the lesson in the calendar."""
+        return f"lesson_{self.lesson_id}"
+
+    @property
+    def date(self) -> date:
+        """Get the date of the lesson."""
+        return self.start_ts.date()  # type: ignore
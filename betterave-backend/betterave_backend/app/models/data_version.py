@@ -0,0 +1,24 @@
+"""
+Flask SQLAlchemy model for the data versions used to invalidate cached responses.
+
+A data version is a counter attached to an owner (a user, a class for the per-class scopes, or
+GLOBAL_OWNER_ID for data shared by everyone) and a scope (e.g. "lessons"). Operations changing what
+an owner sees in a scope bump its version in the same transaction, so that any cache key built from
+the version changes as soon as the change is committed.
+"""
+
+from betterave_backend.extensions import db
+
+
+class DataVersion(db.Model):
+    """SQLAlchemy object representing the version of the data of a scope for an owner."""
+
+    __tablename__ = "data_version"
+
+    owner_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    scope = db.Column(db.String, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the data version."""
+        return f"<DataVersion {self.owner_id} {self.scope}={self.version}>"
@@ -11,6 +11,17 @@ UserLevel:
 - _1A: first year student
 - _2A: second year student
 - _3A: third year student
+
+AudienceKind:
+- ALL: every user
+- LEVEL: the users of a level
+- SUBSCRIBERS: the subscribers of an association
+
+JobStatus:
+- PENDING: waiting for a worker, possibly until a retry time
+- RUNNING: claimed by a worker
+- DONE: ran successfully
+- FAILED: failed on its last attempt
 """
 
 from enum import Enum
@@ -32,3 +43,20 @@ class UserLevel(Enum):
     _2A = "2A"
     _3A = "3A"
     NA = "N/A"  # Not applicable, for teachers, assos and admins
+
+
+class AudienceKind(Enum):
+    """Kinds of audience rules of events and notifications."""
+
+    ALL = "all"
+    LEVEL = "level"
+    SUBSCRIBERS = "subscribers"
+
+
+class JobStatus(Enum):
+    """Statuses of the background jobs."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
@@ -7,6 +7,10 @@ class Event(db.Model):
     """SQLAlchemy object representing a specific event organized by an association."""
 
     __tablename__ = "event"
+    __table_args__ = (
+        db.Index("ix_event_asso_id_date", "asso_id", "date"),
+        db.Index("ix_event_date", "date"),
+    )
     event_id = db.Column(db.Integer, primary_key=True)
     asso_id = db.Column(
         db.Integer, db.ForeignKey("user.user_id"), nullable=False
@@ -20,5 +24,12 @@ class Event(db.Model):
     participant_type = db.Column(db.String, nullable=False)
 
     # Relationships
-    attending_users = db.relationship("User", secondary="event_attendance", back_populates="attended_events")
+    audiences = db.relationship(
+        "EventAudience", primaryjoin="Event.event_id == EventAudience.event_id", cascade="all, delete-orphan"
+    )
     association = db.relationship("User", foreign_keys=[asso_id])
+
+    @property
+    def calendar_id(self) -> str:
+        """Get the identifier of the event in the calendar."""
+        return f"event_{self.event_id}"
@@ -0,0 +1,101 @@
+"""
+Flask SQLAlchemy models for recurring association events. Analoguous to the lesson series models.
+
+An event series stores a weekly recurrence (see recurrence.py) and its audience once, instead of
+one Event row and one audience per week. Single occurrences can be cancelled or
+modified by an override row keyed by the date the occurrence would originally take place on.
+Occurrences are expanded at read time, only for the requested date window, as EventOccurrence objects.
+"""
+
+from dataclasses import dataclass
+from datetime import date, time
+from typing import Any, Optional
+from betterave_backend.extensions import db
+from betterave_backend.app.recurrence import parse_weekdays, to_rrule
+
+
+class EventSeries(db.Model):
+    """SQLAlchemy object representing an event repeated weekly by an association."""
+
+    __tablename__ = "event_series"
+    __table_args__ = (
+        db.Index("ix_event_series_asso_id_until_date", "asso_id", "until_date"),
+        db.Index("ix_event_series_until_date", "until_date"),
+    )
+
+    series_id = db.Column(db.Integer, primary_key=True)
+    asso_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), nullable=False)
+    name = db.Column(db.String, nullable=False)
+
+    # Recurrence rule: every `interval` weeks on `weekdays` (e.g. "MO,WE"), from start_date to until_date included
+    start_date = db.Column(db.Date, nullable=False)
+    until_date = db.Column(db.Date, nullable=False)
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    weekdays = db.Column(db.String, nullable=True)
+
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    description = db.Column(db.String, nullable=True)
+    location = db.Column(db.String, nullable=True)
+    participant_type = db.Column(db.String, nullable=False)
+
+    # Relationships
+    audiences = db.relationship(
+        "EventAudience", primaryjoin="EventSeries.series_id == EventAudience.series_id", cascade="all, delete-orphan"
+    )
+    association = db.relationship("User", foreign_keys=[asso_id])
+    overrides = db.relationship("EventSeriesOverride", back_populates="series", cascade="all, delete-orphan")
+
+    @property
+    def weekday_numbers(self) -> list[int]:
+        """Get the weekdays of the series, Monday being 0."""
+        return parse_weekdays(self.weekdays, self.start_date)
+
+    @property
+    def rrule(self) -> str:
+        """Get the recurrence rule of the series in iCalendar format."""
+        return to_rrule(self.interval, self.weekday_numbers, self.until_date)
+
+
+class EventSeriesOverride(db.Model):
+    """SQLAlchemy object representing a cancelled or modified occurrence of an event series."""
+
+    __tablename__ = "event_series_override"
+    __table_args__ = (db.Index("ix_event_series_override_date", "series_id", "date"),)
+
+    series_id = db.Column(db.Integer, db.ForeignKey("event_series.series_id"), primary_key=True)
+    # Date of the occurrence as generated by the recurrence rule
+    occurrence_date = db.Column(db.Date, primary_key=True)
+    cancelled = db.Column(db.Boolean, nullable=False, default=False)
+
+    # Overridden values, None meaning "as in the series"
+    date = db.Column(db.Date, nullable=True)
+    start_time = db.Column(db.Time, nullable=True)
+    end_time = db.Column(db.Time, nullable=True)
+    description = db.Column(db.String, nullable=True)
+    location = db.Column(db.String, nullable=True)
+
+    series = db.relationship("EventSeries", back_populates="overrides")
+
+
+@dataclass
+class EventOccurrence:
+    """One occurrence of an event series, with the same attributes as an Event."""
+
+    series_id: int
+    occurrence_date: date
+    asso_id: int
+    name: str
+    date: date
+    start_time: time
+    end_time: time
+    description: Optional[str]
+    location: Optional[str]
+    participant_type: str
+    association: Any
+    event_id: Optional[int] = None
+
+    @property
+    def calendar_id(self) -> str:
+        """Get the identifier of the occurrence in the calendar."""
+        return f"event_series_{self.series_id}_{self.occurrence_date.strftime('%Y%m%d')}"
@@ -8,6 +8,10 @@ class Grade(db.Model):
     """SQLAlchemy object for grade associated with a Class."""
 
     __tablename__ = "grade"
+    __table_args__ = (
+        # A student has one grade per class, which the grade upserts rely on (see upsert_grades)
+        db.Index("uq_grade_class_id_student_id", "class_id", "student_id", unique=True),
+    )
     grade_id = db.Column(db.Integer, primary_key=True)
     class_id = db.Column(db.Integer, db.ForeignKey("class.class_id"), nullable=False)
     student_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), nullable=False)
@@ -8,6 +8,7 @@ class Homework(db.Model):
     """SQLAlchemy object for homework associated with a ClassGroup."""
 
     __tablename__ = "homework"
+    __table_args__ = (db.Index("ix_homework_group_id_due_date", "group_id", "due_date"),)
     homework_id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, db.ForeignKey("class_group.group_id"), nullable=False)
     content = db.Column(db.Text, nullable=False)
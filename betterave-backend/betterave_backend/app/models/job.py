@@ -0,0 +1,37 @@
+"""
+Flask SQLAlchemy model for the background jobs (see operations/job_operations.py).
+
+The job table is the queue: the worker claims the pending jobs whose run_after time has come, in order.
+"""
+
+from datetime import datetime
+from betterave_backend.extensions import db
+from betterave_backend.app.models.enums import JobStatus
+
+
+class Job(db.Model):
+    """SQLAlchemy object representing a background job and its status."""
+
+    __tablename__ = "job"
+    __table_args__ = (db.Index("ix_job_status_run_after", "status", "run_after"),)
+
+    job_id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String, nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    # Enqueueing a job with the key of an existing one returns the existing job
+    idempotency_key = db.Column(db.String, nullable=True, unique=True)
+    # The user the job was enqueued for, who can follow its status
+    user_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), nullable=True, index=True)
+
+    status = db.Column(db.Enum(JobStatus), nullable=False, default=JobStatus.PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    error = db.Column(db.String, nullable=True)
+
+    def __repr__(self) -> str:
+        """Return a string representation of the job."""
+        return f"<Job {self.job_id} {self.kind} {self.status.value}>"
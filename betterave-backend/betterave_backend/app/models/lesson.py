@@ -11,6 +11,11 @@ class Lesson(db.Model):
     """SQLAlchemy object representing a specific lesson within a class."""
 
     __tablename__ = "lesson"
+    __table_args__ = (
+        # Calendar queries filter lessons by group (students) or teacher, on a date window
+        db.Index("ix_lesson_group_id_date", "group_id", "date", "start_time"),
+        db.Index("ix_lesson_teacher_id_date", "teacher_id", "date", "start_time"),
+    )
     lesson_id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, db.ForeignKey("class_group.group_id"), nullable=False)
 
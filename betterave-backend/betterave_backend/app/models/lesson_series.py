@@ -0,0 +1,105 @@
+"""
+Flask SQLAlchemy models for recurring lessons.
+
+A lesson series stores a weekly recurrence (see recurrence.py) instead of one Lesson row per week.
+Single occurrences can be cancelled or modified (moved, room change, homework) by an override row
+keyed by the date the occurrence would originally take place on. Occurrences are expanded at read
+time, only for the requested date window, as LessonOccurrence objects.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+from betterave_backend.extensions import db
+from betterave_backend.app.recurrence import parse_weekdays, to_rrule
+
+
+class LessonSeries(db.Model):
+    """SQLAlchemy object representing a lesson repeated weekly for a class group."""
+
+    __tablename__ = "lesson_series"
+    __table_args__ = (
+        db.Index("ix_lesson_series_group_id_until_date", "group_id", "until_date"),
+        db.Index("ix_lesson_series_teacher_id_until_date", "teacher_id", "until_date"),
+    )
+
+    series_id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, db.ForeignKey("class_group.group_id"), nullable=False)
+    teacher_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), nullable=True)
+
+    # Recurrence rule: every `interval` weeks on `weekdays` (e.g. "MO,WE"), from start_date to until_date included
+    start_date = db.Column(db.Date, nullable=False)
+    until_date = db.Column(db.Date, nullable=False)
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    weekdays = db.Column(db.String, nullable=True)
+
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    room = db.Column(db.String, nullable=True)
+    homework = db.Column(db.String, nullable=True)
+
+    # Relationships
+    class_group = db.relationship("ClassGroup")
+    teacher = db.relationship("User", back_populates="lesson_series_taught")
+    overrides = db.relationship("LessonSeriesOverride", back_populates="series", cascade="all, delete-orphan")
+
+    @property
+    def weekday_numbers(self) -> list[int]:
+        """Get the weekdays of the series, Monday being 0."""
+        return parse_weekdays(self.weekdays, self.start_date)
+
+    @property
+    def rrule(self) -> str:
+        """Get the recurrence rule of the series in iCalendar format."""
+        return to_rrule(self.interval, self.weekday_numbers, self.until_date)
+
+
+class LessonSeriesOverride(db.Model):
+    """SQLAlchemy object representing a cancelled or modified occurrence of a lesson series."""
+
+    __tablename__ = "lesson_series_override"
+    __table_args__ = (db.Index("ix_lesson_series_override_date", "series_id", "date"),)
+
+    series_id = db.Column(db.Integer, db.ForeignKey("lesson_series.series_id"), primary_key=True)
+    # Date of the occurrence as generated by the recurrence rule
+    occurrence_date = db.Column(db.Date, primary_key=True)
+    cancelled = db.Column(db.Boolean, nullable=False, default=False)
+
+    # Overridden values, None meaning "as in the series"
+    date = db.Column(db.Date, nullable=True)
+    start_time = db.Column(db.Time, nullable=True)
+    end_time = db.Column(db.Time, nullable=True)
+    room = db.Column(db.String, nullable=True)
+    homework = db.Column(db.String, nullable=True)
+
+    series = db.relationship("LessonSeries", back_populates="overrides")
+
+
+@dataclass
+class LessonOccurrence:
+    """One occurrence of a lesson series, with the same attributes as a CalendarLesson row."""
+
+    series_id: int
+    occurrence_date: date
+    group_id: int
+    class_id: int
+    teacher_id: Optional[int]
+    start_ts: datetime
+    end_ts: datetime
+    title: str
+    background_color: Optional[str]
+    group_name: str
+    teacher_name: Optional[str]
+    room: Optional[str]
+    homework: Optional[str]
+    lesson_id: Optional[int] = None
+
+    @property
+    def calendar_id(self) -> str:
+        """Get the identifier of the occurrence in the calendar."""
+        return f"series_{self.series_id}_{self.occurrence_date.strftime('%Y%m%d')}"
+
+    @property
+    def date(self) -> date:
+        """Get the date of the occurrence."""
+        return self.start_ts.date()
@@ -9,6 +9,13 @@ class Message(db.Model):
     """SQLAlchemy object for Chat messages associated with a ClassGroup."""
 
     __tablename__ = "message"
+    __table_args__ = (
+        # Serves the pages of the chat history of a group, newest first (see get_messages_by_group_id)
+        db.Index("ix_message_group_id_timestamp", "group_id", "timestamp", "message_id"),
+        # Serves the chat streams, which deliver the messages of a group in ID order (see get_messages_since)
+        db.Index("ix_message_group_id_message_id", "group_id", "message_id"),
+    )
+
     message_id = db.Column(db.Integer, primary_key=True)
     group_id = db.Column(db.Integer, db.ForeignKey("class_group.group_id"), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), nullable=False)
@@ -20,16 +27,17 @@ class Message(db.Model):
     user = db.relationship("User", back_populates="messages")
 
     def as_dict(self) -> dict[str, Any]:
-        """Return the message as a dictionary."""
+        """Return the message as a dictionary. Load the senders with the messages to list many of them."""
+        sender = self.user
         return {
             "message_id": self.message_id,
             "group_id": self.group_id,
             "content": self.content,
             "timestamp": self.timestamp.isoformat(),
             "sender_details": {
-                "user_id": self.user.user_id,
-                "name": self.user.name,
-                "surname": self.user.surname,
-                "profile_pic": self.user.profile_pic,
+                "user_id": sender.user_id,
+                "name": sender.name,
+                "surname": sender.surname,
+                "profile_pic": sender.profile_pic,
             },
         }
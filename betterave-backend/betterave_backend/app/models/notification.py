@@ -1,5 +1,12 @@
-"""Flask SQLAlchemy model for a notification."""
+"""
+Flask SQLAlchemy models for a notification and for the read state of the notifications of a user.
 
+The recipients of a notification are given by audience rules (see audience.py), so sending it to everyone
+writes a single rule. Instead of one read flag per recipient, each user has a read cursor: notifications are
+listed in increasing ID order, and those up to the cursor are read.
+"""
+
+from datetime import datetime
 from betterave_backend.extensions import db
 
 
@@ -12,11 +19,18 @@ class Notification(db.Model):
     content = db.Column(db.String, nullable=False)
     sent_by_user_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), nullable=False)
     recipient_type = db.Column(db.String, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
 
     # Relationships
-    recipient_users = db.relationship(
-        "User",
-        secondary="notification_reception",
-        back_populates="received_notifications",
-    )
+    audiences = db.relationship("NotificationAudience", cascade="all, delete-orphan")
     sender = db.relationship("User", foreign_keys=[sent_by_user_id])
+
+
+class NotificationReadCursor(db.Model):
+    """SQLAlchemy object representing the last notification read by a user."""
+
+    __tablename__ = "notification_read_cursor"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.user_id"), primary_key=True)
+    # The notifications of the user with an ID lower than or equal to this one are read
+    last_read_id = db.Column(db.Integer, nullable=False, default=0)
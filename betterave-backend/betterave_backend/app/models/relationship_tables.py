@@ -1,4 +1,9 @@
-"""Various relationship tables for many-to-many relationships."""
+"""
+Various relationship tables for many-to-many relationships.
+
+Each table has a composite primary key, which prevents duplicates and serves the lookups from its first
+column, and an index on its second column for the lookups in the reverse direction.
+"""
 
 from betterave_backend.extensions import db
 
@@ -6,16 +11,34 @@ group_enrollment = db.Table(
     "group_enrollment",
     db.Column("student_id", db.Integer, db.ForeignKey("user.user_id"), primary_key=True),
     db.Column("group_id", db.Integer, db.ForeignKey("class_group.group_id"), primary_key=True),
+    db.Index("ix_group_enrollment_group_id", "group_id"),
 )
 
+# Per-user overrides of the audience rules of events (see audience.py): attending is True for a user
+# who opted in without matching the rules, False for a user who opted out although matching them
 event_attendance = db.Table(
     "event_attendance",
-    db.Column("user_id", db.Integer, db.ForeignKey("user.user_id")),
-    db.Column("event_id", db.Integer, db.ForeignKey("event.event_id")),
+    db.Column("user_id", db.Integer, db.ForeignKey("user.user_id"), primary_key=True),
+    db.Column("event_id", db.Integer, db.ForeignKey("event.event_id"), primary_key=True),
+    db.Column("attending", db.Boolean, nullable=False, default=True),
+    db.Index("ix_event_attendance_event_id", "event_id"),
+)
+
+# Same overrides for a whole event series, shared by all its occurrences
+event_series_attendance = db.Table(
+    "event_series_attendance",
+    db.Column("user_id", db.Integer, db.ForeignKey("user.user_id"), primary_key=True),
+    db.Column("series_id", db.Integer, db.ForeignKey("event_series.series_id"), primary_key=True),
+    db.Column("attending", db.Boolean, nullable=False, default=True),
+    db.Index("ix_event_series_attendance_series_id", "series_id"),
 )
 
+# Per-user overrides of the audience rules of notifications: received is True for a recipient added
+# individually, False for a user removed from the recipients although matching the rules
 notification_reception = db.Table(
     "notification_reception",
-    db.Column("user_id", db.Integer, db.ForeignKey("user.user_id")),
-    db.Column("notification_id", db.Integer, db.ForeignKey("notification.notification_id")),
+    db.Column("user_id", db.Integer, db.ForeignKey("user.user_id"), primary_key=True),
+    db.Column("notification_id", db.Integer, db.ForeignKey("notification.notification_id"), primary_key=True),
+    db.Column("received", db.Boolean, nullable=False, default=True),
+    db.Index("ix_notification_reception_notification_id", "notification_id"),
 )
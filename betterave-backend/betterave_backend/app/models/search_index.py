@@ -0,0 +1,86 @@
+"""
+Full-text indexes of the content of the class messages and homework, read by search_operations.
+
+They cannot be declared on the models, so they are created by DDL run after the message and homework tables:
+- on SQLite, an FTS5 table per indexed table, named <table>_fts, whose rowid is the primary key of the table.
+  It has external content (the text is read from the indexed table, not copied) and triggers keep it up to date.
+- on PostgreSQL, a generated tsvector column, search_vector, with a GIN index.
+Other databases have no full-text index.
+
+A database created before the indexes existed gets them from scripts/rebuild_search_index.py.
+"""
+
+from typing import Any
+from sqlalchemy import Connection, event
+from .homework import Homework
+from .message import Message
+
+# The indexed tables, by name: their primary key
+SEARCH_TABLES = {Message.__tablename__: "message_id", Homework.__tablename__: "homework_id"}
+
+
+def fts_table_name(table_name: str) -> str:
+    """Return the name of the SQLite FTS5 table indexing a table."""
+    return f"{table_name}_fts"
+
+
+def _sqlite_ddl(table_name: str, key: str) -> list[str]:
+    """Return the statements creating the FTS5 table of a table and the triggers keeping it up to date."""
+    fts = fts_table_name(table_name)
+    insert = f"INSERT INTO {fts}(rowid, content) VALUES (new.{key}, new.content);"
+    delete = f"INSERT INTO {fts}({fts}, rowid, content) VALUES ('delete', old.{key}, old.content);"
+    return [
+        # Accents are ignored, as in "théorie" and "theorie"
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"content, content='{table_name}', content_rowid='{key}', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table_name} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table_name} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF content ON {table_name} "
+        f"BEGIN {delete} {insert} END",
+    ]
+
+
+def _postgresql_ddl(table_name: str) -> list[str]:
+    """Return the statements adding the generated tsvector column of a table and its GIN index."""
+    return [
+        # The "simple" configuration does not stem words, which are mostly French
+        f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED",
+        f"CREATE INDEX IF NOT EXISTS ix_{table_name}_search_vector ON {table_name} USING GIN (search_vector)",
+    ]
+
+
+def create_search_index(connection: Connection, table_name: str) -> None:
+    """Create the full-text index of an indexed table if it is missing."""
+    if connection.dialect.name == "sqlite":
+        statements = _sqlite_ddl(table_name, SEARCH_TABLES[table_name])
+    elif connection.dialect.name == "postgresql":
+        statements = _postgresql_ddl(table_name)
+    else:
+        return
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def rebuild_search_index(connection: Connection, table_name: str) -> None:
+    """Index the current content of an indexed table again, e.g. rows inserted before the index existed."""
+    if connection.dialect.name == "sqlite":
+        fts = fts_table_name(table_name)
+        connection.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    # The generated columns of PostgreSQL are computed for the existing rows when they are added
+
+
+def _after_create(target: Any, connection: Connection, **kwargs: Any) -> None:
+    """Create the full-text index of a table created by db.create_all()."""
+    create_search_index(connection, target.name)
+
+
+def _before_drop(target: Any, connection: Connection, **kwargs: Any) -> None:
+    """Drop the FTS5 table of a table dropped by db.drop_all(), its triggers being dropped with the table."""
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {fts_table_name(target.name)}")
+
+
+for model in (Message, Homework):
+    event.listen(model.__table__, "after_create", _after_create)
+    event.listen(model.__table__, "before_drop", _before_drop)
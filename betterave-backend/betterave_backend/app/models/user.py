@@ -1,15 +1,18 @@
 """SQLAlchemy object representing a user with different roles and levels."""
 
+import hashlib
 from typing import Any
 from flask_login import UserMixin
 from betterave_backend.extensions import db
 from betterave_backend.app.models.enums import UserLevel, UserType
 
 
+# The primary key serves the subscriptions of a user, the index the subscribers of an association
 association_subscriptions = db.Table(
     "association_subscriptions",
-    db.Column("subscriber_id", db.Integer, db.ForeignKey("user.user_id")),
-    db.Column("asso_id", db.Integer, db.ForeignKey("user.user_id")),
+    db.Column("subscriber_id", db.Integer, db.ForeignKey("user.user_id"), primary_key=True),
+    db.Column("asso_id", db.Integer, db.ForeignKey("user.user_id"), primary_key=True),
+    db.Index("ix_association_subscriptions_asso_id", "asso_id"),
 )
 
 
@@ -21,6 +24,8 @@ class User(db.Model, UserMixin):
     email = db.Column(db.String(120), unique=True, nullable=False)
     hashed_password = db.Column(db.String(120), nullable=False)
     reset_token = db.Column(db.String(100), unique=True)
+    # SHA-256 of the token of the calendar feed URL, which calendar apps fetch without a session or API key
+    calendar_token_hash = db.Column(db.String(64), unique=True, index=True, nullable=True)
     name = db.Column(db.String(80), nullable=False)
     surname = db.Column(db.String(120), nullable=False)
     profile_pic = db.Column(db.String(120), nullable=True)
@@ -36,12 +41,7 @@ class User(db.Model, UserMixin):
     class_groups = db.relationship("UserClassGroup", back_populates="user", lazy="dynamic")
     messages = db.relationship("Message", back_populates="user")
     lessons_taught = db.relationship("Lesson", back_populates="teacher", lazy="dynamic")
-    attended_events = db.relationship("Event", secondary="event_attendance", back_populates="attending_users")
-    received_notifications = db.relationship(
-        "Notification",
-        secondary="notification_reception",
-        back_populates="recipient_users",
-    )
+    lesson_series_taught = db.relationship("LessonSeries", back_populates="teacher", lazy="dynamic")
     subscriptions = db.relationship(
         "User",
         secondary=association_subscriptions,
@@ -50,6 +50,11 @@ class User(db.Model, UserMixin):
         backref=db.backref("subscribers", lazy="dynamic"),
     )
 
+    @staticmethod
+    def hash_calendar_token(token: str) -> str:
+        """Return the hash of a calendar feed token, as stored in calendar_token_hash."""
+        return hashlib.sha256(token.encode()).hexdigest()
+
     def get_user_type(self) -> UserType:
         """Get the user type."""
         return self.user_type
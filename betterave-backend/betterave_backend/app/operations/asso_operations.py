@@ -1,11 +1,10 @@
 from betterave_backend.extensions import db
 from betterave_backend.app.decorators import with_instance
-from betterave_backend.app.models.user import User, UserType
+from betterave_backend.app.models.user import User, UserType, association_subscriptions
+from sqlalchemy import case, func, select
 from sqlalchemy.exc import SQLAlchemyError
-from betterave_backend.app.operations.event_operations import get_association_events
-from betterave_backend.app.operations.notification_operations import (
-    get_user_notifications,
-)
+from betterave_backend.app.operations.event_operations import bump_event_versions
+from betterave_backend.app.operations.notification_operations import bump_notification_versions
 
 
 @with_instance([User, User])
@@ -18,14 +17,10 @@ def subscribe_to_asso(user: User, asso: User) -> bool:
 
         user.subscriptions.append(asso)
 
-        future_events = get_association_events(asso)
-        for event in future_events:
-            event.attending_users.append(user)
-
-        notifications = get_user_notifications(asso)
-        for notif in notifications:
-            notif.recipient_users.append(user)
+        # The events and notifications for subscribers follow from the subscription, only the user's view changes
 
+        bump_event_versions([user.user_id])
+        bump_notification_versions([user.user_id])
         db.session.commit()
         return True
     except SQLAlchemyError as e:
@@ -44,16 +39,10 @@ def unsubscribe_from_asso(user: User, asso: User) -> bool:
 
         user.subscriptions.remove(asso)
 
-        future_events = get_association_events(asso)
-        for event in future_events:
-            if user in event.attending_users:
-                event.attending_users.remove(user)
-
-        notifications = get_user_notifications(asso)
-        for notif in notifications:
-            if user in notif.recipient_users:
-                notif.recipient_users.remove(user)
+        # The events and notifications for subscribers follow from the subscription, only the user's view changes
 
+        bump_event_versions([user.user_id])
+        bump_notification_versions([user.user_id])
         db.session.commit()
         return True
     except SQLAlchemyError as e:
@@ -65,3 +54,28 @@ def unsubscribe_from_asso(user: User, asso: User) -> bool:
 def get_all_assos() -> list[User]:
     """Get all associations."""
     return User.query.filter_by(user_type=UserType("asso")).all()  # type: ignore
+
+
+def get_assos_with_subscription(user: User) -> list[User]:
+    """
+    Get all associations with the subscription status of a user and their number of subscribers, in one query.
+
+    The association_subscriptions rows of the associations are aggregated by the database, so the cost does not
+    depend on how many users subscribe. Each association gets the `subscribed` and `subscriber_count` attributes.
+    """
+    subscriber_id = association_subscriptions.c.subscriber_id
+    rows = db.session.execute(
+        select(
+            User,
+            func.max(case((subscriber_id == user.user_id, 1), else_=0)).label("subscribed"),
+            func.count(subscriber_id).label("subscriber_count"),
+        )
+        .outerjoin(association_subscriptions, association_subscriptions.c.asso_id == User.user_id)
+        .where(User.user_type == UserType.ASSO)
+        .group_by(User.user_id)
+        .order_by(User.user_id)
+    ).all()
+    for asso, subscribed, subscriber_count in rows:
+        asso.subscribed = bool(subscribed)
+        asso.subscriber_count = subscriber_count
+    return [asso for asso, _, _ in rows]
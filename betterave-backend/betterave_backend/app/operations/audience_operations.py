@@ -0,0 +1,172 @@
+"""
+Evaluation of the rule-based audiences of events, event series and notifications (see models/audience.py).
+
+A user is in the audience of an owner (an event, a series or a notification) if they match one of its rules
+and were not excluded, or if they were included individually. The per-user overrides live in a table with a
+user_id, an owner column and a boolean flag column (True to include, False to exclude).
+Both directions are single indexed queries:
+- owners_attended_by gives the owners a user is in the audience of, to list a user's events or notifications;
+- audience_member_ids gives the users in the audience of an owner.
+Creating an owner or a user therefore never writes one row per user or per owner.
+
+Adding a rule or including many users are set-based, idempotent statements which never load User objects.
+"""
+
+from typing import Any, Iterable, Optional
+from sqlalchemy import Select, and_, exists, insert, literal, or_, select, true
+from betterave_backend.app.models import AudienceKind, User, UserLevel
+from betterave_backend.app.models.user import association_subscriptions
+from betterave_backend.extensions import db
+
+
+def audience_rules(asso_id: int, participants: Any) -> list[dict[str, Any]]:
+    """
+    Return the audience rule matching the participants of an event or the recipients of a notification.
+
+    participants is "Subscribers" (of the association asso_id), "All users" or a UserLevel (or its value).
+    Raises ValueError for an unknown level.
+    """
+    if participants == "Subscribers":
+        return [{"kind": AudienceKind.SUBSCRIBERS, "asso_id": asso_id}]
+    elif participants == "All users":
+        return [{"kind": AudienceKind.ALL}]
+    return [{"kind": AudienceKind.LEVEL, "level": UserLevel(participants)}]
+
+
+def _rule_matches(audience_model: Any, user: User) -> Any:
+    """Return the condition of an audience rule matching a user."""
+    subscriptions = select(association_subscriptions.c.asso_id).where(
+        association_subscriptions.c.subscriber_id == user.user_id
+    )
+    return or_(
+        audience_model.kind == AudienceKind.ALL,
+        and_(audience_model.kind == AudienceKind.LEVEL, audience_model.level == user.level),
+        and_(audience_model.kind == AudienceKind.SUBSCRIBERS, audience_model.asso_id.in_(subscriptions)),
+    )
+
+
+def owners_attended_by(
+    user: User, owner_column: Any, audience_owner_column: Any, override_owner_column: Any, override_flag_column: Any
+) -> Any:
+    """
+    Return the condition selecting the owners (e.g. events) whose audience a user is in.
+
+    Args:
+        owner_column: The primary key of the owners, e.g. Event.event_id.
+        audience_owner_column: The column of the audience rules referencing the owner, e.g. EventAudience.event_id.
+        override_owner_column, override_flag_column: The owner and flag columns of the per-user overrides,
+            e.g. event_attendance.c.event_id and event_attendance.c.attending.
+    """
+    audience_model = audience_owner_column.class_
+    overrides = override_owner_column.table.c.user_id == user.user_id
+    matched = select(audience_owner_column).where(
+        audience_owner_column.is_not(None), _rule_matches(audience_model, user)
+    )
+    included = select(override_owner_column).where(overrides, override_flag_column.is_(True))
+    excluded = select(override_owner_column).where(overrides, override_flag_column.is_(False))
+    return or_(and_(owner_column.in_(matched), owner_column.not_in(excluded)), owner_column.in_(included))
+
+
+def audience_members_query(
+    owner_id: int, audience_owner_column: Any, override_owner_column: Any, override_flag_column: Any
+) -> Select:
+    """Return the query of the IDs of the users in the audience of an owner, in increasing order."""
+    audience_model = audience_owner_column.class_
+    rules = select(audience_model).where(audience_owner_column == owner_id).subquery()
+    subscribers = select(association_subscriptions.c.subscriber_id).where(
+        association_subscriptions.c.asso_id.in_(select(rules.c.asso_id).where(rules.c.kind == AudienceKind.SUBSCRIBERS))
+    )
+    matches = or_(
+        exists(select(rules.c.audience_id).where(rules.c.kind == AudienceKind.ALL)),
+        User.level.in_(select(rules.c.level).where(rules.c.kind == AudienceKind.LEVEL)),
+        User.user_id.in_(subscribers),
+    )
+    override_table = override_owner_column.table
+    overrides = override_owner_column == owner_id
+    included = select(override_table.c.user_id).where(overrides, override_flag_column.is_(True))
+    excluded = select(override_table.c.user_id).where(overrides, override_flag_column.is_(False))
+    return (
+        select(User.user_id)
+        .where(or_(and_(matches, User.user_id.not_in(excluded)), User.user_id.in_(included)))
+        .order_by(User.user_id)
+    )
+
+
+def audience_member_ids(
+    owner_id: int, audience_owner_column: Any, override_owner_column: Any, override_flag_column: Any
+) -> list[int]:
+    """Return the IDs of the users in the audience of an owner (e.g. an event), in increasing order."""
+    query = audience_members_query(owner_id, audience_owner_column, override_owner_column, override_flag_column)
+    return db.session.execute(query).scalars().all()
+
+
+def set_audience_override(
+    override_owner_column: Any, override_flag_column: Any, owner_id: int, user_id: int, value: Optional[bool]
+) -> None:
+    """
+    Include a user in (True) or exclude them from (False) the audience of an owner, or remove their override (None).
+
+    The statements are executed in the caller's transaction.
+    """
+    override_table = override_owner_column.table
+    db.session.execute(
+        override_table.delete().where(override_owner_column == owner_id, override_table.c.user_id == user_id)
+    )
+    if value is not None:
+        db.session.execute(
+            override_table.insert().values(
+                {override_owner_column.name: owner_id, "user_id": user_id, override_flag_column.name: value}
+            )
+        )
+
+
+def add_audience_rule(audience_owner_column: Any, owner_id: int, rule: dict[str, Any]) -> None:
+    """
+    Add an audience rule (as returned by audience_rules) to an owner, unless it already has the same one.
+
+    A single INSERT ... SELECT ... WHERE NOT EXISTS statement, executed in the caller's transaction.
+    """
+    audience_model = audience_owner_column.class_
+    values = {audience_owner_column.key: owner_id, "kind": rule["kind"]}
+    values["level"] = rule.get("level")
+    values["asso_id"] = rule.get("asso_id")
+    columns = {key: getattr(audience_model, key) for key in values}
+    same_rule = [column.is_(None) if values[key] is None else column == values[key] for key, column in columns.items()]
+    new_rule = select(*(literal(values[key], type_=column.type) for key, column in columns.items())).where(
+        ~exists(select(audience_model.audience_id).where(*same_rule))
+    )
+    db.session.execute(insert(audience_model).from_select(list(columns), new_rule))
+
+
+def include_in_audience(
+    override_owner_column: Any, override_flag_column: Any, owner_id: int, user_ids: Iterable[int]
+) -> None:
+    """
+    Include users in the audience of an owner, whatever the rules, with two statements whatever their number.
+
+    Existing exclusions are flipped by one UPDATE, and the missing overrides of the existing users are
+    added by one INSERT ... SELECT ... WHERE NOT EXISTS. Including the same users again changes nothing,
+    unknown user IDs are ignored. The statements are executed in the caller's transaction.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    override_table = override_owner_column.table
+    db.session.execute(
+        override_table.update()
+        .where(
+            override_owner_column == owner_id,
+            override_table.c.user_id.in_(user_ids),
+            override_flag_column.is_(False),
+        )
+        .values({override_flag_column.name: True})
+    )
+    existing = select(override_table.c.user_id).where(
+        override_owner_column == owner_id, override_table.c.user_id == User.user_id
+    )
+    db.session.execute(
+        override_table.insert().from_select(
+            ["user_id", override_owner_column.name, override_flag_column.name],
+            select(User.user_id, literal(owner_id), true()).where(User.user_id.in_(user_ids), ~exists(existing)),
+        )
+    )
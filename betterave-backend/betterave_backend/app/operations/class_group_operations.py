@@ -4,6 +4,11 @@ from betterave_backend.extensions import db
 from betterave_backend.app.decorators import with_instance
 from betterave_backend.app.models.class_group import ClassGroup
 from betterave_backend.app.models.user import User
+from betterave_backend.app.operations.lesson_calendar_operations import (
+    refresh_calendar_lessons,
+    delete_calendar_lessons,
+)
+from betterave_backend.app.operations.data_version_operations import LESSONS_SCOPE, bump_data_versions
 
 
 def add_class_group(name: str, class_id: int, is_main_group: bool) -> int:
@@ -44,6 +49,8 @@ def update_class_group(group: ClassGroup, new_data: dict[str, Any]) -> bool:
         for key, value in new_data.items():
             if hasattr(group, key):
                 setattr(group, key, value)
+        # The group name is displayed on each of its lessons
+        refresh_calendar_lessons(group_id=group.group_id)
         db.session.commit()
         return True
     except SQLAlchemyError as e:
@@ -64,6 +71,7 @@ def delete_class_group(group: ClassGroup) -> bool:
         bool: True if the class group was successfully removed, False otherwise.
     """
     try:
+        delete_calendar_lessons(group_id=group.group_id)
         db.session.delete(group)
         db.session.commit()
         return True
@@ -111,6 +119,7 @@ def enroll_student_in_group(student: User, group: ClassGroup) -> bool:
     try:
         if student and group:
             group.students.append(student)
+            bump_data_versions(LESSONS_SCOPE, [student.user_id])
             db.session.commit()
             return True
         return False
@@ -135,6 +144,7 @@ def unenroll_student_from_group(student: User, group: ClassGroup) -> bool:
     try:
         if student and group:
             group.students.remove(student)
+            bump_data_versions(LESSONS_SCOPE, [student.user_id])
             db.session.commit()
             return True
         return False
@@ -1,9 +1,15 @@
 # type: ignore
 import time
+from sqlalchemy import Select, or_, select
 from sqlalchemy.exc import SQLAlchemyError
 from betterave_backend.extensions import db
 from betterave_backend.app.models import UserLevel, Class, ClassGroup, Lesson
 from betterave_backend.app.decorators import with_instance
+from betterave_backend.app.operations.grade_operations import bump_class_grade_versions
+from betterave_backend.app.operations.lesson_calendar_operations import (
+    refresh_calendar_lessons,
+    delete_calendar_lessons,
+)
 
 
 def add_class(class_id, name, ects_credits, default_teacher_id, level, background_color, **kwargs) -> int:
@@ -60,6 +66,10 @@ def update_class(class_instance: Class, new_data: dict) -> bool:
             if hasattr(class_instance, key):
                 setattr(class_instance, key, value)
 
+        # The class name and colour are displayed on each of its lessons
+        refresh_calendar_lessons(class_id=class_instance.class_id)
+        # The transcripts show the name, level and credits of the class
+        bump_class_grade_versions(class_instance.class_id)
         db.session.commit()
         return True
     except SQLAlchemyError as e:
@@ -80,6 +90,8 @@ def delete_class(class_instance: Class) -> bool:
         bool: True if the class was successfully removed, False otherwise.
     """
     try:
+        delete_calendar_lessons(class_id=class_instance.class_id)
+        bump_class_grade_versions(class_instance.class_id)
         db.session.delete(class_instance)
         db.session.commit()
         return True
@@ -104,15 +116,23 @@ def get_classes_from_level(level: UserLevel) -> list:
     return Class.query.filter_by(level=level).all()
 
 
-def get_classes_from_teacher(teacher_id: int) -> list:
-    """Return all classes of a given teacher id."""
+def teacher_class_ids(teacher_id: int) -> Select:
+    """Return a select of the IDs of the classes of a teacher, for use as a subquery."""
     # Being the teacher of a Lesson of the class is enough to be considered the teacher of a class.
     # Classes have Classes.groups, and ClassGroup have ClassGroup.lessons.
     # We also include the default teacher of the class.
-    start_time = time.time()
-    default_teacher_classes = Class.query.filter_by(default_teacher_id=teacher_id).all()
-    lesson_classes = (
-        Class.query.join(Class.groups).join(ClassGroup.lessons).filter(Lesson.teacher_id == teacher_id).all()
+    lesson_class_ids = select(ClassGroup.class_id).join(Lesson, Lesson.group_id == ClassGroup.group_id)
+    return select(Class.class_id).where(
+        or_(
+            Class.default_teacher_id == teacher_id,
+            Class.class_id.in_(lesson_class_ids.where(Lesson.teacher_id == teacher_id)),
+        )
     )
+
+
+def get_classes_from_teacher(teacher_id: int) -> list:
+    """Return all classes of a given teacher id."""
+    start_time = time.time()
+    classes = Class.query.filter(Class.class_id.in_(teacher_class_ids(teacher_id))).all()
     print(f"get_classes_from_teacher took {time.time() - start_time} seconds", flush=True)
-    return list(set(default_teacher_classes + lesson_classes))
+    return classes
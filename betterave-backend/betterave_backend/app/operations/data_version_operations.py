@@ -0,0 +1,145 @@
+"""
+Reads and bumps of the per-owner data versions.
+
+Versions start at 0 and are only ever incremented. The bumps are executed in the caller's
+transaction, which is responsible for committing.
+
+Three kinds of versions exist:
+- Per-user scopes (lessons, events, notifications), bumped explicitly by the operations for the
+  users whose view changed, and for GLOBAL_OWNER_ID.
+- Per-class scopes (grades), owned by class IDs and bumped explicitly by the operations for the
+  classes whose data changed, and for GLOBAL_OWNER_ID.
+- The transcript scope, owned by student IDs and bumped explicitly by the operations changing the grades of
+  the students or the classes they are graded in.
+- Table scopes ("table:<name>"), owned by GLOBAL_OWNER_ID and bumped automatically once per transaction,
+  at commit, for the tables with a row inserted, updated or deleted by the ORM flushes of the transaction.
+  Bulk statements executed through db.session.execute bypass the flushes and must call mark_tables_changed.
+
+The items of the audience scopes are shared by all the users matching their audience rules. Changing such an
+item only bumps the global version, which per-user reads of these scopes must therefore also depend on.
+"""
+
+from collections import defaultdict
+from typing import Iterable
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from betterave_backend.extensions import db
+from betterave_backend.app.models import DataVersion
+
+# Owner of the data versions shared by every user (e.g. the full lesson list seen by admins)
+GLOBAL_OWNER_ID = 0
+
+# Scopes
+LESSONS_SCOPE = "lessons"
+EVENTS_SCOPE = "events"
+NOTIFICATIONS_SCOPE = "notifications"
+AUDIENCE_SCOPES = (EVENTS_SCOPE, NOTIFICATIONS_SCOPE)
+GRADES_SCOPE = "grades"
+TRANSCRIPT_SCOPE = "transcript"
+
+# Key of the session info holding the tables changed by the current transaction
+CHANGED_TABLES_KEY = "changed_tables"
+
+# Insert constructs supporting ON CONFLICT DO UPDATE, by dialect name
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def table_scope(table_name: str) -> str:
+    """Return the scope of the global version of a table."""
+    return f"table:{table_name}"
+
+
+def get_data_version(owner_id: int, scope: str) -> int:
+    """Return the current version of a scope for an owner, 0 if it has never been bumped."""
+    version = db.session.execute(
+        select(DataVersion.version).where(DataVersion.owner_id == owner_id, DataVersion.scope == scope)
+    ).scalar()
+    return version or 0
+
+
+def bump_data_versions(scope: str, owner_ids: Iterable[int]) -> None:
+    """Increment the version of a scope for every given owner."""
+    _bump(db.session, scope, set(owner_ids))
+
+
+def _bump(session: Session, scope: str, owner_ids: set[int]) -> None:
+    """Increment the version of a scope for every given owner, through the given session."""
+    _upsert_versions(session, [(owner_id, scope) for owner_id in owner_ids])
+
+
+def _upsert_versions(session: Session, keys: list[tuple[int, str]]) -> None:
+    """
+    Increment the versions of the given (owner_id, scope) keys.
+
+    A single INSERT ... ON CONFLICT DO UPDATE creates the missing versions and increments the others, so that
+    concurrent transactions bumping a new version do not both insert it. The keys are sorted for the rows to be
+    locked in the same order by every transaction. The dialects without such upserts increment the existing
+    versions and insert the missing ones instead.
+    """
+    if not keys:
+        return
+    upsert_insert = UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if upsert_insert is None:
+        _update_then_insert_versions(session, keys)
+        return
+    session.execute(
+        upsert_insert(DataVersion).on_conflict_do_update(
+            index_elements=[DataVersion.owner_id, DataVersion.scope], set_={"version": DataVersion.version + 1}
+        ),
+        [{"owner_id": owner_id, "scope": scope, "version": 1} for owner_id, scope in sorted(set(keys))],
+    )
+
+
+def _update_then_insert_versions(session: Session, keys: list[tuple[int, str]]) -> None:
+    """Increment the versions of the given keys with portable statements: an update, then an insert of the missing."""
+    owner_ids_by_scope = defaultdict(set)
+    for owner_id, scope in keys:
+        owner_ids_by_scope[scope].add(owner_id)
+    for scope, owner_ids in sorted(owner_ids_by_scope.items()):
+        in_scope = (DataVersion.scope == scope) & DataVersion.owner_id.in_(owner_ids)
+        session.execute(
+            update(DataVersion).where(in_scope).values(version=DataVersion.version + 1),
+            execution_options={"synchronize_session": False},
+        )
+        missing = owner_ids - set(session.scalars(select(DataVersion.owner_id).where(in_scope)))
+        if missing:
+            session.execute(
+                insert(DataVersion),
+                [{"owner_id": owner_id, "scope": scope, "version": 1} for owner_id in sorted(missing)],
+            )
+
+
+def mark_tables_changed(*table_names: str) -> None:
+    """Bump the version of the tables when the current transaction commits, for changes bypassing the ORM."""
+    db.session.info.setdefault(CHANGED_TABLES_KEY, set()).update(table_names)
+
+
+@event.listens_for(db.session, "after_flush")
+def _collect_flushed_tables(session: Session, flush_context) -> None:  # type: ignore
+    """Record the tables with a row inserted, updated or deleted by the flush, to bump them at commit."""
+    changed = [*session.new, *session.deleted, *(obj for obj in session.dirty if session.is_modified(obj))]
+    session.info.setdefault(CHANGED_TABLES_KEY, set()).update(obj.__table__.name for obj in changed)
+
+
+@event.listens_for(db.session, "before_commit")
+def _bump_changed_tables(session: Session) -> None:
+    """
+    Bump the version of the tables changed by the transaction, in one statement at its commit.
+
+    Bumping once per transaction rather than on every flush keeps the writers of a table from updating its
+    version row, and waiting on each other's lock on it, for the rest of their transactions.
+    """
+    if session.in_nested_transaction():
+        return
+    # The pending changes are only flushed by the commit after this event
+    session.flush()
+    tables = session.info.pop(CHANGED_TABLES_KEY, set())
+    _upsert_versions(session, [(GLOBAL_OWNER_ID, table_scope(table_name)) for table_name in tables])
+
+
+@event.listens_for(db.session, "after_transaction_end")
+def _forget_changed_tables(session: Session, transaction) -> None:  # type: ignore
+    """Forget the tables changed by a transaction which was rolled back."""
+    if transaction.parent is None:
+        session.info.pop(CHANGED_TABLES_KEY, None)
@@ -1,11 +1,66 @@
 # type: ignore
-from typing import Optional
-from datetime import datetime
+import heapq
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional, Union
+from datetime import date, datetime, time
 from flask import request
+from sqlalchemy import or_, select
+from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import SQLAlchemyError
 from betterave_backend.extensions import db
-from betterave_backend.app.models import Event, User, UserLevel
+from betterave_backend.app.models import (
+    AudienceKind,
+    Event,
+    EventAudience,
+    EventOccurrence,
+    EventSeries,
+    EventSeriesOverride,
+    User,
+    UserLevel,
+    event_attendance,
+    event_series_attendance,
+)
 from betterave_backend.app.decorators import is_valid_apikey, with_instance
+from betterave_backend.app.operations.filters import apply_date_window, overlaps_window
+from betterave_backend.app.recurrence import expand_series
+from betterave_backend.app.operations.audience_operations import (
+    add_audience_rule,
+    audience_member_ids,
+    audience_rules,
+    include_in_audience,
+    owners_attended_by,
+    set_audience_override,
+)
+from betterave_backend.app.operations.data_version_operations import (
+    GLOBAL_OWNER_ID,
+    EVENTS_SCOPE,
+    bump_data_versions,
+)
+
+
+def bump_event_versions(user_ids: Iterable[int] = ()) -> None:
+    """
+    Bump the events version of the given users, or the global version if no user is given.
+
+    Changes to an event or series only bump the global version, which is part of every user's events ETag:
+    its audience is a set of rules, not a list of users. The users whose own view changed (opt-in or out,
+    subscription, level) are bumped individually.
+    """
+    bump_data_versions(EVENTS_SCOPE, set(user_ids) or {GLOBAL_OWNER_ID})
+
+
+def get_event_attendee_ids(event_id: int) -> list[int]:
+    """Return the IDs of the users attending an event, according to its audience rules and overrides."""
+    return audience_member_ids(
+        event_id, EventAudience.event_id, event_attendance.c.event_id, event_attendance.c.attending
+    )
+
+
+def get_event_series_attendee_ids(series_id: int) -> list[int]:
+    """Return the IDs of the users attending an event series, according to its audience rules and overrides."""
+    return audience_member_ids(
+        series_id, EventAudience.series_id, event_series_attendance.c.series_id, event_series_attendance.c.attending
+    )
 
 
 def add_event(
@@ -18,7 +73,7 @@ def add_event(
     description: str = None,
     location: str = None,
 ) -> int:
-    """Add an event to the database."""
+    """Add an event to the database, its audience being stored as a rule on the participants."""
     try:
         if isinstance(date, str):
             date = datetime.strptime(date, "%Y-%m-%d").date()
@@ -26,15 +81,12 @@ def add_event(
             start_time = datetime.strptime(start_time, "%H:%M").time()
         if isinstance(end_time, str):
             end_time = datetime.strptime(end_time, "%H:%M").time()
+        audiences = [EventAudience(**rule) for rule in audience_rules(asso_id, participants)]
+    except ValueError as e:
+        print(f"Invalid event: {str(e)}")
+        return -1
 
-        if participants == "Subscribers":
-            attending_users = User.query.get(asso_id).subscribers
-        elif participants == "All users":
-            attending_users = User.query.all()
-        else:
-            # Participants is a UserLevel
-            attending_users = User.query.filter_by(level=UserLevel(participants)).all()
-
+    try:
         new_event = Event(
             asso_id=asso_id,
             name=name,
@@ -43,10 +95,11 @@ def add_event(
             end_time=end_time,
             description=description,
             location=location,
-            attending_users=attending_users,
+            audiences=audiences,
             participant_type=participants,
         )
         db.session.add(new_event)
+        bump_event_versions()
         db.session.commit()
         return new_event.event_id
     except SQLAlchemyError as e:
@@ -63,6 +116,7 @@ def update_event(event_id: int, new_data: dict) -> bool:
             for key, value in new_data.items():
                 if hasattr(event, key):
                     setattr(event, key, value)
+            bump_event_versions()
             db.session.commit()
             return True
         return False
@@ -77,6 +131,8 @@ def delete_event(event_id: int) -> bool:
     try:
         event = get_event_by_id(event_id)
         if event:
+            bump_event_versions()
+            db.session.execute(event_attendance.delete().where(event_attendance.c.event_id == event_id))
             db.session.delete(event)
             db.session.commit()
             return True
@@ -92,91 +148,271 @@ def get_event_by_id(event_id: int) -> Event:
     return db.session.get(Event, event_id)
 
 
-def get_all_events() -> list[Event]:
-    """Return all events in the database."""
-    return Event.query.all()
+def _event_order(item: Union[Event, EventOccurrence]) -> tuple[date, time]:
+    """Sort key of one-off events and series occurrences."""
+    return item.date, item.start_time
 
 
-@with_instance(User)
-def get_association_events(asso: User, limit: Optional[int] = None) -> list[Event]:
-    """Get all events organized by a particular association."""
-    events = (
-        Event.query.filter_by(asso_id=asso.user_id).limit(limit).all()
-        if limit is not None
-        else Event.query.filter_by(asso_id=asso.user_id).all()
+def _user_filters(user: User) -> tuple[Any, Any]:
+    """Return the filters selecting the one-off events and the event series a user is attending."""
+    return (
+        owners_attended_by(
+            user, Event.event_id, EventAudience.event_id, event_attendance.c.event_id, event_attendance.c.attending
+        ),
+        owners_attended_by(
+            user,
+            EventSeries.series_id,
+            EventAudience.series_id,
+            event_series_attendance.c.series_id,
+            event_series_attendance.c.attending,
+        ),
     )
-    return events
 
 
-@with_instance(User)
-def get_user_events(user: User, limit: Optional[int] = None) -> list[Event]:
-    """Get all events a particular user is attending."""
+def _association_filters(asso: User) -> tuple[Any, Any]:
+    """Return the filters selecting the one-off events and the event series of an association."""
+    return Event.asso_id == asso.user_id, EventSeries.asso_id == asso.user_id
+
+
+def _expand_event_series(
+    series: EventSeries,
+    overrides: dict[date, EventSeriesOverride],
+    start: Optional[date],
+    end: Optional[date],
+) -> Iterator[EventOccurrence]:
+    """Yield the occurrences of a series in the [start, end) window, overrides applied, in chronological order."""
+
+    def occurrence(occurrence_date: date, override: Optional[EventSeriesOverride]) -> EventOccurrence:
+        override_value = lambda name: getattr(override, name, None) if override else None  # noqa: E731
+        day = override_value("date") or occurrence_date
+        start_time = override_value("start_time") or series.start_time
+        end_time = override_value("end_time")
+        if end_time is None:
+            # Moving the start time only keeps the duration of the series
+            duration = datetime.combine(day, series.end_time) - datetime.combine(day, series.start_time)
+            end_time = (datetime.combine(day, start_time) + duration).time()
+        description, location = override_value("description"), override_value("location")
+        return EventOccurrence(
+            series_id=series.series_id,
+            occurrence_date=occurrence_date,
+            asso_id=series.asso_id,
+            name=series.name,
+            date=day,
+            start_time=start_time,
+            end_time=end_time,
+            description=description if description is not None else series.description,
+            location=location if location is not None else series.location,
+            participant_type=series.participant_type,
+            association=series.association,
+        )
+
+    return expand_series(series, overrides, occurrence, _event_order, start, end)
+
+
+def _series_occurrences(series_filter: Any, start: Optional[date], end: Optional[date]) -> Iterator[EventOccurrence]:
+    """Expand the event series matching the filter in the [start, end) window, in chronological order."""
+    moved_in_window = select(EventSeriesOverride.series_id).where(
+        EventSeriesOverride.date.is_not(None),
+        overlaps_window(EventSeriesOverride.date, EventSeriesOverride.date, start, end),
+    )
+    query = EventSeries.query.options(joinedload(EventSeries.association)).filter(
+        or_(
+            overlaps_window(EventSeries.start_date, EventSeries.until_date, start, end),
+            EventSeries.series_id.in_(moved_in_window),
+        )
+    )
+    if series_filter is not None:
+        query = query.filter(series_filter)
+    series_list = query.all()
+    if not series_list:
+        return iter(())
+
+    overrides: dict[int, dict[date, EventSeriesOverride]] = {series.series_id: {} for series in series_list}
+    override_query = select(EventSeriesOverride).where(
+        EventSeriesOverride.series_id.in_(overrides),
+        or_(
+            overlaps_window(EventSeriesOverride.occurrence_date, EventSeriesOverride.occurrence_date, start, end),
+            overlaps_window(EventSeriesOverride.date, EventSeriesOverride.date, start, end),
+        ),
+    )
+    for override in db.session.execute(override_query).scalars():
+        overrides[override.series_id][override.occurrence_date] = override
+
+    return heapq.merge(
+        *(_expand_event_series(series, overrides[series.series_id], start, end) for series in series_list),
+        key=_event_order,
+    )
+
+
+def _events(
+    filters: tuple[Any, Any],
+    start: Optional[date],
+    end: Optional[date],
+    limit: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> Iterator[Union[Event, EventOccurrence]]:
+    """
+    Merge the one-off events and the series occurrences selected by the filters, in chronological order.
+
+    `filters` is a pair of conditions on Event and EventSeries, None selecting every event.
+    """
+    event_filter, series_filter = filters
+    query = Event.query.options(joinedload(Event.association))
+    if event_filter is not None:
+        query = query.filter(event_filter)
+    query = apply_date_window(query, Event.date, start, end).order_by(Event.date, Event.start_time)
     if limit is not None:
-        event = user.attended_events[:limit]
-    else:
-        event = user.attended_events
+        query = query.limit(limit)
+    one_offs: Iterable[Event] = query.yield_per(batch_size) if batch_size is not None else query
+    merged = heapq.merge(one_offs, _series_occurrences(series_filter, start, end), key=_event_order)
+    return islice(merged, limit)
 
-    return event
 
+def get_all_events(start: Optional[date] = None, end: Optional[date] = None) -> list[Union[Event, EventOccurrence]]:
+    """Return all events and series occurrences, optionally restricted to the [start, end) window."""
+    return list(_events((None, None), start, end))
 
-def get_all_future_events() -> list[Event]:
-    """Get all future events."""
-    return Event.query.filter(Event.date >= datetime.now().date()).all()
+
+@with_instance(User)
+def get_association_events(
+    asso: User,
+    limit: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> list[Union[Event, EventOccurrence]]:
+    """Get all events organized by a particular association, optionally in the [start, end) window."""
+    return list(_events(_association_filters(asso), start, end, limit))
 
 
 @with_instance(User)
-def get_association_future_events(asso: User, limit: Optional[int] = None) -> list[Event]:
-    """Get all future events organized by a particular association."""
-    if limit is not None:
-        future_events = (
-            Event.query.filter_by(asso_id=asso.user_id).filter(Event.date >= datetime.now().date()).limit(limit).all()
-        )
+def get_user_events(
+    user: User,
+    limit: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> list[Union[Event, EventOccurrence]]:
+    """Get all events a particular user is attending, optionally in the [start, end) window."""
+    return list(_events(_user_filters(user), start, end, limit))
+
+
+@with_instance(User)
+def iter_user_events(
+    user: User,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    batch_size: int = 500,
+) -> Iterator[Union[Event, EventOccurrence]]:
+    """
+    Stream the events of a user with their association, in chronological order, batch_size rows at a time.
+
+    Admins get every event and associations the events they organize, as with get_all_events and
+    get_association_events. The queries only run once the first event is requested.
+    """
+    if user.is_admin:
+        filters = (None, None)
+    elif user.is_asso:
+        filters = _association_filters(user)
     else:
-        future_events = Event.query.filter_by(asso_id=asso.user_id).filter(Event.date >= datetime.now().date()).all()
+        filters = _user_filters(user)
+    yield from _events(filters, start, end, batch_size=batch_size)
+
+
+def get_all_future_events() -> list[Union[Event, EventOccurrence]]:
+    """Get all future events."""
+    return list(_events((None, None), datetime.now().date(), None))
+
 
-    return future_events
+@with_instance(User)
+def get_association_future_events(asso: User, limit: Optional[int] = None) -> list[Union[Event, EventOccurrence]]:
+    """Get all future events organized by a particular association."""
+    return list(_events(_association_filters(asso), datetime.now().date(), None, limit))
 
 
 @with_instance(User)
-def get_user_future_events(user: User, limit: Optional[int] = None) -> list[Event]:
+def get_user_future_events(user: User, limit: Optional[int] = None) -> list[Union[Event, EventOccurrence]]:
     """Get all future events a particular user is attending."""
-    user_events = sorted([event for event in user.attended_events if event.date >= datetime.now().date()])
-    return user_events[:limit] if limit is not None else user_events
+    return list(_events(_user_filters(user), datetime.now().date(), None, limit))
 
 
 def add_attendees_to_event(
     event_id: int,
-    user_ids: Optional[int] = None,
-    user_level: Optional[UserLevel] = None,
+    user_ids: Optional[list[int]] = None,
+    user_level: Optional[Union[UserLevel, str]] = None,
     asso_id: Optional[int] = None,
 ) -> bool:
-    """Add users to an event. If no users are specified, add all users."""
-    event = Event.query.get(event_id)
+    """
+    Add users to an event. If no users are specified, add all users.
+
+    Specific users are opted in individually, while a level, the subscribers of an association or all users
+    are added as one more audience rule. Either way, a constant number of statements is executed whatever the
+    number of users, no User object is loaded, and adding the same attendees again changes nothing.
+    """
+    event = get_event_by_id(event_id)
     if not event:
         return False
 
-    if user_ids:
-        # Add specific users to the event
-        users = User.query.filter(User.user_id.in_(user_ids)).all()
-        event.attending_users.extend(users)
-    elif user_level:
-        # Add all users of a certain level to the event
-        users = User.query.filter_by(level=user_level).all()
-        event.attending_users.extend(users)
-    elif asso_id:
-        # Add all users subscribed to a particular association to the event
-        asso = User.query.get(asso_id)
-        if not asso:
-            return False
-        users = asso.subscribers
-        event.attending_users.extend(users)
-    else:
-        # If no specific users or level provided, assume adding all users
-        users = User.query.all()
-        event.attending_users.extend(users)
+    try:
+        if user_ids:
+            # Opt specific users in the event
+            include_in_audience(event_attendance.c.event_id, event_attendance.c.attending, event_id, user_ids)
+            bump_event_versions(user_ids)
+        else:
+            if user_level:
+                # Add all users of a certain level to the event
+                rule = {"kind": AudienceKind.LEVEL, "level": UserLevel(user_level)}
+            elif asso_id:
+                # Add all users subscribed to a particular association to the event
+                if not db.session.get(User, asso_id):
+                    return False
+                rule = {"kind": AudienceKind.SUBSCRIBERS, "asso_id": asso_id}
+            else:
+                # If no specific users or level provided, assume adding all users
+                rule = {"kind": AudienceKind.ALL}
+            add_audience_rule(EventAudience.event_id, event_id, rule)
+            bump_event_versions()
+        db.session.commit()
+        return True
+    except (SQLAlchemyError, ValueError) as e:
+        db.session.rollback()
+        print(f"Error adding attendees to event: {str(e)}")
+        return False
 
-    db.session.commit()
-    return True
+
+def set_event_attendance(event_id: int, user_id: int, attending: Optional[bool]) -> bool:
+    """
+    Opt a user in (True) or out (False) of an event, or make them follow its audience rules again (None).
+
+    Returns:
+        bool: True if the attendance was set, False if the event does not exist or an error occurs.
+    """
+    if not get_event_by_id(event_id):
+        return False
+    try:
+        set_audience_override(event_attendance.c.event_id, event_attendance.c.attending, event_id, user_id, attending)
+        bump_event_versions([user_id])
+        db.session.commit()
+        return True
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"Error setting event attendance: {str(e)}")
+        return False
+
+
+def set_event_series_attendance(series_id: int, user_id: int, attending: Optional[bool]) -> bool:
+    """Opt a user in (True) or out (False) of every occurrence of an event series, or remove the override (None)."""
+    if not db.session.get(EventSeries, series_id):
+        return False
+    try:
+        set_audience_override(
+            event_series_attendance.c.series_id, event_series_attendance.c.attending, series_id, user_id, attending
+        )
+        bump_event_versions([user_id])
+        db.session.commit()
+        return True
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"Error setting event series attendance: {str(e)}")
+        return False
 
 
 @with_instance(User)
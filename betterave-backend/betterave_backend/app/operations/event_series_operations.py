@@ -0,0 +1,218 @@
+"""
+CRUD operations for association event series and their per-occurrence overrides.
+
+The audience of a series is stored once, as rules (see audience_operations.py), and shared by all its
+occurrences. Every change bumps the global "events" data version.
+"""
+
+from datetime import date, time
+from typing import Any, Optional, Union
+from sqlalchemy.exc import SQLAlchemyError
+from betterave_backend.extensions import db
+from betterave_backend.app.decorators import with_instance
+from betterave_backend.app.models import EventAudience, EventSeries, EventSeriesOverride, event_series_attendance
+from betterave_backend.app.recurrence import (
+    format_weekdays,
+    is_occurrence,
+    parse_date,
+    parse_time,
+    parse_weekdays,
+    weekly_occurrences,
+)
+from betterave_backend.app.operations.audience_operations import audience_rules
+from betterave_backend.app.operations.event_operations import bump_event_versions
+
+
+def add_event_series(
+    asso_id: int,
+    name: str,
+    start_date: Union[str, date],
+    until_date: Union[str, date],
+    start_time: Union[str, time],
+    end_time: Union[str, time],
+    participants: str,
+    weekdays: Optional[str] = None,
+    interval: int = 1,
+    description: Optional[str] = None,
+    location: Optional[str] = None,
+) -> int:
+    """
+    Add a weekly event series to the database, whose participants attend all the occurrences.
+
+    Args:
+        asso_id (int): The ID of the association organizing the events.
+        start_date, until_date: The first and last possible dates of the series (YYYY-MM-DD), both included.
+        start_time, end_time: The time span of each occurrence (HH:MM).
+        participants (str): "Subscribers", "All users" or a UserLevel, as for add_event.
+        weekdays (str, optional): The days of the week, e.g. "MO,WE". Defaults to the weekday of start_date.
+        interval (int, optional): The number of weeks between two occurrences. Defaults to 1.
+
+    Returns:
+        int: The ID of the new series, or -1 if an error occurs.
+    """
+    try:
+        start_date, until_date = parse_date(start_date), parse_date(until_date)
+        start_time, end_time = parse_time(start_time), parse_time(end_time)
+        if until_date < start_date or interval < 1:
+            raise ValueError("A series must end after it starts and have a positive interval")
+        weekdays = format_weekdays(parse_weekdays(weekdays, start_date))
+        audiences = [EventAudience(**rule) for rule in audience_rules(asso_id, participants)]
+    except ValueError as e:
+        print(f"Invalid event series: {str(e)}")
+        return -1
+
+    try:
+        series = EventSeries(
+            asso_id=asso_id,
+            name=name,
+            start_date=start_date,
+            until_date=until_date,
+            interval=interval,
+            weekdays=weekdays,
+            start_time=start_time,
+            end_time=end_time,
+            description=description,
+            location=location,
+            participant_type=participants,
+            audiences=audiences,
+        )
+        db.session.add(series)
+        bump_event_versions()
+        db.session.commit()
+        return series.series_id
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"Error adding event series: {str(e)}")
+        return -1
+
+
+@with_instance(EventSeries)
+def update_event_series(series: EventSeries, new_data: dict[str, Any]) -> bool:
+    """
+    Modify an event series. Changing its recurrence keeps the overrides of the dates still in the series.
+
+    Returns:
+        bool: True if the series was successfully modified, False otherwise.
+    """
+    try:
+        for key, value in new_data.items():
+            if key in ("start_date", "until_date"):
+                value = parse_date(value)
+            elif key in ("start_time", "end_time"):
+                value = parse_time(value)
+            if hasattr(series, key) and key not in ("series_id", "asso_id", "participant_type"):
+                setattr(series, key, value)
+        series.weekdays = format_weekdays(parse_weekdays(series.weekdays, series.start_date))
+        if series.until_date < series.start_date or series.interval < 1:
+            raise ValueError("A series must end after it starts and have a positive interval")
+
+        # Drop the overrides of occurrences which no longer exist
+        dates = set(weekly_occurrences(series.start_date, series.until_date, series.interval, series.weekday_numbers))
+        for override in list(series.overrides):
+            if override.occurrence_date not in dates:
+                series.overrides.remove(override)
+
+        bump_event_versions()
+        db.session.commit()
+        return True
+    except (SQLAlchemyError, ValueError) as e:
+        db.session.rollback()
+        print(f"Error modifying event series: {str(e)}")
+        return False
+
+
+@with_instance(EventSeries)
+def delete_event_series(series: EventSeries) -> bool:
+    """Remove an event series, its audience, its attendance overrides and its occurrence overrides."""
+    try:
+        bump_event_versions()
+        db.session.execute(
+            event_series_attendance.delete().where(event_series_attendance.c.series_id == series.series_id)
+        )
+        db.session.delete(series)
+        db.session.commit()
+        return True
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"Error deleting event series: {str(e)}")
+        return False
+
+
+def get_event_series_by_id(series_id: int) -> EventSeries:
+    """Get an event series by its ID."""
+    return db.session.get(EventSeries, series_id)
+
+
+def get_all_event_series(asso_id: Optional[int] = None) -> list[EventSeries]:
+    """Return all event series, optionally only those of an association."""
+    query = EventSeries.query
+    if asso_id is not None:
+        query = query.filter_by(asso_id=asso_id)
+    return query.order_by(EventSeries.start_date, EventSeries.start_time).all()
+
+
+def _get_or_create_override(series: EventSeries, occurrence_date: date) -> EventSeriesOverride:
+    """Return the override of an occurrence, adding an empty one to the session if there is none."""
+    override = db.session.get(EventSeriesOverride, (series.series_id, occurrence_date))
+    if override is None:
+        override = EventSeriesOverride(series_id=series.series_id, occurrence_date=occurrence_date)
+        db.session.add(override)
+    return override
+
+
+@with_instance(EventSeries)
+def override_event_occurrence(
+    series: EventSeries, occurrence_date: Union[str, date], changes: Optional[dict[str, Any]] = None
+) -> bool:
+    """
+    Modify one occurrence of a series: move it (date, start_time, end_time), or change its location or description.
+
+    Calling it again for the same occurrence updates the same override. A cancelled occurrence is restored.
+
+    Returns:
+        bool: True if the occurrence was modified, False if it does not exist or an error occurs.
+    """
+    changes = changes or {}
+    try:
+        occurrence_date = parse_date(occurrence_date)
+        if not is_occurrence(series, occurrence_date):
+            return False
+        override = _get_or_create_override(series, occurrence_date)
+        override.cancelled = False
+        for key in ("date", "start_time", "end_time", "location", "description"):
+            if key in changes:
+                value = changes[key]
+                if key == "date" and value is not None:
+                    value = parse_date(value)
+                elif key in ("start_time", "end_time") and value is not None:
+                    value = parse_time(value)
+                setattr(override, key, value)
+        bump_event_versions()
+        db.session.commit()
+        return True
+    except (SQLAlchemyError, ValueError) as e:
+        db.session.rollback()
+        print(f"Error overriding event occurrence: {str(e)}")
+        return False
+
+
+@with_instance(EventSeries)
+def cancel_event_occurrence(series: EventSeries, occurrence_date: Union[str, date]) -> bool:
+    """
+    Cancel one occurrence of a series, which is then no longer displayed.
+
+    Returns:
+        bool: True if the occurrence was cancelled, False if it does not exist or an error occurs.
+    """
+    try:
+        occurrence_date = parse_date(occurrence_date)
+        if not is_occurrence(series, occurrence_date):
+            return False
+        _get_or_create_override(series, occurrence_date).cancelled = True
+        bump_event_versions()
+        db.session.commit()
+        return True
+    except (SQLAlchemyError, ValueError) as e:
+        db.session.rollback()
+        print(f"Error cancelling event occurrence: {str(e)}")
+        return False
@@ -0,0 +1,31 @@
+"""Query filters shared by the operations modules."""
+
+from datetime import date, datetime, time
+from typing import Optional
+from sqlalchemy import DateTime, and_, true
+
+
+def apply_date_window(query, column, start: Optional[date] = None, end: Optional[date] = None):  # type: ignore
+    """
+    Restrict a query to the rows whose `column` falls in the [start, end) window.
+
+    Both bounds are optional. When `column` is a datetime column, the bounds are taken at midnight.
+    """
+    if isinstance(column.type, DateTime):
+        start = datetime.combine(start, time.min) if start is not None else None
+        end = datetime.combine(end, time.min) if end is not None else None
+    if start is not None:
+        query = query.filter(column >= start)
+    if end is not None:
+        query = query.filter(column < end)
+    return query
+
+
+def overlaps_window(column_from, column_to, start: Optional[date] = None, end: Optional[date] = None):  # type: ignore
+    """Return the condition of a [column_from, column_to] date range intersecting the [start, end) window."""
+    conditions = []
+    if start is not None:
+        conditions.append(column_to >= start)
+    if end is not None:
+        conditions.append(column_from < end)
+    return and_(true(), *conditions)
@@ -1,6 +1,40 @@
-from typing import Optional
+import csv
+import io
+import math
+from typing import Any, Iterable, Optional
+import numpy as np
+from sqlalchemy import Select, and_, func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
 from betterave_backend.extensions import db
-from betterave_backend.app.models import Grade
+from betterave_backend.app.models import Class, Grade, User, UserClassGroup, UserType
+from betterave_backend.app.operations.data_version_operations import (
+    GLOBAL_OWNER_ID,
+    GRADES_SCOPE,
+    TRANSCRIPT_SCOPE,
+    bump_data_versions,
+    mark_tables_changed,
+)
+
+# Grades are out of GRADE_SCALE, and the histograms have a bucket every GRADE_BUCKET_WIDTH points
+GRADE_SCALE = 20
+GRADE_BUCKET_WIDTH = 2
+# Quantiles of the grade statistics
+GRADE_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+# The ECTS credits of a class are earned with a grade of at least PASSING_GRADE
+PASSING_GRADE = 10
+
+
+def bump_grade_versions(class_ids: Iterable[int], student_ids: Iterable[int] = ()) -> None:
+    """Bump the grades version of the classes and global owner, and the transcript version of the students."""
+    bump_data_versions(GRADES_SCOPE, {GLOBAL_OWNER_ID, *class_ids})
+    bump_data_versions(TRANSCRIPT_SCOPE, set(student_ids))
+
+
+def bump_class_grade_versions(class_id: int) -> None:
+    """Bump the grade versions of a class and the transcript versions of its graded students."""
+    student_ids = db.session.execute(select(Grade.student_id).where(Grade.class_id == class_id)).scalars()
+    bump_grade_versions([class_id], student_ids)
 
 
 def add_grade(student_id: int, class_id: int, grade_value: float) -> Optional[Grade]:
@@ -10,6 +44,7 @@ def add_grade(student_id: int, class_id: int, grade_value: float) -> Optional[Gr
     try:
         # Add the grade to the database
         db.session.add(grade)
+        bump_grade_versions([class_id], [student_id])
         db.session.commit()
         return grade
     except Exception as e:
@@ -24,25 +59,296 @@ def get_grades_by_student_and_class_id(student_id: int, class_id: int) -> list[G
     return sorted(Grade.query.filter_by(student_id=student_id, class_id=class_id).all())
 
 
+def upsert_grades(class_id: int, grades: dict[int, float]) -> None:
+    """
+    Set the grades of students in a class, by student ID, in a single INSERT ... ON CONFLICT DO UPDATE statement.
+
+    The statement is executed in the caller's transaction, which is responsible for committing.
+    """
+    if not grades:
+        return
+    dialect = db.session.get_bind().dialect.name
+    if dialect not in ("sqlite", "postgresql"):
+        raise NotImplementedError(f"Grade upserts are not supported on {dialect}")
+    insert = (sqlite if dialect == "sqlite" else postgresql).insert(Grade)
+    db.session.execute(
+        insert.on_conflict_do_update(
+            index_elements=[Grade.class_id, Grade.student_id], set_={"grade": insert.excluded.grade}
+        ),
+        [{"class_id": class_id, "student_id": student_id, "grade": grade} for student_id, grade in grades.items()],
+    )
+    # The statement bypasses the ORM flushes, which record the changed tables
+    mark_tables_changed(Grade.__tablename__)
+    bump_grade_versions([class_id], grades.keys())
+    # The grades already loaded in the session are outdated
+    db.session.expire_all()
+
+
 def update_student_grade(class_id: int, student_id: int, new_grade: float) -> bool:
-    """Update the grade for a specific student in a specific class."""
+    """Update the grade for a specific student in a specific class, adding it if the student has none."""
     try:
-        # Récupérer l'objet Grade à partir de la base de données
-        grade = Grade.query.filter_by(class_id=class_id, student_id=student_id).first()
-
-        if grade:
-            # Mettre à jour la note
-            grade.grade = new_grade
-
-            # Enregistrez les modifications dans la base de données
-            db.session.commit()
-            return True
-        else:
-            add_grade(student_id, class_id, new_grade)
-            # Gérer le cas où l'entrée de grade n'existe pas
-            return True
-    except Exception as e:
-        # Gérez l'erreur (log, notification, etc.)
-        print(f"Error updating student grade: {e}")
+        upsert_grades(class_id, {student_id: new_grade})
+        db.session.commit()
+        return True
+    except SQLAlchemyError as e:
         db.session.rollback()
+        print(f"Error updating student grade: {str(e)}")
         return False
+
+
+def read_grade_csv(text: str) -> list[dict[str, str]]:
+    """
+    Read the rows of a CSV file of grades, with a header naming the student_id or email and grade columns.
+
+    The delimiter can be a comma, a semicolon (as exported by a French spreadsheet) or a tab.
+    """
+    try:
+        dialect: Any = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(io.StringIO(text.strip()), dialect=dialect)
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    return [{key: (value or "").strip() for key, value in row.items() if key is not None} for row in reader]
+
+
+def _parse_grade(value: Any) -> float:
+    """Parse a grade between 0 and GRADE_SCALE, with a decimal point or comma."""
+    if isinstance(value, bool):
+        raise ValueError
+    grade = float(value.replace(",", ".")) if isinstance(value, str) else float(value)
+    if not 0 <= grade <= GRADE_SCALE:
+        raise ValueError
+    return grade
+
+
+def _row_error(
+    row: dict[str, Any],
+    by_id: dict[int, Any],
+    by_email: dict[str, Any],
+    enrolled: set[int],
+    grades: dict[int, float],
+) -> Optional[str]:
+    """Validate a row of a grade import and add its grade to `grades`, or return its error."""
+    if str(row.get("student_id") or "").isdigit():
+        student = by_id.get(int(row["student_id"]))
+    elif row.get("student_id"):
+        return "Invalid student_id"
+    elif row.get("email"):
+        student = by_email.get(str(row["email"]).lower())
+    else:
+        return "Missing student_id or email"
+    try:
+        grade = _parse_grade(row.get("grade"))
+    except (TypeError, ValueError):
+        return f"The grade must be a number between 0 and {GRADE_SCALE}"
+    if student is None or student.user_type != UserType.STUDENT:
+        return "Unknown student"
+    if student.user_id not in enrolled:
+        return "The student is not enrolled in the class"
+    if student.user_id in grades:
+        return "Duplicate grade for the student"
+    grades[student.user_id] = grade
+    return None
+
+
+def import_class_grades(class_id: int, rows: list[dict[str, Any]]) -> tuple[int, list[dict[str, Any]]]:
+    """
+    Validate a batch of grades of a class, then set them all in one transaction if they are all valid.
+
+    Each row identifies a student enrolled in the class by student_id or email, and gives a grade between 0 and
+    GRADE_SCALE. The students of the whole batch are looked up in two queries, and the grades are written with
+    upsert_grades, so the cost does not grow with round trips per student.
+
+    Returns:
+        tuple: The number of grades set, and the errors of the invalid rows as dictionaries with the row number
+        (from 1), the student as given and the error. Nothing is written if there is any error.
+    """
+    student_ids = set()
+    emails = set()
+    for row in rows:
+        if str(row.get("student_id") or "").isdigit():
+            student_ids.add(int(row["student_id"]))
+        elif row.get("email"):
+            emails.add(str(row["email"]).lower())
+    students = db.session.execute(
+        select(User.user_id, User.email, User.user_type).where(
+            or_(User.user_id.in_(list(student_ids)), func.lower(User.email).in_(list(emails)))
+        )
+    ).all()
+    by_id = {student.user_id: student for student in students}
+    by_email = {student.email.lower(): student for student in students}
+    enrolled = set(
+        db.session.execute(
+            select(UserClassGroup.user_id).where(
+                UserClassGroup.class_id == class_id, UserClassGroup.user_id.in_(list(by_id))
+            )
+        ).scalars()
+    )
+
+    grades: dict[int, float] = {}
+    errors = []
+    for number, row in enumerate(rows, start=1):
+        given = row.get("student_id") or row.get("email")
+        message = _row_error(row, by_id, by_email, enrolled, grades)
+        if message is not None:
+            errors.append({"row": number, "student": str(given) if given else None, "error": message})
+
+    if errors:
+        return 0, errors
+    try:
+        upsert_grades(class_id, grades)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"Error importing grades: {str(e)}")
+        return 0, [{"row": None, "student": None, "error": "The grades could not be saved"}]
+    return len(grades), []
+
+
+def _summary(count: int, mean: Optional[float], mean_square: Optional[float]) -> dict[str, Any]:
+    """Return the count, mean and (population) standard deviation of grades, from their SQL aggregates."""
+    if not count:
+        return {"count": 0, "mean": None, "std": None}
+    # The variance is the mean of the squares minus the square of the mean, rounding can make it slightly negative
+    return {"count": count, "mean": mean, "std": math.sqrt(max(0.0, mean_square - mean**2))}
+
+
+def get_grade_stats(class_id: Optional[int] = None) -> dict[str, Any]:
+    """
+    Compute the statistics of the grades of a class, or of the whole school if class_id is None.
+
+    The count, mean, standard deviation, minimum and maximum are aggregated by the database for each level of
+    the students, in one query, and combined for all of them. The median, quantiles and histogram are computed
+    with NumPy over the grades, fetched as a single column. Only the grades of existing students are included.
+
+    Returns:
+        dict: The class_id, count, mean, median, std, min and max of the grades, their quantiles as a list of
+        {"quantile", "value"}, their histogram as a list of {"start", "end", "count"} buckets of GRADE_BUCKET_WIDTH
+        points over [0, GRADE_SCALE], and the count, mean, std, min and max of each level as a list of dicts.
+    """
+    conditions = [Grade.class_id == class_id] if class_id is not None else []
+    by_level = db.session.execute(
+        select(
+            User.level,
+            func.count(Grade.grade).label("count"),
+            func.avg(Grade.grade).label("mean"),
+            func.avg(Grade.grade * Grade.grade).label("mean_square"),
+            func.min(Grade.grade).label("min"),
+            func.max(Grade.grade).label("max"),
+        )
+        .join(User, User.user_id == Grade.student_id)
+        .where(*conditions)
+        .group_by(User.level)
+        .order_by(User.level)
+    ).all()
+    values = np.asarray(
+        db.session.execute(select(Grade.grade).join(User, User.user_id == Grade.student_id).where(*conditions))
+        .scalars()
+        .all(),
+        dtype=float,
+    )
+
+    count = sum(row.count for row in by_level)
+    mean = sum(row.count * row.mean for row in by_level) / count if count else None
+    mean_square = sum(row.count * row.mean_square for row in by_level) / count if count else None
+    edges = np.arange(0, GRADE_SCALE + GRADE_BUCKET_WIDTH, GRADE_BUCKET_WIDTH)
+    # Out of scale grades are counted in the first or last bucket
+    histogram, _ = np.histogram(np.clip(values, 0, GRADE_SCALE), bins=edges)
+    quantiles = np.quantile(values, GRADE_QUANTILES) if values.size else [None] * len(GRADE_QUANTILES)
+    return {
+        "class_id": class_id,
+        **_summary(count, mean, mean_square),
+        "median": float(np.median(values)) if values.size else None,
+        "min": min(row.min for row in by_level) if count else None,
+        "max": max(row.max for row in by_level) if count else None,
+        "quantiles": [
+            {"quantile": q, "value": float(value) if value is not None else None}
+            for q, value in zip(GRADE_QUANTILES, quantiles)
+        ],
+        "histogram": [
+            {"start": int(start), "end": int(end), "count": int(bucket)}
+            for start, end, bucket in zip(edges[:-1], edges[1:], histogram)
+        ],
+        "levels": [
+            {"level": row.level.value, **_summary(row.count, row.mean, row.mean_square), "min": row.min, "max": row.max}
+            for row in by_level
+        ],
+    }
+
+
+def _weighted_average(rows: list[Any]) -> dict[str, Any]:
+    """Return the ECTS-weighted average of graded classes, and the credits they are worth and earned."""
+    attempted = sum(row.ects_credits for row in rows)
+    weighted = sum(row.grade * row.ects_credits for row in rows)
+    return {
+        "average": weighted / attempted if attempted else None,
+        "credits_attempted": attempted,
+        "credits_earned": sum(row.ects_credits for row in rows if row.grade >= PASSING_GRADE),
+    }
+
+
+def get_student_transcript(student_id: int) -> dict[str, Any]:
+    """
+    Compute the transcript of a student from their grades and the ECTS credits and level of the graded classes.
+
+    The grades are read with their classes in one query. Classes have no semester, so the averages are given for
+    each level of the classes and for all of them.
+
+    Returns:
+        dict: The student_id, the ECTS-weighted average, the credits attempted and earned (with a grade of at least
+        PASSING_GRADE), the same for each level as a list of dicts, and the grade of each class as a list of dicts
+        with the class_id, name, level, ects_credits, grade and whether it was passed.
+    """
+    rows = db.session.execute(
+        select(Class.class_id, Class.name, Class.level, Class.ects_credits, Grade.grade)
+        .join(Class, Class.class_id == Grade.class_id)
+        .where(Grade.student_id == student_id)
+        .order_by(Class.level, Class.name, Class.class_id)
+    ).all()
+    levels: dict[Any, list[Any]] = {}
+    for row in rows:
+        levels.setdefault(row.level, []).append(row)
+    return {
+        "student_id": student_id,
+        **_weighted_average(rows),
+        "levels": [{"level": level.value, **_weighted_average(level_rows)} for level, level_rows in levels.items()],
+        "classes": [
+            {
+                "class_id": row.class_id,
+                "name": row.name,
+                "level": row.level.value,
+                "ects_credits": row.ects_credits,
+                "grade": row.grade,
+                "passed": row.grade >= PASSING_GRADE,
+            }
+            for row in rows
+        ],
+    }
+
+
+def get_grade_matrix(class_ids: Select) -> dict[str, list]:
+    """
+    Build the matrix of the grades of the students enrolled in the given classes, in one query.
+
+    Args:
+        class_ids (Select): A select of the IDs of the classes, e.g. class_operations.teacher_class_ids.
+
+    Returns:
+        dict: The matrix in columnar layout, with the sorted "student_ids" and "class_ids", and the "grades"
+        flattened by student: the grade of student i in class j is grades[i * len(class_ids) + j], None if the
+        student has no grade in the class or is not enrolled in it.
+    """
+    rows = db.session.execute(
+        select(Class.class_id, UserClassGroup.user_id, Grade.grade)
+        .outerjoin(UserClassGroup, UserClassGroup.class_id == Class.class_id)
+        .outerjoin(Grade, and_(Grade.class_id == Class.class_id, Grade.student_id == UserClassGroup.user_id))
+        .where(Class.class_id.in_(class_ids))
+    ).all()
+    # Classes without any enrolled student come with a None user_id
+    column = {class_id: j for j, class_id in enumerate(sorted({row.class_id for row in rows}))}
+    line = {student_id: i for i, student_id in enumerate(sorted({row.user_id for row in rows} - {None}))}
+    grades: list[Optional[float]] = [None] * (len(line) * len(column))
+    for row in rows:
+        if row.grade is not None:
+            grades[line[row.user_id] * len(column) + column[row.class_id]] = row.grade
+    return {"student_ids": list(line), "class_ids": list(column), "grades": grades}
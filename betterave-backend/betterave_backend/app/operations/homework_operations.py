@@ -1,13 +1,26 @@
-from datetime import datetime
+from datetime import date, datetime
+from typing import Any, Optional
+from sqlalchemy.orm import contains_eager
 from betterave_backend.extensions import db
-from betterave_backend.app.models import Homework, Class, User
+from betterave_backend.app.models import Homework, Class, ClassGroup, User, UserClassGroup
 from betterave_backend.app.decorators import with_instance
 from betterave_backend.app.operations.class_operations import get_class_by_id
+from betterave_backend.app.operations.filters import apply_date_window
 
 
-def get_homework_by_group_id(group_id: int) -> list[Homework]:
-    """Retrieve homework for a specific class."""
-    return sorted(Homework.query.filter_by(group_id=group_id).all())
+def _due_order() -> tuple[Any, ...]:
+    """Return the order of homework by due date, those without due time first on their day (as Homework.__lt__)."""
+    return Homework.due_date, Homework.due_time.nulls_first(), Homework.homework_id
+
+
+def get_homework_by_group_id(
+    group_id: int,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> list[Homework]:
+    """Retrieve homework for a specific class, optionally due in the [start, end) window, by due date."""
+    query = apply_date_window(Homework.query.filter_by(group_id=group_id), Homework.due_date, start, end)
+    return query.order_by(*_due_order()).all()
 
 
 def add_homework_to_group(content: str, due_date: str, due_time: str, group_id: int) -> Homework:
@@ -31,9 +44,9 @@ def delete_homework(homework: Homework) -> bool:
 
 
 @with_instance(Class)
-def get_class_homework(class_: Class) -> list[Homework]:
-    """Retrieve homework for a specific class."""
-    return get_homework_by_group_id(class_.main_group().group_id)
+def get_class_homework(class_: Class, start: Optional[date] = None, end: Optional[date] = None) -> list[Homework]:
+    """Retrieve homework for a specific class, optionally due in the [start, end) window."""
+    return get_homework_by_group_id(class_.main_group().group_id, start, end)
 
 
 def add_homework_to_class(content: str, class_id: int, due_date: str, due_time: str) -> Homework:
@@ -48,9 +61,24 @@ def add_homework_to_class(content: str, class_id: int, due_date: str, due_time:
 
 
 @with_instance(User)
-def get_user_homework(user: User) -> list[Homework]:
-    """Get all homework for a specific user."""
-    all_homework = []
-    for ucg in user.class_groups:
-        all_homework += get_homework_by_group_id(ucg.primary_class_group.group_id)
-    return sorted(all_homework)
+def get_user_homework(
+    user: User, start: Optional[date] = None, end: Optional[date] = None, limit: Optional[int] = None
+) -> list[Homework]:
+    """
+    Get the homework of the primary groups of a user, optionally due in the [start, end) window, by due date.
+
+    A single query reads the homework of every group from the index on (group_id, due_date), with the
+    class groups and classes serialized by Homework.as_dict.
+
+    Args:
+        limit (int, optional): Only return the first homework due.
+    """
+    query = (
+        Homework.query.join(Homework.group_ref)
+        .join(ClassGroup.class_ref)
+        .join(UserClassGroup, UserClassGroup.primary_class_group_id == Homework.group_id)
+        .options(contains_eager(Homework.group_ref).contains_eager(ClassGroup.class_ref))
+        .filter(UserClassGroup.user_id == user.user_id)
+    )
+    query = apply_date_window(query, Homework.due_date, start, end)
+    return query.order_by(*_due_order()).limit(limit).all()
@@ -0,0 +1,167 @@
+"""
+Database-backed queue of background jobs, run outside of the HTTP requests by scripts/job_worker.py.
+
+A job is a row of the job table with a kind, naming the handler registered with @job_handler, and a JSON payload.
+Jobs are enqueued in the transaction of the change requiring them, so that they exist if and only if the change
+is committed. Enqueueing a job with the idempotency key of an existing one returns the existing job.
+
+A worker claims a pending job with a conditional UPDATE, so that two workers never run the same job, and runs its
+handler in its own transaction. A failing job is retried with an exponential backoff until it has run max_attempts
+times, then marked as failed. A job whose worker died is claimed again once its lease has expired.
+Jobs are therefore run at least once, and handlers must be idempotent.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+from sqlalchemy import and_, func, or_, select, update
+from betterave_backend.extensions import db
+from betterave_backend.app.models import Job, JobStatus
+
+# The handler of each kind of job, called with the payload of the job
+JOB_HANDLERS: dict[str, Callable[[dict[str, Any]], None]] = {}
+
+# A running job not finished after its lease is considered abandoned by its worker
+JOB_LEASE = timedelta(minutes=5)
+# Delay before the first retry of a failed job, doubled at each attempt
+RETRY_DELAY = timedelta(seconds=30)
+
+
+def job_handler(kind: str) -> Callable:
+    """Register the decorated function as the handler of the jobs of a kind."""
+
+    def decorator(func: Callable[[dict[str, Any]], None]) -> Callable[[dict[str, Any]], None]:
+        JOB_HANDLERS[kind] = func
+        return func
+
+    return decorator
+
+
+def enqueue_job(
+    kind: str,
+    payload: Optional[dict[str, Any]] = None,
+    idempotency_key: Optional[str] = None,
+    user_id: Optional[int] = None,
+    max_attempts: int = 5,
+) -> Job:
+    """
+    Add a job to the queue, in the caller's transaction.
+
+    Args:
+        kind (str): The kind of the job, which must have a handler.
+        payload (dict, optional): The JSON-serializable arguments of the handler.
+        idempotency_key (str, optional): If a job with this key exists, it is returned instead of adding a new one.
+        user_id (int, optional): The user the job is enqueued for, who can follow its status.
+
+    Returns:
+        Job: The new job, or the existing one with the same idempotency key.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"No handler for jobs of kind {kind}")
+    if idempotency_key is not None:
+        existing = Job.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return existing
+
+    job = Job(
+        kind=kind,
+        payload=payload or {},
+        idempotency_key=idempotency_key,
+        user_id=user_id,
+        max_attempts=max_attempts,
+    )
+    # Two concurrent transactions enqueueing the same key cannot both commit, the key being unique
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+
+def _claimable(now: datetime) -> Any:
+    """Return the condition selecting the jobs a worker can claim."""
+    return or_(
+        and_(Job.status == JobStatus.PENDING, Job.run_after <= now),
+        and_(Job.status == JobStatus.RUNNING, Job.started_at <= now - JOB_LEASE),
+    )
+
+
+def claim_job(now: Optional[datetime] = None) -> Optional[Job]:
+    """
+    Claim the next job to run and commit its RUNNING status.
+
+    Returns:
+        Job: The claimed job, or None if no job is due.
+    """
+    now = now or datetime.utcnow()
+    candidates = db.session.execute(
+        select(Job.job_id).where(_claimable(now)).order_by(Job.run_after, Job.job_id).limit(10)
+    ).scalars()
+    for job_id in candidates.all():
+        # Only one worker can move a job out of the claimable state
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.job_id == job_id, _claimable(now))
+            .values(status=JobStatus.RUNNING, started_at=now, attempts=Job.attempts + 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if claimed.rowcount == 1:
+            return db.session.get(Job, job_id)
+    return None
+
+
+def run_job(job: Job, now: Optional[datetime] = None) -> bool:
+    """
+    Run the handler of a claimed job and commit its outcome.
+
+    Returns:
+        bool: True if the job succeeded, False if it will be retried or has failed.
+    """
+    now = now or datetime.utcnow()
+    job_id = job.job_id
+    try:
+        if job.attempts > job.max_attempts:
+            raise RuntimeError("The lease of the last attempt expired")
+        if job.kind not in JOB_HANDLERS:
+            raise LookupError(f"No handler for jobs of kind {job.kind}")
+        JOB_HANDLERS[job.kind](job.payload)
+        job.status = JobStatus.DONE
+        job.finished_at = now
+        job.error = None
+        db.session.commit()
+        return True
+    # Handlers can fail in any way, e.g. when an SMTP server is unreachable
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error running job {job_id}: {str(e)}")
+        job = db.session.get(Job, job_id)
+        job.error = f"{type(e).__name__}: {str(e)}"
+        if job.attempts >= job.max_attempts:
+            job.status = JobStatus.FAILED
+            job.finished_at = now
+        else:
+            job.status = JobStatus.PENDING
+            job.run_after = now + RETRY_DELAY * 2 ** (job.attempts - 1)
+        db.session.commit()
+        return False
+
+
+def run_pending_jobs(max_jobs: Optional[int] = None, now: Optional[datetime] = None) -> int:
+    """Claim and run the due jobs one by one, at most max_jobs of them, and return the number of jobs run."""
+    count = 0
+    while max_jobs is None or count < max_jobs:
+        job = claim_job(now)
+        if job is None:
+            break
+        run_job(job, now)
+        count += 1
+    return count
+
+
+def get_job_by_id(job_id: int) -> Job:
+    """Get a job by its ID."""
+    return db.session.get(Job, job_id)
+
+
+def count_jobs_by_status() -> dict[str, int]:
+    """Return the number of jobs of each status."""
+    counts = dict(db.session.execute(select(Job.status, func.count()).group_by(Job.status)).all())
+    return {status.value: counts.get(status, 0) for status in JobStatus}
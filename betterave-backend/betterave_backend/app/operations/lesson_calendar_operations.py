@@ -0,0 +1,381 @@
+"""
+Maintenance and reads of the denormalized calendar_lesson table.
+
+Every operation that changes what a lesson looks like in the calendar (the lesson itself, its class,
+its class group or its teacher's name) calls refresh_calendar_lessons with a filter selecting the
+affected lessons, inside its own transaction. Calendar reads then only scan calendar_lesson.
+
+Both refresh_calendar_lessons and delete_calendar_lessons also bump the "lessons" data version of
+every user whose calendar changed: the students of the affected groups, the affected teachers
+(before and after the change) and the global owner.
+
+Recurring lessons (LessonSeries) are not materialized: the calendar reads expand the series matching
+the requested window and merge their occurrences with the one-off calendar_lesson rows, in
+chronological order.
+"""
+
+import heapq
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional, Union
+from sqlalchemy import delete, insert, or_, select
+from betterave_backend.extensions import db
+from betterave_backend.app.decorators import with_instance
+from betterave_backend.app.models import (
+    CalendarLesson,
+    Class,
+    ClassGroup,
+    Lesson,
+    LessonOccurrence,
+    LessonSeries,
+    LessonSeriesOverride,
+    User,
+    group_enrollment,
+)
+from betterave_backend.app.operations.filters import apply_date_window, overlaps_window
+from betterave_backend.app.recurrence import expand_series
+from betterave_backend.app.operations.data_version_operations import (
+    GLOBAL_OWNER_ID,
+    LESSONS_SCOPE,
+    bump_data_versions,
+)
+
+
+def bump_calendar_versions(group_ids: set[int], teacher_ids: set[int]) -> None:
+    """Bump the lessons version of the students of the groups, of the teachers and of the global owner."""
+    if not group_ids and not teacher_ids:
+        return
+    students = db.session.execute(
+        select(group_enrollment.c.student_id).where(group_enrollment.c.group_id.in_(group_ids)).distinct()
+    ).scalars()
+    bump_data_versions(LESSONS_SCOPE, {GLOBAL_OWNER_ID, *teacher_ids, *students})
+
+
+def _stale_owners(stale_filter) -> tuple[set[int], set[int]]:  # type: ignore
+    """Return the group and teacher IDs of the calendar rows matching the filter, before they change."""
+    rows = db.session.execute(select(CalendarLesson.group_id, CalendarLesson.teacher_id).where(*stale_filter)).all()
+    return {row.group_id for row in rows}, {row.teacher_id for row in rows if row.teacher_id is not None}
+
+
+def _series_owners(
+    group_id: Optional[int] = None, class_id: Optional[int] = None, teacher_id: Optional[int] = None
+) -> tuple[set[int], set[int]]:
+    """Return the group and teacher IDs of the lesson series matching all the given filters."""
+    query = select(LessonSeries.group_id, LessonSeries.teacher_id)
+    if group_id is not None:
+        query = query.where(LessonSeries.group_id == group_id)
+    if class_id is not None:
+        query = query.join(ClassGroup, ClassGroup.group_id == LessonSeries.group_id).where(
+            ClassGroup.class_id == class_id
+        )
+    if teacher_id is not None:
+        query = query.where(LessonSeries.teacher_id == teacher_id)
+    rows = db.session.execute(query).all()
+    return {row.group_id for row in rows}, {row.teacher_id for row in rows if row.teacher_id is not None}
+
+
+def refresh_calendar_lessons(
+    lesson_ids: Optional[list[int]] = None,
+    group_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    teacher_id: Optional[int] = None,
+) -> int:
+    """
+    Rebuild the calendar rows of the lessons matching all the given filters.
+
+    Without any filter, the whole table is rebuilt. The caller is responsible for committing.
+
+    Returns:
+        int: The number of calendar rows written.
+    """
+    source = (
+        select(
+            Lesson.lesson_id,
+            Lesson.group_id,
+            ClassGroup.class_id,
+            Lesson.teacher_id,
+            Lesson.date,
+            Lesson.start_time,
+            Lesson.end_time,
+            Lesson.room,
+            Lesson.homework,
+            Class.name.label("class_name"),
+            Class.background_color,
+            ClassGroup.name.label("group_name"),
+            User.name.label("teacher_first_name"),
+            User.surname.label("teacher_surname"),
+        )
+        .join(ClassGroup, ClassGroup.group_id == Lesson.group_id)
+        .join(Class, Class.class_id == ClassGroup.class_id)
+        .outerjoin(User, User.user_id == Lesson.teacher_id)
+    )
+    stale = []
+    if lesson_ids is not None:
+        source = source.where(Lesson.lesson_id.in_(lesson_ids))
+        stale.append(CalendarLesson.lesson_id.in_(lesson_ids))
+    if group_id is not None:
+        source = source.where(Lesson.group_id == group_id)
+        stale.append(CalendarLesson.group_id == group_id)
+    if class_id is not None:
+        source = source.where(ClassGroup.class_id == class_id)
+        stale.append(CalendarLesson.class_id == class_id)
+    if teacher_id is not None:
+        source = source.where(Lesson.teacher_id == teacher_id)
+        stale.append(CalendarLesson.teacher_id == teacher_id)
+
+    rows = [
+        {
+            "lesson_id": row.lesson_id,
+            "group_id": row.group_id,
+            "class_id": row.class_id,
+            "teacher_id": row.teacher_id,
+            "start_ts": datetime.combine(row.date, row.start_time),
+            "end_ts": datetime.combine(row.date, row.end_time),
+            "title": row.class_name,
+            "background_color": row.background_color,
+            "group_name": row.group_name,
+            "teacher_name": (
+                f"{row.teacher_first_name} {row.teacher_surname}" if row.teacher_first_name is not None else None
+            ),
+            "room": row.room,
+            "homework": row.homework,
+        }
+        for row in db.session.execute(source)
+    ]
+    group_ids, teacher_ids = _stale_owners(stale)
+    group_ids.update(row["group_id"] for row in rows)
+    teacher_ids.update(row["teacher_id"] for row in rows if row["teacher_id"] is not None)
+    if lesson_ids is None:
+        # Series are displayed with the same class, group and teacher data as one-off lessons
+        series_group_ids, series_teacher_ids = _series_owners(group_id, class_id, teacher_id)
+        group_ids.update(series_group_ids)
+        teacher_ids.update(series_teacher_ids)
+
+    db.session.execute(delete(CalendarLesson).where(*stale))
+    if rows:
+        db.session.execute(insert(CalendarLesson), rows)
+    bump_calendar_versions(group_ids, teacher_ids)
+    return len(rows)
+
+
+def delete_calendar_lessons(
+    lesson_ids: Optional[list[int]] = None,
+    group_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+) -> None:
+    """Delete the calendar rows matching all the given filters. The caller is responsible for committing."""
+    stale = []
+    if lesson_ids is not None:
+        stale.append(CalendarLesson.lesson_id.in_(lesson_ids))
+    if group_id is not None:
+        stale.append(CalendarLesson.group_id == group_id)
+    if class_id is not None:
+        stale.append(CalendarLesson.class_id == class_id)
+    group_ids, teacher_ids = _stale_owners(stale)
+    db.session.execute(delete(CalendarLesson).where(*stale))
+    bump_calendar_versions(group_ids, teacher_ids)
+
+
+def rebuild_calendar_lessons() -> int:
+    """Rebuild the whole calendar_lesson table from the lessons, e.g. after restoring a database."""
+    count = refresh_calendar_lessons()
+    db.session.commit()
+    return count
+
+
+def get_calendar_lesson(lesson_id: int) -> CalendarLesson:
+    """Get the calendar row of a lesson by its ID."""
+    return db.session.get(CalendarLesson, lesson_id)
+
+
+def _calendar_query(query, start: Optional[date], end: Optional[date], limit: Optional[int]):  # type: ignore
+    """Restrict a calendar query to the [start, end) window, in chronological order."""
+    query = apply_date_window(query, CalendarLesson.start_ts, start, end).order_by(CalendarLesson.start_ts)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def _calendar_order(item: Union[CalendarLesson, LessonOccurrence]) -> tuple[datetime, str]:
+    """Sort key of one-off lessons and series occurrences."""
+    return item.start_ts, item.calendar_id
+
+
+def _student_filters(user: User) -> tuple[Any, Any]:
+    """Return the filters selecting the one-off lessons and the series of the groups of a student."""
+    student_groups = select(group_enrollment.c.group_id).where(group_enrollment.c.student_id == user.user_id)
+    return CalendarLesson.group_id.in_(student_groups), LessonSeries.group_id.in_(student_groups)
+
+
+def _teacher_filters(teacher: User) -> tuple[Any, Any]:
+    """Return the filters selecting the one-off lessons and the series taught by a teacher."""
+    return CalendarLesson.teacher_id == teacher.user_id, LessonSeries.teacher_id == teacher.user_id
+
+
+def _expand_series(
+    series: LessonSeries,
+    display: Any,
+    overrides: dict[date, LessonSeriesOverride],
+    start: Optional[date],
+    end: Optional[date],
+) -> Iterator[LessonOccurrence]:
+    """Yield the occurrences of a series in the [start, end) window, overrides applied, in chronological order."""
+
+    def occurrence(occurrence_date: date, override: Optional[LessonSeriesOverride]) -> LessonOccurrence:
+        override_value = lambda name: getattr(override, name, None) if override else None  # noqa: E731
+        day = override_value("date") or occurrence_date
+        room, homework = override_value("room"), override_value("homework")
+        start_ts = datetime.combine(day, override_value("start_time") or series.start_time)
+        if override_value("end_time"):
+            end_ts = datetime.combine(day, override_value("end_time"))
+        else:
+            # Moving the start time only keeps the duration of the series
+            end_ts = start_ts + (datetime.combine(day, series.end_time) - datetime.combine(day, series.start_time))
+        return LessonOccurrence(
+            series_id=series.series_id,
+            occurrence_date=occurrence_date,
+            group_id=series.group_id,
+            class_id=display.class_id,
+            teacher_id=series.teacher_id,
+            start_ts=start_ts,
+            end_ts=end_ts,
+            title=display.class_name,
+            background_color=display.background_color,
+            group_name=display.group_name,
+            teacher_name=(
+                f"{display.teacher_first_name} {display.teacher_surname}"
+                if display.teacher_first_name is not None
+                else None
+            ),
+            room=room if room is not None else series.room,
+            homework=homework if homework is not None else series.homework,
+        )
+
+    return expand_series(series, overrides, occurrence, _calendar_order, start, end)
+
+
+def _series_occurrences(series_filter: Any, start: Optional[date], end: Optional[date]) -> Iterator[LessonOccurrence]:
+    """Expand the series matching the filter in the [start, end) window, in chronological order."""
+    moved_in_window = select(LessonSeriesOverride.series_id).where(
+        LessonSeriesOverride.date.is_not(None),
+        overlaps_window(LessonSeriesOverride.date, LessonSeriesOverride.date, start, end),
+    )
+    query = (
+        select(
+            LessonSeries,
+            ClassGroup.class_id,
+            Class.name.label("class_name"),
+            Class.background_color,
+            ClassGroup.name.label("group_name"),
+            User.name.label("teacher_first_name"),
+            User.surname.label("teacher_surname"),
+        )
+        .join(ClassGroup, ClassGroup.group_id == LessonSeries.group_id)
+        .join(Class, Class.class_id == ClassGroup.class_id)
+        .outerjoin(User, User.user_id == LessonSeries.teacher_id)
+        .where(
+            or_(
+                overlaps_window(LessonSeries.start_date, LessonSeries.until_date, start, end),
+                LessonSeries.series_id.in_(moved_in_window),
+            )
+        )
+    )
+    if series_filter is not None:
+        query = query.where(series_filter)
+    rows = db.session.execute(query).all()
+    if not rows:
+        return iter(())
+
+    overrides: dict[int, dict[date, LessonSeriesOverride]] = {row.LessonSeries.series_id: {} for row in rows}
+    override_query = select(LessonSeriesOverride).where(
+        LessonSeriesOverride.series_id.in_(overrides),
+        or_(
+            overlaps_window(LessonSeriesOverride.occurrence_date, LessonSeriesOverride.occurrence_date, start, end),
+            overlaps_window(LessonSeriesOverride.date, LessonSeriesOverride.date, start, end),
+        ),
+    )
+    for override in db.session.execute(override_query).scalars():
+        overrides[override.series_id][override.occurrence_date] = override
+
+    return heapq.merge(
+        *(_expand_series(row.LessonSeries, row, overrides[row.LessonSeries.series_id], start, end) for row in rows),
+        key=_calendar_order,
+    )
+
+
+def _calendar_lessons(
+    filters: tuple[Any, Any],
+    start: Optional[date],
+    end: Optional[date],
+    limit: Optional[int] = None,
+    batch_size: Optional[int] = None,
+) -> Iterator[Union[CalendarLesson, LessonOccurrence]]:
+    """
+    Merge the one-off lessons and the series occurrences selected by the filters, in chronological order.
+
+    `filters` is a pair of conditions on CalendarLesson and LessonSeries, None selecting every lesson.
+    """
+    calendar_filter, series_filter = filters
+    query = CalendarLesson.query
+    if calendar_filter is not None:
+        query = query.filter(calendar_filter)
+    one_offs: Iterable[CalendarLesson] = _calendar_query(query, start, end, limit)
+    if batch_size is not None:
+        one_offs = one_offs.yield_per(batch_size)  # type: ignore
+    merged = heapq.merge(one_offs, _series_occurrences(series_filter, start, end), key=_calendar_order)
+    return islice(merged, limit)
+
+
+def get_all_calendar_lessons(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: Optional[int] = None,
+) -> list[Union[CalendarLesson, LessonOccurrence]]:
+    """Return all one-off lessons and series occurrences, optionally in the [start, end) window."""
+    return list(_calendar_lessons((None, None), start, end, limit))
+
+
+@with_instance(User)
+def get_student_calendar_lessons(
+    user: User,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: Optional[int] = None,
+) -> list[Union[CalendarLesson, LessonOccurrence]]:
+    """Return the lessons of every group the student is enrolled in, optionally in the [start, end) window."""
+    return list(_calendar_lessons(_student_filters(user), start, end, limit))
+
+
+@with_instance(User)
+def get_teacher_calendar_lessons(
+    teacher: User,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: Optional[int] = None,
+) -> list[Union[CalendarLesson, LessonOccurrence]]:
+    """Return the lessons taught by a teacher, optionally in the [start, end) window."""
+    return list(_calendar_lessons(_teacher_filters(teacher), start, end, limit))
+
+
+@with_instance(User)
+def iter_user_calendar_lessons(
+    user: User,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    batch_size: int = 500,
+) -> Iterator[Union[CalendarLesson, LessonOccurrence]]:
+    """
+    Stream the lessons of a user, in chronological order, one-off lessons being read batch_size rows at a time.
+
+    Students get the lessons of their groups, teachers the lessons they teach and admins every lesson.
+    The queries only run once the first lesson is requested.
+    """
+    if user.is_student:
+        filters = _student_filters(user)
+    elif user.is_teacher:
+        filters = _teacher_filters(user)
+    elif user.is_admin:
+        filters = (None, None)
+    else:
+        return
+    yield from _calendar_lessons(filters, start, end, batch_size=batch_size)
@@ -1,9 +1,23 @@
 # type: ignore
-from datetime import datetime
+from datetime import date, datetime
+from typing import Optional
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
 from betterave_backend.extensions import db
 from betterave_backend.app.decorators import with_instance
-from betterave_backend.app.models import Lesson, ClassGroup, Class, User
+from betterave_backend.app.models import Lesson, ClassGroup, Class, User, group_enrollment
+from betterave_backend.app.operations.filters import apply_date_window
+from betterave_backend.app.operations.lesson_calendar_operations import (
+    refresh_calendar_lessons,
+    delete_calendar_lessons,
+)
+
+# fullcalendar_lesson_model reads the class group, its class and the teacher of every lesson.
+# Loading them in the same statement as the lessons avoids one lazy load per lesson and relationship.
+CALENDAR_LOADER_OPTIONS = (
+    joinedload(Lesson.class_group).joinedload(ClassGroup.class_ref),
+    joinedload(Lesson.teacher),
+)
 
 
 def add_lesson(
@@ -40,6 +54,8 @@ def add_lesson(
             teacher_id=teacher_id,
         )
         db.session.add(new_lesson)
+        db.session.flush()
+        refresh_calendar_lessons([new_lesson.lesson_id])
         db.session.commit()
         return new_lesson.lesson_id
     except SQLAlchemyError as e:
@@ -55,6 +71,7 @@ def update_lesson(lesson: Lesson, new_data: dict) -> bool:
         for key, value in new_data.items():
             if hasattr(lesson, key):
                 setattr(lesson, key, value)
+        refresh_calendar_lessons([lesson.lesson_id])
         db.session.commit()
         return True
     except SQLAlchemyError as e:
@@ -67,6 +84,7 @@ def update_lesson(lesson: Lesson, new_data: dict) -> bool:
 def delete_lesson(lesson: Lesson) -> bool:
     """Remove a lesson from the database."""
     try:
+        delete_calendar_lessons([lesson.lesson_id])
         db.session.delete(lesson)
         db.session.commit()
         return True
@@ -78,78 +96,95 @@ def delete_lesson(lesson: Lesson) -> bool:
 
 def get_lesson_by_id(lesson_id: int) -> Lesson:
     """Get a lesson by its ID."""
-    return db.session.get(Lesson, lesson_id)
+    return db.session.get(Lesson, lesson_id, options=CALENDAR_LOADER_OPTIONS)
 
 
-def get_all_lessons() -> list[Lesson]:
-    """Return all lessons in the database."""
-    return Lesson.query.all()
+def get_all_lessons(start: Optional[date] = None, end: Optional[date] = None) -> list[Lesson]:
+    """Return all lessons in the database, optionally restricted to the [start, end) window."""
+    query = apply_date_window(Lesson.query.options(*CALENDAR_LOADER_OPTIONS), Lesson.date, start, end)
+    return query.order_by(Lesson.date, Lesson.start_time).all()
 
 
 def get_all_future_lessons(sort: bool = True) -> list[Lesson]:
     """Return all lessons in the database."""
+    query = Lesson.query.options(*CALENDAR_LOADER_OPTIONS).filter(Lesson.date >= datetime.now().date())
     if sort:
-        return sorted(Lesson.query.filter(Lesson.date >= datetime.now().date()).all())
-    return Lesson.query.filter(Lesson.date >= datetime.now().date()).all()
+        query = query.order_by(Lesson.date, Lesson.start_time)
+    return query.all()
 
 
 @with_instance(Class)
 def get_lessons_by_class(class_: Class) -> list[Lesson]:
     """Get all lessons for a particular class."""
-    return Lesson.query.join(ClassGroup).filter(ClassGroup.class_id == class_.class_id).all()
+    return (
+        Lesson.query.options(*CALENDAR_LOADER_OPTIONS)
+        .join(ClassGroup)
+        .filter(ClassGroup.class_id == class_.class_id)
+        .all()
+    )
 
 
-@with_instance(User)
-def get_student_lessons(user: User, limit: int = None, sort: bool = True) -> list[Lesson]:
-    """Get all lessons associated with a student through class groups."""
-    # Collect lessons from all groups where the student is enrolled
-    lessons = []
-    for group in user.groups:
-        all_lessons = group.lessons
-        lessons.extend(all_lessons)
+def _student_lessons_query(user: User, sort: bool = True):
+    """Build the query selecting the lessons of every group the student is enrolled in."""
+    query = (
+        Lesson.query.options(*CALENDAR_LOADER_OPTIONS)
+        .join(group_enrollment, group_enrollment.c.group_id == Lesson.group_id)
+        .filter(group_enrollment.c.student_id == user.user_id)
+    )
+    if sort:
+        query = query.order_by(Lesson.date, Lesson.start_time)
+    return query
+
 
+@with_instance(User)
+def get_student_lessons(
+    user: User,
+    limit: int = None,
+    sort: bool = True,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> list[Lesson]:
+    """Get all lessons associated with a student through class groups, optionally in the [start, end) window."""
+    query = apply_date_window(_student_lessons_query(user, sort), Lesson.date, start, end)
     if limit is not None:
-        return sorted(lessons)[:limit] if sort else lessons[:limit]
-    else:
-        return sorted(lessons) if sort else lessons
+        query = query.limit(limit)
+    return query.all()
 
 
 @with_instance(User)
 def get_student_future_lessons(user: User, limit: int = None, sort: bool = True) -> list[Lesson]:
     """Get future lessons for a student through class groups."""
-    # Retrieve all lessons for the student from their groups
-    future_lessons = []
-    date = datetime.now().date()
-    for group in user.groups:
-        all_lesson = group.lessons
-        group_lessons = [lesson for lesson in all_lesson if lesson.date >= date]
-        future_lessons.extend(group_lessons)
-
+    query = _student_lessons_query(user, sort).filter(Lesson.date >= datetime.now().date())
     if limit is not None:
-        return sorted(future_lessons)[:limit] if sort else future_lessons[:limit]
-    else:
-        return sorted(future_lessons) if sort else future_lessons
+        query = query.limit(limit)
+    return query.all()
 
 
 @with_instance(User)
-def get_teacher_lessons(teacher: User, limit: int = None, sort: bool = True) -> list[Lesson]:
-    """Get all lessons associated with a teacher."""
+def get_teacher_lessons(
+    teacher: User,
+    limit: int = None,
+    sort: bool = True,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> list[Lesson]:
+    """Get all lessons associated with a teacher, optionally in the [start, end) window."""
     # The lessons_taught relationship gives us direct access to the lessons
-
-    lessons = teacher.lessons_taught.limit(limit) if limit is not None else teacher.lessons_taught
-    lessons = lessons.all()
-
-    return sorted(lessons) if sort else lessons
+    query = apply_date_window(teacher.lessons_taught.options(*CALENDAR_LOADER_OPTIONS), Lesson.date, start, end)
+    if sort:
+        query = query.order_by(Lesson.date, Lesson.start_time)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
 
 
 @with_instance(User)
 def get_teacher_future_lessons(teacher: User, limit: int = None, sort: bool = True) -> list[Lesson]:
     """Get future lessons for a teacher."""
     # Using the lessons_taught relationship to filter future lessons
-    future_lessons = (
-        teacher.lessons_taught.filter(Lesson.date >= datetime.now().date()).limit(limit).all()
-        if limit is not None
-        else teacher.lessons_taught.filter(Lesson.date >= datetime.now().date()).all()
-    )
-
-    return sorted(future_lessons) if sort else future_lessons
+    query = teacher.lessons_taught.options(*CALENDAR_LOADER_OPTIONS).filter(Lesson.date >= datetime.now().date())
+    if sort:
+        query = query.order_by(Lesson.date, Lesson.start_time)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
@@ -0,0 +1,216 @@
+"""
+CRUD operations for lesson series and their per-occurrence overrides.
+
+Every change bumps the "lessons" data version of the students of the series' group and of its
+teacher, before and after the change (see lesson_calendar_operations.bump_calendar_versions).
+"""
+
+from datetime import date, time
+from typing import Any, Optional, Union
+from sqlalchemy.exc import SQLAlchemyError
+from betterave_backend.extensions import db
+from betterave_backend.app.decorators import with_instance
+from betterave_backend.app.models import LessonSeries, LessonSeriesOverride
+from betterave_backend.app.recurrence import (
+    format_weekdays,
+    is_occurrence,
+    parse_date,
+    parse_time,
+    parse_weekdays,
+    weekly_occurrences,
+)
+from betterave_backend.app.operations.lesson_calendar_operations import bump_calendar_versions
+
+
+def _bump_series_versions(series: LessonSeries) -> None:
+    """Bump the lessons version of the users seeing the series in their calendar."""
+    bump_calendar_versions({series.group_id}, {series.teacher_id} if series.teacher_id else set())
+
+
+def add_lesson_series(
+    group_id: int,
+    start_date: Union[str, date],
+    until_date: Union[str, date],
+    start_time: Union[str, time],
+    end_time: Union[str, time],
+    weekdays: Optional[str] = None,
+    interval: int = 1,
+    homework: Optional[str] = None,
+    room: Optional[str] = None,
+    teacher_id: Optional[int] = None,
+) -> int:
+    """
+    Add a weekly lesson series to the database.
+
+    Args:
+        group_id (int): The ID of the class group.
+        start_date, until_date: The first and last possible dates of the series (YYYY-MM-DD), both included.
+        start_time, end_time: The time span of each occurrence (HH:MM).
+        weekdays (str, optional): The days of the week, e.g. "MO,WE". Defaults to the weekday of start_date.
+        interval (int, optional): The number of weeks between two occurrences. Defaults to 1.
+
+    Returns:
+        int: The ID of the new series, or -1 if an error occurs.
+    """
+    try:
+        start_date, until_date = parse_date(start_date), parse_date(until_date)
+        start_time, end_time = parse_time(start_time), parse_time(end_time)
+        if until_date < start_date or interval < 1:
+            raise ValueError("A series must end after it starts and have a positive interval")
+        # Normalize the weekdays, raising on invalid ones
+        weekdays = format_weekdays(parse_weekdays(weekdays, start_date))
+    except ValueError as e:
+        print(f"Invalid lesson series: {str(e)}")
+        return -1
+
+    try:
+        series = LessonSeries(
+            group_id=group_id,
+            start_date=start_date,
+            until_date=until_date,
+            interval=interval,
+            weekdays=weekdays,
+            start_time=start_time,
+            end_time=end_time,
+            homework=homework,
+            room=room,
+            teacher_id=teacher_id,
+        )
+        db.session.add(series)
+        db.session.flush()
+        _bump_series_versions(series)
+        db.session.commit()
+        return series.series_id
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"Error adding lesson series: {str(e)}")
+        return -1
+
+
+@with_instance(LessonSeries)
+def update_lesson_series(series: LessonSeries, new_data: dict[str, Any]) -> bool:
+    """
+    Modify a lesson series. Changing its recurrence keeps the overrides of the dates still in the series.
+
+    Returns:
+        bool: True if the series was successfully modified, False otherwise.
+    """
+    try:
+        _bump_series_versions(series)
+        for key, value in new_data.items():
+            if key in ("start_date", "until_date"):
+                value = parse_date(value)
+            elif key in ("start_time", "end_time"):
+                value = parse_time(value)
+            if hasattr(series, key) and key != "series_id":
+                setattr(series, key, value)
+        series.weekdays = format_weekdays(parse_weekdays(series.weekdays, series.start_date))
+        if series.until_date < series.start_date or series.interval < 1:
+            raise ValueError("A series must end after it starts and have a positive interval")
+
+        # Drop the overrides of occurrences which no longer exist
+        dates = set(weekly_occurrences(series.start_date, series.until_date, series.interval, series.weekday_numbers))
+        for override in list(series.overrides):
+            if override.occurrence_date not in dates:
+                series.overrides.remove(override)
+
+        db.session.flush()
+        _bump_series_versions(series)
+        db.session.commit()
+        return True
+    except (SQLAlchemyError, ValueError) as e:
+        db.session.rollback()
+        print(f"Error modifying lesson series: {str(e)}")
+        return False
+
+
+@with_instance(LessonSeries)
+def delete_lesson_series(series: LessonSeries) -> bool:
+    """Remove a lesson series and its overrides from the database."""
+    try:
+        _bump_series_versions(series)
+        db.session.delete(series)
+        db.session.commit()
+        return True
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"Error deleting lesson series: {str(e)}")
+        return False
+
+
+def get_lesson_series_by_id(series_id: int) -> LessonSeries:
+    """Get a lesson series by its ID."""
+    return db.session.get(LessonSeries, series_id)
+
+
+def get_all_lesson_series(group_id: Optional[int] = None) -> list[LessonSeries]:
+    """Return all lesson series, optionally only those of a class group."""
+    query = LessonSeries.query
+    if group_id is not None:
+        query = query.filter_by(group_id=group_id)
+    return query.order_by(LessonSeries.start_date, LessonSeries.start_time).all()
+
+
+@with_instance(LessonSeries)
+def override_occurrence(
+    series: LessonSeries, occurrence_date: Union[str, date], changes: Optional[dict[str, Any]] = None
+) -> bool:
+    """
+    Modify one occurrence of a series: move it (date, start_time, end_time), or change its room or homework.
+
+    Calling it again for the same occurrence updates the same override. A cancelled occurrence is restored.
+
+    Returns:
+        bool: True if the occurrence was modified, False if it does not exist or an error occurs.
+    """
+    changes = changes or {}
+    try:
+        occurrence_date = parse_date(occurrence_date)
+        if not is_occurrence(series, occurrence_date):
+            return False
+        override = db.session.get(LessonSeriesOverride, (series.series_id, occurrence_date))
+        if override is None:
+            override = LessonSeriesOverride(series_id=series.series_id, occurrence_date=occurrence_date)
+            db.session.add(override)
+        override.cancelled = False
+        for key in ("date", "start_time", "end_time", "room", "homework"):
+            if key in changes:
+                value = changes[key]
+                if key == "date" and value is not None:
+                    value = parse_date(value)
+                elif key in ("start_time", "end_time") and value is not None:
+                    value = parse_time(value)
+                setattr(override, key, value)
+        _bump_series_versions(series)
+        db.session.commit()
+        return True
+    except (SQLAlchemyError, ValueError) as e:
+        db.session.rollback()
+        print(f"Error overriding occurrence: {str(e)}")
+        return False
+
+
+@with_instance(LessonSeries)
+def cancel_occurrence(series: LessonSeries, occurrence_date: Union[str, date]) -> bool:
+    """
+    Cancel one occurrence of a series, which is then no longer displayed (an exception of the recurrence).
+
+    Returns:
+        bool: True if the occurrence was cancelled, False if it does not exist or an error occurs.
+    """
+    try:
+        occurrence_date = parse_date(occurrence_date)
+        if not is_occurrence(series, occurrence_date):
+            return False
+        override = db.session.get(LessonSeriesOverride, (series.series_id, occurrence_date))
+        if override is None:
+            override = LessonSeriesOverride(series_id=series.series_id, occurrence_date=occurrence_date)
+            db.session.add(override)
+        override.cancelled = True
+        _bump_series_versions(series)
+        db.session.commit()
+        return True
+    except (SQLAlchemyError, ValueError) as e:
+        db.session.rollback()
+        print(f"Error cancelling occurrence: {str(e)}")
+        return False
@@ -1,19 +1,114 @@
-from betterave_backend.extensions import db
+import time
+from datetime import datetime
+from typing import Any, Iterator, Optional
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import contains_eager
+from betterave_backend.extensions import db, chat_broker
 from betterave_backend.app.decorators import with_instance
 from betterave_backend.app.models import Message, Class
 from betterave_backend.app.operations.class_operations import get_class_by_id
 
 
-def get_messages_by_group_id(group_id: int) -> list[Message]:
-    """Retrieve messages for a specific class."""
-    return Message.query.filter_by(group_id=group_id).all()  # type: ignore
+def _cursor_timestamp(group_id: int, message_id: int) -> datetime:
+    """Return the timestamp of the message used as a page cursor, which must be a message of the group."""
+    timestamp = db.session.execute(
+        select(Message.timestamp).where(Message.message_id == message_id, Message.group_id == group_id)
+    ).scalar()
+    if timestamp is None:
+        raise ValueError(f"Message {message_id} is not a message of class group {group_id}")
+    return timestamp
+
+
+def _newer_than(group_id: int, message_id: int) -> Any:
+    """Return the condition selecting the messages posted after a message, in (timestamp, ID) order."""
+    timestamp = _cursor_timestamp(group_id, message_id)
+    return or_(Message.timestamp > timestamp, and_(Message.timestamp == timestamp, Message.message_id > message_id))
+
+
+def _older_than(group_id: int, message_id: int) -> Any:
+    """Return the condition selecting the messages posted before a message, in (timestamp, ID) order."""
+    timestamp = _cursor_timestamp(group_id, message_id)
+    return or_(Message.timestamp < timestamp, and_(Message.timestamp == timestamp, Message.message_id < message_id))
+
+
+def get_messages_by_group_id(
+    group_id: int, before: Optional[int] = None, after: Optional[int] = None, limit: Optional[int] = None
+) -> list[Message]:
+    """
+    Retrieve a page of the messages of a class group, newest first.
+
+    Args:
+        before (int, optional): Only return the messages posted before this message, to load older pages.
+        after (int, optional): Only return the messages posted after this message, to load the new messages.
+        limit (int, optional): The size of the page: the newest messages, or the oldest ones after `after`.
+
+    Pages are read from the index on (group_id, timestamp, message_id) from the cursor on, so their cost
+    does not depend on the number of messages of the group. The senders are joined in the same statement,
+    so that serializing the messages loads nothing more.
+
+    Raises:
+        ValueError: If a cursor is not a message of the group, e.g. a deleted one.
+    """
+    query = Message.query.join(Message.user).options(contains_eager(Message.user)).filter(Message.group_id == group_id)
+    if before is not None:
+        query = query.filter(_older_than(group_id, before))
+    if after is not None:
+        # The page right after the cursor, read in increasing order and returned newest first
+        query = query.filter(_newer_than(group_id, after)).order_by(Message.timestamp, Message.message_id)
+        return query.limit(limit).all()[::-1]
+    return query.order_by(Message.timestamp.desc(), Message.message_id.desc()).limit(limit).all()
+
+
+def get_messages_since(group_id: int, last_id: int, limit: Optional[int] = None) -> list[Message]:
+    """Retrieve the messages of a class group with an ID greater than last_id, in ID order, with their senders."""
+    query = (
+        Message.query.join(Message.user)
+        .options(contains_eager(Message.user))
+        .filter(Message.group_id == group_id, Message.message_id > last_id)
+        .order_by(Message.message_id)
+    )
+    return query.limit(limit).all()
+
+
+def get_last_message_id(group_id: int) -> int:
+    """Return the ID of the last message of a class group, 0 if it has none."""
+    return db.session.execute(select(func.max(Message.message_id)).where(Message.group_id == group_id)).scalar() or 0
+
+
+# Number of messages read at once by a chat stream catching up
+STREAM_BATCH_SIZE = 100
+
+
+def iter_new_messages(group_id: int, last_id: int) -> Iterator[list[dict[str, Any]]]:
+    """
+    Yield the messages of a class group posted after last_id as they arrive, as batches of dictionaries.
+
+    An empty batch is yielded when no message arrived for the keepalive interval of the chat broker, and the
+    iteration ends after its maximum duration. Each query is run in its own transaction, so that the next one
+    sees the messages committed in the meantime.
+    """
+    deadline = time.monotonic() + chat_broker.max_duration
+    last_sent = time.monotonic()
+    while time.monotonic() < deadline:
+        messages = [message.as_dict() for message in get_messages_since(group_id, last_id, STREAM_BATCH_SIZE)]
+        db.session.rollback()
+        if messages:
+            last_id = messages[-1]["message_id"]
+            last_sent = time.monotonic()
+            yield messages
+            continue
+        if time.monotonic() - last_sent >= chat_broker.keepalive:
+            last_sent = time.monotonic()
+            yield []
+        chat_broker.wait(group_id, last_id, deadline)
 
 
 def add_message_to_group(content: str, group_id: int, user_id: int) -> Message:
-    """Add a message to a specific class."""
+    """Add a message to a specific class, and notify the chat streams of the group."""
     msg = Message(content=content, group_id=group_id, user_id=user_id)
     db.session.add(msg)
     db.session.commit()
+    chat_broker.publish(group_id, msg.message_id)
     return msg
 
 
@@ -28,9 +123,11 @@ def delete_message(message: Message) -> bool:
 
 
 @with_instance(Class)
-def get_class_messages(class_: Class) -> list[Message]:
-    """Retrieve messages for a specific class."""
-    return get_messages_by_group_id(class_.main_group().group_id)
+def get_class_messages(
+    class_: Class, before: Optional[int] = None, after: Optional[int] = None, limit: Optional[int] = None
+) -> list[Message]:
+    """Retrieve a page of the messages of the main group of a class, newest first (see get_messages_by_group_id)."""
+    return get_messages_by_group_id(class_.main_group().group_id, before, after, limit)
 
 
 def add_class_message(content: str, class_id: int, user_id: int) -> Message:
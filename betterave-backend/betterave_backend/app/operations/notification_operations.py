@@ -1,38 +1,84 @@
 # type: ignore
-from typing import Optional
+from typing import Any, Iterable, Optional, Union
+from datetime import date
 from flask import request
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 from betterave_backend.extensions import db
-from betterave_backend.app.models import Notification, User, UserLevel
+from betterave_backend.app.models import (
+    AudienceKind,
+    Notification,
+    NotificationAudience,
+    NotificationReadCursor,
+    User,
+    UserLevel,
+    notification_reception,
+)
 from betterave_backend.app.decorators import is_valid_apikey, with_instance
+from betterave_backend.app.operations.filters import apply_date_window
+from betterave_backend.app.operations.audience_operations import (
+    add_audience_rule,
+    audience_member_ids,
+    audience_rules,
+    include_in_audience,
+    owners_attended_by,
+)
+from betterave_backend.app.operations.data_version_operations import (
+    GLOBAL_OWNER_ID,
+    NOTIFICATIONS_SCOPE,
+    bump_data_versions,
+)
+
+
+def bump_notification_versions(user_ids: Iterable[int] = ()) -> None:
+    """
+    Bump the notifications version of the given users, or the global version if no user is given.
+
+    As for events, changes to a notification only bump the global version, which is part of every user's
+    notifications ETag. The users whose own view changed (recipient added, subscription, read state) are
+    bumped individually.
+    """
+    bump_data_versions(NOTIFICATIONS_SCOPE, set(user_ids) or {GLOBAL_OWNER_ID})
+
+
+def get_notification_recipient_ids(notification_id: int) -> list[int]:
+    """Return the IDs of the users receiving a notification, according to its audience rules and overrides."""
+    return audience_member_ids(
+        notification_id,
+        NotificationAudience.notification_id,
+        notification_reception.c.notification_id,
+        notification_reception.c.received,
+    )
 
 
 def add_notification(
     title: str,
     content: str,
     sent_by_user_id: int,
-    recipient_type: [str, UserLevel],
+    recipient_type: Union[str, UserLevel],
 ) -> int:
-    """Add a notification to the database."""
+    """
+    Add a notification to the database, addressed by a single audience rule whatever the number of recipients.
+
+    recipient_type is "Subscribers" (of the sender), "All users" or a UserLevel.
+    """
     try:
-        if recipient_type == "Subscribers":
-            recipient_users = User.query.get(sent_by_user_id).subscribers
-        elif recipient_type == "All users":
-            recipient_users = User.query.all()
-        elif isinstance(recipient_type, UserLevel):
-            recipient_users = User.query.filter_by(level=recipient_type).all()
-        else:
-            raise ValueError("Invalid recipient_type")
+        audiences = [NotificationAudience(**rule) for rule in audience_rules(sent_by_user_id, recipient_type)]
+    except ValueError as e:
+        print(f"Invalid notification recipients: {str(e)}")
+        return -1
 
+    try:
         new_notification = Notification(
             title=title,
             content=content,
             sent_by_user_id=sent_by_user_id,
-            recipient_type=recipient_type,
-            recipient_users=recipient_users,
+            recipient_type=recipient_type.value if isinstance(recipient_type, UserLevel) else recipient_type,
+            audiences=audiences,
         )
 
         db.session.add(new_notification)
+        bump_notification_versions()
         db.session.commit()
 
         return new_notification.notification_id
@@ -50,6 +96,7 @@ def update_notification(notification_id: int, new_data: dict) -> bool:
             for key, value in new_data.items():
                 if hasattr(notification, key):
                     setattr(notification, key, value)
+            bump_notification_versions()
             db.session.commit()
             return True
         return False
@@ -64,6 +111,10 @@ def delete_notification(notification_id: int) -> bool:
     try:
         notification = get_notification_by_id(notification_id)
         if notification:
+            bump_notification_versions()
+            db.session.execute(
+                notification_reception.delete().where(notification_reception.c.notification_id == notification_id)
+            )
             db.session.delete(notification)
             db.session.commit()
             return True
@@ -79,9 +130,10 @@ def get_notification_by_id(notification_id: int) -> Notification:
     return db.session.get(Notification, notification_id)
 
 
-def get_all_notifications() -> list[Notification]:
-    """Return all notifications in the database."""
-    return Notification.query.all()
+def get_all_notifications(start: Optional[date] = None, end: Optional[date] = None) -> list[Notification]:
+    """Return all notifications in the database, optionally sent in the [start, end) window."""
+    query = apply_date_window(Notification.query, Notification.created_at, start, end)
+    return query.order_by(Notification.notification_id).all()
 
 
 def get_title_notification_by_id(notification_id: int) -> Notification:
@@ -91,38 +143,112 @@ def get_title_notification_by_id(notification_id: int) -> Notification:
 
 
 @with_instance(User)
-def get_user_notifications(user: User, limit: Optional[int] = None) -> list[Notification]:
-    """Get all events a particular user is attending."""
+def get_user_notifications(
+    user: User,
+    limit: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> list[Notification]:
+    """
+    Get all notifications received by a particular user, optionally sent in the [start, end) window.
+
+    The notifications are computed in one query from the audience rules, the user's overrides and read cursor.
+    Each notification gets a `read` attribute.
+    """
+    read = Notification.notification_id <= func.coalesce(_read_cursor_query(user), 0)
+    query = (
+        select(Notification, read.label("read"))
+        .where(
+            owners_attended_by(
+                user,
+                Notification.notification_id,
+                NotificationAudience.notification_id,
+                notification_reception.c.notification_id,
+                notification_reception.c.received,
+            )
+        )
+        .order_by(Notification.notification_id)
+    )
+    query = apply_date_window(query, Notification.created_at, start, end)
     if limit is not None:
-        notification = user.received_notifications[:limit]
-    else:
-        notification = user.received_notifications
+        query = query.limit(limit)
+    notifications = []
+    for notification, is_read in db.session.execute(query):
+        notification.read = bool(is_read)
+        notifications.append(notification)
+    return notifications
+
+
+def _read_cursor_query(user: User) -> Any:
+    """Return the scalar subquery of the last notification read by a user."""
+    return (
+        select(NotificationReadCursor.last_read_id)
+        .where(NotificationReadCursor.user_id == user.user_id)
+        .scalar_subquery()
+    )
+
+
+@with_instance(User)
+def mark_notifications_read(user: User, last_read_id: Optional[int] = None) -> bool:
+    """
+    Mark the notifications of a user as read up to last_read_id included, or up to the latest one.
+
+    The read cursor never moves backwards.
 
-    return notification
+    Returns:
+        bool: True if the read state was saved, False if an error occurs.
+    """
+    try:
+        if last_read_id is None:
+            last_read_id = db.session.execute(select(func.max(Notification.notification_id))).scalar() or 0
+        cursor = db.session.get(NotificationReadCursor, user.user_id)
+        if cursor is None:
+            db.session.add(NotificationReadCursor(user_id=user.user_id, last_read_id=last_read_id))
+        elif last_read_id > cursor.last_read_id:
+            cursor.last_read_id = last_read_id
+        bump_notification_versions([user.user_id])
+        db.session.commit()
+        return True
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"Error marking notifications as read: {str(e)}")
+        return False
 
 
-def add_recipient_to_notification(notification_id: int, user_ids=None, user_level=None):
-    """Link new recipients to a notification. If no users are specified, link all users."""
-    notification = Notification.query.get(notification_id)
+def add_recipient_to_notification(notification_id: int, user_ids=None, user_level=None) -> bool:
+    """
+    Link new recipients to a notification. If no users are specified, link all users.
+
+    Specific users are added individually, while a level or all users are added as one more audience rule.
+    Either way, a constant number of statements is executed whatever the number of users, no User object is
+    loaded, and adding the same recipients again changes nothing.
+    """
+    notification = get_notification_by_id(notification_id)
     if not notification:
         return False
 
-    if user_ids:
-        # Link specific users (recipients) to the notification
-        users = User.query.filter(User.user_id.in_(user_ids)).all()
-        notification.recipient_users.extend(users)
-
-    elif user_level:
-        # Link all users of a certain level to the notification
-        users = User.query.filter_by(level=user_level).all()
-        notification.recipient_users.extend(users)
-    else:
-        # If no specific users or level provided, assume linking all users
-        users = User.query.all()
-        notification.recipient_users.extend(users)
-
-    db.session.commit()
-    return True
+    try:
+        if user_ids:
+            # Link specific users (recipients) to the notification
+            include_in_audience(
+                notification_reception.c.notification_id, notification_reception.c.received, notification_id, user_ids
+            )
+            bump_notification_versions(user_ids)
+        else:
+            if user_level:
+                # Link all users of a certain level to the notification
+                rule = {"kind": AudienceKind.LEVEL, "level": UserLevel(user_level)}
+            else:
+                # If no specific users or level provided, assume linking all users
+                rule = {"kind": AudienceKind.ALL}
+            add_audience_rule(NotificationAudience.notification_id, notification_id, rule)
+            bump_notification_versions()
+        db.session.commit()
+        return True
+    except (SQLAlchemyError, ValueError) as e:
+        db.session.rollback()
+        print(f"Error adding recipients to notification: {str(e)}")
+        return False
 
 
 def can_create_notification(user: User) -> bool:
@@ -0,0 +1,175 @@
+"""
+Full-text search over the content of the class messages and homework, within the groups of a user.
+
+The matches are read from the full-text indexes of the message and homework tables (see models/search_index.py):
+FTS5 tables ranked with bm25 on SQLite, GIN-indexed tsvector columns ranked with ts_rank on PostgreSQL.
+Both kinds of results are merged by relevance and paginated in the same statement, then their details are
+loaded for the page only. On other databases the content is scanned with LIKE and the results are not ranked.
+
+The words of the query must all appear in a result, the last one possibly as a prefix (as typed).
+"""
+
+import re
+from datetime import datetime, time
+from typing import Any, Optional
+from sqlalchemy import Select, column, false, func, literal, literal_column, select, table, union, union_all
+from betterave_backend.extensions import db
+from betterave_backend.app.decorators import with_instance
+from betterave_backend.app.models import (
+    CalendarLesson,
+    Class,
+    ClassGroup,
+    Homework,
+    LessonSeries,
+    Message,
+    User,
+    UserClassGroup,
+    group_enrollment,
+)
+from betterave_backend.app.models.search_index import fts_table_name
+
+# The models searched, by kind of result
+SEARCHED_MODELS = {"message": Message, "homework": Homework}
+# Words of a query beyond this number are ignored
+MAX_QUERY_TERMS = 10
+
+
+def query_terms(query: str) -> list[str]:
+    """Split a search query into its words, ignoring the punctuation and the operators of the search syntaxes."""
+    return re.findall(r"\w+", query.lower())[:MAX_QUERY_TERMS]
+
+
+def searchable_group_ids(user: User) -> Optional[Select]:
+    """
+    Return a query of the IDs of the groups whose content a user can search, None for all of them (admins).
+
+    Students search the main groups of their classes, their primary and secondary groups and the groups they are
+    enrolled in; teachers the groups of their classes and the groups they teach lessons to.
+    """
+    if user.is_admin:
+        return None
+    if user.is_student:
+        enrollments = select(UserClassGroup).where(UserClassGroup.user_id == user.user_id).subquery()
+        return union(
+            select(ClassGroup.group_id)
+            .join(enrollments, enrollments.c.class_id == ClassGroup.class_id)
+            .where(ClassGroup.is_main_group),
+            select(enrollments.c.primary_class_group_id),
+            select(enrollments.c.secondary_class_group_id),
+            select(group_enrollment.c.group_id).where(group_enrollment.c.student_id == user.user_id),
+        )
+    if user.is_teacher:
+        return union(
+            select(ClassGroup.group_id).join(Class).where(Class.default_teacher_id == user.user_id),
+            select(CalendarLesson.group_id).where(CalendarLesson.teacher_id == user.user_id),
+            select(LessonSeries.group_id).where(LessonSeries.teacher_id == user.user_id),
+        )
+    return select(ClassGroup.group_id).where(false())
+
+
+def _matches(kind: str, terms: list[str], dialect: str) -> Select:
+    """Return the query of the (kind, item_id, group_id, rank) of the matching items of a kind, best rank first."""
+    model = SEARCHED_MODELS[kind]
+    key = model.__mapper__.primary_key[0]
+    columns = [literal(kind, db.String).label("kind"), key.label("item_id"), model.group_id.label("group_id")]
+    if dialect == "sqlite":
+        fts = table(fts_table_name(model.__tablename__), column("rowid"))
+        match = " ".join(f'"{term}"' for term in terms) + "*"
+        # bm25 is negative, the most relevant matches having the lowest values
+        rank = func.bm25(literal_column(fts.name))
+        return (
+            select(*columns, rank.label("rank"))
+            .select_from(fts)
+            .join(model, key == fts.c.rowid)
+            .where(literal_column(fts.name).op("MATCH")(match))
+        )
+    if dialect == "postgresql":
+        vector = literal_column(f"{model.__tablename__}.search_vector")
+        tsquery = func.to_tsquery("simple", " & ".join(terms) + ":*")
+        return select(*columns, (-func.ts_rank(vector, tsquery)).label("rank")).where(vector.op("@@")(tsquery))
+    conditions = [model.content.ilike(f"%{term}%") for term in terms]
+    return select(*columns, literal(0.0).label("rank")).where(*conditions)
+
+
+def _details(kind: str, item_ids: list[int]) -> dict[int, dict[str, Any]]:
+    """Return the class, content, date and author of the items of a kind, by ID."""
+    if not item_ids:
+        return {}
+    if kind == "message":
+        rows = db.session.execute(
+            select(
+                Message.message_id.label("item_id"),
+                ClassGroup.class_id,
+                Class.name.label("class_name"),
+                Message.content,
+                Message.timestamp.label("date"),
+                (User.name + " " + User.surname).label("author"),
+            )
+            .join(Message.group_ref)
+            .join(ClassGroup.class_ref)
+            .join(Message.user)
+            .where(Message.message_id.in_(item_ids))
+        )
+        return {row.item_id: row._asdict() for row in rows}
+    rows = db.session.execute(
+        select(
+            Homework.homework_id.label("item_id"),
+            ClassGroup.class_id,
+            Class.name.label("class_name"),
+            Homework.content,
+            Homework.due_date,
+            Homework.due_time,
+        )
+        .join(Homework.group_ref)
+        .join(ClassGroup.class_ref)
+        .where(Homework.homework_id.in_(item_ids))
+    )
+    return {
+        row.item_id: {
+            "item_id": row.item_id,
+            "class_id": row.class_id,
+            "class_name": row.class_name,
+            "content": row.content,
+            "date": datetime.combine(row.due_date, row.due_time or time.min),
+            "author": None,
+        }
+        for row in rows
+    }
+
+
+@with_instance(User)
+def search_class_content(user: User, query: str, limit: int = 20, offset: int = 0) -> list[dict[str, Any]]:
+    """
+    Search the messages and homework of the groups of a user, most relevant first.
+
+    Args:
+        query (str): The words to search for.
+        limit (int): The size of the page of results.
+        offset (int): The number of results to skip, for the next pages.
+
+    Returns:
+        list: A page of results, dictionaries with the kind ("message" or "homework"), item_id, group_id,
+        class_id, class_name, content, date (sending or due date), author (of a message) and score
+        (higher is more relevant) of each result.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+    dialect = db.engine.dialect.name
+    groups = searchable_group_ids(user)
+    matches = []
+    for kind, model in SEARCHED_MODELS.items():
+        kind_matches = _matches(kind, terms, dialect)
+        if groups is not None:
+            kind_matches = kind_matches.where(model.group_id.in_(groups))
+        matches.append(kind_matches)
+    results = union_all(*matches).subquery()
+    page = db.session.execute(
+        select(results).order_by(results.c.rank, results.c.kind, results.c.item_id.desc()).limit(limit).offset(offset)
+    ).all()
+
+    details = {kind: _details(kind, [row.item_id for row in page if row.kind == kind]) for kind in SEARCHED_MODELS}
+    return [
+        {**details[row.kind][row.item_id], "kind": row.kind, "group_id": row.group_id, "score": -row.rank or 0.0}
+        for row in page
+    ]
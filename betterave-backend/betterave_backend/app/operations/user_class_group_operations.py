@@ -7,6 +7,7 @@ from betterave_backend.app.operations.class_group_operations import (
     enroll_student_in_group,
     unenroll_student_from_group,
 )
+from betterave_backend.app.operations.data_version_operations import LESSONS_SCOPE, bump_data_versions
 
 
 def enroll_user_in_class(user_id: int, class_id: int) -> tuple[str, Optional[int]]:
@@ -141,6 +142,7 @@ def update_user_class_group(user_class_group: UserClassGroup, new_data: dict[str
             new_group = ClassGroup.query.get(new_secondary_group_id)
             if new_group:
                 new_group.students.append(user_class_group.user)
+            bump_data_versions(LESSONS_SCOPE, [user_class_group.user_id])
 
         else:
             # Update other modifiable attributes
@@ -4,15 +4,30 @@ This module contains functions for performing operations on users in the databas
 It excludes operations related specifically to students, which are defined in student_operations.py.
 """
 
+import secrets
 from typing import Optional, Any
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import and_
-from betterave_backend.extensions import db, bcrypt
+from sqlalchemy import and_, delete, select, update
+from betterave_backend.extensions import db, bcrypt, password_hasher
 from betterave_backend.app.decorators import with_instance
-from betterave_backend.app.models import UserLevel, UserType, User
-from betterave_backend.app.operations.event_operations import get_all_events
-from betterave_backend.app.operations.notification_operations import (
-    get_all_notifications,
+from betterave_backend.app.models import (
+    Grade,
+    UserLevel,
+    UserType,
+    User,
+    Job,
+    NotificationReadCursor,
+    event_attendance,
+    event_series_attendance,
+    notification_reception,
+)
+from betterave_backend.app.operations.event_operations import bump_event_versions
+from betterave_backend.app.operations.notification_operations import bump_notification_versions
+from betterave_backend.app.operations.data_version_operations import LESSONS_SCOPE, bump_data_versions
+from betterave_backend.app.operations.grade_operations import bump_grade_versions
+from betterave_backend.app.operations.lesson_calendar_operations import (
+    refresh_calendar_lessons,
+    bump_calendar_versions,
 )
 
 
@@ -42,13 +57,13 @@ def check_register_hash(hash: str, name: str, surname: str, key: str = "ENSAE202
 
 
 def hash_password(password: str) -> str:
-    """Hash a given password."""
-    return bcrypt.generate_password_hash(password).decode("utf-8")
+    """Hash a given password, in the password hashing pool (raises PasswordHasherBusy if it is saturated)."""
+    return password_hasher.generate_password_hash(password)
 
 
 def check_password(hashed_password: str, password: str) -> bool:
-    """Check if a given password matches a hashed password."""
-    return bcrypt.check_password_hash(hashed_password, password)
+    """Check if a given password matches a hashed password, in the password hashing pool."""
+    return password_hasher.check_password_hash(hashed_password, password)
 
 
 def authenticate_user(email: str, password: str) -> bool:
@@ -116,12 +131,7 @@ def add_user(
         db.session.add(new_user)
         db.session.commit()
 
-        # Update the user's attendance to events
-        update_event_attendance(new_user)
-
-        # Update the user's reception of notifications
-        update_notifications(new_user)
-
+        # Events and notifications need no update, their audience rules are evaluated when they are read
         return new_user.user_id
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -129,66 +139,9 @@ def add_user(
         return -1
 
 
-@with_instance(User)
-def update_event_attendance(user: User) -> None:
-    """Update the attendance of a user to the events of the database."""
-    # Loop through all events
-    for event in get_all_events():
-        # If user already has an attendance for this event
-        if event in user.attended_events:
-            if event.participant_type == "Subscribers" and event.association not in user.subscriptions:
-                user.attended_events.remove(event)
-
-            elif event.participant_type == "All users":
-                continue
-
-            if event.participant_type != user.level.value:
-                user.attended_events.remove(event)
-            continue
-
-        # If not, should the user be added to the event?
-        if event.participant_type == "Subscribers":
-            if event.association in user.subscriptions:
-                user.attended_events.append(event)
-
-        elif event.participant_type == "All users":
-            user.attended_events.append(event)
-
-        elif event.participant_type == user.level.value:
-            user.attended_events.append(event)
-
-    db.session.commit()
-
-
-@with_instance(User)
-def update_notifications(user: User) -> None:
-    """Update the reception of a user to the notifications of the database."""
-    # Loop through all notifications
-    for notif in get_all_notifications():
-        # If user already has an attendance for this event
-        if notif in user.attended_events:
-            if notif.recipient_type == "Subscribers" and notif.association not in user.subscriptions:
-                user.received_notifications.remove(notif)
-
-            elif notif.recipient_type == "All users":
-                continue
-
-            elif isinstance(notif.recipient_type, UserLevel):
-                user.received_notifications.remove(notif)
-            continue
-
-        # If not, should the user be added to the event?
-        if notif.recipient_type == "Subscribers":
-            if notif.association in user.subscriptions:
-                user.received_notifications.append(notif)
-
-        elif notif.recipient_type == "All users":
-            user.received_notifications.append(notif)
-
-        elif isinstance(notif.recipient_type, UserLevel):
-            user.received_notifications.append(notif)
-
-    db.session.commit()
+def _graded_class_ids(user: User) -> set[int]:
+    """Return the IDs of the classes in which a student has a grade."""
+    return set(db.session.execute(select(Grade.class_id).where(Grade.student_id == user.user_id)).scalars())
 
 
 @with_instance(User)
@@ -218,10 +171,19 @@ def update_user(user: User, new_data: dict[str, Any]) -> bool:
                 db.session.delete(ucg)
             user.class_groups = []
             user.groups = []
+            bump_data_versions(LESSONS_SCOPE, [user.user_id])
+            # The events attended and the notifications received for the user's level change with it
+            bump_event_versions([user.user_id])
+            bump_notification_versions([user.user_id])
+            # The grade statistics are broken down by level
+            bump_grade_versions(_graded_class_ids(user))
+        if "name" in new_data or "surname" in new_data:
+            # The teacher's name is displayed on each of their lessons
+            refresh_calendar_lessons(teacher_id=user.user_id)
+            # The association's name is displayed on each of its events
+            if user.is_asso:
+                bump_event_versions()
         db.session.commit()
-
-        # Update the user's attendance to events
-        update_event_attendance(user)
         return True
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -245,7 +207,24 @@ def delete_user(user: User) -> bool:
         for ucg in user.class_groups:
             db.session.delete(ucg)
 
+        # Drop the user's audience overrides and read state, the audience rules no longer match a deleted user
+        db.session.execute(event_attendance.delete().where(event_attendance.c.user_id == user.user_id))
+        db.session.execute(event_series_attendance.delete().where(event_series_attendance.c.user_id == user.user_id))
+        db.session.execute(notification_reception.delete().where(notification_reception.c.user_id == user.user_id))
+        db.session.execute(delete(NotificationReadCursor).where(NotificationReadCursor.user_id == user.user_id))
+        db.session.execute(update(Job).where(Job.user_id == user.user_id).values(user_id=None))
+        # The grade statistics only include the grades of existing students
+        bump_grade_versions(_graded_class_ids(user))
+
+        # The lessons taught lose their teacher, their calendar rows are refreshed once it is gone
+        taught_lesson_ids = [lesson.lesson_id for lesson in user.lessons_taught]
+        taught_series_group_ids = {series.group_id for series in user.lesson_series_taught}
         db.session.delete(user)
+        db.session.flush()
+        if taught_lesson_ids:
+            refresh_calendar_lessons(lesson_ids=taught_lesson_ids)
+        if taught_series_group_ids:
+            bump_calendar_versions(taught_series_group_ids, set())
         db.session.commit()
         return True
     except SQLAlchemyError as e:
@@ -289,6 +268,26 @@ def set_new_token(user: User, reset_token: str) -> User:
     db.session.commit()
 
 
+@with_instance(User)
+def create_calendar_token(user: User) -> str:
+    """
+    Create the token of the calendar feed URL of a user, revoking the previous one.
+
+    Only the hash of the token is stored, so the token is returned once, to build the URL given to the user.
+    """
+    token = secrets.token_urlsafe(32)
+    user.calendar_token_hash = User.hash_calendar_token(token)
+    db.session.commit()
+    return token
+
+
+@with_instance(User)
+def revoke_calendar_token(user: User) -> None:
+    """Revoke the token of the calendar feed URL of a user, whose feed is then no longer served."""
+    user.calendar_token_hash = None
+    db.session.commit()
+
+
 def update_user_password(email: str, new_password: str):
     """Update user's password."""
     user = User.query.filter_by(email=email).first()
@@ -0,0 +1,146 @@
+"""
+Weekly recurrence rules shared by lesson and event series.
+
+A rule is a subset of the iCalendar RRULE: FREQ=WEEKLY with an INTERVAL (every n weeks), a BYDAY
+list of weekdays and an inclusive UNTIL date, starting from the first matching day on or after the
+start date. Occurrences are generated lazily and in chronological order, so that only the requested
+window is ever expanded.
+"""
+
+import heapq
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Iterable, Iterator, Optional, TypeVar, Union
+
+T = TypeVar("T")
+
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+
+def parse_date(value: Union[str, date]) -> date:
+    """Parse a date given as YYYY-MM-DD."""
+    return datetime.strptime(value, "%Y-%m-%d").date() if isinstance(value, str) else value
+
+
+def parse_time(value: Union[str, time]) -> time:
+    """Parse a time given as HH:MM."""
+    return datetime.strptime(value, "%H:%M").time() if isinstance(value, str) else value
+
+
+def parse_weekdays(value: Optional[str], start_date: date) -> list[int]:
+    """
+    Parse a BYDAY list such as "MO,WE" into sorted weekday numbers (Monday is 0).
+
+    Without a value, the series takes place on the weekday of its start date.
+    """
+    if not value:
+        return [start_date.weekday()]
+    try:
+        return sorted({WEEKDAYS.index(day.strip().upper()) for day in value.split(",")})
+    except ValueError:
+        raise ValueError(f"Invalid weekdays: {value}, expected a comma separated list of {', '.join(WEEKDAYS)}")
+
+
+def format_weekdays(weekdays: Iterable[int]) -> str:
+    """Format weekday numbers as a BYDAY list."""
+    return ",".join(WEEKDAYS[day] for day in sorted(set(weekdays)))
+
+
+def to_rrule(interval: int, weekdays: Iterable[int], until: date) -> str:
+    """Return the iCalendar RRULE of a weekly rule."""
+    return f"FREQ=WEEKLY;INTERVAL={interval};BYDAY={format_weekdays(weekdays)};UNTIL={until.strftime('%Y%m%d')}"
+
+
+def weekly_occurrences(
+    start_date: date,
+    until: date,
+    interval: int = 1,
+    weekdays: Optional[list[int]] = None,
+    window_start: Optional[date] = None,
+    window_end: Optional[date] = None,
+) -> Iterator[date]:
+    """
+    Yield the dates of a weekly rule in the [window_start, window_end) window, in chronological order.
+
+    Weeks before the window are skipped arithmetically rather than enumerated.
+    """
+    weekdays = sorted(weekdays) if weekdays else [start_date.weekday()]
+    first = max(start_date, window_start) if window_start else start_date
+    last = min(until, window_end - timedelta(days=1)) if window_end else until
+
+    # Monday of the first week of the series, then of the first week of the window with an occurrence
+    monday = start_date - timedelta(days=start_date.weekday())
+    weeks_to_skip = max(0, (first - monday).days // 7)
+    monday += timedelta(weeks=weeks_to_skip - weeks_to_skip % interval)
+
+    while monday <= last:
+        for weekday in weekdays:
+            day = monday + timedelta(days=weekday)
+            if day > last:
+                return
+            if day >= first:
+                yield day
+        monday += timedelta(weeks=interval)
+
+
+def is_occurrence(series: Any, day: date) -> bool:
+    """Check that the rule of a series (start_date, until_date, interval, weekday_numbers) generates the date."""
+    return any(
+        weekly_occurrences(
+            series.start_date, series.until_date, series.interval, series.weekday_numbers, day, day + timedelta(days=1)
+        )
+    )
+
+
+def infer_weekly_rule(dates: Iterable[date]) -> tuple[date, date, list[date]]:
+    """
+    Describe a set of dates falling on the same weekday as a weekly rule with exceptions.
+
+    Returns:
+        tuple: The start date, the until date and the dates of the rule missing from the given dates.
+    """
+    dates = sorted(set(dates))
+    start_date, until = dates[0], dates[-1]
+    present = set(dates)
+    missing = [day for day in weekly_occurrences(start_date, until) if day not in present]
+    return start_date, until, missing
+
+
+def expand_series(
+    series: Any,
+    overrides: dict[date, Any],
+    build: Callable[[date, Optional[Any]], T],
+    key: Callable[[T], Any],
+    window_start: Optional[date] = None,
+    window_end: Optional[date] = None,
+) -> Iterator[T]:
+    """
+    Yield the occurrences of a series in the [window_start, window_end) window, in the order given by `key`.
+
+    `series` has the start_date, until_date, interval and weekday_numbers of its rule. `overrides` maps the
+    dates generated by the rule to the override rows (with cancelled and date attributes) loaded for the
+    window: cancelled occurrences are skipped and moved ones are placed at their new date. `build` makes
+    an occurrence from its rule date and override.
+    """
+
+    def is_moved(override: Any) -> bool:
+        return override.date is not None and override.date != override.occurrence_date
+
+    regular = (
+        build(day, overrides.get(day))
+        for day in weekly_occurrences(
+            series.start_date, series.until_date, series.interval, series.weekday_numbers, window_start, window_end
+        )
+        if day not in overrides or not (overrides[day].cancelled or is_moved(overrides[day]))
+    )
+    moved = sorted(
+        (
+            build(override.occurrence_date, override)
+            for override in overrides.values()
+            if is_moved(override)
+            and not override.cancelled
+            and (window_start is None or override.date >= window_start)
+            and (window_end is None or override.date < window_end)
+        ),
+        key=key,
+    )
+    return heapq.merge(regular, moved, key=key)
@@ -8,7 +8,8 @@ from typing import Optional
 from flask import Flask
 from flask_cors import CORS
 from werkzeug.middleware.proxy_fix import ProxyFix
-from betterave_backend.extensions import db, bcrypt, login_manager, api, mail
+from betterave_backend.extensions import db, bcrypt, login_manager, api, mail, cache, chat_broker, password_hasher
+from betterave_backend.app.hashing import PasswordHasherBusy
 
 from betterave_backend.app.api import (
     auth_ns,
@@ -19,6 +20,7 @@ from betterave_backend.app.api import (
     user_class_groups_ns,
     events_ns,
     notifications_ns,
+    monitoring_ns,
 )
 
 
@@ -96,6 +98,7 @@ def create_app(db_test_path: Optional[str] = None) -> Flask:
                 "expose_headers": [
                     "Access-Control-Allow-Origin",
                     "Access-Control-Allow-Credentials",
+                    "ETag",
                 ],
             }
         },
@@ -110,11 +113,29 @@ def create_app(db_test_path: Optional[str] = None) -> Flask:
     print(f"MAIL_PASSWORD: {os.environ.get('MAIL_PASSWORD')}")
     mail.init_app(app)  # Bind Flask-Mail to the Flask application
 
+    # Response cache: "memory" (per worker), "sqlite" (shared by the workers of a host) or "none"
+    app.config["CACHE_BACKEND"] = os.environ.get("CACHE_BACKEND", "memory")
+    app.config["CACHE_PATH"] = os.environ.get("CACHE_PATH", "/database/cache.db")
+    app.config["CACHE_TTL"] = int(os.environ.get("CACHE_TTL", 300))
+
+    # Chat streams: "database" (delivers the messages posted through every worker) or "memory" (single worker)
+    app.config["CHAT_BROKER"] = os.environ.get("CHAT_BROKER", "database")
+    app.config["CHAT_POLL_INTERVAL"] = float(os.environ.get("CHAT_POLL_INTERVAL", 2))
+
+    # Password hashing: bcrypt processes (0 to hash in the request threads), hashes admitted at once, and how long
+    # the other logins wait for a slot before being answered 503
+    for key, cast in (("HASH_WORKERS", int), ("HASH_MAX_CONCURRENT", int), ("HASH_QUEUE_TIMEOUT", float)):
+        if key in os.environ:
+            app.config[key] = cast(os.environ[key])
+
     # Initialize the extensions
     db.init_app(app)
     bcrypt.init_app(app)
     login_manager.init_app(app)
     api.init_app(app)
+    cache.init_app(app)
+    chat_broker.init_app(app)
+    password_hasher.init_app(app)
 
     # Initialize the Flask-RestX Api and register the namespaces
     api.add_namespace(auth_ns, path="/auth")
@@ -125,6 +146,12 @@ def create_app(db_test_path: Optional[str] = None) -> Flask:
     api.add_namespace(user_class_groups_ns, path="/user_class_groups")
     api.add_namespace(events_ns, path="/events")
     api.add_namespace(notifications_ns, path="/notifications")
+    api.add_namespace(monitoring_ns, path="/monitoring")
+
+    @api.errorhandler(PasswordHasherBusy)
+    def password_hasher_busy(error: PasswordHasherBusy):  # type: ignore
+        """Answer 503 when the password hashing slots are all taken, so that the client retries later."""
+        return {"message": str(error)}, 503, {"Retry-After": str(max(1, round(password_hasher.queue_timeout)))}
 
     # Load/create the database
     with app.app_context():
@@ -5,6 +5,9 @@ from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
 from flask_restx import Api
 from flask_mail import Mail
+from betterave_backend.app.cache import ResponseCache
+from betterave_backend.app.broker import ChatBroker
+from betterave_backend.app.hashing import PasswordHasher
 
 authorizations = {"apikey": {"type": "apiKey", "in": "header", "name": "X-API-KEY"}}
 
@@ -12,6 +15,9 @@ db = SQLAlchemy()
 bcrypt = Bcrypt()
 login_manager = LoginManager()
 mail = Mail()
+cache = ResponseCache()
+chat_broker = ChatBroker()
+password_hasher = PasswordHasher()
 api = Api(
     version="3.2",
     title="Betterave API",
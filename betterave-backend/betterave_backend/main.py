@@ -2,7 +2,8 @@
 
 from betterave_backend.create_app import create_app
 
-app = create_app()
-
+# Only when run as a script: the spawned password hashing processes import this module again as __mp_main__,
+# and must not build an app each
 if __name__ == "__main__":
+    app = create_app()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,46 @@
+"""
+Add the calendar_token_hash column of the user table to an existing database, with its unique index.
+
+db.create_all() only creates missing tables, so a database created before the calendar feed URLs existed has a
+user table without the column, which every query of the users then fails on. The users have no feed URL until
+they create one.
+
+Works on SQLite and PostgreSQL, and can be run again safely. Run with:
+    python -m betterave_backend.scripts.add_calendar_token_column
+"""
+
+from sqlalchemy import inspect, text
+from betterave_backend.extensions import db
+from betterave_backend.app.models import User
+
+
+def add_calendar_token_column() -> bool:
+    """
+    Add the column and its index if they are missing, in the current transaction which the caller commits.
+
+    Returns:
+        bool: Whether the column was added.
+    """
+    db.create_all()
+    connection = db.session.connection()
+    column = User.__table__.c.calendar_token_hash
+    added = column.name not in {c["name"] for c in inspect(connection).get_columns(User.__tablename__)}
+    if added:
+        preparer = connection.dialect.identifier_preparer
+        connection.execute(
+            text(
+                f"ALTER TABLE {preparer.format_table(User.__table__)} "
+                f"ADD COLUMN {preparer.format_column(column)} {column.type.compile(dialect=connection.dialect)}"
+            )
+        )
+    for index in User.__table__.indexes:
+        index.create(connection, checkfirst=True)
+    return added
+
+
+if __name__ == "__main__":
+    from betterave_backend.wsgi import app
+
+    with app.app_context():
+        print("Added the calendar_token_hash column" if add_calendar_token_column() else "Nothing to do")
+        db.session.commit()
@@ -0,0 +1,70 @@
+"""
+Add the columns and indexes added to the existing tables to a database created before them.
+
+db.create_all() only creates missing tables, so on such a database every read of the notifications fails on
+the missing notification.created_at column, and the calendar, event, homework and message queries run without
+their indexes. The notifications sent before the column existed have no known sending date: they are dated
+from the upgrade. The grade and association tables have their own scripts, as their rows need deduplicating.
+
+Works on SQLite and PostgreSQL, and can be run again safely. Run with:
+    python -m betterave_backend.scripts.add_missing_columns_and_indexes
+"""
+
+from datetime import datetime
+from typing import Any, Callable
+from sqlalchemy import Column, inspect, text, update
+from betterave_backend.extensions import db
+from betterave_backend.app.models import Event, Homework, Lesson, Message, Notification
+
+# The columns added to existing tables, with the value given to the rows written before them
+MISSING_COLUMNS = [(Notification.__table__.c.created_at, datetime.utcnow)]
+UPGRADED_TABLES = [table.__table__ for table in (Lesson, Event, Homework, Message, Notification)]
+
+
+def add_column(column: Column, backfill: Callable[[], Any]) -> bool:
+    """
+    Add a column if it is missing and fill it in the existing rows with backfill().
+
+    Returns:
+        bool: Whether the column was added.
+    """
+    connection = db.session.connection()
+    table = column.table
+    if column.name in {c["name"] for c in inspect(connection).get_columns(table.name)}:
+        return False
+    preparer = connection.dialect.identifier_preparer
+    table_name, column_name = preparer.format_table(table), preparer.format_column(column)
+    # Added nullable, as SQLite cannot add a NOT NULL column without a constant default
+    connection.execute(
+        text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column.type.compile(dialect=connection.dialect)}")
+    )
+    connection.execute(update(table).where(column.is_(None)).values({column.name: backfill()}))
+    if not column.nullable and connection.dialect.name == "postgresql":
+        connection.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN {column_name} SET NOT NULL"))
+    return True
+
+
+def add_missing_columns_and_indexes() -> list[str]:
+    """
+    Add the missing columns and indexes, in the current transaction which the caller commits.
+
+    Returns:
+        list: The names of the added columns.
+    """
+    db.create_all()
+    added = [
+        f"{column.table.name}.{column.name}" for column, backfill in MISSING_COLUMNS if add_column(column, backfill)
+    ]
+    for table in UPGRADED_TABLES:
+        for index in table.indexes:
+            index.create(db.session.connection(), checkfirst=True)
+    return added
+
+
+if __name__ == "__main__":
+    from betterave_backend.wsgi import app
+
+    with app.app_context():
+        added = add_missing_columns_and_indexes()
+        print(f"Added {', '.join(added)}" if added else "No column to add")
+        db.session.commit()
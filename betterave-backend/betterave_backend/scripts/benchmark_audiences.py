@@ -0,0 +1,154 @@
+"""
+Benchmark the fan-out of event attendees and notification recipients on a seeded school of 10k users.
+
+Compares the former row-by-row fan-out (loading every User and writing one attendance row per user) with
+the set-based statements now used by add_attendees_to_event and add_recipient_to_notification.
+For each, the number of User rows loaded by the ORM, the number of SQL statements and the median latency
+are reported. Each run is repeated on the same event to check that adding the same users again is free.
+
+Run with:
+    python -m betterave_backend.scripts.benchmark_audiences
+"""
+
+import time
+import statistics
+from datetime import date, time as dtime
+from sqlalchemy import event, func, select
+from betterave_backend.create_app import create_app
+from betterave_backend.extensions import db
+from betterave_backend.app.models import User, UserLevel, UserType, event_attendance, notification_reception
+from betterave_backend.app.operations.audience_operations import set_audience_override
+from betterave_backend.app.operations.event_operations import (
+    add_attendees_to_event,
+    add_event,
+    get_event_attendee_ids,
+    get_user_events,
+)
+from betterave_backend.app.operations.notification_operations import (
+    add_notification,
+    add_recipient_to_notification,
+    get_user_notifications,
+)
+
+N_USERS = 10_000
+REPEAT = 5
+LEVELS = [UserLevel._1A, UserLevel._2A, UserLevel._3A]
+
+
+def seed_users() -> tuple[int, list[int]]:
+    """Seed an association and N_USERS students, and return their IDs."""
+    asso = User(
+        email="asso@ensae.fr",
+        hashed_password="x",
+        name="Asso",
+        surname="Bench",
+        level=UserLevel.NA,
+        user_type=UserType.ASSO,
+    )
+    db.session.add(asso)
+    db.session.flush()
+    db.session.execute(
+        User.__table__.insert(),
+        [
+            {
+                "email": f"student{i}@ensae.fr",
+                "hashed_password": "x",
+                "name": f"Student{i}",
+                "surname": "Bench",
+                "level": LEVELS[i % len(LEVELS)].name,
+                "user_type": UserType.STUDENT.name,
+            }
+            for i in range(N_USERS)
+        ],
+    )
+    db.session.commit()
+    user_ids = db.session.execute(select(User.user_id).where(User.user_type == UserType.STUDENT)).scalars().all()
+    print(f"Seeded {len(user_ids)} students")
+    return asso.user_id, user_ids
+
+
+def legacy_add_attendees(event_id: int, user_ids: list[int]) -> None:
+    """Former fan-out: load the users and write one attendance row per user."""
+    users = User.query.filter(User.user_id.in_(user_ids)).all()
+    for user in users:
+        set_audience_override(event_attendance.c.event_id, event_attendance.c.attending, event_id, user.user_id, True)
+    db.session.commit()
+
+
+def measure(name: str, func, *args) -> None:
+    """Run `func` REPEAT times on a fresh session and print loaded users, statements and median latency."""
+    loaded = []
+    statements = []
+    timings = []
+
+    def count_load(target, context) -> None:
+        loaded.append(target)
+
+    def count_statement(*args) -> None:
+        statements[-1] += 1
+
+    event.listen(User, "load", count_load)
+    event.listen(db.engine, "before_cursor_execute", count_statement)
+    try:
+        for _ in range(REPEAT):
+            db.session.remove()
+            loaded.clear()
+            statements.append(0)
+            start = time.perf_counter()
+            func(*args)
+            timings.append(time.perf_counter() - start)
+    finally:
+        event.remove(User, "load", count_load)
+        event.remove(db.engine, "before_cursor_execute", count_statement)
+
+    print(
+        f"{name:<28} users loaded: {len(loaded):>6}  statements: {statements[0]:>6} then {statements[-1]:>6}  "
+        f"median latency: {statistics.median(timings) * 1000:.2f} ms"
+    )
+
+
+def measure_read(name: str, func, *args) -> None:
+    """Print the median latency of a read."""
+    timings = []
+    for _ in range(REPEAT):
+        db.session.remove()
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    print(f"{name:<28} returned: {len(result):>6}  median latency: {statistics.median(timings) * 1000:.2f} ms")
+
+
+def count_rows(table) -> int:
+    """Return the number of rows of a table."""
+    return db.session.execute(select(func.count()).select_from(table)).scalar()
+
+
+def run_benchmark() -> None:
+    """Seed an in-memory database and compare both fan-out implementations."""
+    app = create_app(db_test_path="sqlite:///:memory:")
+    with app.app_context():
+        asso_id, user_ids = seed_users()
+        event_args = (asso_id, "Gala", date(2024, 3, 1), dtime(20, 0), dtime(23, 0), "Subscribers")
+
+        before_id = add_event(*event_args)
+        after_id = add_event(*event_args)
+        measure("before: attendees by ID", legacy_add_attendees, before_id, user_ids)
+        measure("after: attendees by ID", add_attendees_to_event, after_id, user_ids)
+        # Both implementations must give the same attendees, without duplicates
+        assert get_event_attendee_ids(before_id) == get_event_attendee_ids(after_id) == sorted(user_ids)
+        assert count_rows(event_attendance) == 2 * N_USERS
+
+        measure("after: attendees by level", add_attendees_to_event, add_event(*event_args), None, "1A")
+        measure("after: all users", add_attendees_to_event, add_event(*event_args))
+        measure("after: notif all users", add_notification, "Fermeture", "Bibliothèque", asso_id, "All users")
+        notification_id = add_notification("Travaux", "Bâtiment", asso_id, "Subscribers")
+        measure("after: notif recipients", add_recipient_to_notification, notification_id, user_ids)
+        assert count_rows(notification_reception) == N_USERS
+
+        measure_read("read: event attendees", get_event_attendee_ids, after_id)
+        measure_read("read: user events", get_user_events, user_ids[0])
+        measure_read("read: user notifications", get_user_notifications, user_ids[0])
+
+
+if __name__ == "__main__":
+    run_benchmark()
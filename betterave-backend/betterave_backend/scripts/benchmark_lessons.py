@@ -0,0 +1,144 @@
+"""
+Benchmark the student timetable queries on a seeded academic year.
+
+Compares the former Python implementation of get_student_future_lessons (walking user.groups and
+sorting every lesson in memory) with the SQL implementation now used by lesson_operations.
+For each, the number of Lesson rows loaded by the ORM and the median latency are reported.
+
+Run with:
+    python -m betterave_backend.scripts.benchmark_lessons
+"""
+
+import time
+import statistics
+from datetime import date, time as dtime, timedelta
+from sqlalchemy import event
+from betterave_backend.create_app import create_app
+from betterave_backend.extensions import db
+from betterave_backend.app.models import User, Class, ClassGroup, Lesson, UserLevel, UserType
+from betterave_backend.app.operations.lesson_operations import get_student_future_lessons
+
+N_CLASSES = 40
+SECONDARY_GROUPS_PER_CLASS = 2
+GROUPS_PER_STUDENT = 12
+# The seeded year is centered on today, so that about half of the lessons are in the future
+YEAR_START = date.today() - timedelta(weeks=18)
+YEAR_END = date.today() + timedelta(weeks=24)
+LIMIT = 10
+REPEAT = 20
+
+
+def legacy_student_future_lessons(user: User, limit: int = None) -> list[Lesson]:
+    """Former implementation: load every lesson of every group, filter and sort in Python."""
+    today = date.today()
+    future_lessons = []
+    for group in user.groups:
+        future_lessons.extend([lesson for lesson in group.lessons if lesson.date >= today])
+    return sorted(future_lessons)[:limit] if limit is not None else sorted(future_lessons)
+
+
+def seed_year() -> int:
+    """Seed one academic year of weekly lessons and return the ID of the benchmarked student."""
+    teacher = User(
+        email="teacher@ensae.fr",
+        hashed_password="x",
+        name="Teacher",
+        surname="Bench",
+        level=UserLevel.NA,
+        user_type=UserType.TEACHER,
+    )
+    student = User(
+        email="student@ensae.fr",
+        hashed_password="x",
+        name="Student",
+        surname="Bench",
+        level=UserLevel._1A,
+        user_type=UserType.STUDENT,
+    )
+    db.session.add_all([teacher, student])
+    db.session.flush()
+
+    groups = []
+    for class_id in range(1, N_CLASSES + 1):
+        db.session.add(
+            Class(
+                class_id=class_id,
+                name=f"Class {class_id}",
+                ects_credits=3,
+                ensae_link="",
+                level=UserLevel._1A,
+                default_teacher_id=teacher.user_id,
+            )
+        )
+        groups.append(ClassGroup(name="Cours", class_id=class_id, is_main_group=True))
+        groups.extend(
+            ClassGroup(name=f"TD {i}", class_id=class_id, is_main_group=False)
+            for i in range(1, SECONDARY_GROUPS_PER_CLASS + 1)
+        )
+    db.session.add_all(groups)
+    db.session.flush()
+
+    lessons = []
+    for index, group in enumerate(groups):
+        lesson_date = YEAR_START + timedelta(days=index % 5)
+        while lesson_date <= YEAR_END:
+            lessons.append(
+                {
+                    "group_id": group.group_id,
+                    "date": lesson_date,
+                    "start_time": dtime(8 + index % 10, 0),
+                    "end_time": dtime(9 + index % 10, 30),
+                    "teacher_id": teacher.user_id,
+                }
+            )
+            lesson_date += timedelta(weeks=1)
+    db.session.execute(Lesson.__table__.insert(), lessons)
+
+    student.groups = groups[:: len(groups) // GROUPS_PER_STUDENT][:GROUPS_PER_STUDENT]
+    db.session.commit()
+    print(f"Seeded {len(groups)} groups and {len(lessons)} lessons, student enrolled in {len(student.groups)} groups")
+    return student.user_id
+
+
+def measure(name: str, func, student_id: int) -> None:
+    """Run `func` REPEAT times on a fresh session and print loaded rows and median latency."""
+    loaded = []
+    timings = []
+
+    def count_load(target, context) -> None:
+        loaded.append(target)
+
+    event.listen(Lesson, "load", count_load)
+    try:
+        for _ in range(REPEAT):
+            db.session.remove()
+            loaded.clear()
+            start = time.perf_counter()
+            result = func(db.session.get(User, student_id))
+            timings.append(time.perf_counter() - start)
+    finally:
+        event.remove(Lesson, "load", count_load)
+
+    print(
+        f"{name:<8} rows loaded: {len(loaded):>6}  returned: {len(result):>3}  "
+        f"median latency: {statistics.median(timings) * 1000:.2f} ms"
+    )
+
+
+def run_benchmark() -> None:
+    """Seed an in-memory database and compare both implementations."""
+    app = create_app(db_test_path="sqlite:///:memory:")
+    with app.app_context():
+        student_id = seed_year()
+
+        # Both implementations must return the same lessons, in the same order
+        before = legacy_student_future_lessons(db.session.get(User, student_id), LIMIT)
+        after = get_student_future_lessons(student_id, LIMIT)
+        assert [lesson.lesson_id for lesson in before] == [lesson.lesson_id for lesson in after]
+
+        measure("before", lambda user: legacy_student_future_lessons(user, LIMIT), student_id)
+        measure("after", lambda user: get_student_future_lessons(user, LIMIT), student_id)
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,133 @@
+"""
+Benchmark the full-text search on a seeded year of chat history: 40 classes, 100k messages and 4k homework.
+
+Compares the search through the full-text index (search_class_content) with a scan of the content of the
+messages and homework with LIKE, for a student enrolled in 8 classes and for an admin searching every group.
+The median latency of the first page of results is reported for queries of different selectivity.
+
+Run with:
+    python -m betterave_backend.scripts.benchmark_search
+"""
+
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import select
+from betterave_backend.create_app import create_app
+from betterave_backend.extensions import db
+from betterave_backend.app.models import Class, ClassGroup, Homework, Message, User, UserClassGroup, UserLevel, UserType
+from betterave_backend.app.operations.search_operations import search_class_content, searchable_group_ids
+
+N_CLASSES = 40
+N_MESSAGES = 100_000
+N_HOMEWORK = 4_000
+N_ENROLLED = 8
+REPEAT = 5
+WORDS = (
+    "partiel examen cours td tp amphi chapitre exercice correction projet rendu lundi mardi mercredi jeudi "
+    "vendredi salle note question réponse théorie jeux économétrie statistique probabilité séance rattrapage "
+    "slides poly annale groupe binôme date limite rapport code python R"
+).split()
+QUERIES = ["partiel", "théorie jeux", "annale corr", "rattrapage économétrie"]
+
+
+def seed_history() -> tuple[User, User]:
+    """Seed the classes, a year of messages and homework, and return a student and an admin."""
+    random.seed(0)
+    users = [
+        User(
+            email=f"{user_type.name.lower()}@ensae.fr",
+            hashed_password="x",
+            name=user_type.name.title(),
+            surname="Bench",
+            level=UserLevel._1A if user_type == UserType.STUDENT else UserLevel.NA,
+            user_type=user_type,
+        )
+        for user_type in (UserType.STUDENT, UserType.ADMIN, UserType.TEACHER)
+    ]
+    db.session.add_all(users)
+    db.session.flush()
+    student, admin, teacher = users
+    for class_id in range(1, N_CLASSES + 1):
+        db.session.add(
+            Class(
+                class_id=class_id,
+                name=f"Class {class_id}",
+                ects_credits=3,
+                ensae_link="",
+                level=UserLevel._1A,
+                default_teacher_id=teacher.user_id,
+            )
+        )
+        db.session.add(ClassGroup(group_id=class_id, name="Main", class_id=class_id, is_main_group=True))
+        if class_id <= N_ENROLLED:
+            db.session.add(UserClassGroup(user_id=student.user_id, class_id=class_id))
+    db.session.flush()
+
+    start = datetime(2023, 9, 1)
+    db.session.execute(
+        Message.__table__.insert(),
+        [
+            {
+                "group_id": random.randint(1, N_CLASSES),
+                "user_id": random.choice((student.user_id, teacher.user_id)),
+                "content": " ".join(random.choices(WORDS, k=random.randint(3, 20))),
+                "timestamp": start + timedelta(seconds=i * 315),
+            }
+            for i in range(N_MESSAGES)
+        ],
+    )
+    db.session.execute(
+        Homework.__table__.insert(),
+        [
+            {
+                "group_id": random.randint(1, N_CLASSES),
+                "content": " ".join(random.choices(WORDS, k=random.randint(5, 30))),
+                "due_date": date(2023, 9, 1) + timedelta(days=i % 365),
+            }
+            for i in range(N_HOMEWORK)
+        ],
+    )
+    db.session.commit()
+    print(f"Seeded {N_MESSAGES} messages and {N_HOMEWORK} homework in {N_CLASSES} classes")
+    return student, admin
+
+
+def scan_search(user_id: int, query: str) -> list:
+    """Search without the index: scan the content of every message and homework of the groups with LIKE."""
+    groups = searchable_group_ids(db.session.get(User, user_id))
+    results = []
+    for model in (Message, Homework):
+        statement = select(model).where(*(model.content.ilike(f"%{word}%") for word in query.split()))
+        if groups is not None:
+            statement = statement.where(model.group_id.in_(groups))
+        results += db.session.execute(statement).scalars().all()
+    return results
+
+
+def measure(name: str, func, *args) -> None:
+    """Print the number of results and the median latency of a search."""
+    timings = []
+    for _ in range(REPEAT):
+        db.session.remove()
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    print(f"{name:<44} results: {len(result):>4}  median latency: {statistics.median(timings) * 1000:.2f} ms")
+
+
+def run_benchmark() -> None:
+    """Seed an in-memory database and compare the indexed search with a scan."""
+    app = create_app(db_test_path="sqlite:///:memory:")
+    with app.app_context():
+        student, admin = seed_history()
+        for user_id in (student.user_id, admin.user_id):
+            for query in QUERIES:
+                label = f"{db.session.get(User, user_id).user_type.name.lower()} '{query}'"
+                measure(f"scan: {label}", scan_search, user_id, query)
+                measure(f"index: {label}", search_class_content, user_id, query, 50)
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,48 @@
+"""
+Deduplicate the grades of an existing database and add the unique index on grade(class_id, student_id).
+
+db.create_all() only creates missing tables, so a database created before the index existed may hold several
+grades for the same student in a class, which update_student_grade used to ignore but the upserts of the grades
+cannot handle. For each (class_id, student_id), this script keeps the grade added last (the highest grade_id),
+deletes the others, then creates the index.
+
+Works on SQLite and PostgreSQL, and can be run again safely. Run with:
+    python -m betterave_backend.scripts.deduplicate_grades
+"""
+
+from sqlalchemy import delete, func, select
+from betterave_backend.extensions import db
+from betterave_backend.app.models import Grade
+from betterave_backend.app.operations.data_version_operations import mark_tables_changed
+from betterave_backend.app.operations.grade_operations import bump_grade_versions
+
+
+def deduplicate_grades() -> int:
+    """
+    Delete the duplicate grades and create the unique index, in the current transaction which the caller commits.
+
+    Returns:
+        int: The number of grades deleted.
+    """
+    db.create_all()
+    latest = select(func.max(Grade.grade_id)).group_by(Grade.class_id, Grade.student_id)
+    duplicated_classes = set(
+        db.session.execute(select(Grade.class_id).where(Grade.grade_id.not_in(latest)).distinct()).scalars()
+    )
+    deleted = db.session.execute(
+        delete(Grade).where(Grade.grade_id.not_in(latest)).execution_options(synchronize_session=False)
+    ).rowcount
+    if deleted:
+        mark_tables_changed(Grade.__tablename__)
+        bump_grade_versions(duplicated_classes)
+    for index in Grade.__table__.indexes:
+        index.create(db.session.connection(), checkfirst=True)
+    return deleted
+
+
+if __name__ == "__main__":
+    from betterave_backend.wsgi import app
+
+    with app.app_context():
+        print(f"Deleted {deduplicate_grades()} duplicate grades")
+        db.session.commit()
@@ -2,9 +2,8 @@
 
 import random
 import json
+from datetime import datetime
 import numpy as np
-import pandas as pd
-from betterave_backend.main import app
 from betterave_backend.extensions import db
 from betterave_backend.app.operations.user_operations import add_user, get_user_by_name
 from betterave_backend.app.operations.student_operations import get_students_from_level
@@ -13,13 +12,18 @@ from betterave_backend.app.operations.class_operations import (
     get_classes_from_level,
     get_class_by_id,
 )
-from betterave_backend.app.operations.lesson_operations import add_lesson
+from betterave_backend.app.operations.lesson_series_operations import (
+    add_lesson_series,
+    cancel_occurrence,
+    get_all_lesson_series,
+)
+from betterave_backend.app.recurrence import infer_weekly_rule, weekly_occurrences
 from betterave_backend.app.operations.class_group_operations import (
     add_class_group,
     enroll_student_in_group,
     get_class_group_by_name,
 )
-from betterave_backend.app.operations.event_operations import add_event
+from betterave_backend.app.operations.event_series_operations import add_event_series
 from betterave_backend.app.operations.notification_operations import add_notification
 from betterave_backend.app.operations.grade_operations import add_grade
 from betterave_backend.app.operations.user_class_group_operations import (
@@ -91,6 +95,9 @@ homework_contents = [
 
 def initialize_database() -> None:
     """Initialize the database with dummy data."""
+    # Imported here, as the password hashing processes spawned by add_user import this module again
+    from betterave_backend.wsgi import app
+
     with app.app_context():
         db.session.remove()
         db.drop_all()
@@ -101,7 +108,7 @@ def initialize_database() -> None:
         admin_ids = []
         teacher_ids = []
         class_ids = []
-        lesson_ids = []
+        series_ids = []
 
         # 1 - Add students
         print("Adding students...")
@@ -245,21 +252,31 @@ def initialize_database() -> None:
                     )
 
         # 9 - Add lessons
-        print("Adding lessons to class groups...")
+        # The scraped timetable lists every lesson: lessons of a group on the same weekday, time span, teacher
+        # and room are stored as one weekly series, the weeks without a lesson being cancelled occurrences
+        print("Adding lesson series to class groups...")
         for class_dict in classes:
+            weekly_slots = {}
             for lesson in class_dict["lesson_info"]:
                 date, start_time, end_time, lesson_type, teacher, room = lesson
+                lesson_date = datetime.strptime(date, "%Y-%m-%d").date()
+                slot = (lesson_type, lesson_date.weekday(), start_time, end_time, tuple(teacher), room)
+                weekly_slots.setdefault(slot, []).append(lesson_date)
+            for (lesson_type, _, start_time, end_time, teacher, room), dates in weekly_slots.items():
                 group_id = get_class_group_by_name(class_dict["class_id"], lesson_type).group_id
-                lesson_ids.append(
-                    add_lesson(
-                        group_id=group_id,
-                        date=date,
-                        start_time=start_time,
-                        end_time=end_time,
-                        room=room,
-                        teacher_id=get_user_by_name(*teacher).user_id,
-                    )
+                start_date, until_date, missing_dates = infer_weekly_rule(dates)
+                series_id = add_lesson_series(
+                    group_id=group_id,
+                    start_date=start_date,
+                    until_date=until_date,
+                    start_time=start_time,
+                    end_time=end_time,
+                    room=room,
+                    teacher_id=get_user_by_name(*teacher).user_id,
                 )
+                series_ids.append(series_id)
+                for missing_date in missing_dates:
+                    cancel_occurrence(series_id, missing_date)
 
         # 10 - Subscribe all students and admin to all assos by default
         print("Subscribing students to assos...")
@@ -270,31 +287,28 @@ def initialize_database() -> None:
         # 11 - Add association events
         print("Adding asso events...")
         # Tribu meeting every monday at 18h
-        asso_id = asso_ids[0]
-        date_range = pd.date_range(start="2023-09-01", end="2024-04-30", freq="W-MON")
-        for date in date_range:
-            add_event(
-                asso_id,
-                "Réunion",
-                date,
-                "18:00",
-                "19:00",
-                "Subscribers",
-            )
+        add_event_series(
+            asso_ids[0],
+            "Réunion",
+            start_date="2023-09-01",
+            until_date="2024-04-30",
+            start_time="18:00",
+            end_time="19:00",
+            participants="Subscribers",
+            weekdays="MO",
+        )
 
         # EJE meeting every tuesday at 17h
-        asso_id = asso_ids[1]
-        date_range = pd.date_range(start="2023-09-01", end="2024-04-30", freq="W-TUE")
-
-        for date in date_range:
-            add_event(
-                asso_id,
-                "Réunion",
-                date,
-                "17:00",
-                "18:00",
-                "Subscribers",
-            )
+        add_event_series(
+            asso_ids[1],
+            "Réunion",
+            start_date="2023-09-01",
+            until_date="2024-04-30",
+            start_time="17:00",
+            end_time="18:00",
+            participants="Subscribers",
+            weekdays="TU",
+        )
 
         # 11bis - Add notifications
         print("Adding notifications ...")
@@ -362,15 +376,18 @@ def initialize_database() -> None:
             if random.random() < 0.5:
                 # Iterate over the lessons of the class
                 class_ = get_class_by_id(class_id)
-                for lesson in class_.main_group().lessons:
-                    # Add homework to the lesson
-                    if random.random() < 0.2:
-                        add_homework_to_class(
-                            content=random.choice(homework_contents),
-                            class_id=class_id,
-                            due_date=lesson.date.strftime("%Y-%m-%d"),
-                            due_time=lesson.start_time.strftime("%H:%M"),
-                        )
+                for series in get_all_lesson_series(class_.main_group().group_id):
+                    for lesson_date in weekly_occurrences(
+                        series.start_date, series.until_date, series.interval, series.weekday_numbers
+                    ):
+                        # Add homework to the lesson
+                        if random.random() < 0.2:
+                            add_homework_to_class(
+                                content=random.choice(homework_contents),
+                                class_id=class_id,
+                                due_date=lesson_date.strftime("%Y-%m-%d"),
+                                due_time=series.start_time.strftime("%H:%M"),
+                            )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,46 @@
+"""
+Run the background jobs of the job table (see operations/job_operations.py) until stopped.
+
+Several workers can run side by side, each job is claimed by a single one. The worker waits
+JOB_POLL_INTERVAL seconds (2 by default) when no job is due, and finishes its current job on SIGTERM.
+Run with:
+    python -m betterave_backend.scripts.job_worker
+"""
+
+import os
+import signal
+import time
+from betterave_backend.extensions import db
+from betterave_backend.app.operations.job_operations import run_pending_jobs
+
+POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 2))
+# The session is renewed after this many jobs, so that the worker does not keep every job it ran in memory
+JOBS_PER_BATCH = 100
+
+stopping = False
+
+
+def stop(signum, frame) -> None:
+    """Stop the worker once its current job is done."""
+    global stopping
+    stopping = True
+
+
+def main() -> None:
+    """Run the due jobs until SIGTERM or SIGINT."""
+    from betterave_backend.wsgi import app
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    with app.app_context():
+        print(f"Job worker started, polling every {POLL_INTERVAL}s", flush=True)
+        while not stopping:
+            count = run_pending_jobs(max_jobs=JOBS_PER_BATCH)
+            db.session.remove()
+            if count == 0:
+                time.sleep(POLL_INTERVAL)
+        print("Job worker stopped", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""Create the calendar_lesson table if needed and rebuild it from the existing lessons."""
+
+from betterave_backend.extensions import db
+from betterave_backend.app.models import CalendarLesson
+from betterave_backend.app.operations.lesson_calendar_operations import rebuild_calendar_lessons
+
+
+def main() -> None:
+    """Rebuild the calendar lessons in an app context."""
+    from betterave_backend.wsgi import app
+
+    with app.app_context():
+        CalendarLesson.__table__.create(db.engine, checkfirst=True)
+        count = rebuild_calendar_lessons()
+        print(f"Rebuilt {count} calendar lessons")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Create the full-text indexes of the message and homework tables of an existing database, and fill them.
+
+db.create_all() only creates the indexes with the tables (see app/models/search_index.py), so a database created
+before they existed has none. This script creates the missing ones and indexes the current content of the tables,
+which also repairs an SQLite index out of sync with its table.
+
+Works on SQLite and PostgreSQL, and can be run again safely. Run with:
+    python -m betterave_backend.scripts.rebuild_search_index
+"""
+
+from betterave_backend.extensions import db
+from betterave_backend.app.models.search_index import SEARCH_TABLES, create_search_index, rebuild_search_index
+
+
+def rebuild_search_indexes() -> list[str]:
+    """Create and fill the full-text indexes, in the current transaction which the caller commits."""
+    db.create_all()
+    connection = db.session.connection()
+    for table_name in SEARCH_TABLES:
+        create_search_index(connection, table_name)
+        rebuild_search_index(connection, table_name)
+    return list(SEARCH_TABLES)
+
+
+if __name__ == "__main__":
+    from betterave_backend.wsgi import app
+
+    with app.app_context():
+        for name in rebuild_search_indexes():
+            print(f"Indexed {name}")
+        db.session.commit()
@@ -0,0 +1,177 @@
+"""
+Upgrade the association tables of an existing database to their composite primary keys and indexes.
+
+db.create_all() only creates missing tables, so a database created before the keys were added keeps
+tables without primary key, possibly holding duplicate rows. For each association table, this script:
+- rebuilds it if it has no primary key or lacks a column: the legacy table is renamed, the table is created
+  with its keys and indexes, the distinct rows are copied and the legacy table is dropped;
+- otherwise only creates its missing indexes.
+
+event_attendance and notification_reception used to list every member of the audience. Before they are
+rebuilt, the audience rules of the events, series and notifications without any are created from their
+participants, and only the legacy rows of users not matching these rules are kept, as opt-ins. These rules
+are read through the events and notifications, so the missing columns of these tables are added first (see
+add_missing_columns_and_indexes.py).
+
+Works on SQLite and PostgreSQL, and can be run again safely. Run with:
+    python -m betterave_backend.scripts.upgrade_association_tables
+"""
+
+from typing import Any, Optional
+from sqlalchemy import Table, insert, inspect, select, text
+from betterave_backend.extensions import db
+from betterave_backend.app.models import (
+    Event,
+    EventAudience,
+    EventSeries,
+    Notification,
+    NotificationAudience,
+    UserLevel,
+    event_attendance,
+    event_series_attendance,
+    group_enrollment,
+    notification_reception,
+)
+from betterave_backend.app.models.user import association_subscriptions
+from betterave_backend.app.operations.audience_operations import audience_member_ids, audience_rules
+from betterave_backend.scripts.add_missing_columns_and_indexes import add_missing_columns_and_indexes
+
+# Tables whose legacy rows were a materialized audience, by name: (audience owner column, flag column)
+AUDIENCE_OVERRIDE_TABLES = {
+    event_attendance.name: (EventAudience.event_id, event_attendance.c.attending),
+    event_series_attendance.name: (EventAudience.series_id, event_series_attendance.c.attending),
+    notification_reception.name: (NotificationAudience.notification_id, notification_reception.c.received),
+}
+ASSOCIATION_TABLES = [
+    group_enrollment,
+    association_subscriptions,
+    event_attendance,
+    event_series_attendance,
+    notification_reception,
+]
+
+
+def needs_rebuild(table: Table) -> bool:
+    """Tell whether the table of the database has no primary key or lacks a column of the model."""
+    inspector = inspect(db.session.connection())
+    if not inspector.get_pk_constraint(table.name)["constrained_columns"]:
+        return True
+    existing = {column["name"] for column in inspector.get_columns(table.name)}
+    return not set(table.columns.keys()) <= existing
+
+
+def backfill_audience_rules() -> int:
+    """Create the audience rules of the events, series and notifications without any, return their number."""
+    owners: list[tuple[Any, Any, Any, Any, Any]] = [
+        (Event, Event.event_id, EventAudience, "event_id", lambda event: (event.asso_id, event.participant_type)),
+        (
+            EventSeries,
+            EventSeries.series_id,
+            EventAudience,
+            "series_id",
+            lambda series: (series.asso_id, series.participant_type),
+        ),
+        (
+            Notification,
+            Notification.notification_id,
+            NotificationAudience,
+            "notification_id",
+            lambda notification: (notification.sent_by_user_id, _legacy_level(notification.recipient_type)),
+        ),
+    ]
+    count = 0
+    for model, owner_column, audience_model, owner_key, participants in owners:
+        with_rules = select(getattr(audience_model, owner_key)).where(getattr(audience_model, owner_key).is_not(None))
+        for owner in model.query.filter(owner_column.not_in(with_rules)):
+            try:
+                rules = audience_rules(*participants(owner))
+            except ValueError:
+                print(f"Skipping {model.__tablename__} {getattr(owner, owner_key)}: unknown participants")
+                continue
+            db.session.add_all(audience_model(**{owner_key: getattr(owner, owner_key)}, **rule) for rule in rules)
+            count += len(rules)
+    db.session.flush()
+    return count
+
+
+def _legacy_level(recipient_type: str) -> str:
+    """Return the recipient type of a notification, whose levels used to be stored as 'UserLevel._1A'."""
+    if recipient_type.startswith("UserLevel."):
+        return UserLevel[recipient_type.split(".", 1)[1]].value
+    return recipient_type
+
+
+def rebuild_table(table: Table) -> tuple[int, int]:
+    """Rebuild a table with its keys and indexes from its distinct legacy rows, return the rows before and after."""
+    legacy_name = f"{table.name}_legacy"
+    connection = db.session.connection()
+    quote = connection.dialect.identifier_preparer.quote
+    pk_name = inspect(connection).get_pk_constraint(table.name).get("name")
+    connection.execute(text(f"ALTER TABLE {quote(table.name)} RENAME TO {quote(legacy_name)}"))
+    if pk_name and connection.dialect.name != "sqlite":
+        # The name of the primary key of the renamed table would collide with the new one
+        connection.execute(
+            text(f"ALTER TABLE {quote(legacy_name)} RENAME CONSTRAINT {quote(pk_name)} TO {quote(pk_name + '_legacy')}")
+        )
+    legacy = Table(legacy_name, db.MetaData(), autoload_with=connection)
+    # The indexes of a renamed table keep their names, which the new table reuses
+    for index in legacy.indexes:
+        index.drop(connection)
+    table.create(connection)
+
+    keys = [column.name for column in table.primary_key.columns]
+    before = connection.execute(select(db.func.count()).select_from(legacy)).scalar()
+    rows = [dict(zip(keys, row)) for row in connection.execute(select(*(legacy.c[key] for key in keys)).distinct())]
+    if table.name in AUDIENCE_OVERRIDE_TABLES:
+        rows = _opted_in_rows(table, rows)
+    if rows:
+        connection.execute(insert(table), rows)
+    legacy.drop(connection)
+    return before, len(rows)
+
+
+def _opted_in_rows(table: Table, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Keep the legacy attendance rows of users not matching the audience rules, flagged as opt-ins."""
+    audience_owner_column, flag_column = AUDIENCE_OVERRIDE_TABLES[table.name]
+    owner_key = audience_owner_column.key
+    members: dict[int, set[int]] = {}
+    kept = []
+    for row in rows:
+        owner_id = row[owner_key]
+        if owner_id not in members:
+            members[owner_id] = set(
+                audience_member_ids(owner_id, audience_owner_column, table.c[owner_key], flag_column)
+            )
+        if row["user_id"] not in members[owner_id]:
+            kept.append({**row, flag_column.name: True})
+    return kept
+
+
+def upgrade_association_tables(tables: Optional[list[Table]] = None) -> dict[str, tuple[int, int]]:
+    """
+    Upgrade the association tables, in the current transaction which the caller commits.
+
+    Returns:
+        dict: For each rebuilt table, its number of rows before and after deduplication.
+    """
+    db.create_all()
+    add_missing_columns_and_indexes()
+    if backfill_audience_rules():
+        print("Created the missing audience rules")
+    rebuilt = {}
+    for table in tables or ASSOCIATION_TABLES:
+        if needs_rebuild(table):
+            rebuilt[table.name] = rebuild_table(table)
+        else:
+            for index in table.indexes:
+                index.create(db.session.connection(), checkfirst=True)
+    return rebuilt
+
+
+if __name__ == "__main__":
+    from betterave_backend.wsgi import app
+
+    with app.app_context():
+        for name, (before, after) in upgrade_association_tables().items():
+            print(f"Rebuilt {name}: {before} rows, {after} kept")
+        db.session.commit()
@@ -0,0 +1,5 @@
+"""The application instance, for WSGI servers and the scripts which need an app context."""
+
+from betterave_backend.create_app import create_app
+
+app = create_app()
@@ -9,6 +9,7 @@ sys.path.append(os.path.join(os.getcwd(), "betterave_backend"))
 from betterave_backend.create_app import create_app
 from betterave_backend.extensions import db
 from flask.testing import FlaskClient
+from sqlalchemy import event
 
 
 class CustomClient(FlaskClient):
@@ -36,3 +37,34 @@ def test_client():
         db.session.remove()
         db.drop_all()
     context.pop()
+
+
+class QueryCounter:
+    """Count the SQL statements sent to the database."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+@pytest.fixture(scope="function")
+def query_counter(test_client):
+    counter = QueryCounter()
+    event.listen(db.engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(db.engine, "before_cursor_execute", counter)
+
+
+@pytest.fixture(scope="function")
+def count_request_statements(test_client, query_counter):
+    """Return a function getting a URL from an empty session, as a new request does, and counting its statements."""
+
+    def count(url):
+        db.session.expunge_all()
+        query_counter.count = 0
+        response = test_client.get(url)
+        return query_counter.count, response
+
+    return count
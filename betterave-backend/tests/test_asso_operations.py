@@ -7,6 +7,7 @@ from betterave_backend.app.operations.asso_operations import (
     subscribe_to_asso,
     unsubscribe_from_asso,
     get_all_assos,
+    get_assos_with_subscription,
 )
 from betterave_backend.app.operations.user_operations import get_user_by_id
 from betterave_backend.app.models import UserType, UserLevel
@@ -91,3 +92,29 @@ def test_get_all_assos(setup_asso):
     assert len(assos) >= 1
     for asso in assos:
         assert asso.is_asso
+
+
+def test_get_assos_with_subscription(setup_user, setup_asso, query_counter):
+    """Test the subscription status and subscriber counts, in one query whatever the number of subscribers."""
+    other_asso_id = user_operations.add_user("BDS", "", "asso_pic_url", UserType.ASSO, UserLevel.NA)
+    subscribe_to_asso(setup_user, setup_asso)
+    user = get_user_by_id(setup_user)
+
+    query_counter.count = 0
+    assos = get_assos_with_subscription(user)
+    assert query_counter.count == 1
+    assert [(asso.user_id, asso.subscribed, asso.subscriber_count) for asso in assos] == [
+        (setup_asso, True, 1),
+        (other_asso_id, False, 0),
+    ]
+
+    for i in range(5):
+        student_id = user_operations.add_user(
+            f"Student{i}", "Smith", "student_pic_url", UserType.STUDENT, UserLevel._1A
+        )
+        subscribe_to_asso(student_id, other_asso_id)
+    user = get_user_by_id(setup_user)
+    query_counter.count = 0
+    assos = get_assos_with_subscription(user)
+    assert query_counter.count == 1
+    assert [(asso.subscribed, asso.subscriber_count) for asso in assos] == [(True, 1), (False, 5)]
@@ -0,0 +1,158 @@
+"""Tests for the keys and indexes of the association tables, and for the upgrade of legacy tables."""
+
+# type: ignore
+import os
+import pytest
+from sqlalchemy import inspect, select, text
+from betterave_backend.create_app import create_app
+from betterave_backend.extensions import db
+from betterave_backend.app.models import (
+    Event,
+    EventAudience,
+    Homework,
+    Lesson,
+    Message,
+    Notification,
+    UserLevel,
+    UserType,
+    event_attendance,
+    event_series_attendance,
+    group_enrollment,
+    notification_reception,
+)
+from betterave_backend.app.models.user import association_subscriptions
+from betterave_backend.app.operations.user_operations import add_user
+from betterave_backend.app.operations.asso_operations import subscribe_to_asso
+from betterave_backend.app.operations.event_operations import add_event, get_event_attendee_ids
+from betterave_backend.app.operations.notification_operations import get_all_notifications
+from betterave_backend.scripts.upgrade_association_tables import upgrade_association_tables
+from betterave_backend.scripts.add_missing_columns_and_indexes import add_missing_columns_and_indexes
+
+# The PostgreSQL query plans are only checked when a test database is given
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+# Hot lookups of each association table, in both directions
+HOT_LOOKUPS = [
+    (association_subscriptions, "subscriber_id", "asso_id"),
+    (association_subscriptions, "asso_id", "subscriber_id"),
+    (event_attendance, "user_id", "event_id"),
+    (event_attendance, "event_id", "user_id"),
+    (event_series_attendance, "user_id", "series_id"),
+    (event_series_attendance, "series_id", "user_id"),
+    (notification_reception, "user_id", "notification_id"),
+    (notification_reception, "notification_id", "user_id"),
+    (group_enrollment, "student_id", "group_id"),
+    (group_enrollment, "group_id", "student_id"),
+]
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def plan_database(request):
+    """Create the tables in an SQLite or PostgreSQL database and yield the dialect name."""
+    if request.param == "postgresql" and not POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    app = create_app(db_test_path=POSTGRES_URL if request.param == "postgresql" else "sqlite:///:memory:")
+    with app.app_context():
+        db.create_all()
+        yield request.param
+        db.session.remove()
+        db.drop_all()
+
+
+def query_plan(dialect: str, statement) -> str:
+    """Return the query plan of a statement as text."""
+    sql = statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True})
+    connection = db.session.connection()
+    if dialect == "sqlite":
+        return "\n".join(row.detail for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+    # On small tables PostgreSQL prefers a sequential scan, which is only used here if there is no index
+    connection.exec_driver_sql("SET enable_seqscan = off")
+    return "\n".join(row[0] for row in connection.exec_driver_sql(f"EXPLAIN {sql}"))
+
+
+@pytest.mark.parametrize("table, column, other", HOT_LOOKUPS, ids=lambda value: getattr(value, "name", value))
+def test_hot_lookups_use_an_index(plan_database, table, column, other):
+    """The lookups of an association table from either of its columns, and membership checks, use an index."""
+    for statement in (
+        select(table.c[other]).where(table.c[column] == 1),
+        select(table.c[column]).where(table.c[column] == 1, table.c[other] == 2),
+    ):
+        plan = query_plan(plan_database, statement)
+        if plan_database == "sqlite":
+            assert "USING" in plan and ("INDEX" in plan or "PRIMARY KEY" in plan), plan
+        else:
+            assert "Index" in plan and "Seq Scan" not in plan, plan
+
+
+def test_association_tables_have_primary_keys(test_client):
+    """Every association table has a composite primary key and an index for the reverse direction."""
+    inspector = inspect(db.engine)
+    for table, column, other in HOT_LOOKUPS[::2]:
+        assert inspector.get_pk_constraint(table.name)["constrained_columns"] == [column, other]
+        assert [other] in [index["column_names"] for index in inspector.get_indexes(table.name)]
+
+
+def test_upgrade_legacy_association_tables(test_client):
+    """The upgrade rebuilds the tables without primary key, deduplicates them and keeps the opt-ins only."""
+    asso_id = add_user("BDE", "", "asso_pic_url", UserType.ASSO, UserLevel.NA)
+    subscriber_id = add_user("Alice", "Martins", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    other_id = add_user("Bob", "Martins", "student_pic_url", UserType.STUDENT, UserLevel._2A)
+    subscribe_to_asso(subscriber_id, asso_id)
+    event_id = add_event(asso_id, "Gala", "2024-03-01", "20:00", "23:00", "Subscribers")
+
+    # Legacy schema: no keys, a materialized audience and no audience rules
+    db.session.execute(EventAudience.__table__.delete())
+    for table, columns in (
+        (association_subscriptions, "subscriber_id, asso_id"),
+        (event_attendance, "user_id, event_id"),
+    ):
+        db.session.execute(text(f"DROP TABLE {table.name}"))
+        db.session.execute(text(f"CREATE TABLE {table.name} ({columns.replace(',', ' INTEGER,')} INTEGER)"))
+    db.session.execute(
+        text(f"INSERT INTO association_subscriptions VALUES ({subscriber_id}, {asso_id}), ({subscriber_id}, {asso_id})")
+    )
+    attendance = [(subscriber_id, event_id), (subscriber_id, event_id), (other_id, event_id)]
+    for user_id, attended_id in attendance:
+        db.session.execute(text(f"INSERT INTO event_attendance VALUES ({user_id}, {attended_id})"))
+    db.session.commit()
+
+    rebuilt = upgrade_association_tables()
+    db.session.commit()
+    assert rebuilt == {"association_subscriptions": (2, 1), "event_attendance": (3, 1)}
+    assert EventAudience.query.filter_by(event_id=event_id).count() == 1
+    assert db.session.execute(select(event_attendance)).all() == [(other_id, event_id, True)]
+    assert get_event_attendee_ids(event_id) == [subscriber_id, other_id]
+
+    # Running it again changes nothing
+    assert upgrade_association_tables() == {}
+    assert get_event_attendee_ids(event_id) == [subscriber_id, other_id]
+
+
+def test_upgrade_tables_without_their_new_columns_and_indexes(test_client):
+    """The upgrade of a database created before notification.created_at and the new indexes adds them."""
+    admin_id = add_user("Directeur", "Admin", "admin_pic_url", UserType.ADMIN, UserLevel.NA)
+    tables = [model.__table__ for model in (Lesson, Event, Homework, Message, Notification)]
+    indexes = [index for table in tables for index in table.indexes]
+    for index in indexes:
+        db.session.execute(text(f"DROP INDEX {index.name}"))
+    db.session.execute(text("ALTER TABLE notification DROP COLUMN created_at"))
+    db.session.execute(
+        text(
+            "INSERT INTO notification (title, content, sent_by_user_id, recipient_type) "
+            f"VALUES ('Welcome', 'Hello', {admin_id}, 'All users')"
+        )
+    )
+    db.session.commit()
+
+    # The association tables upgrade reads the notifications, so it adds the column first
+    assert upgrade_association_tables() == {}
+    db.session.commit()
+    inspector = inspect(db.engine)
+    assert "created_at" in {column["name"] for column in inspector.get_columns("notification")}
+    for table in tables:
+        assert {index.name for index in table.indexes} <= {index["name"] for index in inspector.get_indexes(table.name)}
+    [notification] = get_all_notifications()
+    assert notification.title == "Welcome" and notification.created_at is not None
+
+    # Running it again changes nothing
+    assert add_missing_columns_and_indexes() == []
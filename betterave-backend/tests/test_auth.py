@@ -1,6 +1,7 @@
 """Tests for the authentication endpoints."""
 
 # type: ignore
+from betterave_backend.extensions import mail
 from betterave_backend.app.models import UserLevel, UserType
 from betterave_backend.app.operations import user_operations
 
@@ -32,3 +33,17 @@ def test_logout_route(test_client):
     response = test_client.post("/auth/logout")
 
     assert response.status_code == 200
+
+
+def test_reset_password_route(test_client):
+    """ResetPassword.POST should send the reset token by email within the request."""
+    user_id = user_operations.add_user("Martine", "Garcia", "martine_garcia.jpg", UserType.STUDENT, UserLevel._1A)
+
+    with mail.record_messages() as outbox:
+        response = test_client.post("/auth/reset-password", json={"email": "martine.garcia@ensae.fr"})
+    assert response.status_code == 200
+    assert len(outbox) == 1
+    assert outbox[0].recipients == ["martine.garcia@ensae.fr"]
+    assert user_operations.get_user_by_id(user_id).reset_token in outbox[0].body
+
+    assert test_client.post("/auth/reset-password", json={"email": "nobody@ensae.fr"}).status_code == 404
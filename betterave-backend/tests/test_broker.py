@@ -0,0 +1,128 @@
+"""Tests for the chat broker backends and the Server-Sent Events chat streams."""
+
+# type: ignore
+import json
+import threading
+import time
+import pytest
+from betterave_backend.extensions import chat_broker
+from betterave_backend.app.broker import DatabaseChatBroker, MemoryChatBroker, server_sent_event
+from betterave_backend.app.models import UserType, UserLevel
+from betterave_backend.app.operations.user_operations import add_user
+from betterave_backend.app.operations.class_operations import add_class
+from betterave_backend.app.operations.class_group_operations import add_class_group
+from betterave_backend.app.operations.message_operations import add_message_to_group, iter_new_messages
+
+
+@pytest.fixture
+def setup_group(test_client) -> int:
+    """Create a class with its main group and return the ID of the group."""
+    teacher_id = add_user("John", "Martins", "teacher_pic_url", UserType.TEACHER, UserLevel.NA)
+    add_class(
+        class_id=7,
+        name="Test Class",
+        ects_credits=3,
+        default_teacher_id=teacher_id,
+        level="1A",
+        background_color="#123456",
+    )
+    return add_class_group(name="Main", class_id=7, is_main_group=True)
+
+
+@pytest.fixture
+def setup_sender(test_client) -> int:
+    """Create a student and return their ID."""
+    return add_user("Lucas", "Felix", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+
+
+@pytest.fixture
+def short_streams(monkeypatch):
+    """Close the chat streams after half a second."""
+    monkeypatch.setattr(chat_broker, "max_duration", 0.5)
+
+
+def parse_events(body: str) -> list[dict]:
+    """Return the events of a Server-Sent Events body, without the comments."""
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if line and not line.startswith(":"))
+        if "data" in fields:
+            events.append({"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])})
+    return events
+
+
+def test_memory_broker_wakes_waiting_streams():
+    """A stream waiting on a group is woken by a message published to it, not by one published to another group."""
+    broker = MemoryChatBroker()
+    assert not broker.wait(1, 0, timeout=0.01)
+
+    threading.Timer(0.05, broker.publish, (2, 5)).start()
+    threading.Timer(0.1, broker.publish, (1, 3)).start()
+    start = time.monotonic()
+    assert broker.wait(1, 0, timeout=5)
+    assert time.monotonic() - start < 1
+    # Already published messages do not wake the streams
+    assert not broker.wait(1, 3, timeout=0.01)
+
+
+def test_database_broker_polls():
+    """The database broker wakes the streams every poll interval, to query the messages of the other workers."""
+    broker = DatabaseChatBroker(poll_interval=0.05)
+    start = time.monotonic()
+    assert broker.wait(1, 0, timeout=5)
+    assert time.monotonic() - start < 1
+
+
+def test_server_sent_event():
+    """Events are formatted as an id, an event type and JSON data, ended by a blank line."""
+    assert server_sent_event({"a": 1}, 4, "message") == 'id: 4\nevent: message\ndata: {"a": 1}\n\n'
+
+
+def test_iter_new_messages(setup_group, setup_sender, monkeypatch):
+    """The stream yields the missed messages, then the new ones as they are posted, and keepalives in between."""
+    first = add_message_to_group("First", setup_group, setup_sender)
+    second = add_message_to_group("Second", setup_group, setup_sender)
+    first_id, second_id = first.message_id, second.message_id
+
+    # Another request posts a message while the stream waits
+    def post_while_waiting(group_id, last_id, deadline=None):
+        add_message_to_group("Live", group_id, setup_sender)
+
+    monkeypatch.setattr(chat_broker, "wait", post_while_waiting)
+    stream = iter_new_messages(setup_group, first_id)
+    assert [message["message_id"] for message in next(stream)] == [second_id]
+    assert [message["content"] for message in next(stream)] == ["Live"]
+
+    monkeypatch.setattr(chat_broker, "wait", lambda *args: None)
+    monkeypatch.setattr(chat_broker, "keepalive", 0)
+    assert next(stream) == []
+    stream.close()
+
+
+def test_group_message_stream_route(test_client, setup_group, setup_sender, short_streams):
+    """GroupMessageStream.GET should stream the messages posted after the Last-Event-ID."""
+    ids = [add_message_to_group(f"Message {i}", setup_group, setup_sender).message_id for i in range(3)]
+
+    response = test_client.get(f"/class_groups/{setup_group}/messages/stream", headers={"Last-Event-ID": str(ids[0])})
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    body = response.get_data(as_text=True)
+    assert body.startswith("retry: ")
+    events = parse_events(body)
+    assert [event["id"] for event in events] == ids[1:]
+    assert events[0]["event"] == "message"
+    assert events[0]["data"]["content"] == "Message 1"
+    assert events[0]["data"]["sender_details"]["user_id"] == setup_sender
+
+    # Without Last-Event-ID, the stream starts after the newest message
+    response = test_client.get(f"/class_groups/{setup_group}/messages/stream")
+    assert parse_events(response.get_data(as_text=True)) == []
+    response = test_client.get(f"/class_groups/{setup_group}/messages/stream?last_event_id={ids[1]}")
+    assert [event["id"] for event in parse_events(response.get_data(as_text=True))] == ids[2:]
+
+    response = test_client.get("/classes/7/messages/stream", headers={"Last-Event-ID": str(ids[1])})
+    assert [event["id"] for event in parse_events(response.get_data(as_text=True))] == ids[2:]
+
+    assert test_client.get("/class_groups/999/messages/stream").status_code == 404
+    headers = {"Last-Event-ID": "abc"}
+    assert test_client.get(f"/class_groups/{setup_group}/messages/stream", headers=headers).status_code == 400
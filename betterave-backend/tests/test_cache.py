@@ -0,0 +1,210 @@
+"""Tests for the response cache and its invalidation through data versions."""
+
+# type: ignore
+from datetime import date, time
+import pytest
+from betterave_backend.extensions import cache
+from betterave_backend.app.cache import MemoryCacheBackend, SQLiteCacheBackend
+from betterave_backend.extensions import db
+from betterave_backend.app.models import Message, UserType, UserLevel
+from betterave_backend.app.operations.user_operations import add_user
+from betterave_backend.app.operations.class_operations import add_class
+from betterave_backend.app.operations.class_group_operations import add_class_group, enroll_student_in_group
+from betterave_backend.app.operations.lesson_operations import add_lesson, update_lesson
+from betterave_backend.app.operations import data_version_operations
+from betterave_backend.app.operations.data_version_operations import (
+    GLOBAL_OWNER_ID,
+    LESSONS_SCOPE,
+    bump_data_versions,
+    get_data_version,
+    table_scope,
+)
+
+LESSON_DATE = date(2023, 12, 21)
+
+
+@pytest.fixture
+def setup_teacher(test_client) -> int:
+    """Create a teacher and return their ID."""
+    return add_user("John", "Martins", "teacher_pic_url", UserType.TEACHER, UserLevel.NA)
+
+
+@pytest.fixture
+def setup_student(test_client) -> int:
+    """Create a student and return their ID."""
+    return add_user("Lucas", "Felix", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+
+
+@pytest.fixture
+def setup_groups(test_client, setup_teacher) -> tuple[int, int]:
+    """Create a class with two groups and return their IDs."""
+    add_class(
+        class_id=5,
+        name="Test Class",
+        ects_credits=3,
+        default_teacher_id=setup_teacher,
+        level="1A",
+        background_color="#123456",
+    )
+    return (
+        add_class_group(name="Cours", is_main_group=True, class_id=5),
+        add_class_group(name="TD 1", is_main_group=False, class_id=5),
+    )
+
+
+def new_lesson(group_id: int, teacher_id: int) -> int:
+    """Add a lesson to the group and return its ID."""
+    return add_lesson(
+        group_id=group_id,
+        date=LESSON_DATE,
+        start_time=time(9, 0),
+        end_time=time(10, 0),
+        homework="",
+        room="A10",
+        teacher_id=teacher_id,
+    )
+
+
+def test_memory_backend_lru_and_ttl(monkeypatch):
+    """Test that the memory backend evicts the least recently used entry and expires old ones."""
+    backend = MemoryCacheBackend(max_entries=2, ttl=10)
+    backend.set("a", "1")
+    backend.set("b", "2")
+    assert backend.get("a") == "1"
+    backend.set("c", "3")
+    assert backend.get("b") is None
+    assert backend.get("a") == "1" and backend.get("c") == "3"
+
+    backend.ttl = -1
+    backend.set("d", "4")
+    assert backend.get("d") is None
+
+
+def test_sqlite_backend_is_shared(tmp_path):
+    """Test that two SQLite backends on the same file, as in two workers, share their entries."""
+    path = str(tmp_path / "cache.db")
+    first = SQLiteCacheBackend(path, max_entries=2, ttl=10)
+    second = SQLiteCacheBackend(path, max_entries=2, ttl=10)
+    first.set("a", "1")
+    assert second.get("a") == "1"
+
+    first.set("b", "2")
+    first.set("c", "3")
+    first.prune()
+    assert len(second) == 2
+
+
+def test_bump_data_versions(test_client):
+    """Test that versions start at 0 and are only incremented for the given owners."""
+    assert get_data_version(1, LESSONS_SCOPE) == 0
+    bump_data_versions(LESSONS_SCOPE, [1, 2])
+    bump_data_versions(LESSONS_SCOPE, [1])
+    assert get_data_version(1, LESSONS_SCOPE) == 2
+    assert get_data_version(2, LESSONS_SCOPE) == 1
+    assert get_data_version(3, LESSONS_SCOPE) == 0
+
+
+def test_bump_data_versions_upsert(test_client, query_counter):
+    """Existing and missing versions are bumped together by a single upsert, which cannot insert twice."""
+    bump_data_versions(LESSONS_SCOPE, [1])
+    query_counter.count = 0
+    bump_data_versions(LESSONS_SCOPE, [1, 2, 3])
+    assert query_counter.count == 1
+    assert [get_data_version(owner_id, LESSONS_SCOPE) for owner_id in (1, 2, 3)] == [2, 1, 1]
+
+
+def test_bump_data_versions_without_upserts(test_client, setup_student, setup_groups, monkeypatch):
+    """On the dialects without upserts, versions are bumped by an update and an insert, and writes still commit."""
+    monkeypatch.setattr(data_version_operations, "UPSERT_INSERTS", {})
+    bump_data_versions(LESSONS_SCOPE, [1])
+    bump_data_versions(LESSONS_SCOPE, [1, 2])
+    assert [get_data_version(owner_id, LESSONS_SCOPE) for owner_id in (1, 2, 3)] == [2, 1, 0]
+
+    main_group, _ = setup_groups
+    version = get_data_version(GLOBAL_OWNER_ID, table_scope("message"))
+    db.session.add(Message(content="Hello", group_id=main_group, user_id=setup_student))
+    db.session.commit()
+    assert get_data_version(GLOBAL_OWNER_ID, table_scope("message")) == version + 1
+
+
+def test_table_versions_are_bumped_once_per_transaction(test_client, setup_student, setup_groups):
+    """A table version is bumped once at the commit of a transaction, however many flushes wrote to the table."""
+    main_group, _ = setup_groups
+    version = get_data_version(GLOBAL_OWNER_ID, table_scope("message"))
+    for i in range(3):
+        db.session.add(Message(content=f"Message {i}", group_id=main_group, user_id=setup_student))
+        db.session.flush()
+    assert get_data_version(GLOBAL_OWNER_ID, table_scope("message")) == version
+    db.session.commit()
+    assert get_data_version(GLOBAL_OWNER_ID, table_scope("message")) == version + 1
+
+    # Changes rolled back do not bump the version at the next commit
+    db.session.add(Message(content="Rolled back", group_id=main_group, user_id=setup_student))
+    db.session.flush()
+    db.session.rollback()
+    db.session.commit()
+    assert get_data_version(GLOBAL_OWNER_ID, table_scope("message")) == version + 1
+
+
+def test_user_lessons_cache_hit_and_invalidation(test_client, setup_student, setup_teacher, setup_groups):
+    """Test that user lessons are served from the cache until a change of the user's calendar."""
+    main_group, other_group = setup_groups
+    lesson_id = new_lesson(main_group, setup_teacher)
+    enroll_student_in_group(setup_student, main_group)
+    url = f"/users/{setup_student}/lessons"
+
+    response = test_client.get(url)
+    assert response.status_code == 200
+    assert len(response.json) == 1
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert test_client.get(url).json == response.json
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Another group's lesson does not touch the student's calendar
+    other_lesson_id = new_lesson(other_group, setup_teacher)
+    test_client.get(url)
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # A change of a lesson of the student's groups is visible immediately
+    update_lesson(lesson_id, {"room": "B2"})
+    assert test_client.get(url).json[0]["room"] == "B2"
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    # So is a change of the student's enrollments
+    enroll_student_in_group(setup_student, other_group)
+    assert {lesson["lesson_id"] for lesson in test_client.get(url).json} == {lesson_id, other_lesson_id}
+    assert (cache.hits, cache.misses) == (2, 3)
+
+    # Query arguments are part of the key
+    assert test_client.get(url, query_string={"start": "2024-01-01"}).json == []
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_teacher_lessons_cache_invalidation(test_client, setup_teacher, setup_groups):
+    """Test that a new lesson invalidates the cached calendar of its teacher."""
+    url = f"/users/{setup_teacher}/lessons/future"
+    assert test_client.get(url).json == []
+    add_lesson(
+        group_id=setup_groups[0],
+        date=date.today(),
+        start_time=time(23, 0),
+        end_time=time(23, 30),
+        homework="",
+        room="A10",
+        teacher_id=setup_teacher,
+    )
+    assert len(test_client.get(url).json) == 1
+    assert cache.hits == 0
+
+
+def test_cache_monitoring_route(test_client, setup_student):
+    """Test that the monitoring route exposes the hit/miss counters."""
+    url = f"/users/{setup_student}/lessons"
+    test_client.get(url)
+    test_client.get(url)
+    response = test_client.get("/monitoring/cache")
+    assert response.status_code == 200
+    assert response.json["backend"] == "memory"
+    assert response.json["hits"] == 1
+    assert response.json["misses"] == 1
+    assert response.json["hit_ratio"] == 0.5
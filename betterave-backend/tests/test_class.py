@@ -166,3 +166,95 @@ def test_delete_class_route(test_client, setup_login_admin, setup_class):
     """ClassResource.DELETE should return 204 if the class is deleted."""
     response = test_client.delete(f"/classes/{setup_class}")
     assert response.status_code == 204
+
+
+def test_get_user_homework_route(test_client, setup_class, setup_class_group):
+    """Homework.GET should return the homework of the current user by due date, in the window and up to the limit."""
+    from betterave_backend.app.operations.user_class_group_operations import enroll_user_in_class
+
+    student_id = add_user("Alice", "Georges", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    enroll_user_in_class(student_id, setup_class)
+    for due_date in ("2024-01-03", "2024-01-01", "2024-01-02"):
+        add_homework_to_class(HOMEWORK_CONTENT, setup_class, due_date, DUE_TIME)
+    test_client.post("/auth/login", json={"email": "alice.georges@ensae.fr", "password": "ageorges"})
+    response = test_client.get("/classes/homework", query_string={"start": "2024-01-02"})
+    assert response.status_code == 200
+    assert [hmw["due_date"] for hmw in response.json] == ["2024-01-02", "2024-01-03"]
+    response = test_client.get("/classes/homework", query_string={"limit": 1})
+    assert [hmw["due_date"] for hmw in response.json] == ["2024-01-01"]
+
+
+def test_get_class_grade_stats_route(test_client, setup_class, setup_login_teacher):
+    """ClassGradeStats.GET should return the statistics of the class, cached until one of its grades changes."""
+    from betterave_backend.extensions import cache
+    from betterave_backend.app.operations.grade_operations import add_grade, update_student_grade
+
+    student_id = add_user("Alice", "Georges", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    add_grade(student_id, setup_class, 12)
+    url = f"/classes/{setup_class}/grades/stats"
+    response = test_client.get(url)
+    assert response.status_code == 200
+    assert response.json["count"] == 1
+    assert response.json["levels"] == [{"level": "1A", "count": 1, "mean": 12, "std": 0, "min": 12, "max": 12}]
+
+    hits = cache.hits
+    assert test_client.get(url).json == response.json
+    assert cache.hits == hits + 1
+    update_student_grade(setup_class, student_id, 16)
+    assert test_client.get(url).json["mean"] == 16
+    assert test_client.get("/classes/grades/stats").json["count"] == 1
+    assert test_client.get("/classes/999/grades/stats").status_code == 404
+
+
+def test_get_grade_stats_route_forbidden_to_students(test_client, setup_class):
+    """The grade statistics should only be available to teachers and admins."""
+    add_user("Alice", "Georges", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    test_client.post("/auth/login", json={"email": "alice.georges@ensae.fr", "password": "ageorges"})
+    assert test_client.get(f"/classes/{setup_class}/grades/stats").status_code == 403
+    assert test_client.get("/classes/grades/stats").status_code == 403
+
+
+def test_post_class_grades_route(test_client, setup_class, setup_login_teacher):
+    """ClassGrades.POST should set the grades given as JSON or CSV, or report the invalid rows."""
+    from betterave_backend.app.operations.grade_operations import get_grades_by_student_and_class_id
+    from betterave_backend.app.operations.user_class_group_operations import add_user_class_group
+
+    student_id = add_user("Alice", "Georges", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    add_user_class_group(student_id, setup_class, None)
+    url = f"/classes/{setup_class}/grades"
+    response = test_client.post(url, json={"grades": [{"student_id": student_id, "grade": 13}]})
+    assert response.status_code == 200
+    assert response.json == {"imported": 1, "errors": []}
+
+    csv = "email;grade\nalice.georges@ensae.fr;15,5\n"
+    response = test_client.post(url, data=csv, content_type="text/csv")
+    assert response.status_code == 200
+    assert get_grades_by_student_and_class_id(student_id, setup_class)[0].grade == 15.5
+
+    response = test_client.post(url, json=[{"student_id": student_id, "grade": 25}])
+    assert response.status_code == 400
+    assert response.json["errors"] == [
+        {"row": 1, "student": str(student_id), "error": "The grade must be a number between 0 and 20"}
+    ]
+    assert test_client.post(url, json={"grades": "none"}).status_code == 400
+    assert test_client.post("/classes/999/grades", json=[]).status_code == 404
+
+
+def test_get_teacher_grade_matrix_route(test_client, setup_class, setup_login_teacher, setup_teacher, setup_admin):
+    """ClassTeacherGrades.GET should return the grade matrix of the classes of the teacher."""
+    from betterave_backend.app.operations.grade_operations import add_grade, update_student_grade
+    from betterave_backend.app.operations.user_class_group_operations import add_user_class_group
+
+    student_id = add_user("Alice", "Georges", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    add_user_class_group(student_id, setup_class, None)
+    add_grade(student_id, setup_class, 12)
+    url = "/classes/teacherclasses/me/grades"
+    response = test_client.get(url)
+    assert response.status_code == 200
+    assert response.json == {"student_ids": [student_id], "class_ids": [setup_class], "grades": [12.0]}
+    etag = response.headers["ETag"]
+    assert test_client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    update_student_grade(setup_class, student_id, 14)
+    assert test_client.get(url, headers={"If-None-Match": etag}).json["grades"] == [14.0]
+    assert test_client.get(f"/classes/teacherclasses/{setup_teacher}/grades").status_code == 200
+    assert test_client.get(f"/classes/teacherclasses/{setup_admin}/grades").status_code == 403
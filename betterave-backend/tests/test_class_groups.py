@@ -5,6 +5,7 @@ import pytest
 from betterave_backend.app.operations.class_group_operations import add_class_group
 from betterave_backend.app.operations.user_operations import add_user
 from betterave_backend.app.operations.class_operations import add_class
+from betterave_backend.app.operations.message_operations import add_message_to_group
 from betterave_backend.app.models import UserType, UserLevel
 
 # Constants for the test
@@ -78,6 +79,24 @@ def test_get_class_group_message_route(test_client):
     assert response.status_code == 200
 
 
+def test_get_class_group_message_page_route(test_client, setup_login_teacher):
+    """GroupMessages.GET should return a page of messages newest first, and 400 for an invalid page size."""
+    for content in ("First", "Second", "Third"):
+        test_client.post("/class_groups/2/messages", json={"content": content})
+
+    response = test_client.get("/class_groups/2/messages?limit=2")
+    assert response.status_code == 200
+    assert [message["content"] for message in response.json] == ["Third", "Second"]
+    before = response.json[-1]["message_id"]
+    response = test_client.get(f"/class_groups/2/messages?before={before}&limit=2")
+    assert [message["content"] for message in response.json] == ["First"]
+    # A cursor of another group, or deleted, is rejected instead of returning an empty page
+    assert test_client.get(f"/class_groups/1/messages?after={before}").status_code == 400
+    assert test_client.get("/class_groups/2/messages?after=999999").status_code == 400
+    assert test_client.get("/class_groups/2/messages?limit=0").status_code == 400
+    assert test_client.get("/class_groups/2/messages?limit=1000").status_code == 400
+
+
 def test_post_class_group_message_route(test_client, setup_login_teacher):
     """ClassGroupResource.POST should return 201."""
     payload = {
@@ -91,3 +110,21 @@ def test_delete_class_group_route(test_client, setup_login_teacher, setup_class_
     """ClassGroupResource.DELETE should return 200."""
     response = test_client.delete(f"/class_groups/{setup_class_group}")
     assert response.status_code == 204
+
+
+@pytest.mark.parametrize("url", ["/classes/{class_id}/messages", "/class_groups/{group_id}/messages"])
+def test_get_messages_statement_count(test_client, setup_class, count_request_statements, url):
+    """The messages routes should load the senders with the messages, in as many statements whatever their number."""
+    group_id = add_class_group(name="Cours", class_id=setup_class, is_main_group=True)
+    url = url.format(class_id=setup_class, group_id=group_id)
+    first_id = add_user("Student", "First", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    add_message_to_group("Hello", group_id, first_id)
+    count, response = count_request_statements(url)
+    assert response.status_code == 200
+    assert len(response.json) == 1
+
+    for i in range(5):
+        sender_id = add_user(f"Student{i}", "Other", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+        add_message_to_group(f"Hello {i}", group_id, sender_id)
+    count_with_more_senders, response = count_request_statements(url)
+    assert (count_with_more_senders, len(response.json)) == (count, 6)
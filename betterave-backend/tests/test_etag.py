@@ -0,0 +1,103 @@
+"""Tests for the ETag / If-None-Match support of the list endpoints."""
+
+# type: ignore
+from datetime import date, time
+import pytest
+from betterave_backend.app.models import UserType, UserLevel
+from betterave_backend.app.operations.user_operations import add_user
+from betterave_backend.app.operations.class_operations import add_class
+from betterave_backend.app.operations.class_group_operations import add_class_group, enroll_student_in_group
+from betterave_backend.app.operations.lesson_operations import add_lesson, update_lesson
+from betterave_backend.app.operations.event_operations import add_event
+from betterave_backend.app.operations.asso_operations import subscribe_to_asso
+
+
+@pytest.fixture
+def setup_student(test_client) -> int:
+    """Create a student and return their ID."""
+    return add_user("Lucas", "Felix", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+
+
+@pytest.fixture
+def setup_group(test_client) -> int:
+    """Create a class with a main group and return the group ID."""
+    teacher_id = add_user("John", "Martins", "teacher_pic_url", UserType.TEACHER, UserLevel.NA)
+    add_class(
+        class_id=5,
+        name="Test Class",
+        ects_credits=3,
+        default_teacher_id=teacher_id,
+        level="1A",
+        background_color="#123456",
+    )
+    return add_class_group(name="Cours", is_main_group=True, class_id=5)
+
+
+def test_etag_not_modified(test_client, setup_student, setup_group):
+    """Test that a matching If-None-Match gets an empty 304 until the user's lessons change."""
+    lesson_id = add_lesson(setup_group, date(2023, 12, 21), time(9, 0), time(10, 0), "", "A10", None)
+    enroll_student_in_group(setup_student, setup_group)
+    url = f"/users/{setup_student}/lessons"
+
+    response = test_client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith('"') and etag.endswith('"')
+
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+    # Query arguments are part of the ETag
+    assert test_client.get(url, query_string={"start": "2024-01-01"}).headers["ETag"] != etag
+
+    update_lesson(lesson_id, {"room": "B2"})
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_etag_is_per_user(test_client, setup_student, setup_group):
+    """Test that a change of another user's calendar keeps the ETag of a user."""
+    other_student = add_user("Alice", "Adams", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    etag = test_client.get(f"/users/{setup_student}/lessons").headers["ETag"]
+    enroll_student_in_group(other_student, setup_group)
+    add_lesson(setup_group, date(2023, 12, 21), time(9, 0), time(10, 0), "", "A10", None)
+    response = test_client.get(f"/users/{setup_student}/lessons", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_etag_follows_table_changes(test_client, setup_group):
+    """Test that global lists get a new ETag as soon as a row of their table is written."""
+    etag = test_client.get("/classes/").headers["ETag"]
+    assert test_client.get("/classes/", headers={"If-None-Match": etag}).status_code == 304
+    teacher_id = add_user("Jane", "Martins", "teacher_pic_url", UserType.TEACHER, UserLevel.NA)
+    etag = test_client.get("/classes/").headers["ETag"]
+    add_class(class_id=6, name="Other", ects_credits=3, default_teacher_id=teacher_id, level="1A", background_color="")
+    response = test_client.get("/classes/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json) == 2
+
+
+def test_etag_user_events(test_client, setup_student):
+    """Test that the events ETag of a user changes with new events and their subscriptions only."""
+    asso_id = add_user("BDE", "Asso", "asso_pic_url", UserType.ASSO, UserLevel.NA)
+    other_id = add_user("Nina", "Felix", "student_pic_url", UserType.STUDENT, UserLevel._2A)
+    url = f"/users/{setup_student}/events"
+    etag = test_client.get(url).headers["ETag"]
+
+    # Events are shared through their audience rules, any change of an event is a change for every user
+    add_event(asso_id, "Gala", date(2023, 12, 21), time(20, 0), time(23, 0), "Subscribers")
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json == []
+    etag = response.headers["ETag"]
+
+    subscribe_to_asso(other_id, asso_id)
+    assert test_client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    subscribe_to_asso(setup_student, asso_id)
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json) == 1
@@ -2,7 +2,9 @@
 
 # type: ignore
 import pytest
-from betterave_backend.app.models import User
+from sqlalchemy import event as sqlalchemy_event
+from betterave_backend.extensions import db
+from betterave_backend.app.models import User, EventAudience, event_attendance
 from betterave_backend.app.models import UserType, UserLevel
 from datetime import date, time
 from betterave_backend.app.operations.event_operations import (
@@ -17,8 +19,10 @@ from betterave_backend.app.operations.event_operations import (
     get_user_future_events,
     get_association_future_events,
     add_attendees_to_event,
+    get_event_attendee_ids,
+    set_event_attendance,
 )
-from betterave_backend.app.operations.user_operations import add_user
+from betterave_backend.app.operations.user_operations import add_user, update_user, delete_user
 
 # Constants
 ASSO_NAME = "Betterave"
@@ -145,3 +149,93 @@ def test_add_attendees_to_event(test_client, setup_event, setup_student):
     """Test adding attendees to an event."""
     success = add_attendees_to_event(setup_event, user_ids=[setup_student])
     assert success is True
+
+
+def test_event_audience_rules(test_client, setup_asso, setup_student, query_counter):
+    """The audience of an event is a rule, matching users created or updated after the event."""
+    event_id = add_event(setup_asso, "Afterwork", EVENT_DATE, START_TIME, END_TIME, "1A")
+    assert EventAudience.query.filter_by(event_id=event_id).count() == 1
+    assert db.session.execute(db.select(db.func.count()).select_from(event_attendance)).scalar() == 0
+    assert get_event_attendee_ids(event_id) == [setup_student]
+
+    # Creating a user does not depend on the number of events
+    add_event(setup_asso, "Gala", EVENT_DATE, START_TIME, END_TIME, "All users")
+    query_counter.count = 0
+    late_id = add_user("Jane", "Mac", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    statements = query_counter.count
+    for _ in range(5):
+        add_event(setup_asso, "Gala", EVENT_DATE, START_TIME, END_TIME, "All users")
+    query_counter.count = 0
+    add_user("Jim", "Mac", "student_pic_url", UserType.STUDENT, UserLevel._3A)
+    assert query_counter.count == statements
+    assert get_event_attendee_ids(event_id) == [setup_student, late_id]
+
+    update_user(late_id, {"level": "2A"})
+    assert get_event_attendee_ids(event_id) == [setup_student]
+
+    # Adding a level to the audience adds a rule
+    assert add_attendees_to_event(event_id, user_level="2A")
+    assert get_event_attendee_ids(event_id) == [setup_student, late_id]
+
+
+def test_add_attendees_to_event_is_set_based(test_client, setup_asso, setup_student, query_counter):
+    """Adding attendees never loads users, is idempotent and takes the same statements for any number of users."""
+    event_id = add_event(setup_asso, "Afterwork", EVENT_DATE, START_TIME, END_TIME, "2A")
+    user_ids = [add_user(f"User{i}", "Mac", "student_pic_url", UserType.STUDENT, UserLevel._3A) for i in range(4)]
+    set_event_attendance(event_id, user_ids[0], False)
+    db.session.expunge_all()
+
+    loaded = []
+
+    def count_load(target, context):
+        loaded.append(target)
+
+    sqlalchemy_event.listen(User, "load", count_load)
+    try:
+        assert add_attendees_to_event(event_id, user_ids=user_ids + [setup_student, 9999])
+        query_counter.count = 0
+        assert add_attendees_to_event(event_id, user_ids=user_ids + [setup_student])
+        statements = query_counter.count
+        query_counter.count = 0
+        assert add_attendees_to_event(event_id, user_ids=user_ids[:1])
+        assert query_counter.count == statements
+        assert add_attendees_to_event(event_id, user_level="1A")
+        assert add_attendees_to_event(event_id, user_level="1A")
+        assert add_attendees_to_event(event_id)
+    finally:
+        sqlalchemy_event.remove(User, "load", count_load)
+    assert loaded == []
+
+    assert get_event_attendee_ids(event_id) == sorted([setup_asso, setup_student, *user_ids])
+    assert db.session.execute(db.select(db.func.count()).select_from(event_attendance)).scalar() == 5
+    assert [rule.kind.value for rule in EventAudience.query.filter_by(event_id=event_id)] == ["level", "level", "all"]
+
+
+def test_event_attendance_overrides(test_client, setup_asso, setup_student):
+    """Users can opt out of an event of their audience, or opt in an event of another audience."""
+    level_event = add_event(setup_asso, "Afterwork", EVENT_DATE, START_TIME, END_TIME, "1A")
+    other_event = add_event(setup_asso, "Gala", EVENT_DATE, END_TIME, time(11, 0), "2A")
+    assert [event.event_id for event in get_user_events(setup_student)] == [level_event]
+
+    assert set_event_attendance(level_event, setup_student, False)
+    assert set_event_attendance(other_event, setup_student, True)
+    assert [event.event_id for event in get_user_events(setup_student)] == [other_event]
+    assert get_event_attendee_ids(level_event) == []
+
+    # Removing the override follows the rules again
+    assert set_event_attendance(other_event, setup_student, None)
+    assert get_event_attendee_ids(other_event) == []
+    assert not set_event_attendance(-1, setup_student, True)
+
+    assert delete_user(setup_student)
+    assert db.session.execute(db.select(db.func.count()).select_from(event_attendance)).scalar() == 0
+
+
+def test_get_events_in_date_window(test_client, setup_asso, setup_student, setup_event):
+    """Only events in the [start, end) window are returned."""
+    add_event(setup_asso, "Later", date(2024, 11, 20), START_TIME, END_TIME, PARTICIPANT_TYPE)
+    window = {"start": date(2024, 10, 1), "end": date(2024, 11, 1)}
+    assert [event.event_id for event in get_all_events(**window)] == [setup_event]
+    assert [event.event_id for event in get_association_events(setup_asso, **window)] == [setup_event]
+    assert [event.event_id for event in get_user_events(setup_student, **window)] == [setup_event]
+    assert len(get_user_events(setup_student, start=date(2024, 11, 1))) == 1
@@ -0,0 +1,141 @@
+"""Tests for the association event series operations."""
+
+# type: ignore
+import pytest
+from datetime import date, time
+from betterave_backend.app.models import UserType, UserLevel, EventSeriesOverride
+from betterave_backend.app.operations.user_operations import add_user, update_user
+from betterave_backend.app.operations.asso_operations import subscribe_to_asso, unsubscribe_from_asso
+from betterave_backend.app.operations.event_operations import (
+    add_event,
+    get_all_events,
+    get_association_events,
+    get_user_events,
+    get_event_series_attendee_ids,
+)
+from betterave_backend.app.operations.event_series_operations import (
+    add_event_series,
+    update_event_series,
+    delete_event_series,
+    get_event_series_by_id,
+    get_all_event_series,
+    override_event_occurrence,
+    cancel_event_occurrence,
+)
+from betterave_backend.app.operations.data_version_operations import EVENTS_SCOPE, get_data_version
+
+# Mondays from 2023-09-04 to 2023-10-02 included
+SERIES_START = "2023-09-01"
+SERIES_UNTIL = "2023-10-02"
+MONDAYS = [date(2023, 9, 4), date(2023, 9, 11), date(2023, 9, 18), date(2023, 9, 25), date(2023, 10, 2)]
+
+
+@pytest.fixture
+def setup_asso(test_client) -> int:
+    """Create an association and return its ID."""
+    return add_user("Tribu", "", "asso_pic_url", UserType.ASSO, UserLevel.NA)
+
+
+@pytest.fixture
+def setup_students(test_client, setup_asso) -> list[int]:
+    """Create two students, the first one subscribed to the association, and return their IDs."""
+    subscriber_id = add_user("Alice", "Martins", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    other_id = add_user("Bob", "Martins", "student_pic_url", UserType.STUDENT, UserLevel._2A)
+    subscribe_to_asso(subscriber_id, setup_asso)
+    return [subscriber_id, other_id]
+
+
+@pytest.fixture
+def setup_series(test_client, setup_asso, setup_students) -> int:
+    """Create a weekly series of meetings on Mondays for the subscribers and return its ID."""
+    return add_event_series(
+        setup_asso,
+        "Réunion",
+        SERIES_START,
+        SERIES_UNTIL,
+        "18:00",
+        "19:00",
+        "Subscribers",
+        weekdays="MO",
+        location="Salle 1",
+    )
+
+
+def test_add_event_series(setup_series, setup_asso, setup_students):
+    """add_event_series should store the rule and the attendance once, for every occurrence."""
+    series = get_event_series_by_id(setup_series)
+    assert series.rrule == "FREQ=WEEKLY;INTERVAL=1;BYDAY=MO;UNTIL=20231002"
+    assert get_event_series_attendee_ids(setup_series) == [setup_students[0]]
+    assert get_all_event_series(setup_asso) == [series]
+    assert add_event_series(setup_asso, "Réunion", SERIES_UNTIL, SERIES_START, "18:00", "19:00", "All users") == -1
+
+
+def test_event_series_occurrences(setup_series, setup_asso, setup_students):
+    """Occurrences should be expanded for the window and merged with one-off events in chronological order."""
+    event_id = add_event(setup_asso, "Gala", "2023-09-12", "20:00", "23:00", "Subscribers")
+
+    events = get_all_events()
+    assert [event.date for event in events] == MONDAYS[:2] + [date(2023, 9, 12)] + MONDAYS[2:]
+    assert events[2].event_id == event_id
+    first = events[0]
+    assert first.calendar_id == f"event_series_{setup_series}_20230904"
+    assert (first.name, first.start_time, first.location, first.association.name) == (
+        "Réunion",
+        time(18, 0),
+        "Salle 1",
+        "Tribu",
+    )
+
+    window = get_all_events(date(2023, 9, 10), date(2023, 9, 19))
+    assert [event.date for event in window] == [date(2023, 9, 11), date(2023, 9, 12), date(2023, 9, 18)]
+    assert len(get_association_events(setup_asso, limit=3)) == 3
+    assert len(get_user_events(setup_students[0])) == 6
+    assert get_user_events(setup_students[1]) == []
+
+
+def test_override_and_cancel_event_occurrence(setup_series):
+    """Overrides should move, modify or cancel a single occurrence."""
+    assert override_event_occurrence(setup_series, "2023-09-11", {"date": "2023-09-13", "start_time": "17:00"})
+    assert override_event_occurrence(setup_series, "2023-09-18", {"location": "Amphi 1"})
+    assert cancel_event_occurrence(setup_series, "2023-09-25")
+    assert not cancel_event_occurrence(setup_series, "2023-09-26")
+
+    events = get_all_events()
+    assert [event.date for event in events] == [
+        date(2023, 9, 4),
+        date(2023, 9, 13),
+        date(2023, 9, 18),
+        date(2023, 10, 2),
+    ]
+    moved = events[1]
+    assert (moved.occurrence_date, moved.start_time, moved.end_time) == (date(2023, 9, 11), time(17, 0), time(18, 0))
+    assert events[2].location == "Amphi 1"
+
+
+def test_update_and_delete_event_series(setup_series):
+    """Updating the rule should drop the obsolete overrides, deleting the series should remove everything."""
+    cancel_event_occurrence(setup_series, "2023-10-02")
+    assert update_event_series(setup_series, {"until_date": "2023-09-25", "name": "Assemblée"})
+    assert EventSeriesOverride.query.count() == 0
+    assert [event.name for event in get_all_events()] == ["Assemblée"] * 4
+
+    assert delete_event_series(setup_series)
+    assert get_event_series_by_id(setup_series) is None
+    assert get_all_events() == []
+
+
+def test_event_series_attendance_follows_users(setup_series, setup_asso, setup_students):
+    """Subscriptions and user updates should add or remove users from the series attendance."""
+    subscriber_id, other_id = setup_students
+    version = get_data_version(other_id, EVENTS_SCOPE)
+    subscribe_to_asso(other_id, setup_asso)
+    assert sorted(get_event_series_attendee_ids(setup_series)) == sorted(setup_students)
+    assert get_data_version(other_id, EVENTS_SCOPE) > version
+
+    unsubscribe_from_asso(subscriber_id, setup_asso)
+    assert get_event_series_attendee_ids(setup_series) == [other_id]
+
+    series_id = add_event_series(setup_asso, "Afterwork", SERIES_START, SERIES_UNTIL, "19:00", "20:00", "1A")
+    assert get_event_series_attendee_ids(series_id) == [subscriber_id]
+    update_user(subscriber_id, {"level": "2A"})
+    assert get_event_series_attendee_ids(series_id) == []
@@ -97,3 +97,63 @@ def test_delete_event_route(test_client, setup_login_admin, setup_event):
     """EventResource.DELETE should return 200 if the event is deleted."""
     response = test_client.delete(f"/events/{setup_event}")
     assert response.status_code == 200
+
+
+@pytest.fixture
+def setup_series(test_client, setup_asso, setup_login_admin) -> int:
+    """Create a weekly event series through the API and return its ID."""
+    payload = {
+        "asso_id": setup_asso,
+        "name": "Réunion",
+        "start_date": "2024-10-01",
+        "until_date": "2024-10-31",
+        "start_time": START_TIME,
+        "end_time": END_TIME,
+        "weekdays": "TU,TH",
+        "interval": 2,
+        "participants": PARTICIPANT_TYPE,
+        "location": LOCATION,
+    }
+    response = test_client.post("/events/series", json=payload)
+    assert response.status_code == 201
+    return response.json
+
+
+def test_event_series_routes(test_client, setup_series):
+    """EventSeriesList.GET and EventSeriesResource.GET should return the series and its rule."""
+    response = test_client.get("/events/series")
+    assert response.status_code == 200
+    assert [series["series_id"] for series in response.json] == [setup_series]
+
+    response = test_client.get(f"/events/series/{setup_series}")
+    assert response.status_code == 200
+    assert response.json["rrule"] == "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,TH;UNTIL=20241031"
+    assert test_client.get("/events/series/9999").status_code == 404
+
+
+def test_event_series_occurrences_route(test_client, setup_series):
+    """EventList.GET should list the occurrences of the window, overrides applied."""
+    response = test_client.put(f"/events/series/{setup_series}/occurrences/2024-10-01", json={"start_time": "08:00"})
+    assert response.status_code == 204
+    assert test_client.delete(f"/events/series/{setup_series}/occurrences/2024-10-03").status_code == 204
+    assert test_client.delete(f"/events/series/{setup_series}/occurrences/2024-10-08").status_code == 404
+
+    response = test_client.get("/events/", query_string={"start": "2024-10-01", "end": "2024-10-18"})
+    assert response.status_code == 200
+    assert [(event["id"], event["start"]) for event in response.json] == [
+        (f"event_series_{setup_series}_20241001", "2024-10-01T08:00:00"),
+        (f"event_series_{setup_series}_20241015", "2024-10-15T09:00:00"),
+        (f"event_series_{setup_series}_20241017", "2024-10-17T09:00:00"),
+    ]
+    assert response.json[0]["event_id"] is None
+    assert response.json[0]["series_id"] == setup_series
+
+
+def test_update_and_delete_event_series_routes(test_client, setup_series):
+    """EventSeriesResource.PUT and DELETE should return 204."""
+    response = test_client.put(f"/events/series/{setup_series}", json={"until_date": "2024-10-03"})
+    assert response.status_code == 204
+    assert len(test_client.get("/events/").json) == 2
+
+    assert test_client.delete(f"/events/series/{setup_series}").status_code == 204
+    assert test_client.get("/events/").json == []
@@ -1,15 +1,39 @@
 """Tests for the grade operations."""
 
 # type: ignore
+import numpy as np
 import pytest
+from sqlalchemy import select, text
 from betterave_backend.app.models import UserType, UserLevel
-from betterave_backend.app.operations.class_operations import add_class
+from betterave_backend.app.operations.class_group_operations import add_class_group
+from betterave_backend.app.operations.class_operations import (
+    add_class,
+    get_classes_from_teacher,
+    teacher_class_ids,
+    update_class,
+)
+from betterave_backend.app.operations.lesson_operations import add_lesson
+from betterave_backend.app.models import Grade
 from betterave_backend.app.operations.grade_operations import (
+    GRADE_QUANTILES,
     add_grade,
+    get_grade_matrix,
+    get_grade_stats,
     get_grades_by_student_and_class_id,
+    get_student_transcript,
+    import_class_grades,
+    read_grade_csv,
     update_student_grade,
 )
-from betterave_backend.app.operations.user_operations import add_user
+from betterave_backend.app.operations.user_class_group_operations import add_user_class_group
+from betterave_backend.scripts.deduplicate_grades import deduplicate_grades
+from betterave_backend.app.operations.data_version_operations import (
+    GLOBAL_OWNER_ID,
+    GRADES_SCOPE,
+    TRANSCRIPT_SCOPE,
+    get_data_version,
+)
+from betterave_backend.app.operations.user_operations import add_user, delete_user, update_user
 from betterave_backend.extensions import db
 
 STUDENT_NAME = ("Alice", "Smith")
@@ -81,3 +105,265 @@ def test_update_student_grade(test_client, setup_student, setup_class):
     new_grade_value = 8
     success = update_student_grade(setup_class, setup_student, new_grade_value)
     assert success is True
+
+
+@pytest.fixture
+def setup_graded_class(test_client, setup_class, setup_teacher):
+    """Grade students of two levels in the class and in another one, return the grades of the class by level."""
+    add_class(
+        class_id=102,
+        name="Other Class",
+        ects_credits=3,
+        default_teacher_id=setup_teacher,
+        level=UserLevel._2A,
+        background_color="#123456",
+    )
+    grades = {UserLevel._1A: [8, 12, 15, 17], UserLevel._2A: [4, 10, 20]}
+    for level, values in grades.items():
+        for value in values:
+            student_id = add_user(f"Student{value}", level.name, "student_pic_url", UserType.STUDENT, level)
+            add_grade(student_id, setup_class, value)
+            add_grade(student_id, 102, 11)
+    return grades
+
+
+def test_get_grade_stats(test_client, setup_class, setup_graded_class, query_counter):
+    """The statistics of a class are aggregated over its grades, overall and by level, in two statements."""
+    values = np.array(sum(setup_graded_class.values(), []), dtype=float)
+    query_counter.count = 0
+    stats = get_grade_stats(setup_class)
+    assert query_counter.count == 2
+
+    assert stats["class_id"] == setup_class
+    assert stats["count"] == 7
+    assert stats["mean"] == pytest.approx(values.mean())
+    assert stats["std"] == pytest.approx(values.std())
+    assert stats["median"] == 12
+    assert (stats["min"], stats["max"]) == (4, 20)
+    assert [quantile["quantile"] for quantile in stats["quantiles"]] == list(GRADE_QUANTILES)
+    assert [quantile["value"] for quantile in stats["quantiles"]] == pytest.approx(np.quantile(values, GRADE_QUANTILES))
+    assert [(bucket["start"], bucket["end"]) for bucket in stats["histogram"]][:2] == [(0, 2), (2, 4)]
+    assert [bucket["count"] for bucket in stats["histogram"]] == [0, 0, 1, 0, 1, 1, 1, 1, 1, 1]
+
+    levels = {level["level"]: level for level in stats["levels"]}
+    assert list(levels) == ["1A", "2A"]
+    assert levels["1A"]["count"] == 4
+    assert levels["1A"]["mean"] == pytest.approx(13)
+    assert levels["2A"]["std"] == pytest.approx(np.std([4, 10, 20]))
+    assert (levels["2A"]["min"], levels["2A"]["max"]) == (4, 20)
+
+
+def test_get_grade_stats_school_and_empty_class(test_client, setup_class, setup_graded_class):
+    """The school-wide statistics include every class, and a class without grades has empty statistics."""
+    stats = get_grade_stats()
+    assert stats["class_id"] is None
+    assert stats["count"] == 14
+    assert stats["median"] == 11
+
+    empty = get_grade_stats(999)
+    assert empty["count"] == 0
+    assert empty["mean"] is None and empty["median"] is None and empty["std"] is None
+    assert all(quantile["value"] is None for quantile in empty["quantiles"])
+    assert sum(bucket["count"] for bucket in empty["histogram"]) == 0
+    assert empty["levels"] == []
+
+
+def test_grade_changes_bump_grade_versions(test_client, setup_student, setup_class):
+    """Changing a grade, or the level of a graded student, bumps the grades versions of the class and school."""
+
+    def versions():
+        return get_data_version(setup_class, GRADES_SCOPE), get_data_version(GLOBAL_OWNER_ID, GRADES_SCOPE)
+
+    add_grade(setup_student, setup_class, 12)
+    assert versions() == (1, 1)
+    update_student_grade(setup_class, setup_student, 14)
+    assert versions() == (2, 2)
+    update_user(setup_student, {"level": "2A"})
+    assert versions() == (3, 3)
+    assert get_grade_stats(setup_class)["levels"][0]["level"] == "2A"
+    delete_user(setup_student)
+    assert versions() == (4, 4)
+    assert get_grade_stats(setup_class)["count"] == 0
+
+
+def class_grades(class_id):
+    """Return the grades of a class by student ID."""
+    return dict(db.session.execute(select(Grade.student_id, Grade.grade).where(Grade.class_id == class_id)).all())
+
+
+def test_one_grade_per_student_and_class(test_client, setup_student, setup_class, query_counter):
+    """A student has a single grade in a class, which update_student_grade sets in one statement."""
+    assert add_grade(setup_student, setup_class, 12) is not None
+    assert add_grade(setup_student, setup_class, 13) is None
+    query_counter.count = 0
+    assert update_student_grade(setup_class, setup_student, 15) is True
+    # The upsert, and the update and select of the grade and class versions
+    assert query_counter.count <= 7
+    assert class_grades(setup_class) == {setup_student: 15}
+    assert get_grades_by_student_and_class_id(setup_student, setup_class)[0].grade == 15
+
+
+@pytest.fixture
+def setup_enrolled_students(test_client, setup_class):
+    """Enroll 30 students in the class and return their IDs."""
+    student_ids = []
+    for i in range(30):
+        student_id = add_user(f"Student{i}", "Amphi", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+        add_user_class_group(student_id, setup_class, None)
+        student_ids.append(student_id)
+    return student_ids
+
+
+def test_import_class_grades(test_client, setup_class, setup_enrolled_students, query_counter):
+    """A batch of grades is set in a number of statements which does not depend on its size."""
+    first, second, *others = setup_enrolled_students
+    add_grade(first, setup_class, 5)
+    rows = [{"student_id": first, "grade": 14}, {"email": "STUDENT1.amphi@ensae.fr", "grade": "12,5"}]
+    rows += [{"student_id": str(student_id), "grade": 10} for student_id in others]
+    query_counter.count = 0
+    assert import_class_grades(setup_class, rows) == (30, [])
+    assert query_counter.count <= 10
+    grades = class_grades(setup_class)
+    assert len(grades) == 30
+    assert (grades[first], grades[second], grades[others[0]]) == (14, 12.5, 10)
+
+
+def test_import_class_grades_errors(test_client, setup_class, setup_teacher, setup_student, setup_enrolled_students):
+    """A batch with invalid rows sets no grade and reports the error of each invalid row."""
+    first, second, *_ = setup_enrolled_students
+    rows = [
+        {"student_id": first, "grade": 14},
+        {"student_id": setup_student, "grade": 10},
+        {"student_id": setup_teacher, "grade": 10},
+        {"email": "nobody@ensae.fr", "grade": 10},
+        {"student_id": second, "grade": 21},
+        {"student_id": second, "grade": "abc"},
+        {"student_id": first, "grade": 15},
+        {"grade": 10},
+        {"student_id": "12a", "grade": 10},
+    ]
+    imported, errors = import_class_grades(setup_class, rows)
+    assert imported == 0
+    assert [(error["row"], error["error"]) for error in errors] == [
+        (2, "The student is not enrolled in the class"),
+        (3, "Unknown student"),
+        (4, "Unknown student"),
+        (5, "The grade must be a number between 0 and 20"),
+        (6, "The grade must be a number between 0 and 20"),
+        (7, "Duplicate grade for the student"),
+        (8, "Missing student_id or email"),
+        (9, "Invalid student_id"),
+    ]
+    assert errors[2]["student"] == "nobody@ensae.fr"
+    assert class_grades(setup_class) == {}
+
+
+def test_read_grade_csv():
+    """CSV files separated by commas, semicolons or tabs are read, with headers in any case."""
+    expected = [{"email": "a.b@ensae.fr", "grade": "12,5"}, {"email": "c.d@ensae.fr", "grade": "8"}]
+    assert read_grade_csv("Email;Grade\na.b@ensae.fr;12,5\nc.d@ensae.fr;8\n") == expected
+    assert read_grade_csv("email\tgrade\r\na.b@ensae.fr\t12,5\r\nc.d@ensae.fr\t8") == expected
+    assert read_grade_csv("student_id,grade\n3,17\n") == [{"student_id": "3", "grade": "17"}]
+
+
+def test_deduplicate_grades(test_client, setup_student, setup_class):
+    """The duplicate grades of a legacy table are deleted, keeping the last one, before the index is created."""
+    connection = db.session.connection()
+    connection.execute(text("DROP INDEX uq_grade_class_id_student_id"))
+    for value in (8, 11, 16):
+        connection.execute(Grade.__table__.insert().values(class_id=setup_class, student_id=setup_student, grade=value))
+    assert deduplicate_grades() == 2
+    db.session.commit()
+    assert class_grades(setup_class) == {setup_student: 16}
+    assert deduplicate_grades() == 0
+    assert add_grade(setup_student, setup_class, 12) is None
+
+
+def test_get_student_transcript(test_client, setup_student, setup_teacher, setup_class, query_counter):
+    """The transcript gives the ECTS-weighted averages and the credits earned, for each level and overall."""
+    for class_id, name, ects_credits, level in ((102, "Algèbre", 6, UserLevel._1A), (201, "Séries", 4, "2A")):
+        add_class(class_id, name, ects_credits, setup_teacher, level, "#123456")
+    add_grade(setup_student, setup_class, 14)
+    add_grade(setup_student, 102, 8)
+    add_grade(setup_student, 201, 12.5)
+    db.session.expunge_all()
+    query_counter.count = 0
+    transcript = get_student_transcript(setup_student)
+    assert query_counter.count == 1
+    assert [(row["name"], row["grade"], row["passed"]) for row in transcript["classes"]] == [
+        ("Algèbre", 8, False),
+        ("Test Class", 14, True),
+        ("Séries", 12.5, True),
+    ]
+    assert transcript["levels"] == [
+        {"level": "1A", "average": pytest.approx((14 * 3 + 8 * 6) / 9), "credits_attempted": 9, "credits_earned": 3},
+        {"level": "2A", "average": 12.5, "credits_attempted": 4, "credits_earned": 4},
+    ]
+    assert transcript["average"] == pytest.approx((14 * 3 + 8 * 6 + 12.5 * 4) / 13)
+    assert (transcript["credits_attempted"], transcript["credits_earned"]) == (13, 7)
+
+
+def test_empty_transcript(test_client, setup_student):
+    """A student without grades has no average and no credits."""
+    transcript = get_student_transcript(setup_student)
+    assert transcript == {
+        "student_id": setup_student,
+        "average": None,
+        "credits_attempted": 0,
+        "credits_earned": 0,
+        "levels": [],
+        "classes": [],
+    }
+
+
+def test_transcript_versions(test_client, setup_student, setup_class):
+    """The transcript version of a student is bumped when their grades or their graded classes change."""
+    other_student = add_user("Bob", "Smith", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    versions = [get_data_version(setup_student, TRANSCRIPT_SCOPE)]
+    add_grade(setup_student, setup_class, 12)
+    versions.append(get_data_version(setup_student, TRANSCRIPT_SCOPE))
+    update_student_grade(setup_class, setup_student, 13)
+    versions.append(get_data_version(setup_student, TRANSCRIPT_SCOPE))
+    update_class(setup_class, {"ects_credits": 6})
+    versions.append(get_data_version(setup_student, TRANSCRIPT_SCOPE))
+    assert versions == sorted(set(versions))
+    assert get_data_version(other_student, TRANSCRIPT_SCOPE) == 0
+    assert get_student_transcript(setup_student)["credits_earned"] == 6
+
+
+def test_get_grade_matrix(test_client, setup_teacher, setup_class, setup_enrolled_students, query_counter):
+    """The matrix of a teacher covers the classes they teach a lesson of or are the default teacher of."""
+    other_teacher = add_user("Jane", "Roe", "teacher_pic_url", UserType.TEACHER, UserLevel.NA)
+    for class_id in (102, 103, 104):
+        add_class(class_id, f"Class {class_id}", 3, other_teacher, UserLevel._1A, "#123456")
+    add_lesson(add_class_group("TD", 102, False), "2024-01-08", "09:00", "10:00", teacher_id=setup_teacher)
+    first, second, third, *_ = setup_enrolled_students
+    add_user_class_group(first, 102, None)
+    add_user_class_group(third, 104, None)
+    add_grade(first, setup_class, 12)
+    add_grade(second, setup_class, 15.5)
+    add_grade(first, 102, 9)
+    assert sorted(c.class_id for c in get_classes_from_teacher(setup_teacher)) == [setup_class, 102]
+
+    query_counter.count = 0
+    matrix = get_grade_matrix(teacher_class_ids(setup_teacher))
+    assert query_counter.count == 1
+    assert matrix["class_ids"] == [setup_class, 102]
+    assert matrix["student_ids"] == sorted(setup_enrolled_students)
+    assert len(matrix["grades"]) == 2 * len(setup_enrolled_students)
+    grades = np.array(matrix["grades"], dtype=object).reshape(len(matrix["student_ids"]), 2)
+    rows = {student_id: list(line) for student_id, line in zip(matrix["student_ids"], grades)}
+    assert rows[first] == [12, 9]
+    assert rows[second] == [15.5, None]
+    assert rows[third] == [None, None]
+
+    # Classes without students are columns without lines
+    matrix = get_grade_matrix(teacher_class_ids(other_teacher))
+    assert matrix["class_ids"] == [102, 103, 104]
+    assert matrix["student_ids"] == [first, third]
+    assert matrix["grades"] == [9, None, None, None, None, None]
+    assert get_grade_matrix(teacher_class_ids(999)) == {
+        "student_ids": [],
+        "class_ids": [],
+        "grades": [],
+    }
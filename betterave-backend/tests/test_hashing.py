@@ -0,0 +1,123 @@
+"""Tests for the password hashing pool and its admission limit."""
+
+# type: ignore
+import runpy
+import sys
+import threading
+from pathlib import Path
+import pytest
+import betterave_backend.create_app
+from flask import Flask
+from flask_bcrypt import Bcrypt
+from betterave_backend.extensions import password_hasher
+from betterave_backend.app.hashing import PasswordHasher, PasswordHasherBusy
+from betterave_backend.app.models import UserType, UserLevel
+from betterave_backend.app.operations.user_operations import add_user
+
+
+def make_hasher(**config) -> PasswordHasher:
+    """Create a hasher configured like an app with the given settings, with cheap bcrypt rounds."""
+    app = Flask(__name__)
+    app.config.update(BCRYPT_LOG_ROUNDS=4, **config)
+    hasher = PasswordHasher()
+    hasher.init_app(app)
+    return hasher
+
+
+def test_hashing_in_a_process_pool():
+    """The hashes of the pool processes are bcrypt hashes, compatible with the ones made in the app."""
+    hasher = make_hasher(HASH_WORKERS=1)
+    try:
+        hashed = hasher.generate_password_hash("ageorges")
+        assert Bcrypt().check_password_hash(hashed, "ageorges")
+        assert hasher.check_password_hash(Bcrypt().generate_password_hash("ageorges", 4).decode(), "ageorges")
+        assert not hasher.check_password_hash(hashed, "wrong")
+        assert hasher.stats() == {
+            "workers": 1,
+            "max_concurrent": 2,
+            "in_flight": 0,
+            "waiting": 0,
+            "completed": 3,
+            "rejected": 0,
+        }
+    finally:
+        hasher.shutdown()
+
+
+def test_hashing_is_inline_in_tests(test_client):
+    """The app of the tests hashes in the request threads."""
+    assert password_hasher.stats()["workers"] == 0
+    hashed = password_hasher.generate_password_hash("secret")
+    assert password_hasher.check_password_hash(hashed, "secret")
+
+
+def test_admission_limit():
+    """Hashes beyond the limit wait for a slot, and are rejected if none frees up in time."""
+    hasher = make_hasher(HASH_WORKERS=0, HASH_MAX_CONCURRENT=1, HASH_QUEUE_TIMEOUT=0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+        return "hash"
+
+    thread = threading.Thread(target=hasher._run, args=(slow_hash,))
+    thread.start()
+    try:
+        assert started.wait(5)
+        assert hasher.stats()["in_flight"] == 1
+        with pytest.raises(PasswordHasherBusy):
+            hasher.generate_password_hash("secret")
+        assert hasher.stats()["rejected"] == 1
+        assert hasher.stats()["waiting"] == 0
+    finally:
+        release.set()
+        thread.join()
+    # The slot is free again
+    assert hasher.check_password_hash(hasher.generate_password_hash("secret"), "secret")
+    assert hasher.stats()["in_flight"] == 0
+
+
+def test_login_answers_503_when_saturated(test_client, monkeypatch):
+    """Logins are answered 503 with Retry-After when every hashing slot stays taken, and are counted."""
+    add_user("Directeur", "Admin", "admin_pic_url", UserType.ADMIN, UserLevel.NA)
+    add_user("Alice", "Georges", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    monkeypatch.setattr(password_hasher, "queue_timeout", 0.01)
+    slots = password_hasher.max_concurrent
+    for _ in range(slots):
+        password_hasher._slots.acquire()
+    try:
+        response = test_client.post("/auth/login", json={"email": "alice.georges@ensae.fr", "password": "ageorges"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+    finally:
+        for _ in range(slots):
+            password_hasher._slots.release()
+
+    response = test_client.post("/auth/login", json={"email": "directeur.admin@ensae.fr", "password": "dadmin"})
+    assert response.status_code == 200
+    stats = test_client.get("/monitoring/password-hashing").json
+    assert (stats["rejected"], stats["waiting"], stats["in_flight"]) == (1, 0, 0)
+
+
+@pytest.mark.parametrize(
+    "run_main",
+    [
+        lambda: runpy.run_path(str(Path(betterave_backend.__file__).parent / "main.py"), run_name="__mp_main__"),
+        lambda: runpy.run_module("betterave_backend.scripts.init_db", run_name="__mp_main__"),
+        lambda: runpy.run_module("betterave_backend.scripts.job_worker", run_name="__mp_main__"),
+        lambda: runpy.run_module("betterave_backend.scripts.rebuild_calendar_lessons", run_name="__mp_main__"),
+    ],
+    ids=["main.py", "init_db", "job_worker", "rebuild_calendar_lessons"],
+)
+def test_pool_processes_do_not_create_the_app(run_main, monkeypatch, tmp_path):
+    """The entry points, imported again as __mp_main__ by each spawned pool process, do not build an app."""
+    calls = []
+    monkeypatch.setattr(betterave_backend.create_app, "create_app", lambda *args, **kwargs: calls.append(args))
+    monkeypatch.delitem(sys.modules, "betterave_backend.wsgi", raising=False)
+    # init_db reads its classes when imported
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "classes.json").write_text("{}")
+    monkeypatch.chdir(tmp_path)
+    run_main()
+    assert calls == []
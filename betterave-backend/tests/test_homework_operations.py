@@ -2,6 +2,8 @@
 
 # type: ignore
 import pytest
+from datetime import date
+from sqlalchemy import event
 from betterave_backend.extensions import db
 from betterave_backend.app.models.class_ import Class
 from betterave_backend.app.models.user import User
@@ -16,6 +18,7 @@ from betterave_backend.app.operations.homework_operations import (
     add_homework_to_class,
     get_user_homework,
 )
+from betterave_backend.app.operations.user_class_group_operations import enroll_user_in_class
 from betterave_backend.app.operations.user_operations import add_user
 
 STUDENT_NAME = ("Alice", "Doe")
@@ -99,3 +102,75 @@ def test_get_user_homework(test_client, setup_student):
     user_homework = get_user_homework(db.session.get(User, setup_student))
     assert user_homework is not None
     assert isinstance(user_homework, list)
+
+
+def test_get_homework_in_date_window(test_client, setup_class, setup_group):
+    """Only homework due in the [start, end) window is returned."""
+    for due_date in ["2023-12-30", "2023-12-31", "2024-01-01"]:
+        add_homework_to_class(HOMEWORK_CONTENT, setup_class, due_date, DUE_TIME)
+    homework = get_class_homework(setup_class, start=date(2023, 12, 31), end=date(2024, 1, 1))
+    assert [hmw.due_date for hmw in homework] == [date(2023, 12, 31)]
+
+
+@pytest.fixture
+def setup_enrolled_student(test_client, setup_teacher, setup_student):
+    """Enroll the student in two classes out of three, and return the IDs of their main groups."""
+    groups = []
+    for class_id in (201, 202, 203):
+        add_class(
+            class_id=class_id,
+            name=f"Class {class_id}",
+            ects_credits=3,
+            default_teacher_id=setup_teacher,
+            level=UserLevel._1A,
+            background_color="#123456",
+        )
+        groups.append(add_class_group(name=GROUP_NAME, class_id=class_id, is_main_group=True))
+        add_class_group(name="TD 1", class_id=class_id, is_main_group=False)
+    for class_id in (201, 202):
+        enroll_user_in_class(setup_student, class_id)
+    return groups
+
+
+def test_get_user_homework_order(test_client, setup_student, setup_enrolled_student):
+    """The homework of every group of the user come by due date, those without due time first on their day."""
+    first_group, second_group, other_group = setup_enrolled_student
+    add_homework_to_group("C", "2024-01-02", "08:00", first_group)
+    add_homework_to_group("A", "2024-01-01", "18:00", second_group)
+    add_homework_to_group("B", "2024-01-02", None, second_group)
+    add_homework_to_group("D", "2024-01-02", "09:30", second_group)
+    add_homework_to_group("Not for this student", "2024-01-01", None, other_group)
+
+    homework = get_user_homework(setup_student)
+    assert [hmw.content for hmw in homework] == ["A", "B", "C", "D"]
+    assert homework == sorted(homework)
+    assert [hmw.as_dict()["class_name"] for hmw in homework] == ["Class 202", "Class 202", "Class 201", "Class 202"]
+    assert [hmw.content for hmw in get_user_homework(setup_student, start=date(2024, 1, 2), limit=2)] == ["B", "C"]
+    assert [hmw.content for hmw in get_user_homework(setup_student, end=date(2024, 1, 2))] == ["A"]
+
+
+def test_get_user_homework_single_query(test_client, setup_student, setup_enrolled_student):
+    """The homework feed is read in one statement from the index on (group_id, due_date), classes included."""
+    for group_id in setup_enrolled_student[:2]:
+        for day in range(1, 4):
+            add_homework_to_group(HOMEWORK_CONTENT, f"2024-01-0{day}", DUE_TIME, group_id)
+    db.session.expunge_all()
+    user = db.session.get(User, setup_student)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        homework = [hmw.as_dict() for hmw in get_user_homework(user, start=date(2024, 1, 2))]
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert len(homework) == 4
+    assert len(statements) == 1
+
+    statement, parameters = statements[0]
+    plan = "\n".join(
+        row.detail for row in db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+    )
+    assert "homework USING INDEX ix_homework_group_id_due_date" in plan, plan
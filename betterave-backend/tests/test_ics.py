@@ -0,0 +1,157 @@
+"""Tests for the iCalendar feed of a user."""
+
+# type: ignore
+from datetime import date, datetime, time
+import pytest
+from betterave_backend.app.ics import escape_text, fold_line
+from betterave_backend.app.models import UserType, UserLevel
+from urllib.parse import urlsplit
+from sqlalchemy import inspect, text
+from betterave_backend.extensions import db
+from betterave_backend.app.operations.user_operations import add_user, create_calendar_token, revoke_calendar_token
+from betterave_backend.app.operations.class_operations import add_class
+from betterave_backend.app.operations.class_group_operations import add_class_group, enroll_student_in_group
+from betterave_backend.app.operations.lesson_operations import add_lesson
+from betterave_backend.app.operations.event_operations import add_event
+from betterave_backend.app.operations.lesson_series_operations import add_lesson_series
+from betterave_backend.app.operations.event_series_operations import add_event_series
+from betterave_backend.scripts.add_calendar_token_column import add_calendar_token_column
+
+TODAY = datetime.now().date()
+
+
+@pytest.fixture
+def setup_student(test_client) -> int:
+    """Create a student enrolled in a group with two lessons, and attending one event."""
+    teacher_id = add_user("John", "Martins", "teacher_pic_url", UserType.TEACHER, UserLevel.NA)
+    student_id = add_user("Lucas", "Felix", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    asso_id = add_user("BDE", "Asso", "asso_pic_url", UserType.ASSO, UserLevel.NA)
+    add_class(
+        class_id=5,
+        name="Statistique, Inférence",
+        ects_credits=3,
+        default_teacher_id=teacher_id,
+        level="1A",
+        background_color="#123456",
+    )
+    group_id = add_class_group(name="Cours", is_main_group=True, class_id=5)
+    enroll_student_in_group(student_id, group_id)
+    add_lesson(group_id, TODAY, time(9, 0), time(10, 30), "Exercise 1; 2", "A10", teacher_id)
+    add_lesson(group_id, date(2000, 1, 3), time(9, 0), time(10, 30), "", "A10", teacher_id)
+    add_event(asso_id, "Gala", TODAY, time(20, 0), time(23, 0), "All users", location="Paris")
+    return student_id
+
+
+def get_feed(test_client, user_id, token, **args):
+    """Fetch the calendar feed of a user with the token of its URL."""
+    return test_client.get(f"/users/{user_id}/calendar.ics", query_string={"token": token, **args})
+
+
+def test_escape_and_fold():
+    """Test the escaping of text values and the folding of long lines."""
+    assert escape_text("a,b;c\\d\ne") == r"a\,b\;c\\d\ne"
+    line = "DESCRIPTION:" + "é" * 100
+    folded = fold_line(line)
+    assert folded.endswith("\r\n")
+    assert all(len(part.encode()) <= 75 for part in folded[:-2].split("\r\n"))
+    assert folded[:-2].replace("\r\n ", "") == line
+
+
+def test_calendar_feed(test_client, setup_student):
+    """Test that the feed streams the lessons and events of the window as an iCalendar document."""
+    response = get_feed(test_client, setup_student, create_calendar_token(setup_student))
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "text/calendar"
+    body = response.get_data(as_text=True)
+    assert body.startswith("BEGIN:VCALENDAR\r\n")
+    assert body.endswith("END:VCALENDAR\r\n")
+    # The lesson of 2000 is out of the default window
+    assert body.count("BEGIN:VEVENT") == 2
+    assert f"DTSTART:{TODAY.strftime('%Y%m%d')}T090000" in body
+    assert r"SUMMARY:Statistique\, Inférence - Cours" in body
+    assert r"DESCRIPTION:John Martins\nHomework: Exercise 1\; 2" in body
+    assert "SUMMARY:BDE - Gala" in body
+    assert "LOCATION:Paris" in body
+
+
+def test_calendar_feed_window(test_client, setup_student):
+    """Test that an explicit window is applied to lessons and events."""
+    token = create_calendar_token(setup_student)
+    response = get_feed(test_client, setup_student, token, start="1999-12-01")
+    assert response.get_data(as_text=True).count("BEGIN:VEVENT") == 3
+    response = get_feed(test_client, setup_student, token, start="1999-12-01", end="2000-02-01")
+    assert response.get_data(as_text=True).count("BEGIN:VEVENT") == 1
+
+
+def test_calendar_feed_conditional_get(test_client, setup_student):
+    """Test that polling the feed with its ETag gets a 304."""
+    url = f"/users/{setup_student}/calendar.ics?token={create_calendar_token(setup_student)}"
+    etag = test_client.get(url).headers["ETag"]
+    response = test_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_calendar_feed_series_uids(test_client, setup_student):
+    """Test that every occurrence of a lesson series gets its own UID."""
+    group_id = add_class_group(name="TD", is_main_group=False, class_id=5)
+    enroll_student_in_group(setup_student, group_id)
+    series_id = add_lesson_series(group_id, "2000-01-03", "2000-01-17", "14:00", "15:00")
+    token = create_calendar_token(setup_student)
+    response = get_feed(test_client, setup_student, token, start="1999-12-01", end="2000-02-01")
+    body = response.get_data(as_text=True)
+    assert body.count("BEGIN:VEVENT") == 4
+    assert [f"UID:lesson-series-{series_id}-200001{day:02}@betterave" in body for day in (3, 10, 17)] == [True] * 3
+
+
+def test_calendar_feed_event_series(test_client, setup_student):
+    """Test that the occurrences of an event series the user attends are in the feed."""
+    asso_id = add_user("EJE", "Asso", "asso_pic_url", UserType.ASSO, UserLevel.NA)
+    series_id = add_event_series(asso_id, "Réunion", "2000-01-01", "2000-01-15", "17:00", "18:00", "1A", weekdays="TU")
+    token = create_calendar_token(setup_student)
+    response = get_feed(test_client, setup_student, token, start="1999-12-01", end="2000-02-01")
+    body = response.get_data(as_text=True)
+    assert body.count("SUMMARY:EJE - Réunion") == 2
+    assert f"UID:event-series-{series_id}-20000111@betterave" in body
+
+
+def test_calendar_feed_token(test_client, setup_student):
+    """The feed is only served with the current token of the user, which the user can rotate and revoke."""
+    response = test_client.post(f"/users/{setup_student}/calendar-token")
+    assert response.status_code == 201
+    feed_url = urlsplit(response.json["feed_url"])
+    assert test_client.get(f"{feed_url.path}?{feed_url.query}").status_code == 200
+    token = response.json["token"]
+
+    assert test_client.get(f"/users/{setup_student}/calendar.ics").status_code == 404
+    assert get_feed(test_client, setup_student, token + "x").status_code == 404
+    other_id = add_user("Zoe", "Smith", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    assert get_feed(test_client, other_id, token).status_code == 404
+
+    new_token = create_calendar_token(setup_student)
+    assert get_feed(test_client, setup_student, token).status_code == 404
+    assert get_feed(test_client, setup_student, new_token).status_code == 200
+    assert test_client.delete(f"/users/{setup_student}/calendar-token").status_code == 200
+    assert get_feed(test_client, setup_student, new_token).status_code == 404
+
+
+def test_calendar_feed_of_an_association(test_client, setup_student):
+    """The feed of an association has the events it organizes, as /users/<id>/events."""
+    asso_id = add_user("BDS", "Asso", "asso_pic_url", UserType.ASSO, UserLevel.NA)
+    add_event(asso_id, "Tournoi", TODAY, time(14, 0), time(18, 0), "All users", location="Stade")
+    body = get_feed(test_client, asso_id, create_calendar_token(asso_id)).get_data(as_text=True)
+    assert body.count("BEGIN:VEVENT") == 1
+    assert "SUMMARY:BDS - Tournoi" in body
+
+
+def test_add_calendar_token_column(test_client, setup_student):
+    """The column is added to a user table created before it existed, and the tokens then work."""
+    connection = db.session.connection()
+    connection.execute(text("DROP INDEX ix_user_calendar_token_hash"))
+    connection.execute(text('ALTER TABLE "user" DROP COLUMN calendar_token_hash'))
+    assert add_calendar_token_column() is True
+    db.session.commit()
+    assert "calendar_token_hash" in {c["name"] for c in inspect(db.engine).get_columns("user")}
+    assert add_calendar_token_column() is False
+    revoke_calendar_token(setup_student)
+    assert get_feed(test_client, setup_student, create_calendar_token(setup_student)).status_code == 200
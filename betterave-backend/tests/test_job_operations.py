@@ -0,0 +1,153 @@
+"""Tests for the database-backed queue of background jobs."""
+
+# type: ignore
+import pytest
+from datetime import datetime, timedelta
+from betterave_backend.extensions import db
+from betterave_backend.app.models import Job, JobStatus, UserLevel, UserType
+from betterave_backend.app.operations.job_operations import (
+    JOB_LEASE,
+    RETRY_DELAY,
+    claim_job,
+    count_jobs_by_status,
+    enqueue_job,
+    job_handler,
+    run_job,
+    run_pending_jobs,
+)
+from betterave_backend.app.operations.user_operations import add_user, delete_user
+
+# Payloads received by the test handlers
+calls = []
+
+
+@job_handler("test_record")
+def record(payload):
+    """Record the payload of the job."""
+    calls.append(payload)
+
+
+@job_handler("test_fail")
+def fail(payload):
+    """Raise a connection error."""
+    raise ConnectionError("SMTP server unreachable")
+
+
+@pytest.fixture
+def recorded(test_client):
+    """Return the list of the payloads recorded by the test handler, emptied."""
+    calls.clear()
+    return calls
+
+
+def test_enqueue_job_is_idempotent(recorded):
+    """Enqueueing a job with the key of an existing one returns it, and jobs run once."""
+    first = enqueue_job("test_record", {"n": 1}, idempotency_key="record-1")
+    db.session.commit()
+    second = enqueue_job("test_record", {"n": 2}, idempotency_key="record-1")
+    other = enqueue_job("test_record", {"n": 3})
+    db.session.commit()
+
+    assert second.job_id == first.job_id
+    assert other.job_id != first.job_id
+    assert run_pending_jobs() == 2
+    assert run_pending_jobs() == 0
+    assert recorded == [{"n": 1}, {"n": 3}]
+    assert db.session.get(Job, first.job_id).status == JobStatus.DONE
+
+    with pytest.raises(ValueError):
+        enqueue_job("unknown")
+
+
+def test_enqueued_job_is_rolled_back_with_its_transaction(recorded):
+    """A job enqueued in a transaction which is rolled back is never run."""
+    enqueue_job("test_record", {"n": 1})
+    db.session.rollback()
+
+    assert run_pending_jobs() == 0
+    assert recorded == []
+
+
+def test_claim_job_once(recorded):
+    """A job is claimed by a single worker, and not before its run_after time."""
+    job = enqueue_job("test_record")
+    db.session.commit()
+    job_id = job.job_id
+
+    claimed = claim_job()
+    assert claimed.job_id == job_id
+    assert claimed.status == JobStatus.RUNNING
+    assert claimed.attempts == 1
+    assert claim_job() is None
+
+    later = enqueue_job("test_record")
+    later.run_after = datetime.utcnow() + timedelta(minutes=1)
+    db.session.commit()
+    assert claim_job() is None
+    assert claim_job(datetime.utcnow() + timedelta(minutes=2)).job_id == later.job_id
+
+
+def test_failed_job_is_retried_with_backoff(test_client):
+    """A failing job is retried later, with a doubling delay, until it has run max_attempts times."""
+    job = enqueue_job("test_fail", max_attempts=3)
+    db.session.commit()
+    job_id = job.job_id
+    now = datetime.utcnow()
+
+    assert run_pending_jobs(now=now) == 1
+    job = db.session.get(Job, job_id)
+    assert job.status == JobStatus.PENDING
+    assert job.run_after == now + RETRY_DELAY
+    assert job.error == "ConnectionError: SMTP server unreachable"
+    assert run_pending_jobs(now=now) == 0
+
+    now = job.run_after
+    assert run_pending_jobs(now=now) == 1
+    assert db.session.get(Job, job_id).run_after == now + 2 * RETRY_DELAY
+
+    assert run_pending_jobs(now=now + 2 * RETRY_DELAY) == 1
+    job = db.session.get(Job, job_id)
+    assert job.status == JobStatus.FAILED
+    assert job.attempts == 3
+    assert run_pending_jobs(now=now + timedelta(days=1)) == 0
+    assert count_jobs_by_status() == {"pending": 0, "running": 0, "done": 0, "failed": 1}
+
+
+def test_abandoned_job_is_claimed_again(recorded):
+    """A job whose worker died is claimed again once its lease has expired, but not after its last attempt."""
+    job = enqueue_job("test_record", max_attempts=2)
+    db.session.commit()
+    job_id = job.job_id
+    now = datetime.utcnow()
+
+    assert claim_job(now).job_id == job_id
+    assert claim_job(now + JOB_LEASE / 2) is None
+    now += JOB_LEASE
+    assert claim_job(now).job_id == job_id
+    now += JOB_LEASE
+    job = claim_job(now)
+    assert job.attempts == 3
+    assert not run_job(job, now)
+    assert db.session.get(Job, job_id).status == JobStatus.FAILED
+    assert recorded == []
+
+
+def test_job_routes(test_client):
+    """UserJob.GET should only return the jobs of the user, JobStats.GET the number of jobs by status."""
+    user_id = add_user("Martine", "Garcia", "martine_garcia.jpg", UserType.STUDENT, UserLevel._1A)
+    other_id = add_user("Jean", "Dupont", "jean_dupont.jpg", UserType.STUDENT, UserLevel._1A)
+    job = enqueue_job("test_record", user_id=user_id)
+    db.session.commit()
+    job_id = job.job_id
+
+    response = test_client.get(f"/users/{user_id}/jobs/{job_id}")
+    assert response.status_code == 200
+    assert response.json["status"] == "pending"
+    assert response.json["attempts"] == 0
+    assert test_client.get(f"/users/{other_id}/jobs/{job_id}").status_code == 404
+    assert test_client.get(f"/users/{user_id}/jobs/{job_id + 1}").status_code == 404
+    assert test_client.get("/monitoring/jobs").json == {"pending": 1, "running": 0, "done": 0, "failed": 0}
+
+    # The jobs of a deleted user are kept
+    assert delete_user(user_id)
+    assert db.session.get(Job, job_id).user_id is None
@@ -0,0 +1,149 @@
+"""Tests for the maintenance and reads of the denormalized calendar_lesson table."""
+
+# type: ignore
+import pytest
+from datetime import date, datetime, time
+from betterave_backend.app.models import UserType, UserLevel
+from betterave_backend.app.operations.user_operations import add_user, update_user, delete_user
+from betterave_backend.app.operations.class_operations import add_class, update_class
+from betterave_backend.app.operations.class_group_operations import (
+    add_class_group,
+    update_class_group,
+    enroll_student_in_group,
+)
+from betterave_backend.app.operations.lesson_operations import add_lesson, update_lesson, delete_lesson
+from betterave_backend.app.operations.lesson_calendar_operations import (
+    get_calendar_lesson,
+    get_all_calendar_lessons,
+    get_student_calendar_lessons,
+    get_teacher_calendar_lessons,
+    rebuild_calendar_lessons,
+)
+
+CLASS_ID = 101
+CLASS_NAME = "Test Class"
+BACKGROUND_COLOR = "#123456"
+GROUP_NAME = "Test Group"
+LESSON_DATES = [date(2023, 10, 2), date(2023, 10, 9), date(2023, 10, 16)]
+START_TIME = time(9, 0)
+END_TIME = time(10, 30)
+ROOM = "A1"
+
+
+@pytest.fixture
+def setup_teacher(test_client) -> int:
+    """Create a teacher and return their ID."""
+    return add_user("John", "Adams", "teacher_pic_url", UserType.TEACHER, UserLevel.NA)
+
+
+@pytest.fixture
+def setup_group(test_client, setup_teacher) -> int:
+    """Create a class with one group and return the group ID."""
+    add_class(
+        class_id=CLASS_ID,
+        name=CLASS_NAME,
+        ects_credits=3,
+        default_teacher_id=setup_teacher,
+        level="1A",
+        background_color=BACKGROUND_COLOR,
+    )
+    return add_class_group(name=GROUP_NAME, class_id=CLASS_ID, is_main_group=True)
+
+
+@pytest.fixture
+def setup_lessons(test_client, setup_group, setup_teacher) -> list[int]:
+    """Create one weekly lesson per date of LESSON_DATES and return their IDs."""
+    return [
+        add_lesson(
+            group_id=setup_group,
+            date=lesson_date,
+            start_time=START_TIME,
+            end_time=END_TIME,
+            homework="",
+            room=ROOM,
+            teacher_id=setup_teacher,
+        )
+        for lesson_date in LESSON_DATES
+    ]
+
+
+def test_add_lesson_creates_calendar_row(test_client, setup_lessons, setup_group, setup_teacher):
+    """Test that adding a lesson writes its denormalized calendar row."""
+    row = get_calendar_lesson(setup_lessons[0])
+    assert row is not None
+    assert row.group_id == setup_group
+    assert row.class_id == CLASS_ID
+    assert row.teacher_id == setup_teacher
+    assert row.start_ts == datetime.combine(LESSON_DATES[0], START_TIME)
+    assert row.end_ts == datetime.combine(LESSON_DATES[0], END_TIME)
+    assert row.title == CLASS_NAME
+    assert row.background_color == BACKGROUND_COLOR
+    assert row.group_name == GROUP_NAME
+    assert row.teacher_name == "John Adams"
+    assert row.room == ROOM
+
+
+def test_update_lesson_refreshes_calendar_row(test_client, setup_lessons):
+    """Test that updating a lesson rewrites its calendar row."""
+    assert update_lesson(setup_lessons[0], {"room": "B2", "start_time": time(8, 0)}) is True
+    row = get_calendar_lesson(setup_lessons[0])
+    assert row.room == "B2"
+    assert row.start_ts == datetime.combine(LESSON_DATES[0], time(8, 0))
+
+
+def test_delete_lesson_removes_calendar_row(test_client, setup_lessons):
+    """Test that deleting a lesson removes its calendar row."""
+    assert delete_lesson(setup_lessons[0]) is True
+    assert get_calendar_lesson(setup_lessons[0]) is None
+    assert len(get_all_calendar_lessons()) == len(LESSON_DATES) - 1
+
+
+def test_update_class_refreshes_calendar_rows(test_client, setup_lessons):
+    """Test that renaming or recoloring a class rewrites the rows of all its lessons."""
+    assert update_class(CLASS_ID, {"name": "Renamed", "background_color": "#654321"}) is True
+    rows = get_all_calendar_lessons()
+    assert len(rows) == len(LESSON_DATES)
+    assert all(row.title == "Renamed" and row.background_color == "#654321" for row in rows)
+
+
+def test_update_class_group_refreshes_calendar_rows(test_client, setup_lessons, setup_group):
+    """Test that renaming a class group rewrites the rows of its lessons."""
+    assert update_class_group(setup_group, {"name": "TD 1"}) is True
+    assert all(row.group_name == "TD 1" for row in get_all_calendar_lessons())
+
+
+def test_update_teacher_refreshes_calendar_rows(test_client, setup_lessons, setup_teacher):
+    """Test that renaming a teacher rewrites the rows of the lessons they teach."""
+    assert update_user(setup_teacher, {"surname": "Smith"}) is True
+    assert all(row.teacher_name == "John Smith" for row in get_all_calendar_lessons())
+
+
+def test_delete_teacher_clears_calendar_teacher(test_client, setup_lessons, setup_teacher):
+    """Test that deleting a teacher keeps the lessons but clears their teacher in the calendar."""
+    assert delete_user(setup_teacher) is True
+    rows = get_all_calendar_lessons()
+    assert len(rows) == len(LESSON_DATES)
+    assert all(row.teacher_id is None and row.teacher_name is None for row in rows)
+
+
+def test_get_student_calendar_lessons_window(test_client, setup_lessons, setup_group):
+    """Test that a student only gets the lessons of their groups in the [start, end) window."""
+    student_id = add_user("Lucas", "Dough", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    assert get_student_calendar_lessons(student_id) == []
+    enroll_student_in_group(student_id, setup_group)
+    rows = get_student_calendar_lessons(student_id, start=LESSON_DATES[1], end=LESSON_DATES[2])
+    assert [row.lesson_id for row in rows] == [setup_lessons[1]]
+    rows = get_student_calendar_lessons(student_id, start=LESSON_DATES[1])
+    assert [row.lesson_id for row in rows] == setup_lessons[1:]
+
+
+def test_get_teacher_calendar_lessons_limit(test_client, setup_lessons, setup_teacher):
+    """Test that a teacher gets their lessons in chronological order, up to the limit."""
+    rows = get_teacher_calendar_lessons(setup_teacher, limit=2)
+    assert [row.lesson_id for row in rows] == setup_lessons[:2]
+
+
+def test_rebuild_calendar_lessons(test_client, setup_lessons):
+    """Test that the calendar table can be rebuilt from scratch."""
+    assert rebuild_calendar_lessons() == len(LESSON_DATES)
+    assert len(get_all_calendar_lessons()) == len(LESSON_DATES)
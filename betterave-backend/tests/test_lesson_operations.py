@@ -5,11 +5,12 @@ import pytest
 from betterave_backend.extensions import db
 from betterave_backend.app.models.user import User
 from betterave_backend.app.models import UserType, UserLevel
-from datetime import date, time, datetime
+from datetime import date, time, datetime, timedelta
 from betterave_backend.app.operations.class_operations import add_class
 from betterave_backend.app.operations.class_group_operations import (
     add_class_group,
     delete_class_group,
+    enroll_student_in_group,
 )
 from betterave_backend.app.operations.lesson_operations import (
     add_lesson,
@@ -182,3 +183,46 @@ def test_get_teacher_future_lessons(test_client, setup_lesson, setup_teacher):
     teacher_future_lessons = get_teacher_future_lessons(db.session.get(User, setup_teacher))
     assert teacher_future_lessons is not None
     assert all(lesson.date >= datetime.now().date() for lesson in teacher_future_lessons)
+
+
+def test_get_student_future_lessons_sorted_and_limited(test_client, setup_group, setup_student, setup_teacher):
+    """Future lessons of a student are returned in chronological order, and the limit applies after sorting."""
+    enroll_student_in_group(setup_student, setup_group)
+    today = datetime.now().date()
+    for days, hour in [(3, 14), (1, 10), (-2, 9), (1, 8), (7, 9)]:
+        add_lesson(
+            group_id=setup_group,
+            date=today + timedelta(days=days),
+            start_time=time(hour, 0),
+            end_time=time(hour + 1, 0),
+            teacher_id=setup_teacher,
+        )
+
+    lessons = get_student_future_lessons(setup_student, limit=3)
+    assert [(lesson.date - today).days for lesson in lessons] == [1, 1, 3]
+    assert [lesson.start_time for lesson in lessons] == [time(8, 0), time(10, 0), time(14, 0)]
+
+    all_lessons = get_student_lessons(setup_student)
+    assert len(all_lessons) == 5
+    assert all_lessons == sorted(all_lessons)
+
+
+def test_get_lessons_in_date_window(test_client, setup_group, setup_student, setup_teacher):
+    """Only lessons in the [start, end) window are returned."""
+    enroll_student_in_group(setup_student, setup_group)
+    for day in range(18, 25):
+        add_lesson(group_id=setup_group, date=date(2024, 3, day), start_time=START_TIME, end_time=END_TIME)
+    add_lesson(
+        group_id=setup_group,
+        date=date(2024, 3, 20),
+        start_time=START_TIME,
+        end_time=END_TIME,
+        teacher_id=setup_teacher,
+    )
+
+    start, end = date(2024, 3, 20), date(2024, 3, 22)
+    student_lessons = get_student_lessons(setup_student, start=start, end=end)
+    assert [lesson.date for lesson in student_lessons] == [date(2024, 3, 20), date(2024, 3, 20), date(2024, 3, 21)]
+    assert [lesson.date for lesson in get_teacher_lessons(setup_teacher, start=start, end=end)] == [date(2024, 3, 20)]
+    assert len(get_all_lessons(start=start)) == 6
+    assert len(get_all_lessons(end=start)) == 2
@@ -0,0 +1,222 @@
+"""Tests for the weekly recurrence rules and the lesson series operations."""
+
+# type: ignore
+import pytest
+from datetime import date, datetime, time
+from betterave_backend.extensions import db
+from betterave_backend.app.models import User, UserType, UserLevel, LessonSeriesOverride
+from betterave_backend.app.recurrence import weekly_occurrences, infer_weekly_rule, to_rrule
+from betterave_backend.app.operations.user_operations import add_user, delete_user
+from betterave_backend.app.operations.class_operations import add_class
+from betterave_backend.app.operations.class_group_operations import add_class_group, enroll_student_in_group
+from betterave_backend.app.operations.lesson_operations import add_lesson
+from betterave_backend.app.operations.data_version_operations import LESSONS_SCOPE, get_data_version
+from betterave_backend.app.operations.lesson_series_operations import (
+    add_lesson_series,
+    update_lesson_series,
+    delete_lesson_series,
+    get_lesson_series_by_id,
+    get_all_lesson_series,
+    override_occurrence,
+    cancel_occurrence,
+)
+from betterave_backend.app.operations.lesson_calendar_operations import (
+    get_all_calendar_lessons,
+    get_student_calendar_lessons,
+    get_teacher_calendar_lessons,
+    iter_user_calendar_lessons,
+)
+
+CLASS_ID = 102
+# Mondays from 2023-10-02 to 2023-10-30 included
+SERIES_START = date(2023, 10, 2)
+SERIES_UNTIL = date(2023, 10, 30)
+START_TIME = time(9, 0)
+END_TIME = time(10, 30)
+ROOM = "B2"
+
+
+def test_weekly_occurrences():
+    """weekly_occurrences should follow the interval and weekdays, and only yield the window."""
+    dates = list(weekly_occurrences(SERIES_START, SERIES_UNTIL))
+    assert dates == [date(2023, 10, day) for day in (2, 9, 16, 23, 30)]
+
+    dates = list(weekly_occurrences(SERIES_START, SERIES_UNTIL, interval=2, weekdays=[0, 2]))
+    assert dates == [date(2023, 10, day) for day in (2, 4, 16, 18, 30)]
+
+    window = list(weekly_occurrences(SERIES_START, SERIES_UNTIL, 2, [0, 2], date(2023, 10, 5), date(2023, 10, 30)))
+    assert window == [date(2023, 10, 16), date(2023, 10, 18)]
+
+    # A start date in the middle of the week skips the weekdays before it
+    assert list(weekly_occurrences(date(2023, 10, 4), date(2023, 10, 10), weekdays=[0, 2])) == [
+        date(2023, 10, 4),
+        date(2023, 10, 9),
+    ]
+
+
+def test_infer_weekly_rule():
+    """infer_weekly_rule should return the bounds of the dates and the weeks without a date."""
+    start, until, missing = infer_weekly_rule([date(2023, 10, 16), date(2023, 10, 2), date(2023, 10, 30)])
+    assert (start, until) == (SERIES_START, SERIES_UNTIL)
+    assert missing == [date(2023, 10, 9), date(2023, 10, 23)]
+    assert to_rrule(2, [0, 2], until) == "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;UNTIL=20231030"
+
+
+@pytest.fixture
+def setup_teacher(test_client) -> int:
+    """Create a teacher and return their ID."""
+    return add_user("Jane", "Series", "teacher_pic_url", UserType.TEACHER, UserLevel.NA)
+
+
+@pytest.fixture
+def setup_student(test_client) -> int:
+    """Create a student and return their ID."""
+    return add_user("Paul", "Series", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+
+
+@pytest.fixture
+def setup_group(test_client, setup_teacher, setup_student) -> int:
+    """Create a class with one group, enroll the student in it and return the group ID."""
+    add_class(
+        class_id=CLASS_ID,
+        name="Series Class",
+        ects_credits=3,
+        default_teacher_id=setup_teacher,
+        level="1A",
+        background_color="#abcdef",
+    )
+    group_id = add_class_group(name="Cours", class_id=CLASS_ID, is_main_group=True)
+    enroll_student_in_group(setup_student, group_id)
+    return group_id
+
+
+@pytest.fixture
+def setup_series(test_client, setup_group, setup_teacher) -> int:
+    """Create a weekly series on Mondays and return its ID."""
+    return add_lesson_series(
+        group_id=setup_group,
+        start_date=SERIES_START.isoformat(),
+        until_date=SERIES_UNTIL.isoformat(),
+        start_time="09:00",
+        end_time="10:30",
+        room=ROOM,
+        teacher_id=setup_teacher,
+    )
+
+
+def test_add_lesson_series(setup_series, setup_group):
+    """add_lesson_series should store the rule and refuse invalid ones."""
+    series = get_lesson_series_by_id(setup_series)
+    assert series.weekdays == "MO"
+    assert series.start_time == START_TIME
+    assert series.rrule == "FREQ=WEEKLY;INTERVAL=1;BYDAY=MO;UNTIL=20231030"
+    assert get_all_lesson_series(setup_group) == [series]
+
+    assert add_lesson_series(setup_group, "2023-10-30", "2023-10-02", "09:00", "10:00") == -1
+    assert add_lesson_series(setup_group, "2023-10-02", "2023-10-30", "09:00", "10:00", weekdays="XX") == -1
+
+
+def test_series_occurrences_in_calendar(setup_series, setup_group, setup_teacher):
+    """Occurrences should be expanded in the calendar reads, only for the requested window."""
+    occurrences = get_all_calendar_lessons()
+    assert [occurrence.start_ts for occurrence in occurrences] == [
+        datetime(2023, 10, day, 9, 0) for day in (2, 9, 16, 23, 30)
+    ]
+    first = occurrences[0]
+    assert first.calendar_id == f"series_{setup_series}_20231002"
+    assert first.lesson_id is None
+    assert (first.title, first.group_name, first.teacher_name, first.room) == (
+        "Series Class",
+        "Cours",
+        "Jane Series",
+        ROOM,
+    )
+    assert first.end_ts == datetime(2023, 10, 2, 10, 30)
+
+    window = get_all_calendar_lessons(date(2023, 10, 9), date(2023, 10, 17))
+    assert [occurrence.occurrence_date for occurrence in window] == [date(2023, 10, 9), date(2023, 10, 16)]
+    assert len(get_all_calendar_lessons(limit=2)) == 2
+
+
+def test_student_and_teacher_reads_merge_lessons_and_series(setup_series, setup_group, setup_student, setup_teacher):
+    """One-off lessons and occurrences should be merged in chronological order."""
+    lesson_id = add_lesson(setup_group, "2023-10-10", "14:00", "15:00", teacher_id=setup_teacher)
+    student = db.session.get(User, setup_student)
+    teacher = db.session.get(User, setup_teacher)
+    lessons = get_student_calendar_lessons(student, date(2023, 10, 9), date(2023, 10, 17))
+    assert [lesson.calendar_id for lesson in lessons] == [
+        f"series_{setup_series}_20231009",
+        f"lesson_{lesson_id}",
+        f"series_{setup_series}_20231016",
+    ]
+    assert [lesson.calendar_id for lesson in get_teacher_calendar_lessons(teacher, date(2023, 10, 9))][:2] == [
+        f"series_{setup_series}_20231009",
+        f"lesson_{lesson_id}",
+    ]
+    assert len(list(iter_user_calendar_lessons(student))) == 6
+
+
+def test_override_and_cancel_occurrence(setup_series):
+    """Overrides should move, modify or cancel a single occurrence."""
+    assert override_occurrence(setup_series, "2023-10-09", {"date": "2023-10-11", "start_time": "14:00", "room": "C3"})
+    assert cancel_occurrence(setup_series, "2023-10-16")
+    # Dates outside of the rule cannot be overridden
+    assert not override_occurrence(setup_series, "2023-10-10", {"room": "C3"})
+    assert not cancel_occurrence(setup_series, "2023-11-06")
+
+    occurrences = get_all_calendar_lessons()
+    assert [occurrence.start_ts for occurrence in occurrences] == [
+        datetime(2023, 10, 2, 9, 0),
+        datetime(2023, 10, 11, 14, 0),
+        datetime(2023, 10, 23, 9, 0),
+        datetime(2023, 10, 30, 9, 0),
+    ]
+    moved = occurrences[1]
+    assert (moved.occurrence_date, moved.room, moved.end_ts) == (
+        date(2023, 10, 9),
+        "C3",
+        datetime(2023, 10, 11, 15, 30),
+    )
+    # A moved occurrence is found in the window of its new date
+    window = get_all_calendar_lessons(date(2023, 10, 10), date(2023, 10, 12))
+    assert [occurrence.calendar_id for occurrence in window] == [f"series_{setup_series}_20231009"]
+
+    # Overriding a cancelled occurrence restores it
+    assert override_occurrence(setup_series, "2023-10-16", {"homework": "Exercise 3"})
+    restored = get_all_calendar_lessons(date(2023, 10, 16), date(2023, 10, 17))
+    assert [occurrence.homework for occurrence in restored] == ["Exercise 3"]
+
+
+def test_update_lesson_series(setup_series):
+    """Updating the rule should drop the overrides of the dates no longer in the series."""
+    cancel_occurrence(setup_series, "2023-10-30")
+    cancel_occurrence(setup_series, "2023-10-09")
+    assert update_lesson_series(setup_series, {"until_date": "2023-10-23", "end_time": "11:00"})
+    assert [override.occurrence_date for override in LessonSeriesOverride.query.all()] == [date(2023, 10, 9)]
+    occurrences = get_all_calendar_lessons()
+    assert [occurrence.occurrence_date for occurrence in occurrences] == [date(2023, 10, day) for day in (2, 16, 23)]
+    assert occurrences[0].end_ts == datetime(2023, 10, 2, 11, 0)
+
+    assert not update_lesson_series(setup_series, {"weekdays": "XX"})
+    assert get_lesson_series_by_id(setup_series).weekdays == "MO"
+
+
+def test_delete_lesson_series(setup_series):
+    """Deleting a series should remove its occurrences and overrides."""
+    cancel_occurrence(setup_series, "2023-10-09")
+    assert delete_lesson_series(setup_series)
+    assert get_lesson_series_by_id(setup_series) is None
+    assert LessonSeriesOverride.query.count() == 0
+    assert get_all_calendar_lessons() == []
+
+
+def test_series_changes_bump_lessons_version(setup_series, setup_student, setup_teacher):
+    """Every series change should bump the lessons version of its students and teacher."""
+    versions = [get_data_version(owner_id, LESSONS_SCOPE) for owner_id in (setup_student, setup_teacher)]
+    cancel_occurrence(setup_series, "2023-10-09")
+    bumped = [get_data_version(owner_id, LESSONS_SCOPE) for owner_id in (setup_student, setup_teacher)]
+    assert all(after > before for before, after in zip(versions, bumped))
+
+    delete_user(setup_teacher)
+    assert get_data_version(setup_student, LESSONS_SCOPE) > bumped[0]
+    assert get_all_calendar_lessons()[0].teacher_name is None
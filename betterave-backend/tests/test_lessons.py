@@ -86,6 +86,46 @@ def test_get_all_lessons_route(test_client):
     assert response.status_code == 200
 
 
+def test_get_lessons_window_route(test_client, setup_lesson):
+    """LessonList.GET should only return the lessons of the requested window."""
+    response = test_client.get("/lessons/", query_string={"start": "2023-12-18T00:00:00+01:00", "end": "2023-12-25"})
+    assert response.status_code == 200
+    assert [lesson["lesson_id"] for lesson in response.json] == [setup_lesson]
+
+    response = test_client.get("/lessons/", query_string={"start": "2023-12-22"})
+    assert response.status_code == 200
+    assert response.json == []
+
+    response = test_client.get("/lessons/", query_string={"start": "not a date"})
+    assert response.status_code == 400
+
+
+def test_get_lessons_route_constant_queries(test_client, setup_lesson, query_counter):
+    """Serializing lessons should not issue one query per lesson, class group, class or teacher."""
+    test_client.get("/lessons/")
+    queries_for_one_lesson = query_counter.count
+
+    for i in range(4):
+        teacher_id = add_user("Teacher", f"Number{i}", "teacher_pic_url", UserType.TEACHER, UserLevel.NA)
+        class_id = add_class(
+            class_id=100 + i,
+            name=f"Class {i}",
+            ects_credits=3,
+            default_teacher_id=teacher_id,
+            level="1A",
+            background_color="#654321",
+        )
+        group_id = add_class_group(name=f"Group {i}", is_main_group=True, class_id=class_id)
+        add_lesson(group_id=group_id, date=LESSON_DATE, start_time=START_TIME, end_time=END_TIME, teacher_id=teacher_id)
+
+    query_counter.count = 0
+    response = test_client.get("/lessons/")
+    assert response.status_code == 200
+    assert len(response.json) == 5
+    assert {lesson["teacher"] for lesson in response.json} >= {"Teacher Number0", "Teacher Number3"}
+    assert query_counter.count == queries_for_one_lesson
+
+
 def test_post_lesson_route(test_client, setup_login_admin, setup_teacher):
     """LessonList.POST should return 201."""
     payload = {
@@ -120,3 +160,65 @@ def test_delete_lesson_route(test_client, setup_login_admin, setup_lesson):
     """LessonResource.DELETE should return 204."""
     response = test_client.delete(f"/lessons/{setup_lesson}")
     assert response.status_code == 204
+
+
+@pytest.fixture
+def setup_series(test_client, setup_login_admin, setup_group, setup_teacher) -> int:
+    """Create a weekly lesson series through the API and return its ID."""
+    payload = {
+        "group_id": setup_group,
+        "start_date": "2023-12-04",
+        "until_date": "2023-12-18",
+        "start_time": START_TIME,
+        "end_time": END_TIME,
+        "weekdays": "MO,TH",
+        "room": ROOM,
+        "teacher_id": setup_teacher,
+    }
+    response = test_client.post("/lessons/series", json=payload)
+    assert response.status_code == 201
+    return response.json
+
+
+def test_get_lesson_series_routes(test_client, setup_series):
+    """LessonSeriesList.GET and LessonSeriesResource.GET should return the series and its rule."""
+    response = test_client.get("/lessons/series")
+    assert response.status_code == 200
+    assert [series["series_id"] for series in response.json] == [setup_series]
+
+    response = test_client.get(f"/lessons/series/{setup_series}")
+    assert response.status_code == 200
+    assert response.json["rrule"] == "FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,TH;UNTIL=20231218"
+    assert response.json["start_time"] == START_TIME
+
+    assert test_client.get("/lessons/series/9999").status_code == 404
+
+
+def test_series_occurrences_route(test_client, setup_series):
+    """LessonList.GET should list the occurrences of the series in the window, overrides applied."""
+    response = test_client.put(f"/lessons/series/{setup_series}/occurrences/2023-12-07", json={"room": "B12"})
+    assert response.status_code == 204
+    response = test_client.delete(f"/lessons/series/{setup_series}/occurrences/2023-12-11")
+    assert response.status_code == 204
+    assert test_client.delete(f"/lessons/series/{setup_series}/occurrences/2023-12-12").status_code == 404
+
+    response = test_client.get("/lessons/", query_string={"start": "2023-12-05", "end": "2023-12-15"})
+    assert response.status_code == 200
+    assert [(lesson["id"], lesson["room"]) for lesson in response.json] == [
+        (f"series_{setup_series}_20231207", "B12"),
+        (f"series_{setup_series}_20231214", ROOM),
+    ]
+    assert response.json[0]["occurrence_date"] == "2023-12-07"
+    assert response.json[0]["lesson_id"] is None
+
+
+def test_update_and_delete_lesson_series_routes(test_client, setup_series):
+    """LessonSeriesResource.PUT and DELETE should return 204, and the calendar follow."""
+    response = test_client.put(f"/lessons/series/{setup_series}", json={"until_date": "2023-12-07"})
+    assert response.status_code == 204
+    assert len(test_client.get("/lessons/").json) == 2
+
+    response = test_client.delete(f"/lessons/series/{setup_series}")
+    assert response.status_code == 204
+    assert test_client.get("/lessons/").json == []
+    assert test_client.delete(f"/lessons/series/{setup_series}").status_code == 404
@@ -2,9 +2,11 @@
 
 # type: ignore
 import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select
 from betterave_backend.extensions import db
 from betterave_backend.app.models.class_ import Class
-from betterave_backend.app.models import UserType, UserLevel
+from betterave_backend.app.models import Message, UserType, UserLevel
 from betterave_backend.app.operations.class_operations import add_class
 from betterave_backend.app.operations.class_group_operations import add_class_group
 from betterave_backend.app.operations.message_operations import (
@@ -94,3 +96,82 @@ def test_add_class_message(test_client, setup_class, setup_student, setup_group)
     class_message = add_class_message(MESSAGE_CONTENT, setup_class, setup_student)
     assert class_message is not None
     assert class_message.content == MESSAGE_CONTENT
+
+
+@pytest.fixture
+def setup_history(test_client, setup_group, setup_student) -> list[int]:
+    """Post 7 messages to the group, the 3rd and 4th at the same time, and return their IDs in posting order."""
+    start = datetime(2024, 5, 1, 12, 0)
+    offsets = [0, 1, 2, 2, 3, 4, 5]
+    messages = [
+        Message(
+            content=f"Message {i}", group_id=setup_group, user_id=setup_student, timestamp=start + timedelta(minutes=m)
+        )
+        for i, m in enumerate(offsets)
+    ]
+    db.session.add_all(messages)
+    db.session.commit()
+    return [message.message_id for message in messages]
+
+
+def test_get_messages_by_group_id_pages(setup_group, setup_history):
+    """Test walking the history of a group page by page, newest first, from either end."""
+    ids = setup_history
+
+    def page(**kwargs):
+        return [message.message_id for message in get_messages_by_group_id(setup_group, **kwargs)]
+
+    assert page() == ids[::-1]
+    assert page(limit=3) == [ids[6], ids[5], ids[4]]
+    assert page(before=ids[4], limit=3) == [ids[3], ids[2], ids[1]]
+    assert page(before=ids[1], limit=3) == [ids[0]]
+    assert page(before=ids[0], limit=3) == []
+    # Messages posted at the same time are ordered by ID
+    assert page(before=ids[3], limit=1) == [ids[2]]
+    assert page(after=ids[2], limit=1) == [ids[3]]
+
+    assert page(after=ids[1], limit=3) == [ids[4], ids[3], ids[2]]
+    assert page(after=ids[4]) == [ids[6], ids[5]]
+    assert page(after=ids[6]) == []
+    assert page(after=ids[1], before=ids[4]) == [ids[3], ids[2]]
+
+
+def test_get_messages_by_group_id_unknown_cursor(setup_group, setup_history):
+    """A cursor which is not a message of the group, e.g. a deleted one, is an error rather than an empty page."""
+    ids = setup_history
+    db.session.delete(db.session.get(Message, ids[6]))
+    db.session.commit()
+    for cursor in (ids[6], ids[6] + 1):
+        with pytest.raises(ValueError):
+            get_messages_by_group_id(setup_group, after=cursor)
+        with pytest.raises(ValueError):
+            get_messages_by_group_id(setup_group, before=cursor)
+    with pytest.raises(ValueError):
+        get_messages_by_group_id(setup_group + 1, after=ids[0])
+
+
+def query_plan(query) -> str:
+    """Return the SQLite query plan of a query."""
+    sql = query.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True})
+    return " ".join(row.detail for row in db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+
+def test_get_messages_by_group_id_uses_index(setup_group, setup_history):
+    """Test that the pages and the chat streams are read from the message indexes, without sorting."""
+    query = (
+        select(Message.message_id)
+        .where(Message.group_id == setup_group, Message.timestamp < datetime(2024, 5, 1, 12, 3))
+        .order_by(Message.timestamp.desc(), Message.message_id.desc())
+        .limit(3)
+    )
+    assert "ix_message_group_id_timestamp" in query_plan(query)
+    assert "TEMP B-TREE" not in query_plan(query)
+
+    # The chat streams read the messages of a group in ID order from the last one sent
+    query = (
+        select(Message.message_id)
+        .where(Message.group_id == setup_group, Message.message_id > setup_history[3])
+        .order_by(Message.message_id)
+    )
+    assert "ix_message_group_id_message_id" in query_plan(query)
+    assert "TEMP B-TREE" not in query_plan(query)
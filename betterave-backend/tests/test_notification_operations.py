@@ -1,6 +1,8 @@
 # type: ignore
 import pytest
-from betterave_backend.app.models import User, UserType, UserLevel
+from datetime import datetime
+from betterave_backend.extensions import db
+from betterave_backend.app.models import User, UserType, UserLevel, NotificationAudience, notification_reception
 from betterave_backend.app.operations.notification_operations import (
     add_notification,
     update_notification,
@@ -10,8 +12,11 @@ from betterave_backend.app.operations.notification_operations import (
     get_user_notifications,
     add_recipient_to_notification,
     get_title_notification_by_id,
+    get_notification_recipient_ids,
+    mark_notifications_read,
 )
-from betterave_backend.app.operations.user_operations import add_user
+from betterave_backend.app.operations.user_operations import add_user, update_user, delete_user
+from betterave_backend.app.operations.asso_operations import subscribe_to_asso
 
 # Constants
 TITLE = "New Notification"
@@ -105,3 +110,78 @@ def test_add_recipient_to_notification(test_client, setup_notification, setup_st
     """Test adding recipients to a notification."""
     success = add_recipient_to_notification(setup_notification, user_ids=[setup_student])
     assert success is True
+
+
+def test_get_notifications_in_date_window(test_client, setup_user):
+    """Notifications are filtered on their sending date."""
+    notif_id = add_notification(TITLE, CONTENT, setup_user, RECIPIENT_TYPE)
+    today = datetime.utcnow().date()
+    assert [notif.notification_id for notif in get_user_notifications(setup_user, start=today)] == [notif_id]
+    assert get_all_notifications(end=today) == []
+
+
+def test_notification_audience_rules(test_client, setup_user, setup_student, query_counter):
+    """A notification is addressed by one rule, also matching the users created or updated after it."""
+    add_notification(TITLE, CONTENT, setup_user, RECIPIENT_TYPE)
+    query_counter.count = 0
+    everyone = add_notification(TITLE, CONTENT, setup_user, RECIPIENT_TYPE)
+    statements = query_counter.count
+    assert NotificationAudience.query.filter_by(notification_id=everyone).count() == 1
+    assert db.session.execute(db.select(db.func.count()).select_from(notification_reception)).scalar() == 0
+
+    # Sending to everyone does not depend on the number of users
+    for name in ("Anna", "Ben", "Chloe"):
+        add_user(name, "Mac", "student_pic_url", UserType.STUDENT, UserLevel._2A)
+    query_counter.count = 0
+    add_notification(TITLE, CONTENT, setup_user, RECIPIENT_TYPE)
+    assert query_counter.count == statements
+
+    first_years = add_notification(TITLE, CONTENT, setup_user, UserLevel._1A)
+    late_id = add_user("Jane", "Mac", "student_pic_url", UserType.STUDENT, UserLevel._2A)
+    assert get_notification_recipient_ids(first_years) == [setup_student]
+    assert len(get_user_notifications(late_id)) == 3
+    update_user(late_id, {"level": "1A"})
+    assert get_notification_recipient_ids(first_years) == [setup_student, late_id]
+
+    asso_id = add_user("BDE", "", "asso_pic_url", UserType.ASSO, UserLevel.NA)
+    subscribers = add_notification(TITLE, CONTENT, asso_id, "Subscribers")
+    assert get_notification_recipient_ids(subscribers) == []
+    subscribe_to_asso(setup_student, asso_id)
+    assert get_notification_recipient_ids(subscribers) == [setup_student]
+    assert add_notification(TITLE, CONTENT, asso_id, "4A") == -1
+
+
+def test_add_recipient_to_notification_rules(test_client, setup_user, setup_student):
+    """Recipients are added individually or by level, the notification being deleted with them."""
+    notif_id = add_notification(TITLE, CONTENT, setup_user, UserLevel._2A)
+    assert add_recipient_to_notification(notif_id, user_ids=[setup_student, setup_student])
+    assert add_recipient_to_notification(notif_id, user_ids=[setup_student, 9999])
+    assert db.session.execute(db.select(db.func.count()).select_from(notification_reception)).scalar() == 1
+    assert [notif.notification_id for notif in get_user_notifications(setup_student)] == [notif_id]
+    assert add_recipient_to_notification(notif_id, user_level="N/A")
+    assert add_recipient_to_notification(notif_id, user_level="N/A")
+    assert NotificationAudience.query.filter_by(notification_id=notif_id).count() == 2
+    assert get_notification_recipient_ids(notif_id) == [setup_user, setup_student]
+    assert not add_recipient_to_notification(-1)
+
+    assert delete_notification(notif_id)
+    assert NotificationAudience.query.count() == 0
+    assert db.session.execute(db.select(db.func.count()).select_from(notification_reception)).scalar() == 0
+
+
+def test_notification_read_cursor(test_client, setup_user, setup_student):
+    """Notifications up to the read cursor are read, the cursor never moving backwards."""
+    first, second, third = (add_notification(TITLE, CONTENT, setup_user, RECIPIENT_TYPE) for _ in range(3))
+    assert [notif.read for notif in get_user_notifications(setup_student)] == [False, False, False]
+
+    assert mark_notifications_read(setup_student, second)
+    assert mark_notifications_read(setup_student, first)
+    assert [notif.read for notif in get_user_notifications(setup_student)] == [True, True, False]
+    # Another user's read state is independent
+    assert [notif.read for notif in get_user_notifications(setup_user)] == [False, False, False]
+
+    assert mark_notifications_read(setup_student)
+    assert [notif.notification_id for notif in get_user_notifications(setup_student, limit=2)] == [first, second]
+    assert all(notif.read for notif in get_user_notifications(setup_student))
+    assert third > second
+    assert delete_user(setup_student)
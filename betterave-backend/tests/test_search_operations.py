@@ -0,0 +1,212 @@
+"""Tests for the full-text search over the class messages and homework."""
+
+# type: ignore
+import os
+import pytest
+from sqlalchemy import event, select
+from betterave_backend.create_app import create_app
+from betterave_backend.extensions import db
+from betterave_backend.app.models import Homework, Message, UserLevel, UserType
+from betterave_backend.app.operations.class_group_operations import add_class_group
+from betterave_backend.app.operations.class_operations import add_class
+from betterave_backend.app.operations.homework_operations import add_homework_to_group
+from betterave_backend.app.operations.message_operations import add_message_to_group, delete_message
+from betterave_backend.app.operations.search_operations import query_terms, search_class_content
+from betterave_backend.app.operations.user_class_group_operations import enroll_user_in_class
+from betterave_backend.app.operations.user_operations import add_user
+from betterave_backend.scripts.rebuild_search_index import rebuild_search_indexes
+
+# The PostgreSQL search is only checked when a test database is given
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+@pytest.fixture
+def setup_classes(test_client):
+    """Create two classes with a main group each, a teacher, a student enrolled in the first one and an admin."""
+    teacher_id = add_user("Allan", "Doe", "teacher_pic_url", UserType.TEACHER, UserLevel.NA)
+    other_teacher_id = add_user("Jane", "Roe", "teacher_pic_url", UserType.TEACHER, UserLevel.NA)
+    student_id = add_user("Zoe", "Smith", "student_pic_url", UserType.STUDENT, UserLevel._1A)
+    admin_id = add_user("Directeur", "Admin", "admin_pic_url", UserType.ADMIN, UserLevel.NA)
+    groups = []
+    for class_id, name, teacher in ((1, "Théorie des jeux", teacher_id), (2, "Économétrie", other_teacher_id)):
+        add_class(
+            class_id=class_id,
+            name=name,
+            ects_credits=3,
+            default_teacher_id=teacher,
+            level=UserLevel._1A,
+            background_color="#123456",
+        )
+        groups.append(add_class_group(name="Main", class_id=class_id, is_main_group=True))
+    enroll_user_in_class(student_id, 1)
+    return {"teacher": teacher_id, "other_teacher": other_teacher_id, "student": student_id, "admin": admin_id}, groups
+
+
+def found(user_id, query, **kwargs):
+    """Return the (kind, content) of the results of a search, in order."""
+    return [(result["kind"], result["content"]) for result in search_class_content(user_id, query, **kwargs)]
+
+
+def test_query_terms():
+    """The operators and punctuation of a query are ignored."""
+    assert query_terms('Partiel: "théorie" AND jeux* -NEAR(') == ["partiel", "théorie", "and", "jeux", "near"]
+    assert query_terms("  ?! ") == []
+
+
+def test_search_messages_and_homework(setup_classes):
+    """Messages and homework of the groups matching every word are found, accents and case ignored."""
+    users, (group_id, _) = setup_classes
+    add_message_to_group("Le partiel de Théorie des jeux est lundi", group_id, users["teacher"])
+    add_message_to_group("Pas de cours lundi", group_id, users["teacher"])
+    add_homework_to_group("Réviser la theorie pour le partiel", "2024-05-01", "10:00", group_id)
+
+    results = search_class_content(users["student"], "THEORIE partiel")
+    assert sorted(result["kind"] for result in results) == ["homework", "message"]
+    message = next(result for result in results if result["kind"] == "message")
+    assert message["author"] == "Allan Doe"
+    assert message["class_name"] == "Théorie des jeux"
+    assert message["group_id"] == group_id
+    assert message["score"] > 0
+    homework = next(result for result in results if result["kind"] == "homework")
+    assert homework["date"].isoformat() == "2024-05-01T10:00:00"
+    assert homework["author"] is None
+
+    # The last word is a prefix, as the user may not have finished typing it
+    assert found(users["student"], "lun") == found(users["student"], "lundi")
+    assert len(found(users["student"], "lundi")) == 2
+    assert found(users["student"], "partiel dimanche") == []
+    assert found(users["student"], "?!") == []
+
+
+def test_search_ranking(setup_classes):
+    """The most relevant results come first."""
+    users, (group_id, _) = setup_classes
+    add_message_to_group(
+        "Le rendu du projet est reporté, pensez à relire le sujet et le barème", group_id, users["teacher"]
+    )
+    add_message_to_group("Projet : rendu projet vendredi", group_id, users["teacher"])
+    contents = [content for _, content in found(users["teacher"], "projet")]
+    assert contents[0] == "Projet : rendu projet vendredi"
+
+
+def test_search_is_scoped_to_the_groups_of_the_user(setup_classes):
+    """Users only find the content of their groups, admins of every group."""
+    users, (group_id, other_group_id) = setup_classes
+    add_message_to_group("Partiel de jeux", group_id, users["teacher"])
+    add_homework_to_group("Partiel blanc d'économétrie", "2024-05-01", None, other_group_id)
+
+    assert found(users["student"], "partiel") == [("message", "Partiel de jeux")]
+    assert found(users["teacher"], "partiel") == [("message", "Partiel de jeux")]
+    assert found(users["other_teacher"], "partiel") == [("homework", "Partiel blanc d'économétrie")]
+    assert len(found(users["admin"], "partiel")) == 2
+
+
+def test_search_index_follows_changes(setup_classes):
+    """The index is kept up to date when messages and homework are edited or deleted."""
+    users, (group_id, _) = setup_classes
+    message = add_message_to_group("Salle A10", group_id, users["teacher"])
+    add_homework_to_group("Exercice 3", "2024-05-01", None, group_id)
+    assert found(users["student"], "a10") == [("message", "Salle A10")]
+
+    message.content = "Salle B22"
+    db.session.commit()
+    assert found(users["student"], "a10") == []
+    assert found(users["student"], "b22") == [("message", "Salle B22")]
+
+    delete_message(message.message_id)
+    assert found(users["student"], "salle") == []
+    db.session.delete(db.session.execute(select(Homework)).scalar_one())
+    db.session.commit()
+    assert found(users["student"], "exercice") == []
+
+
+def test_search_pagination(setup_classes):
+    """Pages of results follow each other without overlapping."""
+    users, (group_id, _) = setup_classes
+    for i in range(7):
+        add_message_to_group(f"Question {i} sur le TD", group_id, users["teacher"])
+    every_result = found(users["student"], "question")
+    assert len(every_result) == 7
+    pages = [found(users["student"], "question", limit=3, offset=offset) for offset in (0, 3, 6)]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert sum(pages, []) == every_result
+
+
+def test_search_uses_the_full_text_index(setup_classes, query_counter):
+    """A search reads the full-text indexes, in one statement for the page and one for each kind of result."""
+    users, (group_id, _) = setup_classes
+    add_message_to_group("Partiel de jeux", group_id, users["teacher"])
+    add_homework_to_group("Partiel blanc", "2024-05-01", None, group_id)
+    db.session.expunge_all()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    query_counter.count = 0
+    try:
+        search_class_content(users["student"], "partiel")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    # The user, the page, the messages and the homework
+    assert query_counter.count == 4
+    page, parameters = next((statement, parameters) for statement, parameters in statements if "bm25" in statement)
+    connection = db.session.connection()
+    plan = "\n".join(row.detail for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {page}", parameters))
+    assert "VIRTUAL TABLE INDEX" in plan, plan
+
+
+def test_rebuild_search_index(setup_classes):
+    """Rows written before the index existed are indexed by the rebuild script."""
+    users, (group_id, _) = setup_classes
+    connection = db.session.connection()
+    for name in ("message_fts_insert", "message_fts_update", "message_fts_delete"):
+        connection.exec_driver_sql(f"DROP TRIGGER {name}")
+    connection.exec_driver_sql("DROP TABLE message_fts")
+    db.session.execute(
+        Message.__table__.insert(), [{"content": "Message d'avant", "group_id": group_id, "user_id": users["teacher"]}]
+    )
+    rebuild_search_indexes()
+    db.session.commit()
+    assert found(users["student"], "avant") == [("message", "Message d'avant")]
+    add_message_to_group("Message d'après", group_id, users["teacher"])
+    assert len(found(users["student"], "message")) == 2
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+def test_postgresql_search():
+    """On PostgreSQL, the search reads the GIN-indexed tsvector columns."""
+    app = create_app(db_test_path=POSTGRES_URL)
+    with app.app_context():
+        db.create_all()
+        try:
+            teacher_id = add_user("Allan", "Doe", "teacher_pic_url", UserType.TEACHER, UserLevel.NA)
+            add_class(
+                class_id=1,
+                name="Jeux",
+                ects_credits=3,
+                default_teacher_id=teacher_id,
+                level=UserLevel._1A,
+                background_color="#123456",
+            )
+            group_id = add_class_group(name="Main", class_id=1, is_main_group=True)
+            add_message_to_group("Le partiel de jeux", group_id, teacher_id)
+            add_message_to_group("Partiel, partiel, partiel", group_id, teacher_id)
+            add_homework_to_group("Préparer le partiel", "2024-05-01", None, group_id)
+            assert found(teacher_id, "parti")[0] == ("message", "Partiel, partiel, partiel")
+            assert len(found(teacher_id, "partiel")) == 3
+            assert found(teacher_id, "partiel jeux") == [("message", "Le partiel de jeux")]
+
+            connection = db.session.connection()
+            connection.exec_driver_sql("SET enable_seqscan = off")
+            plan = "\n".join(
+                row[0]
+                for row in connection.exec_driver_sql(
+                    "EXPLAIN SELECT message_id FROM message WHERE search_vector @@ to_tsquery('simple', 'partiel')"
+                )
+            )
+            assert "ix_message_search_vector" in plan, plan
+        finally:
+            db.session.remove()
+            db.drop_all()
@@ -7,6 +7,9 @@ from betterave_backend.app.models import UserType, UserLevel
 from betterave_backend.app.operations.user_operations import add_user
 from betterave_backend.app.operations.class_group_operations import add_class_group
 from betterave_backend.app.operations.class_operations import add_class
+from betterave_backend.app.operations.event_operations import add_event
+from betterave_backend.app.operations.event_series_operations import add_event_series
+from betterave_backend.app.operations.notification_operations import add_notification
 
 LESSON_ID = "lesson_2"
 DATE = str(date(2023, 12, 21))
@@ -181,6 +184,16 @@ def test_get_user_association_route(test_client, setup_student, setup_login_stud
     assert response.status_code == 200
 
 
+def test_get_user_association_subscription_route(test_client, setup_student, setup_association, setup_login_student):
+    """UserAssociationList.GET should return the subscription status and subscriber count of each association."""
+    test_client.post(f"/users/{setup_student}/subscribe/{setup_association}")
+    response = test_client.get(f"/users/associations/{setup_student}")
+    assert response.status_code == 200
+    assert [(asso["user_id"], asso["subscribed"], asso["subscriber_count"]) for asso in response.json] == [
+        (setup_association, True, 1)
+    ]
+
+
 def test_post_user_association_route(test_client, setup_student, setup_association, setup_login_student):
     """SubscribeAssociation.POST should return 201."""
     response = test_client.post(f"/users/{setup_student}/subscribe/{setup_association}")
@@ -206,7 +219,85 @@ def test_get_user_future_events_route(test_client, setup_student, setup_login_st
     assert response.status_code == 200
 
 
+def test_user_event_attendance_routes(test_client, setup_student, setup_association, setup_login_student):
+    """The attendance routes should opt the user in or out of events and series."""
+    event_id = add_event(setup_association, "Gala", "2024-03-01", "20:00", "23:00", "Subscribers")
+    series_id = add_event_series(setup_association, "Réunion", "2024-03-04", "2024-03-11", "18:00", "19:00", "3A")
+    url = f"/users/{setup_student}/events"
+    assert len(test_client.get(url).json) == 2
+
+    response = test_client.put(f"/users/{setup_student}/events/{event_id}/attendance", json={"attending": True})
+    assert response.status_code == 204
+    response = test_client.put(
+        f"/users/{setup_student}/events/series/{series_id}/attendance", json={"attending": False}
+    )
+    assert response.status_code == 204
+    assert [event["event_id"] for event in test_client.get(url).json] == [event_id]
+
+    assert test_client.delete(f"/users/{setup_student}/events/{event_id}/attendance").status_code == 204
+    assert test_client.delete(f"/users/{setup_student}/events/series/{series_id}/attendance").status_code == 204
+    assert len(test_client.get(url).json) == 2
+    response = test_client.put(f"/users/{setup_student}/events/0/attendance", json={"attending": True})
+    assert response.status_code == 404
+
+
+def test_user_notifications_read_route(test_client, setup_student, setup_admin, setup_login_student):
+    """UserNotificationsRead.POST should mark the notifications as read."""
+    first = add_notification("Fermeture", "Bibliothèque", setup_admin, "All users")
+    add_notification("Travaux", "Bâtiment", setup_admin, "All users")
+    url = f"/users/{setup_student}/notifications"
+    response = test_client.get(url)
+    assert [notif["read"] for notif in response.json] == [False, False]
+
+    assert test_client.post(f"{url}/read", json={"last_read_id": first}).status_code == 204
+    assert test_client.get(url, headers={"If-None-Match": response.headers["ETag"]}).status_code == 200
+    assert [notif["read"] for notif in test_client.get(url).json] == [True, False]
+    assert test_client.post(f"{url}/read", json={}).status_code == 204
+    assert [notif["read"] for notif in test_client.get(url).json] == [True, True]
+
+
 def test_delete_user_by_id_route(test_client, setup_student, setup_login_admin):
     """UserRessource.DELETE should return 200."""
     response = test_client.delete(f"/users/{setup_student}")
     assert response.status_code == 204
+
+
+def test_user_search_route(test_client, setup_student, setup_group, setup_login_student):
+    """UserSearch.GET should return the ranked messages and homework of the classes of the user."""
+    from betterave_backend.app.operations.homework_operations import add_homework_to_group
+    from betterave_backend.app.operations.message_operations import add_message_to_group
+    from betterave_backend.app.operations.user_class_group_operations import enroll_user_in_class
+
+    enroll_user_in_class(setup_student, 1)
+    add_message_to_group("Partiel lundi", setup_group, setup_student)
+    add_homework_to_group("Réviser le partiel", "2024-05-01", None, setup_group)
+    response = test_client.get(f"/users/{setup_student}/search", query_string={"q": "partiel"})
+    assert response.status_code == 200
+    assert sorted(result["kind"] for result in response.json) == ["homework", "message"]
+    assert response.json[0]["class_name"] == "Betterave"
+
+    response = test_client.get(f"/users/{setup_student}/search", query_string={"q": "partiel", "limit": 1})
+    assert len(response.json) == 1
+    assert test_client.get(f"/users/{setup_student}/search").status_code == 400
+    assert test_client.get(f"/users/{setup_student}/search?q=partiel&offset=-1").status_code == 400
+
+
+def test_get_user_transcript_route(test_client, setup_class, setup_student, setup_admin, setup_login_student):
+    """UserTranscript.GET should return the transcript of the student, cached until their grades change."""
+    from betterave_backend.app.operations.grade_operations import add_grade, update_student_grade
+
+    add_grade(setup_student, setup_class, 9)
+    response = test_client.get("/users/me/transcript")
+    assert response.status_code == 200
+    assert response.json["classes"] == [
+        {"class_id": setup_class, "name": "Betterave", "level": "3A", "ects_credits": 20, "grade": 9.0, "passed": False}
+    ]
+    assert response.json["levels"] == [{"level": "3A", "average": 9.0, "credits_attempted": 20, "credits_earned": 0}]
+    etag = response.headers["ETag"]
+    assert test_client.get("/users/me/transcript", headers={"If-None-Match": etag}).status_code == 304
+
+    update_student_grade(setup_class, setup_student, 15)
+    response = test_client.get("/users/me/transcript")
+    assert response.headers["ETag"] != etag
+    assert response.json["credits_earned"] == 20
+    assert test_client.get(f"/users/{setup_admin}/transcript").status_code == 403